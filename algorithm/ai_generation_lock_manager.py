@@ -2,14 +2,23 @@
 教师一键禁用AI自动生成机制
 
 基于v9.0需求，允许教师锁定知识点，进入专家标注模式。
+锁定历史有界保存；配置后台租约回收器（LeaseReaper）时，已解锁的记录在保留期后自动清理。
+
+锁定按"视频→知识点"分层索引：锁定视频即隐式锁定其下的全部知识点，知识点的锁定状态可以O(1)查询；
+单独锁定的知识点在所属视频上记录意向锁计数，无需遍历即可知道视频下是否有被锁定的知识点。
 """
 
 import logging
+import threading
+from functools import partial
 from typing import Dict, List, Optional, Any, Set
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 
+from bounded_history import BoundedHistory
+from lease_reaper import LeaseReaper
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -40,9 +49,12 @@ class LockHistory:
     video_id: Optional[int]
     knowledge_point_id: Optional[int]
     teacher_id: int
-    action: str  # "lock" or "unlock"
+    action: str  # "lock", "unlock", "batch_lock" or "batch_unlock"
     timestamp: datetime
     reason: str
+    # 批量操作只记录一条历史，涉及的全部视频和知识点
+    video_ids: List[int] = field(default_factory=list)
+    knowledge_point_ids: List[int] = field(default_factory=list)
 
 
 class AIGenerationLockManager:
@@ -52,19 +64,54 @@ class AIGenerationLockManager:
     1. 教师可以一键禁用AI自动生成（锁定知识点）
     2. 锁定后，系统不再自动生成知识点标注
     3. 进入专家标注模式，教师手动标注
-    4. 支持批量锁定/解锁
+    4. 支持批量锁定/解锁（一次加锁完成，只写一条历史记录）
+    5. 锁定视频时，其下的知识点（register_knowledge_points登记或随视频一起锁定的）隐式锁定
     """
     
-    def __init__(self):
-        """初始化AI生成锁定管理器"""
+    # 已解锁记录的默认保留时长
+    DEFAULT_UNLOCKED_RETENTION = timedelta(hours=1)
+    
+    def __init__(
+        self,
+        reaper: Optional[LeaseReaper] = None,
+        unlocked_retention: timedelta = DEFAULT_UNLOCKED_RETENTION,
+        history_limit: Optional[int] = BoundedHistory.DEFAULT_MAX_RECORDS,
+        history_spill_path: Optional[str] = None
+    ):
+        """初始化AI生成锁定管理器
+        
+        Args:
+            reaper: 后台租约回收器（可选，通常为get_lease_reaper()），配置后已解锁的记录
+                在unlocked_retention之后从video_locks/knowledge_point_locks中清理
+            unlocked_retention: 已解锁记录的保留时长
+            history_limit: 锁定历史在内存中保留的最大记录数，None表示不限制
+            history_spill_path: 锁定历史溢出文件路径（可选）
+        """
+        self.reaper = reaper
+        self.unlocked_retention = unlocked_retention
+        
+        # 保护锁定表（回收器在后台线程中清理记录）
+        self._lock = threading.Lock()
+        
         # 存储视频级别的锁定状态
         self.video_locks: Dict[int, LockRecord] = {}  # key: video_id
         
         # 存储知识点级别的锁定状态
         self.knowledge_point_locks: Dict[int, LockRecord] = {}  # key: knowledge_point_id
         
-        # 存储锁定历史
-        self.lock_history: List[LockHistory] = []
+        # 分层索引：知识点 -> 所属视频
+        self._kp_video: Dict[int, int] = {}
+        
+        # 意向锁：视频 -> 其下单独锁定（LOCKED）的知识点数量，为0时删除
+        self._video_intents: Dict[int, int] = {}
+        
+        # 存储锁定历史（有界，超出后淘汰最旧记录）
+        self.lock_history: BoundedHistory[LockHistory] = BoundedHistory(
+            max_records=history_limit, spill_path=history_spill_path
+        )
+        
+        # 统计计数
+        self.purged_count = 0
         
         logger.info("AIGenerationLockManager initialized")
     
@@ -90,18 +137,15 @@ class AIGenerationLockManager:
             logger.warning("Either video_id or knowledge_point_ids must be provided")
             return False
         
-        success = True
+        video_ids = [video_id] if video_id is not None else []
+        kp_ids = list(knowledge_point_ids or [])
+        
+        # 视频和知识点在同一个临界区内锁定，随视频锁定的知识点登记到该视频下
+        with self._lock:
+            self._lock_items(teacher_id, video_ids, kp_ids, video_id, reason)
         
         # 锁定视频级别
         if video_id is not None:
-            record = LockRecord(
-                video_id=video_id,
-                teacher_id=teacher_id,
-                status=LockStatus.LOCKED,
-                reason=reason or f"教师{teacher_id}禁用AI自动生成"
-            )
-            self.video_locks[video_id] = record
-            
             # 记录历史
             history = LockHistory(
                 video_id=video_id,
@@ -118,16 +162,8 @@ class AIGenerationLockManager:
             )
         
         # 锁定知识点级别
-        if knowledge_point_ids:
-            for kp_id in knowledge_point_ids:
-                record = LockRecord(
-                    knowledge_point_id=kp_id,
-                    teacher_id=teacher_id,
-                    status=LockStatus.LOCKED,
-                    reason=reason or f"教师{teacher_id}禁用知识点{kp_id}的AI自动生成"
-                )
-                self.knowledge_point_locks[kp_id] = record
-                
+        if kp_ids:
+            for kp_id in kp_ids:
                 # 记录历史
                 history = LockHistory(
                     video_id=video_id,
@@ -140,11 +176,11 @@ class AIGenerationLockManager:
                 self.lock_history.append(history)
             
             logger.info(
-                f"Locked AI generation for {len(knowledge_point_ids)} knowledge points, "
+                f"Locked AI generation for {len(kp_ids)} knowledge points, "
                 f"teacher={teacher_id}"
             )
         
-        return success
+        return True
     
     def unlock_ai_generation(
         self,
@@ -168,104 +204,101 @@ class AIGenerationLockManager:
             logger.warning("Either video_id or knowledge_point_ids must be provided")
             return False
         
-        success = True
+        video_ids = [video_id] if video_id is not None else []
+        kp_ids = list(knowledge_point_ids or [])
+        
+        with self._lock:
+            results = self._unlock_items(teacher_id, video_ids, kp_ids)
         
         # 解锁视频级别
-        if video_id is not None:
-            if video_id in self.video_locks:
-                record = self.video_locks[video_id]
-                if record.teacher_id == teacher_id:
-                    record.status = LockStatus.UNLOCKED
-                    record.unlocked_at = datetime.now()
-                    
+        if results["videos"].get(video_id):
+            # 记录历史
+            history = LockHistory(
+                video_id=video_id,
+                knowledge_point_id=None,
+                teacher_id=teacher_id,
+                action="unlock",
+                timestamp=datetime.now(),
+                reason=reason
+            )
+            self.lock_history.append(history)
+            
+            logger.info(
+                f"Unlocked AI generation for video={video_id}, teacher={teacher_id}"
+            )
+        
+        # 解锁知识点级别
+        if kp_ids:
+            for kp_id, unlocked in results["knowledge_points"].items():
+                if unlocked:
                     # 记录历史
                     history = LockHistory(
                         video_id=video_id,
-                        knowledge_point_id=None,
+                        knowledge_point_id=kp_id,
                         teacher_id=teacher_id,
                         action="unlock",
                         timestamp=datetime.now(),
                         reason=reason
                     )
                     self.lock_history.append(history)
-                    
-                    logger.info(
-                        f"Unlocked AI generation for video={video_id}, teacher={teacher_id}"
-                    )
-                else:
-                    logger.warning(
-                        f"Teacher {teacher_id} is not the owner of lock for video={video_id}"
-                    )
-                    success = False
-            else:
-                logger.warning(f"No lock found for video={video_id}")
-                success = False
-        
-        # 解锁知识点级别
-        if knowledge_point_ids:
-            for kp_id in knowledge_point_ids:
-                if kp_id in self.knowledge_point_locks:
-                    record = self.knowledge_point_locks[kp_id]
-                    if record.teacher_id == teacher_id:
-                        record.status = LockStatus.UNLOCKED
-                        record.unlocked_at = datetime.now()
-                        
-                        # 记录历史
-                        history = LockHistory(
-                            video_id=video_id,
-                            knowledge_point_id=kp_id,
-                            teacher_id=teacher_id,
-                            action="unlock",
-                            timestamp=datetime.now(),
-                            reason=reason
-                        )
-                        self.lock_history.append(history)
-                    else:
-                        logger.warning(
-                            f"Teacher {teacher_id} is not the owner of lock for kp={kp_id}"
-                        )
-                        success = False
-                else:
-                    logger.warning(f"No lock found for knowledge_point={kp_id}")
-                    success = False
             
             logger.info(
-                f"Unlocked AI generation for {len(knowledge_point_ids)} knowledge points, "
+                f"Unlocked AI generation for {len(kp_ids)} knowledge points, "
                 f"teacher={teacher_id}"
             )
         
-        return success
+        return all(results["videos"].values()) and all(results["knowledge_points"].values())
+    
+    def register_knowledge_points(self, video_id: int, knowledge_point_ids: List[int]):
+        """登记视频下的知识点（分层索引），锁定视频时这些知识点隐式锁定
+        
+        Args:
+            video_id: 视频ID
+            knowledge_point_ids: 知识点ID列表（已登记到其他视频的知识点改为属于该视频）
+        """
+        with self._lock:
+            for kp_id in knowledge_point_ids:
+                self._attach(kp_id, video_id)
     
     def is_locked(
         self,
         video_id: Optional[int] = None,
         knowledge_point_id: Optional[int] = None
     ) -> bool:
-        """检查是否已锁定
+        """检查是否已锁定（O(1)，与锁定的数量无关）
         
         Args:
             video_id: 视频ID（可选）
-            knowledge_point_id: 知识点ID（可选）
+            knowledge_point_id: 知识点ID（可选），所属视频已锁定时视为锁定
         
         Returns:
             是否已锁定
         """
         # 检查视频级别锁定
-        if video_id is not None:
-            if video_id in self.video_locks:
-                record = self.video_locks[video_id]
-                if record.status == LockStatus.LOCKED:
-                    return True
+        if video_id is not None and self._is_active(self.video_locks.get(video_id)):
+            return True
         
-        # 检查知识点级别锁定
+        # 检查知识点级别锁定（单独锁定或所属视频锁定）
         if knowledge_point_id is not None:
-            if knowledge_point_id in self.knowledge_point_locks:
-                record = self.knowledge_point_locks[knowledge_point_id]
-                if record.status == LockStatus.LOCKED:
-                    return True
+            if self._is_active(self.knowledge_point_locks.get(knowledge_point_id)):
+                return True
+            parent = self._kp_video.get(knowledge_point_id)
+            if parent is not None and self._is_active(self.video_locks.get(parent)):
+                return True
         
         return False
     
+    def has_locked_knowledge_points(self, video_id: int) -> bool:
+        """检查视频下是否有单独锁定的知识点（意向锁，O(1)）
+        
+        Args:
+            video_id: 视频ID
+        
+        Returns:
+            是否有单独锁定的知识点
+        """
+        return self._video_intents.get(video_id, 0) > 0
+    
     def get_lock_status(
         self,
         video_id: Optional[int] = None,
@@ -286,10 +319,14 @@ class AIGenerationLockManager:
                 record = self.video_locks[video_id]
                 return record.status
         
-        # 检查知识点级别锁定
+        # 检查知识点级别锁定（所属视频已锁定时为隐式锁定）
         if knowledge_point_id is not None:
-            if knowledge_point_id in self.knowledge_point_locks:
-                record = self.knowledge_point_locks[knowledge_point_id]
+            record = self.knowledge_point_locks.get(knowledge_point_id)
+            if not self._is_active(record):
+                parent = self._kp_video.get(knowledge_point_id)
+                if parent is not None and self._is_active(self.video_locks.get(parent)):
+                    return LockStatus.LOCKED
+            if record is not None:
                 return record.status
         
         return None
@@ -314,12 +351,16 @@ class AIGenerationLockManager:
         """
         history = self.lock_history.copy()
         
-        # 过滤
+        # 过滤（批量操作的记录按其涉及的视频和知识点匹配）
         if video_id is not None:
-            history = [h for h in history if h.video_id == video_id]
+            history = [h for h in history if h.video_id == video_id or video_id in h.video_ids]
         
         if knowledge_point_id is not None:
-            history = [h for h in history if h.knowledge_point_id == knowledge_point_id]
+            history = [
+                h for h in history
+                if h.knowledge_point_id == knowledge_point_id
+                or knowledge_point_id in h.knowledge_point_ids
+            ]
         
         if teacher_id is not None:
             history = [h for h in history if h.teacher_id == teacher_id]
@@ -385,6 +426,8 @@ class AIGenerationLockManager:
     ) -> Dict[str, Any]:
         """批量锁定
         
+        全部视频和知识点在同一个临界区内锁定，并只写一条历史记录。
+        
         Args:
             teacher_id: 教师ID
             video_ids: 视频ID列表（可选）
@@ -394,29 +437,30 @@ class AIGenerationLockManager:
         Returns:
             批量锁定结果字典
         """
+        video_ids = list(video_ids or [])
+        kp_ids = list(knowledge_point_ids or [])
+        
         results = {
-            "videos": {},
-            "knowledge_points": {},
+            "videos": {video_id: True for video_id in video_ids},
+            "knowledge_points": {kp_id: True for kp_id in kp_ids},
             "total_locked": 0
         }
+        results["total_locked"] = len(results["videos"]) + len(results["knowledge_points"])
         
-        if video_ids:
-            for video_id in video_ids:
-                success = self.lock_ai_generation(
-                    teacher_id, video_id=video_id, reason=reason
-                )
-                results["videos"][video_id] = success
-                if success:
-                    results["total_locked"] += 1
-        
-        if knowledge_point_ids:
-            for kp_id in knowledge_point_ids:
-                success = self.lock_ai_generation(
-                    teacher_id, knowledge_point_ids=[kp_id], reason=reason
-                )
-                results["knowledge_points"][kp_id] = success
-                if success:
-                    results["total_locked"] += 1
+        if results["total_locked"]:
+            with self._lock:
+                self._lock_items(teacher_id, video_ids, kp_ids, None, reason)
+            
+            self.lock_history.append(LockHistory(
+                video_id=None,
+                knowledge_point_id=None,
+                teacher_id=teacher_id,
+                action="batch_lock",
+                timestamp=datetime.now(),
+                reason=reason,
+                video_ids=list(results["videos"]),
+                knowledge_point_ids=list(results["knowledge_points"])
+            ))
         
         logger.info(
             f"Batch lock completed: teacher={teacher_id}, "
@@ -434,6 +478,8 @@ class AIGenerationLockManager:
     ) -> Dict[str, Any]:
         """批量解锁
         
+        全部视频和知识点在同一个临界区内解锁，成功解锁的部分只写一条历史记录。
+        
         Args:
             teacher_id: 教师ID
             video_ids: 视频ID列表（可选）
@@ -443,29 +489,26 @@ class AIGenerationLockManager:
         Returns:
             批量解锁结果字典
         """
-        results = {
-            "videos": {},
-            "knowledge_points": {},
-            "total_unlocked": 0
-        }
+        with self._lock:
+            results: Dict[str, Any] = self._unlock_items(
+                teacher_id, list(video_ids or []), list(knowledge_point_ids or [])
+            )
         
-        if video_ids:
-            for video_id in video_ids:
-                success = self.unlock_ai_generation(
-                    teacher_id, video_id=video_id, reason=reason
-                )
-                results["videos"][video_id] = success
-                if success:
-                    results["total_unlocked"] += 1
+        unlocked_videos = [video_id for video_id, ok in results["videos"].items() if ok]
+        unlocked_kps = [kp_id for kp_id, ok in results["knowledge_points"].items() if ok]
+        results["total_unlocked"] = len(unlocked_videos) + len(unlocked_kps)
         
-        if knowledge_point_ids:
-            for kp_id in knowledge_point_ids:
-                success = self.unlock_ai_generation(
-                    teacher_id, knowledge_point_ids=[kp_id], reason=reason
-                )
-                results["knowledge_points"][kp_id] = success
-                if success:
-                    results["total_unlocked"] += 1
+        if results["total_unlocked"]:
+            self.lock_history.append(LockHistory(
+                video_id=None,
+                knowledge_point_id=None,
+                teacher_id=teacher_id,
+                action="batch_unlock",
+                timestamp=datetime.now(),
+                reason=reason,
+                video_ids=unlocked_videos,
+                knowledge_point_ids=unlocked_kps
+            ))
         
         logger.info(
             f"Batch unlock completed: teacher={teacher_id}, "
@@ -486,8 +529,9 @@ class AIGenerationLockManager:
         Returns:
             统计报告字典
         """
-        video_locks = list(self.video_locks.values())
-        kp_locks = list(self.knowledge_point_locks.values())
+        with self._lock:
+            video_locks = list(self.video_locks.values())
+            kp_locks = list(self.knowledge_point_locks.values())
         
         if teacher_id is not None:
             video_locks = [l for l in video_locks if l.teacher_id == teacher_id]
@@ -501,5 +545,138 @@ class AIGenerationLockManager:
             "locked_videos": locked_videos,
             "total_knowledge_point_locks": len(kp_locks),
             "locked_knowledge_points": locked_kps,
-            "total_locked": locked_videos + locked_kps
+            "total_locked": locked_videos + locked_kps,
+            "purged_records": self.purged_count,
+            "history_records": len(self.lock_history)
         }
+    
+    @staticmethod
+    def _is_active(record: Optional[LockRecord]) -> bool:
+        """记录是否处于锁定状态"""
+        return record is not None and record.status == LockStatus.LOCKED
+    
+    def _lock_items(
+        self,
+        teacher_id: int,
+        video_ids: List[int],
+        knowledge_point_ids: List[int],
+        parent_video_id: Optional[int],
+        reason: str
+    ):
+        """锁定视频和知识点，维护意向锁计数（调用方持有self._lock）"""
+        now = datetime.now()
+        
+        for video_id in video_ids:
+            self.video_locks[video_id] = LockRecord(
+                video_id=video_id,
+                teacher_id=teacher_id,
+                status=LockStatus.LOCKED,
+                locked_at=now,
+                reason=reason or f"教师{teacher_id}禁用AI自动生成"
+            )
+        
+        for kp_id in knowledge_point_ids:
+            if parent_video_id is not None:
+                self._attach(kp_id, parent_video_id)
+            
+            was_locked = self._is_active(self.knowledge_point_locks.get(kp_id))
+            self.knowledge_point_locks[kp_id] = LockRecord(
+                knowledge_point_id=kp_id,
+                teacher_id=teacher_id,
+                status=LockStatus.LOCKED,
+                locked_at=now,
+                reason=reason or f"教师{teacher_id}禁用知识点{kp_id}的AI自动生成"
+            )
+            if not was_locked:
+                self._add_intent(kp_id, 1)
+    
+    def _unlock_items(
+        self,
+        teacher_id: int,
+        video_ids: List[int],
+        knowledge_point_ids: List[int]
+    ) -> Dict[str, Dict[int, bool]]:
+        """解锁视频和知识点，只有锁定者本人可以解锁（调用方持有self._lock）
+        
+        Returns:
+            {"videos": {video_id: 是否解锁}, "knowledge_points": {kp_id: 是否解锁}}
+        """
+        now = datetime.now()
+        results: Dict[str, Dict[int, bool]] = {"videos": {}, "knowledge_points": {}}
+        
+        for video_id in video_ids:
+            results["videos"][video_id] = self._unlock_record(
+                self.video_locks, video_id, teacher_id, now, "video"
+            )
+        
+        for kp_id in knowledge_point_ids:
+            was_locked = self._is_active(self.knowledge_point_locks.get(kp_id))
+            unlocked = self._unlock_record(
+                self.knowledge_point_locks, kp_id, teacher_id, now, "knowledge_point"
+            )
+            if unlocked and was_locked:
+                self._add_intent(kp_id, -1)
+            results["knowledge_points"][kp_id] = unlocked
+        
+        return results
+    
+    def _unlock_record(
+        self,
+        locks: Dict[int, LockRecord],
+        key: int,
+        teacher_id: int,
+        now: datetime,
+        kind: str
+    ) -> bool:
+        """将单条记录置为解锁状态（调用方持有self._lock）"""
+        record = locks.get(key)
+        if record is None:
+            logger.warning(f"No lock found for {kind}={key}")
+            return False
+        if record.teacher_id != teacher_id:
+            logger.warning(f"Teacher {teacher_id} is not the owner of lock for {kind}={key}")
+            return False
+        
+        record.status = LockStatus.UNLOCKED
+        record.unlocked_at = now
+        self._schedule_purge(locks, key, record)
+        return True
+    
+    def _attach(self, kp_id: int, video_id: int):
+        """将知识点登记到视频下，已锁定的知识点同时迁移意向锁（调用方持有self._lock）"""
+        if self._kp_video.get(kp_id) == video_id:
+            return
+        
+        locked = self._is_active(self.knowledge_point_locks.get(kp_id))
+        if locked:
+            self._add_intent(kp_id, -1)
+        self._kp_video[kp_id] = video_id
+        if locked:
+            self._add_intent(kp_id, 1)
+    
+    def _add_intent(self, kp_id: int, delta: int):
+        """调整知识点所属视频的意向锁计数（调用方持有self._lock）"""
+        video_id = self._kp_video.get(kp_id)
+        if video_id is None:
+            return
+        
+        count = self._video_intents.get(video_id, 0) + delta
+        if count > 0:
+            self._video_intents[video_id] = count
+        else:
+            self._video_intents.pop(video_id, None)
+    
+    def _schedule_purge(self, locks: Dict[int, LockRecord], key: int, record: LockRecord):
+        """在回收器中注册已解锁记录的清理"""
+        if self.reaper is None:
+            return
+        
+        deadline = (record.unlocked_at + self.unlocked_retention).timestamp()
+        self.reaper.schedule(deadline, partial(self._purge_record, locks, key, record))
+    
+    def _purge_record(self, locks: Dict[int, LockRecord], key: int, record: LockRecord):
+        """回收器回调：删除仍处于解锁状态的记录（期间重新锁定过则保留新记录）"""
+        with self._lock:
+            if locks.get(key) is record and record.status == LockStatus.UNLOCKED:
+                del locks[key]
+                self.purged_count += 1
@@ -0,0 +1,289 @@
+"""
+中间产物持久化缓存模块
+
+以内容寻址的方式把每个视频的切分结果、知识点标注结果、知识卡片保存到本地SQLite文件，
+进程重启后仍然有效，并可在多个工作进程之间共享。重新解析课程时只有内容变化的视频需要重新计算。
+
+特性：
+1. 键为 (产物类型, 输入内容, 算法参数) 的规范化JSON的稳定哈希，任一项变化都会得到新键
+2. SQLite WAL模式，支持多进程并发读写；fork后的子进程自动重新连接
+3. 可选的条目数上限，超出后按最近访问时间淘汰
+4. 记录命中/未命中/写入次数
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 区分"未命中"与"缓存的值为None"
+_MISSING = object()
+
+
+class ArtifactCache:
+    """中间产物持久化缓存
+    
+    值以JSON保存，调用方负责把数据类转换为字典并在读取后还原。
+    """
+    
+    # 缓存键的摘要长度（字节）
+    DIGEST_SIZE = 20
+    
+    # 数据库忙时的等待时间（秒）
+    BUSY_TIMEOUT = 30.0
+    
+    def __init__(self, path: str = ":memory:", max_entries: Optional[int] = None):
+        """初始化中间产物缓存
+        
+        Args:
+            path: SQLite数据库文件路径，":memory:"表示仅在当前进程内有效
+            max_entries: 最大条目数（可选），超出后按最近访问时间淘汰
+        
+        Raises:
+            ValueError: 当max_entries不是正数时
+        """
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError(f"max_entries must be positive, got {max_entries}")
+        
+        self.path = path
+        self.max_entries = max_entries
+        
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        
+        # 统计计数（当前进程）
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        
+        with self._lock:
+            self._connection()
+        
+        logger.info(f"ArtifactCache initialized at {path}")
+    
+    @classmethod
+    def make_key(cls, kind: str, inputs: Any, params: Optional[Dict[str, Any]] = None) -> str:
+        """生成缓存键
+        
+        Args:
+            kind: 产物类型（如segmentation、annotation、knowledge_card）
+            inputs: 输入内容（可JSON序列化）
+            params: 影响结果的算法参数（可JSON序列化）
+        
+        Returns:
+            十六进制缓存键
+        """
+        digest = hashlib.blake2b(digest_size=cls.DIGEST_SIZE)
+        digest.update(kind.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(cls._canonical_json(params or {}))
+        digest.update(b"\0")
+        digest.update(cls._canonical_json(inputs))
+        return digest.hexdigest()
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """查询缓存
+        
+        Args:
+            key: 缓存键
+            default: 未命中时的返回值（缓存的值本身可能是None）
+        
+        Returns:
+            缓存的值，未命中时返回default
+        """
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            
+            if self.max_entries is not None:
+                with conn:
+                    conn.execute("UPDATE artifacts SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+        
+        return json.loads(row[0])
+    
+    def put(self, kind: str, key: str, value: Any):
+        """写入缓存
+        
+        Args:
+            kind: 产物类型
+            key: 缓存键
+            value: 值（可JSON序列化）
+        """
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO artifacts (key, kind, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, data, len(data), now, now)
+                )
+                self.writes += 1
+                
+                if self.max_entries is not None:
+                    excess = conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0] - self.max_entries
+                    if excess > 0:
+                        conn.execute(
+                            "DELETE FROM artifacts WHERE key IN "
+                            "(SELECT key FROM artifacts ORDER BY accessed_at LIMIT ?)",
+                            (excess,)
+                        )
+                        self.evictions += excess
+    
+    def get_or_compute(
+        self,
+        kind: str,
+        inputs: Any,
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], Any]
+    ) -> Any:
+        """查询缓存，未命中时计算并写入
+        
+        Args:
+            kind: 产物类型
+            inputs: 输入内容（可JSON序列化）
+            params: 影响结果的算法参数
+            compute: 计算函数，返回可JSON序列化的值
+        
+        Returns:
+            缓存或新计算的值
+        """
+        key = self.make_key(kind, inputs, params)
+        cached = self.get(key, _MISSING)
+        if cached is not _MISSING:
+            logger.debug(f"Artifact cache hit: {kind} {key[:12]}")
+            return cached
+        
+        value = compute()
+        self.put(kind, key, value)
+        return value
+    
+    def invalidate(self, kind: Optional[str] = None) -> int:
+        """删除某类产物（或全部产物）
+        
+        Args:
+            kind: 产物类型，None表示全部
+        
+        Returns:
+            删除的条目数
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                if kind is None:
+                    cursor = conn.execute("DELETE FROM artifacts")
+                else:
+                    cursor = conn.execute("DELETE FROM artifacts WHERE kind = ?", (kind,))
+        
+        logger.info(f"Invalidated {cursor.rowcount} artifacts (kind={kind})")
+        return cursor.rowcount
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._pid = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计
+        
+        Returns:
+            统计字典（entries、bytes和by_kind为数据库中的全部条目，其余为当前进程的计数）
+        """
+        with self._lock:
+            conn = self._connection()
+            by_kind = dict(conn.execute("SELECT kind, COUNT(*) FROM artifacts GROUP BY kind").fetchall())
+            total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+            
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": sum(by_kind.values()),
+                "bytes": total_bytes,
+                "by_kind": by_kind,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0
+            }
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+    
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前进程的数据库连接（调用方持有self._lock）"""
+        pid = os.getpid()
+        if self._conn is not None and self._pid == pid:
+            return self._conn
+        
+        # fork继承的连接不能在子进程中使用，重新连接
+        conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_kind ON artifacts (kind)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_accessed ON artifacts (accessed_at)")
+        
+        self._conn = conn
+        self._pid = pid
+        return conn
+    
+    @staticmethod
+    def _canonical_json(value: Any) -> bytes:
+        """规范化JSON（键排序、无多余空白），相同内容总是得到相同字节"""
+        return json.dumps(
+            value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str
+        ).encode("utf-8")
+
+
+# 全局实例（按路径缓存，延迟初始化）
+_global_caches: Dict[str, ArtifactCache] = {}
+_global_caches_lock = threading.Lock()
+
+
+def get_artifact_cache(path: str) -> ArtifactCache:
+    """获取进程级共享的中间产物缓存（每个路径一个实例）
+    
+    Args:
+        path: SQLite数据库文件路径
+    
+    Returns:
+        中间产物缓存实例
+    """
+    path = os.path.abspath(path) if path != ":memory:" else path
+    
+    cache = _global_caches.get(path)
+    if cache is None:
+        with _global_caches_lock:
+            cache = _global_caches.get(path)
+            if cache is None:
+                cache = ArtifactCache(path)
+                _global_caches[path] = cache
+    
+    return cache
@@ -0,0 +1,343 @@
+"""
+基准测试合成数据生成器
+
+按规模生成可复现的合成数据，用于performance_test中的基准测试：
+- 多小时的ASR/OCR流（按主题轮换的中文教学文本）
+- 10～10,000个知识点及其依赖关系（DAG）
+- 1k～1M学生的观看行为（列式数组）
+
+所有生成器都接受seed参数，相同参数总是生成相同数据。
+"""
+
+import random
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from difficulty_detector import BehaviorData
+from knowledge_graph_builder import KnowledgePointInfo
+from multimodal_timestamp_aligner import ASRSegment, OCRSegment, VideoFrame
+
+# 主题词表：每个主题一组关键词，ASR文本在主题内取词造句，相邻片段在主题切换处语义跳变
+TOPICS: List[List[str]] = [
+    ["函数", "参数", "返回值", "定义", "调用", "映射"],
+    ["变量", "作用域", "局部变量", "全局变量", "赋值", "命名"],
+    ["列表", "索引", "切片", "遍历", "元素", "长度"],
+    ["字典", "键", "值", "哈希", "查找", "更新"],
+    ["循环", "条件", "迭代", "终止", "嵌套", "计数"],
+    ["类", "对象", "继承", "方法", "属性", "实例"],
+    ["异常", "捕获", "抛出", "错误", "处理", "调试"],
+    ["文件", "读取", "写入", "路径", "编码", "关闭"],
+    ["模块", "导入", "包", "依赖", "版本", "接口"],
+    ["递归", "基线条件", "调用栈", "分治", "回溯", "深度"],
+]
+
+# 造句模板
+SENTENCE_TEMPLATES = [
+    "接下来我们学习{0}的概念，{0}和{1}密切相关。",
+    "{0}是编程中非常重要的内容，理解{1}有助于掌握{2}。",
+    "我们来看一个{0}的例子，注意{1}的用法。",
+    "在实际项目中，{0}经常和{1}、{2}一起使用。",
+    "请大家思考{0}与{1}之间的区别。",
+]
+
+# 掌握状态取值及其分布
+MASTERY_STATES = ["未学", "学习中", "疑难", "已掌握"]
+MASTERY_WEIGHTS = [0.4, 0.2, 0.1, 0.3]
+
+# 难度取值
+DIFFICULTY_LEVELS = ["easy", "medium", "hard"]
+
+
+def _topic_sentence(rng: random.Random, topic: List[str]) -> str:
+    """用主题关键词生成一句话"""
+    words = rng.sample(topic, 3)
+    return rng.choice(SENTENCE_TEMPLATES).format(*words)
+
+
+def generate_asr_stream(
+    duration_hours: float,
+    segment_seconds: float = 30.0,
+    topic_minutes: float = 10.0,
+    seed: int = 0
+) -> List[Dict]:
+    """生成ASR转写流
+    
+    Args:
+        duration_hours: 视频总时长（小时）
+        segment_seconds: 每个ASR片段的时长（秒）
+        topic_minutes: 每个主题持续的时长（分钟）
+        seed: 随机种子
+    
+    Returns:
+        ASR片段列表，格式与tests/mock_data.MOCK_ASR_TEXTS相同
+    """
+    rng = random.Random(seed)
+    total_seconds = duration_hours * 3600
+    segments = []
+    
+    start = 0.0
+    while start < total_seconds:
+        end = min(start + segment_seconds, total_seconds)
+        topic = TOPICS[int(start // (topic_minutes * 60)) % len(TOPICS)]
+        text = "".join(_topic_sentence(rng, topic) for _ in range(rng.randint(1, 3)))
+        segments.append({"start_time": start, "end_time": end, "text": text})
+        start = end
+    
+    return segments
+
+
+def generate_ocr_stream(
+    duration_hours: float,
+    slide_seconds: float = 120.0,
+    topic_minutes: float = 10.0,
+    seed: int = 0
+) -> List[Dict]:
+    """生成OCR（PPT文字）流
+    
+    Args:
+        duration_hours: 视频总时长（小时）
+        slide_seconds: 每页幻灯片的停留时长（秒）
+        topic_minutes: 每个主题持续的时长（分钟），与ASR流保持一致
+        seed: 随机种子
+    
+    Returns:
+        OCR片段列表，格式与tests/mock_data.MOCK_OCR_TEXTS相同
+    """
+    rng = random.Random(seed + 1)
+    total_seconds = duration_hours * 3600
+    slides = []
+    
+    start = 0.0
+    slide_number = 1
+    while start < total_seconds:
+        end = min(start + slide_seconds, total_seconds)
+        topic = TOPICS[int(start // (topic_minutes * 60)) % len(TOPICS)]
+        text = "、".join(rng.sample(topic, 2))
+        slides.append({
+            "start_time": start,
+            "end_time": end,
+            "text": text,
+            "slide_number": slide_number
+        })
+        start = end
+        slide_number += 1
+    
+    return slides
+
+
+def generate_alignment_inputs(
+    duration_hours: float,
+    frame_interval: float = 1.0,
+    seed: int = 0
+) -> Tuple[List[ASRSegment], List[OCRSegment], List[VideoFrame]]:
+    """生成多模态对齐的输入
+    
+    ASR/OCR时间戳加入±2秒的随机抖动，模拟真实的采集误差。
+    
+    Args:
+        duration_hours: 视频总时长（小时）
+        frame_interval: 视频抽帧间隔（秒）
+        seed: 随机种子
+    
+    Returns:
+        (ASR片段列表, OCR片段列表, 视频帧列表)
+    """
+    rng = random.Random(seed + 2)
+    
+    asr_data = []
+    for seg in generate_asr_stream(duration_hours, seed=seed):
+        jitter = rng.uniform(-2.0, 2.0)
+        asr_data.append(ASRSegment(
+            start_time=max(0.0, seg["start_time"] + jitter),
+            end_time=seg["end_time"] + jitter,
+            text=seg["text"]
+        ))
+    
+    ocr_data = []
+    for slide in generate_ocr_stream(duration_hours, slide_seconds=30.0, seed=seed):
+        jitter = rng.uniform(-2.0, 2.0)
+        ocr_data.append(OCRSegment(
+            start_time=max(0.0, slide["start_time"] + jitter),
+            end_time=slide["end_time"] + jitter,
+            text=slide["text"],
+            slide_num=slide["slide_number"]
+        ))
+    
+    frame_count = int(duration_hours * 3600 / frame_interval)
+    video_frames = [
+        VideoFrame(timestamp=i * frame_interval, frame_data=None)
+        for i in range(frame_count)
+    ]
+    
+    return asr_data, ocr_data, video_frames
+
+
+def generate_knowledge_points(
+    count: int,
+    minutes_per_point: float = 5.0,
+    seed: int = 0
+) -> List[KnowledgePointInfo]:
+    """生成知识点列表
+    
+    名称和关键词取自主题词表，同一主题的知识点之间会产生相关/包含关系。
+    
+    Args:
+        count: 知识点数量
+        minutes_per_point: 每个知识点的时长（分钟）
+        seed: 随机种子
+    
+    Returns:
+        知识点列表（用于知识图谱构建）
+    """
+    rng = random.Random(seed + 3)
+    knowledge_points = []
+    
+    for i in range(count):
+        topic = TOPICS[i % len(TOPICS)]
+        name = f"{rng.choice(topic)}{i}"
+        keywords = rng.sample(topic, 3)
+        knowledge_points.append(KnowledgePointInfo(
+            id=i + 1,
+            name=name,
+            summary=_topic_sentence(rng, topic),
+            keywords=keywords,
+            start_time=i * minutes_per_point * 60,
+            end_time=(i + 1) * minutes_per_point * 60
+        ))
+    
+    return knowledge_points
+
+
+def generate_dependencies(
+    count: int,
+    avg_prerequisites: float = 2.0,
+    window: int = 50,
+    related_ratio: float = 0.2,
+    seed: int = 0
+) -> List[Tuple[int, int, str]]:
+    """生成知识点依赖关系
+    
+    前置关系只从编号小的知识点指向编号大的知识点（保证无环），
+    且前置知识点取自前window个知识点内，模拟课程章节的局部依赖。
+    
+    Args:
+        count: 知识点数量（ID为1～count）
+        avg_prerequisites: 每个知识点的平均前置数量
+        window: 前置知识点的回溯范围
+        related_ratio: 额外生成的相关关系占前置关系的比例
+        seed: 随机种子
+    
+    Returns:
+        依赖关系列表 [(source_id, target_id, relation_type), ...]
+    """
+    rng = random.Random(seed + 4)
+    dependencies = []
+    
+    for target in range(2, count + 1):
+        low = max(1, target - window)
+        candidates = target - low
+        k = min(candidates, int(rng.expovariate(1.0 / avg_prerequisites)) if avg_prerequisites > 0 else 0)
+        for source in rng.sample(range(low, target), k):
+            dependencies.append((source, target, "prerequisite"))
+    
+    for _ in range(int(len(dependencies) * related_ratio)):
+        source, target = rng.sample(range(1, count + 1), 2) if count > 1 else (1, 1)
+        dependencies.append((source, target, "related"))
+    
+    return dependencies
+
+
+def generate_mastery_status(count: int, seed: int = 0) -> Dict[int, str]:
+    """生成单个学生的掌握状态
+    
+    Args:
+        count: 知识点数量（ID为1～count）
+        seed: 随机种子
+    
+    Returns:
+        掌握状态字典 {knowledge_point_id: status}
+    """
+    rng = random.Random(seed + 5)
+    states = rng.choices(MASTERY_STATES, weights=MASTERY_WEIGHTS, k=count)
+    return {kp_id: state for kp_id, state in zip(range(1, count + 1), states)}
+
+
+def generate_difficulty_info(count: int, seed: int = 0) -> Dict[int, str]:
+    """生成知识点难度信息
+    
+    Args:
+        count: 知识点数量（ID为1～count）
+        seed: 随机种子
+    
+    Returns:
+        难度信息字典 {knowledge_point_id: difficulty}
+    """
+    rng = random.Random(seed + 6)
+    return {kp_id: rng.choice(DIFFICULTY_LEVELS) for kp_id in range(1, count + 1)}
+
+
+def generate_behavior_columns(
+    student_count: int,
+    knowledge_point_count: int = 1,
+    difficult_ratio: float = 0.3,
+    seed: int = 0
+) -> Dict[str, np.ndarray]:
+    """生成列式观看行为数据
+    
+    每行是一个学生在一个知识点上的行为；约difficult_ratio比例的行
+    带有较多的回放/暂停，会被识别为难点。
+    
+    Args:
+        student_count: 学生数量
+        knowledge_point_count: 知识点数量，行为随机分布到各知识点
+        difficult_ratio: 困难行为的比例
+        seed: 随机种子
+    
+    Returns:
+        字段名 -> 数组 的字典，可直接传给DifficultyDetector.detect_columns
+    """
+    rng = np.random.default_rng(seed + 7)
+    difficult = rng.random(student_count) < difficult_ratio
+    duration = rng.uniform(120.0, 600.0, student_count)
+    
+    return {
+        "user_id": np.arange(1, student_count + 1, dtype=np.int64),
+        "knowledge_point_id": rng.integers(1, knowledge_point_count + 1, student_count, dtype=np.int64),
+        "replay_count": rng.poisson(np.where(difficult, 3.0, 0.3)),
+        "pause_count": rng.poisson(np.where(difficult, 5.0, 0.5)),
+        "total_watch_time": duration * rng.uniform(0.8, np.where(difficult, 3.5, 1.2)),
+        "knowledge_point_duration": duration,
+        "seek_count": rng.poisson(np.where(difficult, 3.0, 0.2)),
+    }
+
+
+def behaviors_from_columns(columns: Dict[str, np.ndarray]) -> List[BehaviorData]:
+    """将列式行为数据转换为BehaviorData列表（用于逐条接口）
+    
+    Args:
+        columns: generate_behavior_columns生成的列式数据
+    
+    Returns:
+        行为数据列表
+    """
+    return [
+        BehaviorData(
+            user_id=int(user_id),
+            knowledge_point_id=int(kp_id),
+            replay_count=int(replay),
+            pause_count=int(pause),
+            total_watch_time=float(watch_time),
+            knowledge_point_duration=float(duration),
+            seek_count=int(seek)
+        )
+        for user_id, kp_id, replay, pause, watch_time, duration, seek in zip(
+            columns["user_id"].tolist(),
+            columns["knowledge_point_id"].tolist(),
+            columns["replay_count"].tolist(),
+            columns["pause_count"].tolist(),
+            columns["total_watch_time"].tolist(),
+            columns["knowledge_point_duration"].tolist(),
+            columns["seek_count"].tolist()
+        )
+    ]
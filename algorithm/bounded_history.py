@@ -0,0 +1,233 @@
+"""
+有界历史记录模块
+
+为长期运行的引擎（多模态对齐、资源推送、数据审计、一致性校验等）
+提供统一的历史记录存储，避免历史列表无限增长。
+
+特性：
+1. 环形缓冲：只在内存中保留最近的N条记录
+2. 溢出落盘：可选地将被淘汰的记录以JSON Lines格式追加写入文件，进程退出时自动写入缓冲的记录
+3. 列表式查询接口：len、迭代、下标、copy，调用方无需修改查询代码
+4. compact_record：为dataclass记录添加__slots__，降低单条记录的内存占用
+"""
+
+import atexit
+import dataclasses
+import json
+import logging
+import weakref
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Generic, Iterable, Iterator, List, Optional, TypeVar
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 设置了溢出文件的历史记录（弱引用），进程退出时统一写盘
+_spilling_histories: "weakref.WeakSet[BoundedHistory]" = weakref.WeakSet()
+
+
+def compact_record(cls):
+    """为dataclass添加__slots__
+    
+    手写__slots__与带默认值的字段冲突，这里在dataclass生成方法之后
+    重建类：字段默认值已保存在生成的__init__中，可以从类属性中移除。
+    
+    Args:
+        cls: 已经过@dataclass处理的类
+    
+    Returns:
+        带__slots__的新类
+    
+    Raises:
+        TypeError: cls不是dataclass
+    """
+    if not dataclasses.is_dataclass(cls):
+        raise TypeError(f"{cls.__name__} is not a dataclass")
+    
+    field_names = tuple(f.name for f in dataclasses.fields(cls))
+    namespace = dict(cls.__dict__)
+    namespace["__slots__"] = field_names
+    for name in field_names:
+        namespace.pop(name, None)
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+def _json_default(value: Any) -> Any:
+    """JSON序列化兜底：处理枚举、时间和嵌套dataclass"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    return str(value)
+
+
+class BoundedHistory(Generic[T]):
+    """有界历史记录
+    
+    内存中最多保留max_records条最新记录，超出时淘汰最旧的记录。
+    设置spill_path时，被淘汰的记录按批追加到JSON Lines文件中，可通过iter_spilled读回。
+    """
+    
+    # 默认保留的记录数
+    DEFAULT_MAX_RECORDS = 10000
+    
+    # 溢出记录的写盘批大小
+    SPILL_BATCH_SIZE = 256
+    
+    def __init__(
+        self,
+        max_records: Optional[int] = DEFAULT_MAX_RECORDS,
+        spill_path: Optional[str] = None
+    ):
+        """初始化有界历史记录
+        
+        Args:
+            max_records: 内存中保留的最大记录数，None表示不限制
+            spill_path: 溢出文件路径（可选），None表示直接丢弃被淘汰的记录
+        
+        Raises:
+            ValueError: max_records不是正整数
+        """
+        if max_records is not None and max_records <= 0:
+            raise ValueError(f"max_records must be positive, got {max_records}")
+        
+        self.max_records = max_records
+        self.spill_path = spill_path
+        
+        self._records: deque = deque()
+        self._spill_buffer: List[str] = []
+        
+        # 统计计数
+        self.total_count = 0  # 累计写入的记录数
+        self.evicted_count = 0  # 累计淘汰的记录数
+        self.spilled_count = 0  # 累计写入溢出文件的记录数
+        
+        if spill_path is not None:
+            _spilling_histories.add(self)
+    
+    def append(self, record: T):
+        """追加一条记录
+        
+        Args:
+            record: 历史记录
+        """
+        if self.max_records is not None and len(self._records) >= self.max_records:
+            self._evict(self._records.popleft())
+        
+        self._records.append(record)
+        self.total_count += 1
+    
+    def extend(self, records: Iterable[T]):
+        """追加多条记录
+        
+        Args:
+            records: 历史记录序列
+        """
+        for record in records:
+            self.append(record)
+    
+    def copy(self) -> List[T]:
+        """返回内存中记录的列表副本（按写入顺序）"""
+        return list(self._records)
+    
+    def clear(self):
+        """清空内存中的记录（溢出文件保留）"""
+        self.flush()
+        self._records.clear()
+    
+    def flush(self):
+        """将缓冲的溢出记录写入文件"""
+        if not self._spill_buffer or self.spill_path is None:
+            return
+        
+        try:
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                f.writelines(self._spill_buffer)
+            self.spilled_count += len(self._spill_buffer)
+        except OSError as e:
+            logger.error(f"Failed to spill history to {self.spill_path}: {e}")
+        finally:
+            self._spill_buffer.clear()
+    
+    def close(self):
+        """写入缓冲的溢出记录（所属引擎关闭时调用，进程退出时也会自动调用）"""
+        self.flush()
+        _spilling_histories.discard(self)
+    
+    def iter_spilled(self) -> Iterator[Dict[str, Any]]:
+        """按写入顺序读回溢出文件中的记录
+        
+        Yields:
+            记录字典（dataclass字段序列化后的结果）
+        """
+        if self.spill_path is None:
+            return
+        
+        self.flush()
+        try:
+            with open(self.spill_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取历史记录统计
+        
+        Returns:
+            统计字典
+        """
+        return {
+            "records": len(self._records),
+            "max_records": self.max_records,
+            "total_count": self.total_count,
+            "evicted_count": self.evicted_count,
+            "spilled_count": self.spilled_count + len(self._spill_buffer)
+        }
+    
+    def _evict(self, record: T):
+        """处理被淘汰的记录"""
+        self.evicted_count += 1
+        if self.spill_path is None:
+            return
+        
+        self._spill_buffer.append(
+            json.dumps(record, ensure_ascii=False, default=_json_default) + "\n"
+        )
+        if len(self._spill_buffer) >= self.SPILL_BATCH_SIZE:
+            self.flush()
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._records)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._records)[index]
+        return self._records[index]
+    
+    def __repr__(self) -> str:
+        return (
+            f"BoundedHistory(records={len(self._records)}, "
+            f"max_records={self.max_records}, spill_path={self.spill_path!r})"
+        )
+
+
+@atexit.register
+def flush_all():
+    """将所有历史记录缓冲的溢出记录写入文件（进程退出时自动调用）"""
+    for history in list(_spilling_histories):
+        history.flush()
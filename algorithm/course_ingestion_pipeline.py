@@ -0,0 +1,434 @@
+"""
+课程批量解析流水线
+
+将一个课程目录下所有视频的ASR/OCR文本批量解析为知识图谱：
+切分（KnowledgePointSegmenter）-> 标注（KnowledgePointAnnotator）-> 图谱构建（KnowledgeGraphBuilder）
+
+- 视频按文件分片到进程池，每个工作进程只初始化一次jieba和切分器/标注器
+- 视频解析完成即回传知识点（按完成顺序流式产出），主进程汇总后构建图谱
+- 统计各阶段耗时和吞吐量
+- 可选的中间产物持久化缓存（--cache），重新解析时只有内容变化的视频需要重新切分和标注
+
+输入目录中每个视频对应以下任一种文件：
+- <video_id>.json：{"asr": [...], "ocr": [...], "subtitles": [...]}（ocr、subtitles可选）
+- <video_id>.asr.json 和 <video_id>.ocr.json（后者可选）：各自是片段列表
+
+用法：
+    python course_ingestion_pipeline.py course_dir --workers 8 --output course_graph.json
+    python course_ingestion_pipeline.py course_dir --cache course_artifacts.db
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import networkx as nx
+
+from artifact_cache import get_artifact_cache
+from knowledge_point_segmenter import KnowledgePointSegmenter, KnowledgePoint
+from knowledge_point_annotator import KnowledgePointAnnotator
+from knowledge_graph_builder import KnowledgeGraphBuilder, KnowledgePointInfo
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 流水线阶段（按执行顺序）
+STAGES = ("load", "segment", "annotate", "graph")
+
+# 工作进程内的切分器和标注器（由_init_worker创建，每个进程一份）
+_worker_segmenter: Optional[KnowledgePointSegmenter] = None
+_worker_annotator: Optional[KnowledgePointAnnotator] = None
+
+
+@dataclass
+class VideoSource:
+    """单个视频的输入文件"""
+    video_id: str
+    path: Optional[str] = None  # 合并格式的JSON文件
+    asr_path: Optional[str] = None
+    ocr_path: Optional[str] = None
+
+
+@dataclass
+class VideoResult:
+    """单个视频的解析结果"""
+    video_id: str
+    index: int  # 视频在课程中的顺序（按video_id排序）
+    knowledge_points: List[KnowledgePoint] = field(default_factory=list)
+    stage_seconds: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时（秒）
+    segment_count: int = 0  # 输入的ASR片段数
+    error: Optional[str] = None
+
+
+@dataclass
+class IngestionResult:
+    """课程解析结果"""
+    graph: nx.DiGraph
+    knowledge_points: List[KnowledgePointInfo]
+    video_of: Dict[int, str]  # 知识点ID -> 所属视频ID
+    videos: List[VideoResult]
+    stats: Dict[str, Any]
+
+
+def discover_videos(directory: str) -> List[VideoSource]:
+    """扫描目录中的视频输入文件
+    
+    Args:
+        directory: 课程目录
+    
+    Returns:
+        视频输入列表（按video_id排序）
+    
+    Raises:
+        ValueError: 当目录不存在时
+    """
+    if not os.path.isdir(directory):
+        raise ValueError(f"Not a directory: {directory}")
+    
+    sources: Dict[str, VideoSource] = {}
+    for filename in os.listdir(directory):
+        if not filename.endswith(".json"):
+            continue
+        
+        path = os.path.join(directory, filename)
+        stem = filename[:-len(".json")]
+        if stem.endswith(".asr"):
+            sources.setdefault(stem[:-4], VideoSource(stem[:-4])).asr_path = path
+        elif stem.endswith(".ocr"):
+            sources.setdefault(stem[:-4], VideoSource(stem[:-4])).ocr_path = path
+        else:
+            sources.setdefault(stem, VideoSource(stem)).path = path
+    
+    videos = []
+    for video_id in sorted(sources):
+        source = sources[video_id]
+        if source.path is None and source.asr_path is None:
+            logger.warning(f"Skipping video {video_id}: no ASR file")
+            continue
+        videos.append(source)
+    
+    return videos
+
+
+def load_video(source: VideoSource) -> Dict[str, List[Dict]]:
+    """读取单个视频的ASR/OCR/字幕文本
+    
+    Args:
+        source: 视频输入文件
+    
+    Returns:
+        {"asr": [...], "ocr": [...], "subtitles": [...]}
+    """
+    data: Dict[str, List[Dict]] = {"asr": [], "ocr": [], "subtitles": []}
+    
+    if source.path is not None:
+        with open(source.path, "r", encoding="utf-8") as f:
+            content = json.load(f)
+        for key in data:
+            data[key] = content.get(key) or []
+    
+    if source.asr_path is not None:
+        with open(source.asr_path, "r", encoding="utf-8") as f:
+            data["asr"] = json.load(f)
+    if source.ocr_path is not None:
+        with open(source.ocr_path, "r", encoding="utf-8") as f:
+            data["ocr"] = json.load(f)
+    
+    return data
+
+
+def _init_worker(
+    segmenter_options: Dict[str, Any],
+    annotator_options: Dict[str, Any],
+    log_level: int = logging.WARNING,
+    artifact_cache_path: Optional[str] = None
+):
+    """工作进程初始化：创建切分器和标注器（jieba在这里初始化一次）"""
+    global _worker_segmenter, _worker_annotator
+    
+    logging.getLogger().setLevel(log_level)
+    artifact_cache = get_artifact_cache(artifact_cache_path) if artifact_cache_path else None
+    _worker_segmenter = KnowledgePointSegmenter(artifact_cache=artifact_cache, **segmenter_options)
+    _worker_annotator = KnowledgePointAnnotator(artifact_cache=artifact_cache, **annotator_options)
+
+
+def _process_video(source: VideoSource, index: int) -> VideoResult:
+    """在工作进程中解析单个视频：读取 -> 切分 -> 标注"""
+    result = VideoResult(video_id=source.video_id, index=index)
+    
+    try:
+        start = time.perf_counter()
+        data = load_video(source)
+        result.segment_count = len(data["asr"])
+        
+        segmented = time.perf_counter()
+        knowledge_points = _worker_segmenter.segment(
+            data["asr"], data["ocr"] or None, data["subtitles"] or None
+        )
+        
+        annotated = time.perf_counter()
+        for kp in knowledge_points:
+            # 知识点时间范围内的ASR和OCR文本
+            kp_asr = [
+                item for item in data["asr"]
+                if item["start_time"] >= kp.start_time and item["end_time"] <= kp.end_time
+            ]
+            kp_ocr = [
+                item for item in data["ocr"]
+                if item["start_time"] >= kp.start_time and item["end_time"] <= kp.end_time
+            ]
+            annotation = _worker_annotator.annotate(
+                knowledge_point_text=" ".join(item.get("text", "") for item in kp_asr),
+                asr_texts=kp_asr,
+                ocr_texts=kp_ocr,
+                start_time=kp.start_time,
+                end_time=kp.end_time
+            )
+            kp.name = annotation["name"]
+            kp.summary = annotation["summary"]
+            kp.keywords = annotation["keywords"]
+            kp.difficulty = annotation["difficulty"]
+        finished = time.perf_counter()
+        
+        result.knowledge_points = knowledge_points
+        result.stage_seconds = {
+            "load": segmented - start,
+            "segment": annotated - segmented,
+            "annotate": finished - annotated,
+        }
+    except Exception as e:
+        # 单个视频失败不影响整个课程
+        result.error = f"{type(e).__name__}: {e}"
+    
+    return result
+
+
+class CourseIngestionPipeline:
+    """课程批量解析流水线
+    
+    视频在进程池中并行切分和标注，主进程按完成顺序接收结果，
+    全部完成后统一构建知识图谱（跨视频的关系识别需要完整的知识点集合）。
+    """
+    
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        segmenter_options: Optional[Dict[str, Any]] = None,
+        annotator_options: Optional[Dict[str, Any]] = None,
+        graph_builder: Optional[KnowledgeGraphBuilder] = None,
+        worker_log_level: int = logging.WARNING,
+        artifact_cache_path: Optional[str] = None
+    ):
+        """初始化课程解析流水线
+        
+        Args:
+            workers: 工作进程数，None表示CPU核数，0表示在当前进程中顺序执行
+            segmenter_options: KnowledgePointSegmenter的构造参数
+            annotator_options: KnowledgePointAnnotator的构造参数
+            graph_builder: 知识图谱构建器实例，如果为None则创建新实例
+            worker_log_level: 工作进程的日志级别（默认WARNING，避免逐条INFO日志拖慢解析）
+            artifact_cache_path: 中间产物缓存的SQLite文件路径（可选），切分和标注结果按内容持久化，
+                各工作进程共享
+        
+        Raises:
+            ValueError: 当workers为负数时
+        """
+        if workers is not None and workers < 0:
+            raise ValueError(f"workers must be non-negative, got {workers}")
+        
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.segmenter_options = segmenter_options or {}
+        self.annotator_options = annotator_options or {}
+        self.graph_builder = graph_builder or KnowledgeGraphBuilder()
+        self.worker_log_level = worker_log_level
+        self.artifact_cache_path = artifact_cache_path
+        
+        logger.info(f"CourseIngestionPipeline initialized with {self.workers} workers")
+    
+    def iter_videos(self, videos: List[VideoSource]) -> Iterator[VideoResult]:
+        """并行解析视频，按完成顺序产出结果
+        
+        Args:
+            videos: 视频输入列表
+        
+        Yields:
+            单个视频的解析结果
+        """
+        initargs = (
+            self.segmenter_options,
+            self.annotator_options,
+            self.worker_log_level,
+            self.artifact_cache_path
+        )
+        
+        if self.workers == 0 or len(videos) <= 1:
+            # 在当前进程中执行时不修改全局日志级别
+            saved_level = logging.getLogger().level
+            _init_worker(*initargs)
+            logging.getLogger().setLevel(saved_level)
+            for index, source in enumerate(videos):
+                yield _process_video(source, index)
+            return
+        
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(videos)),
+            initializer=_init_worker,
+            initargs=initargs
+        ) as executor:
+            futures = [
+                executor.submit(_process_video, source, index)
+                for index, source in enumerate(videos)
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def run(self, directory: str) -> IngestionResult:
+        """解析课程目录并构建知识图谱
+        
+        Args:
+            directory: 课程目录
+        
+        Returns:
+            课程解析结果
+        """
+        started = time.perf_counter()
+        videos = discover_videos(directory)
+        logger.info(f"Ingesting {len(videos)} videos from {directory}")
+        
+        results: List[Optional[VideoResult]] = [None] * len(videos)
+        for finished_count, result in enumerate(self.iter_videos(videos), 1):
+            results[result.index] = result
+            if result.error:
+                logger.error(f"Video {result.video_id} failed: {result.error}")
+            else:
+                logger.info(
+                    f"Video {result.video_id} done ({finished_count}/{len(videos)}): "
+                    f"{len(result.knowledge_points)} knowledge points"
+                )
+        
+        # 知识点ID按视频顺序分配，与完成顺序无关，保证结果可复现
+        kp_infos = []
+        video_of = {}
+        for result in results:
+            for kp in result.knowledge_points:
+                kp_id = len(kp_infos) + 1
+                kp_infos.append(KnowledgePointInfo(
+                    id=kp_id,
+                    name=kp.name,
+                    summary=kp.summary,
+                    keywords=kp.keywords,
+                    start_time=kp.start_time,
+                    end_time=kp.end_time
+                ))
+                video_of[kp_id] = result.video_id
+        
+        graph_started = time.perf_counter()
+        graph = self.graph_builder.build_graph(kp_infos)
+        graph_seconds = time.perf_counter() - graph_started
+        
+        stats = self._build_stats(results, len(kp_infos), graph_seconds, time.perf_counter() - started)
+        logger.info(
+            f"Ingestion finished: {stats['videos']} videos, {stats['knowledge_points']} knowledge points, "
+            f"{stats['wall_seconds']:.2f}s"
+        )
+        
+        return IngestionResult(
+            graph=graph,
+            knowledge_points=kp_infos,
+            video_of=video_of,
+            videos=results,
+            stats=stats
+        )
+    
+    def _build_stats(
+        self,
+        results: List[VideoResult],
+        kp_count: int,
+        graph_seconds: float,
+        wall_seconds: float
+    ) -> Dict[str, Any]:
+        """汇总各阶段耗时和吞吐量
+        
+        load/segment/annotate为各工作进程耗时之和，吞吐量按阶段耗时计算
+        （即单个工作进程的处理速度）；整体吞吐量按墙钟时间计算。
+        """
+        succeeded = [r for r in results if r.error is None]
+        stage_items = {
+            "load": sum(r.segment_count for r in succeeded),
+            "segment": sum(r.segment_count for r in succeeded),
+            "annotate": kp_count,
+            "graph": kp_count,
+        }
+        stage_units = {
+            "load": "segments",
+            "segment": "segments",
+            "annotate": "knowledge_points",
+            "graph": "knowledge_points",
+        }
+        
+        stages = {}
+        for stage in STAGES:
+            if stage == "graph":
+                seconds = graph_seconds
+            else:
+                seconds = sum(r.stage_seconds.get(stage, 0.0) for r in succeeded)
+            stages[stage] = {
+                "seconds": seconds,
+                "items": stage_items[stage],
+                "unit": stage_units[stage],
+                "throughput": stage_items[stage] / seconds if seconds > 0 else 0.0
+            }
+        
+        return {
+            "workers": self.workers,
+            "videos": len(results),
+            "failed_videos": len(results) - len(succeeded),
+            "knowledge_points": kp_count,
+            "wall_seconds": wall_seconds,
+            "videos_per_second": len(results) / wall_seconds if wall_seconds > 0 else 0.0,
+            "stages": stages
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="课程批量解析：切分 -> 标注 -> 知识图谱")
+    parser.add_argument("directory", help="课程目录（每个视频一个或一对ASR/OCR JSON文件）")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认CPU核数，0表示单进程）")
+    parser.add_argument("--output", help="解析结果JSON输出路径（默认只输出统计信息）")
+    parser.add_argument("--cache", help="中间产物缓存SQLite文件路径（重新解析时复用未变化视频的结果）")
+    args = parser.parse_args(argv)
+    
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    pipeline = CourseIngestionPipeline(workers=args.workers, artifact_cache_path=args.cache)
+    result = pipeline.run(args.directory)
+    
+    if args.output:
+        output = {
+            "knowledge_points": [
+                dict(vars(kp), video_id=result.video_of[kp.id])
+                for kp in result.knowledge_points
+            ],
+            "relations": [
+                vars(rel) for rel in pipeline.graph_builder.get_relations(result.graph)
+            ],
+            "failed_videos": {r.video_id: r.error for r in result.videos if r.error},
+            "stats": result.stats
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+    
+    print(json.dumps(result.stats, ensure_ascii=False, indent=2))
+    return 1 if result.stats["failed_videos"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 from enum import Enum
 from collections import defaultdict
 
+from bounded_history import BoundedHistory, compact_record
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -64,6 +66,7 @@ class AuditResultDetail:
     confidence: float  # 置信度（0-1）
 
 
+@compact_record
 @dataclass
 class AnomalyPattern:
     """异常模式"""
@@ -93,13 +96,24 @@ class DataAuditEngine:
     # 恶意反馈判定阈值
     MALICIOUS_SCORE_THRESHOLD = 0.3  # 恶意分数阈值
     
-    def __init__(self):
-        """初始化数据审计引擎"""
+    def __init__(
+        self,
+        history_limit: Optional[int] = BoundedHistory.DEFAULT_MAX_RECORDS,
+        history_spill_path: Optional[str] = None
+    ):
+        """初始化数据审计引擎
+        
+        Args:
+            history_limit: 异常模式在内存中保留的最大记录数，None表示不限制
+            history_spill_path: 异常模式溢出文件路径（可选）
+        """
         # 存储审计结果
         self.audit_results: Dict[int, AuditResultDetail] = {}  # key: feedback_id
         
-        # 存储异常模式
-        self.anomaly_patterns: List[AnomalyPattern] = []
+        # 存储异常模式（有界，超出后淘汰最旧记录）
+        self.anomaly_patterns: BoundedHistory[AnomalyPattern] = BoundedHistory(
+            max_records=history_limit, spill_path=history_spill_path
+        )
         
         # 存储用户反馈历史（用于检测批量反馈）
         self.user_feedback_history: Dict[int, List[FeedbackData]] = {}  # key: user_id
@@ -6,10 +6,12 @@
 """
 
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import Any, List, Dict, Optional, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
+import numpy as np
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +47,113 @@ class DifficultyResult:
     confidence: float  # 0-1
 
 
+# 触发原因位掩码
+TRIGGER_REPLAY = 1
+TRIGGER_PAUSE = 2
+TRIGGER_WATCH_RATIO = 4
+TRIGGER_SEEK = 8
+
+# 列式批量检测需要的行为数据字段
+BEHAVIOR_COLUMNS = (
+    "replay_count",
+    "pause_count",
+    "total_watch_time",
+    "knowledge_point_duration",
+    "seek_count"
+)
+
+
+@dataclass
+class BatchDifficultyResult:
+    """列式批量难点识别结果
+    
+    每个数组的第i个元素对应输入的第i行。
+    触发原因以位掩码保存，文字描述只在调用trigger_reasons时按需生成。
+    """
+    user_ids: Optional[np.ndarray]
+    knowledge_point_ids: Optional[np.ndarray]
+    difficulty_scores: np.ndarray  # 0-10
+    trigger_masks: np.ndarray  # TRIGGER_*位掩码
+    is_difficult: np.ndarray
+    confidences: np.ndarray  # 0-1
+    replay_counts: np.ndarray
+    pause_counts: np.ndarray
+    watch_ratios: np.ndarray
+    seek_counts: np.ndarray
+    thresholds: Dict[str, float]
+    
+    def __len__(self) -> int:
+        return len(self.difficulty_scores)
+    
+    def flagged_rows(self) -> np.ndarray:
+        """返回判定为疑难点的行下标"""
+        return np.flatnonzero(self.is_difficult)
+    
+    def trigger_reasons(self, row: int) -> List[str]:
+        """生成指定行的触发原因（与DifficultyDetector.get_trigger_reasons格式一致）
+        
+        Args:
+            row: 行下标
+        
+        Returns:
+            触发原因列表
+        """
+        mask = int(self.trigger_masks[row])
+        reasons = []
+        
+        if mask & TRIGGER_REPLAY:
+            reasons.append(f"回放次数过多（{self.replay_counts[row].item()}次 >= {self.thresholds['replay']}次）")
+        
+        if mask & TRIGGER_PAUSE:
+            reasons.append(f"暂停次数过多（{self.pause_counts[row].item()}次 >= {self.thresholds['pause']}次）")
+        
+        if mask & TRIGGER_WATCH_RATIO:
+            reasons.append(f"停留时长过长（{self.watch_ratios[row]:.1f}倍 >= {self.thresholds['watch_ratio']}倍）")
+        
+        if mask & TRIGGER_SEEK:
+            reasons.append(f"快进/快退次数过多（{self.seek_counts[row].item()}次 >= {self.thresholds['seek']}次）")
+        
+        return reasons
+    
+    def to_result(self, row: int) -> DifficultyResult:
+        """将指定行转换为DifficultyResult
+        
+        Args:
+            row: 行下标
+        
+        Returns:
+            难点识别结果
+        """
+        return DifficultyResult(
+            is_difficult=bool(self.is_difficult[row]),
+            difficulty_score=float(self.difficulty_scores[row]),
+            trigger_reasons=self.trigger_reasons(row) if self.trigger_masks[row] else [],
+            confidence=float(self.confidences[row])
+        )
+
+
+def behavior_columns(behavior_data_list: List[BehaviorData]) -> Dict[str, np.ndarray]:
+    """将行为数据列表转换为列式数组
+    
+    Args:
+        behavior_data_list: 行为数据列表
+    
+    Returns:
+        字段名 -> 数组 的字典，可直接传给DifficultyDetector.detect_columns
+    """
+    return {
+        "user_id": np.array([b.user_id for b in behavior_data_list], dtype=np.int64),
+        "knowledge_point_id": np.array([b.knowledge_point_id for b in behavior_data_list], dtype=np.int64),
+        "replay_count": np.array([b.replay_count for b in behavior_data_list]),
+        "pause_count": np.array([b.pause_count for b in behavior_data_list]),
+        "total_watch_time": np.array([b.total_watch_time for b in behavior_data_list], dtype=np.float64),
+        "knowledge_point_duration": np.array(
+            [b.knowledge_point_duration for b in behavior_data_list], dtype=np.float64
+        ),
+        "seek_count": np.array([b.seek_count for b in behavior_data_list]),
+    }
+
+
 class DifficultyDetector:
     """难点识别器
     
@@ -241,15 +350,118 @@ class DifficultyDetector:
         Returns:
             (行为数据, 检测结果) 元组列表
         """
-        results = []
+        if not behavior_data_list:
+            logger.info("Batch detection completed: 0 results")
+            return []
+        
+        # 使用列式向量化计算，触发原因只为被触发的行生成
+        batch_result = self.detect_columns(behavior_columns(behavior_data_list))
         
-        for behavior_data in behavior_data_list:
-            result = self.detect(behavior_data, knowledge_point_info)
-            results.append((behavior_data, result))
+        results = [
+            (behavior_data, batch_result.to_result(i))
+            for i, behavior_data in enumerate(behavior_data_list)
+        ]
         
         logger.info(f"Batch detection completed: {len(results)} results")
         return results
     
+    def detect_columns(self, columns: Any) -> BatchDifficultyResult:
+        """列式批量检测
+        
+        一次向量化计算整个班级（或全部学生×知识点）的困难度分数、
+        触发位掩码和置信度，结果与逐条调用detect一致。
+        
+        Args:
+            columns: NumPy结构化数组，或 字段名 -> 数组 的映射。
+                必须包含replay_count、pause_count、total_watch_time、
+                knowledge_point_duration、seek_count；
+                可选user_id、knowledge_point_id
+        
+        Returns:
+            列式批量难点识别结果
+        
+        Raises:
+            ValueError: 当缺少必需字段、各列长度不一致或阈值/权重不完整时
+        """
+        field_names = (
+            columns.dtype.names if isinstance(columns, np.ndarray) else tuple(columns.keys())
+        ) or ()
+        missing = [name for name in BEHAVIOR_COLUMNS if name not in field_names]
+        if missing:
+            raise ValueError(f"Missing behavior columns: {missing}")
+        
+        replay = np.asarray(columns["replay_count"])
+        pause = np.asarray(columns["pause_count"])
+        watch_time = np.asarray(columns["total_watch_time"], dtype=np.float64)
+        duration = np.asarray(columns["knowledge_point_duration"], dtype=np.float64)
+        seek = np.asarray(columns["seek_count"])
+        
+        if len({len(replay), len(pause), len(watch_time), len(duration), len(seek)}) > 1:
+            raise ValueError("Behavior columns must have the same length")
+        
+        # 计算停留时长比（时长为0时为0）
+        watch_ratio = np.zeros(len(duration), dtype=np.float64)
+        np.divide(watch_time, duration, out=watch_ratio, where=duration > 0)
+        
+        thresholds = self.thresholds
+        weights = self.weights
+        for key in ("replay", "pause", "watch_ratio", "seek"):
+            if key not in thresholds or key not in weights:
+                raise ValueError(f"Missing threshold or weight for '{key}'")
+        
+        # 与calculate_difficulty_score相同的计算顺序
+        replay_score = (replay / thresholds["replay"]) * weights["replay"]
+        pause_score = (pause / thresholds["pause"]) * weights["pause"]
+        watch_ratio_score = (watch_ratio / thresholds["watch_ratio"]) * weights["watch_ratio"]
+        seek_score = (seek / thresholds["seek"]) * weights["seek"]
+        scores = np.maximum((replay_score + pause_score + watch_ratio_score + seek_score) * 10, 0.0)
+        
+        # 各项指标是否触发
+        replay_hit = replay >= thresholds["replay"]
+        pause_hit = pause >= thresholds["pause"]
+        watch_ratio_hit = watch_ratio >= thresholds["watch_ratio"]
+        seek_hit = seek >= thresholds["seek"]
+        
+        masks = (
+            replay_hit * TRIGGER_REPLAY
+            | pause_hit * TRIGGER_PAUSE
+            | watch_ratio_hit * TRIGGER_WATCH_RATIO
+            | seek_hit * TRIGGER_SEEK
+        ).astype(np.uint8)
+        reason_counts = (
+            replay_hit.astype(np.int64) + pause_hit + watch_ratio_hit + seek_hit
+        )
+        
+        # 与_calculate_confidence相同的计算
+        base_confidence = np.minimum(reason_counts * 0.3, 0.9)
+        score_confidence = np.minimum(scores / 10.0, 1.0) * 0.5
+        confidences = np.minimum(base_confidence + score_confidence, 1.0)
+        
+        user_ids = np.asarray(columns["user_id"]) if "user_id" in field_names else None
+        kp_ids = (
+            np.asarray(columns["knowledge_point_id"]) if "knowledge_point_id" in field_names else None
+        )
+        
+        result = BatchDifficultyResult(
+            user_ids=user_ids,
+            knowledge_point_ids=kp_ids,
+            difficulty_scores=np.minimum(scores, 10.0),
+            trigger_masks=masks,
+            is_difficult=(masks != 0) | (scores >= 1.0),
+            confidences=confidences,
+            replay_counts=replay,
+            pause_counts=pause,
+            watch_ratios=watch_ratio,
+            seek_counts=seek,
+            thresholds=dict(thresholds)
+        )
+        
+        logger.debug(
+            f"Columnar detection completed: {len(result)} rows, "
+            f"{int(result.is_difficult.sum())} difficult"
+        )
+        return result
+    
     def _calculate_confidence(
         self,
         behavior_data: BehaviorData,
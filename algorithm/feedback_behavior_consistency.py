@@ -10,6 +10,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
+from bounded_history import BoundedHistory, compact_record
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,6 +56,7 @@ class BehaviorData:
     interaction_count: int = 0  # 交互次数（点击、暂停等）
 
 
+@compact_record
 @dataclass
 class ConsistencyResult:
     """一致性校验结果"""
@@ -98,17 +101,23 @@ class FeedbackBehaviorConsistency:
     
     def __init__(
         self,
-        min_watch_percentage: float = MIN_WATCH_PERCENTAGE
+        min_watch_percentage: float = MIN_WATCH_PERCENTAGE,
+        history_limit: Optional[int] = BoundedHistory.DEFAULT_MAX_RECORDS,
+        history_spill_path: Optional[str] = None
     ):
         """初始化一致性校验器
         
         Args:
             min_watch_percentage: 最小观看百分比阈值（默认0.8）
+            history_limit: 一致性历史在内存中保留的最大记录数，None表示不限制
+            history_spill_path: 一致性历史溢出文件路径（可选）
         """
         self.min_watch_percentage = min_watch_percentage
         
-        # 存储一致性历史记录
-        self.consistency_history: List[ConsistencyResult] = []
+        # 存储一致性历史记录（有界，超出后淘汰最旧记录）
+        self.consistency_history: BoundedHistory[ConsistencyResult] = BoundedHistory(
+            max_records=history_limit, spill_path=history_spill_path
+        )
         
         # 存储异常记录
         self.anomaly_records: Dict[int, AnomalyRecord] = {}
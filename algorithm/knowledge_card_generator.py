@@ -7,7 +7,9 @@
 import logging
 from typing import List, Dict, Optional
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+
+from artifact_cache import ArtifactCache
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -32,19 +34,26 @@ class KnowledgeCardGenerator:
     为疑难知识点生成补偿学习资源，包括核心概念、公式、例题、常见误区、学习建议等。
     """
     
+    # 卡片生成算法版本，算法变化导致结果不同时递增，使持久化缓存中的旧结果失效
+    ARTIFACT_VERSION = 1
+    
     def __init__(
         self,
         use_ai: bool = False,
-        ai_api_key: Optional[str] = None
+        ai_api_key: Optional[str] = None,
+        artifact_cache: Optional[ArtifactCache] = None
     ):
         """初始化知识卡片生成器
         
         Args:
             use_ai: 是否使用AI模型生成内容（需要配置API密钥）
             ai_api_key: AI API密钥（可选）
+            artifact_cache: 中间产物持久化缓存（可选），卡片按知识点内容和输入文本持久化，
+                进程重启后仍可复用
         """
         self.use_ai = use_ai
         self.ai_api_key = ai_api_key
+        self.artifact_cache = artifact_cache
         
         # 缓存已生成的卡片
         self.card_cache: Dict[int, str] = {}
@@ -73,38 +82,56 @@ class KnowledgeCardGenerator:
                 logger.debug(f"Using cached card for knowledge point {knowledge_point_info.id}")
                 return self.card_cache[knowledge_point_info.id]
             
-            logger.info(f"Generating knowledge card for: {knowledge_point_info.name}")
-            
-            # 合并文本
-            full_text = self._merge_texts(asr_text, ocr_text, knowledge_point_info.summary)
-            
-            # 提取各部分内容
-            core_concept = self.extract_core_concept(full_text, knowledge_point_info)
-            formulas = self.extract_formulas(full_text)
-            examples = self.generate_examples(knowledge_point_info, full_text)
-            common_mistakes = self.generate_common_mistakes(knowledge_point_info, full_text)
-            learning_tips = self.generate_learning_tips(knowledge_point_info, full_text)
-            
-            # 格式化为Markdown
-            card_content = self.format_as_markdown(
-                knowledge_point_info=knowledge_point_info,
-                core_concept=core_concept,
-                formulas=formulas,
-                examples=examples,
-                common_mistakes=common_mistakes,
-                learning_tips=learning_tips
-            )
+            if self.artifact_cache is not None:
+                card_content = self.artifact_cache.get_or_compute(
+                    "knowledge_card",
+                    {"knowledge_point": asdict(knowledge_point_info), "asr": asr_text, "ocr": ocr_text},
+                    {"version": self.ARTIFACT_VERSION, "use_ai": self.use_ai},
+                    lambda: self._generate_card(knowledge_point_info, asr_text, ocr_text)
+                )
+            else:
+                card_content = self._generate_card(knowledge_point_info, asr_text, ocr_text)
             
             # 缓存结果
             self.card_cache[knowledge_point_info.id] = card_content
-            
-            logger.info(f"Knowledge card generated successfully")
             return card_content
             
         except Exception as e:
             logger.error(f"Error generating knowledge card: {e}", exc_info=True)
             raise
     
+    def _generate_card(
+        self,
+        knowledge_point_info: KnowledgePointInfo,
+        asr_text: Optional[str] = None,
+        ocr_text: Optional[str] = None
+    ) -> str:
+        """生成知识卡片内容（不经过缓存），参数与返回值同generate_card"""
+        logger.info(f"Generating knowledge card for: {knowledge_point_info.name}")
+        
+        # 合并文本
+        full_text = self._merge_texts(asr_text, ocr_text, knowledge_point_info.summary)
+        
+        # 提取各部分内容
+        core_concept = self.extract_core_concept(full_text, knowledge_point_info)
+        formulas = self.extract_formulas(full_text)
+        examples = self.generate_examples(knowledge_point_info, full_text)
+        common_mistakes = self.generate_common_mistakes(knowledge_point_info, full_text)
+        learning_tips = self.generate_learning_tips(knowledge_point_info, full_text)
+        
+        # 格式化为Markdown
+        card_content = self.format_as_markdown(
+            knowledge_point_info=knowledge_point_info,
+            core_concept=core_concept,
+            formulas=formulas,
+            examples=examples,
+            common_mistakes=common_mistakes,
+            learning_tips=learning_tips
+        )
+        
+        logger.info(f"Knowledge card generated successfully")
+        return card_content
+    
     def extract_core_concept(
         self,
         text: str,
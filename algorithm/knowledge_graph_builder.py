@@ -5,8 +5,10 @@
 包括前置依赖、相关关系、包含关系的识别。
 """
 
+import heapq
 import logging
-from typing import List, Dict, Tuple, Optional
+from collections import defaultdict, deque
+from typing import Any, List, Dict, Set, Tuple, Optional
 from dataclasses import dataclass
 import networkx as nx
 
@@ -17,6 +19,8 @@ try:
 except ImportError:
     SEMANTIC_SIMILARITY_AVAILABLE = False
 
+from similarity_cache import get_similarity_cache
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,6 +46,93 @@ class KnowledgeRelation:
     confidence: float
 
 
+class ConceptMatcher:
+    """多模式串匹配器（Aho–Corasick自动机）
+    
+    将所有知识点的概念词（名称、核心关键词）构建为一个自动机，
+    扫描一遍文本即可找出其中提到的全部概念，复杂度与文本长度和匹配数成正比。
+    """
+    
+    def __init__(self):
+        """初始化匹配器"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Any]] = [[]]
+        # 空模式串出现在任何文本中
+        self._always: List[Any] = []
+        self._built = False
+    
+    def add(self, pattern: str, value: Any):
+        """添加模式串
+        
+        Args:
+            pattern: 模式串
+            value: 匹配成功时返回的值
+        """
+        if not pattern:
+            self._always.append(value)
+            return
+        
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        
+        self._output[state].append(value)
+        self._built = False
+    
+    def build(self):
+        """构建失败指针（BFS）"""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # 合并后缀状态的输出
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+                queue.append(next_state)
+        
+        self._built = True
+    
+    def find_all(self, text: str) -> Set[Any]:
+        """找出文本中出现的所有模式串对应的值
+        
+        Args:
+            text: 待扫描文本
+        
+        Returns:
+            匹配到的值集合
+        """
+        if not self._built:
+            self.build()
+        
+        found = set(self._always)
+        state = 0
+        
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                found.update(self._output[state])
+        
+        return found
+
+
 class KnowledgeGraphBuilder:
     """知识图谱构建器
     
@@ -54,7 +145,10 @@ class KnowledgeGraphBuilder:
         similarity_threshold: float = 0.6,
         keyword_overlap_threshold: float = 0.3,
         prerequisite_confidence: float = 0.8,
-        use_advanced_similarity: bool = False
+        use_advanced_similarity: bool = False,
+        use_similarity_cache: bool = True,
+        use_inverted_index: bool = True,
+        cycle_strategy: str = "feedback_arc_set"
     ):
         """初始化知识图谱构建器
         
@@ -63,10 +157,26 @@ class KnowledgeGraphBuilder:
             keyword_overlap_threshold: 关键词重叠阈值
             prerequisite_confidence: 前置依赖关系的默认置信度
             use_advanced_similarity: 是否使用sentence-transformers（需要安装）
+            use_similarity_cache: 是否使用进程级共享的相似度缓存
+            use_inverted_index: 是否使用倒排索引生成候选知识点对（否则两两比较）
+            cycle_strategy: 循环依赖处理策略：
+                feedback_arc_set - 强连通分量 + 按置信度加权的贪心反馈边集（近线性时间）
+                simple_cycles - 枚举所有简单环，逐个移除置信度最低的边（最坏指数时间）
+        
+        Raises:
+            ValueError: 当cycle_strategy不合法时
         """
+        if cycle_strategy not in ("feedback_arc_set", "simple_cycles"):
+            raise ValueError(f"Unknown cycle strategy: {cycle_strategy}")
+        
         self.similarity_threshold = similarity_threshold
         self.keyword_overlap_threshold = keyword_overlap_threshold
         self.prerequisite_confidence = prerequisite_confidence
+        self.use_inverted_index = use_inverted_index
+        self.cycle_strategy = cycle_strategy
+        
+        # 最近一次处理循环依赖时移除的边
+        self.removed_edges: List[KnowledgeRelation] = []
         
         # 初始化语义相似度计算器
         if SEMANTIC_SIMILARITY_AVAILABLE and use_advanced_similarity:
@@ -76,6 +186,9 @@ class KnowledgeGraphBuilder:
             self.similarity_calculator = None
             logger.info("Using simple similarity calculation")
         
+        # 进程级共享的相似度缓存
+        self.similarity_cache = get_similarity_cache() if use_similarity_cache else None
+        
         logger.info("KnowledgeGraphBuilder initialized")
     
     def build_graph(self, knowledge_points: List[KnowledgePointInfo]) -> nx.DiGraph:
@@ -120,10 +233,10 @@ class KnowledgeGraphBuilder:
                     confidence=rel.confidence
                 )
             
-            # 检测并处理循环依赖
-            cycles = self.detect_cycles(graph)
-            if cycles:
-                logger.warning(f"Detected {len(cycles)} cycles, resolving...")
+            # 检测并处理循环依赖（O(V+E)判断是否有环，避免枚举所有环）
+            self.removed_edges = []
+            if not nx.is_directed_acyclic_graph(graph):
+                logger.warning("Detected cycles, resolving...")
                 graph = self.resolve_cycles(graph)
             
             logger.info(f"Graph built: {graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges")
@@ -151,20 +264,21 @@ class KnowledgeGraphBuilder:
         """
         relations = []
         
-        for i, kp_a in enumerate(knowledge_points):
-            for j, kp_b in enumerate(knowledge_points[i+1:], start=i+1):
-                # 检查B的文本中是否提到A的概念
-                if self._mentions_concept(kp_b, kp_a):
-                    # 检查时序：A应该在B之前
-                    if kp_a.end_time <= kp_b.start_time:
-                        confidence = self._calculate_prerequisite_confidence(kp_a, kp_b)
-                        relations.append(KnowledgeRelation(
-                            source_id=kp_a.id,
-                            target_id=kp_b.id,
-                            relation_type="prerequisite",
-                            confidence=confidence
-                        ))
-                        logger.debug(f"Prerequisite: {kp_a.name} -> {kp_b.name}")
+        # 候选对(i, j)满足i < j且B的文本中提到A的概念
+        for i, j in self._mention_pairs(knowledge_points):
+            kp_a = knowledge_points[i]
+            kp_b = knowledge_points[j]
+            
+            # 检查时序：A应该在B之前
+            if kp_a.end_time <= kp_b.start_time:
+                confidence = self._calculate_prerequisite_confidence(kp_a, kp_b)
+                relations.append(KnowledgeRelation(
+                    source_id=kp_a.id,
+                    target_id=kp_b.id,
+                    relation_type="prerequisite",
+                    confidence=confidence
+                ))
+                logger.debug(f"Prerequisite: {kp_a.name} -> {kp_b.name}")
         
         logger.info(f"Detected {len(relations)} prerequisite relations")
         return relations
@@ -187,25 +301,27 @@ class KnowledgeGraphBuilder:
         """
         relations = []
         
-        for i, kp_a in enumerate(knowledge_points):
-            for j, kp_b in enumerate(knowledge_points[i+1:], start=i+1):
-                # 计算关键词重叠度
-                keyword_overlap = self._calculate_keyword_overlap(kp_a.keywords, kp_b.keywords)
-                
-                # 计算语义相似度（基于摘要）
-                semantic_similarity = self._calculate_semantic_similarity(kp_a.summary, kp_b.summary)
-                
-                # 如果重叠度或相似度超过阈值，认为是相关关系
-                if keyword_overlap >= self.keyword_overlap_threshold or \
-                   semantic_similarity >= self.similarity_threshold:
-                    confidence = (keyword_overlap + semantic_similarity) / 2
-                    relations.append(KnowledgeRelation(
-                        source_id=kp_a.id,
-                        target_id=kp_b.id,
-                        relation_type="related",
-                        confidence=confidence
-                    ))
-                    logger.debug(f"Related: {kp_a.name} <-> {kp_b.name}")
+        for i, j in self._related_candidate_pairs(knowledge_points):
+            kp_a = knowledge_points[i]
+            kp_b = knowledge_points[j]
+            
+            # 计算关键词重叠度
+            keyword_overlap = self._calculate_keyword_overlap(kp_a.keywords, kp_b.keywords)
+            
+            # 计算语义相似度（基于摘要）
+            semantic_similarity = self._calculate_semantic_similarity(kp_a.summary, kp_b.summary)
+            
+            # 如果重叠度或相似度超过阈值，认为是相关关系
+            if keyword_overlap >= self.keyword_overlap_threshold or \
+               semantic_similarity >= self.similarity_threshold:
+                confidence = (keyword_overlap + semantic_similarity) / 2
+                relations.append(KnowledgeRelation(
+                    source_id=kp_a.id,
+                    target_id=kp_b.id,
+                    relation_type="related",
+                    confidence=confidence
+                ))
+                logger.debug(f"Related: {kp_a.name} <-> {kp_b.name}")
         
         logger.info(f"Detected {len(relations)} related relations")
         return relations
@@ -228,21 +344,20 @@ class KnowledgeGraphBuilder:
         """
         relations = []
         
-        for i, kp_a in enumerate(knowledge_points):
-            for j, kp_b in enumerate(knowledge_points):
-                if i == j:
-                    continue
-                
-                # 检查A是否包含B
-                if self._contains_concept(kp_a, kp_b):
-                    confidence = self._calculate_contains_confidence(kp_a, kp_b)
-                    relations.append(KnowledgeRelation(
-                        source_id=kp_a.id,
-                        target_id=kp_b.id,
-                        relation_type="contains",
-                        confidence=confidence
-                    ))
-                    logger.debug(f"Contains: {kp_a.name} -> {kp_b.name}")
+        for i, j in self._contains_candidate_pairs(knowledge_points):
+            kp_a = knowledge_points[i]
+            kp_b = knowledge_points[j]
+            
+            # 检查A是否包含B
+            if self._contains_concept(kp_a, kp_b):
+                confidence = self._calculate_contains_confidence(kp_a, kp_b)
+                relations.append(KnowledgeRelation(
+                    source_id=kp_a.id,
+                    target_id=kp_b.id,
+                    relation_type="contains",
+                    confidence=confidence
+                ))
+                logger.debug(f"Contains: {kp_a.name} -> {kp_b.name}")
         
         logger.info(f"Detected {len(relations)} contains relations")
         return relations
@@ -267,6 +382,8 @@ class KnowledgeGraphBuilder:
         """解决循环依赖
         
         策略：移除置信度最低的边来打破循环。
+        feedback_arc_set策略下移除的是贪心反馈边集，结果保证无环；
+        移除的边记录在self.removed_edges中。
         
         Args:
             graph: 包含循环的图
@@ -274,6 +391,23 @@ class KnowledgeGraphBuilder:
         Returns:
             解决循环后的图
         """
+        if self.cycle_strategy == "feedback_arc_set":
+            feedback_edges = self.find_feedback_edges(graph)
+            self.removed_edges = feedback_edges
+            if not feedback_edges:
+                return graph
+            
+            resolved_graph = graph.copy()
+            for rel in feedback_edges:
+                resolved_graph.remove_edge(rel.source_id, rel.target_id)
+                logger.info(
+                    f"Removed edge ({rel.source_id}, {rel.target_id}) "
+                    f"[{rel.relation_type}, confidence={rel.confidence:.2f}] to break cycle"
+                )
+            
+            return resolved_graph
+        
+        removed_edges = []
         cycles = self.detect_cycles(graph)
         if not cycles:
             return graph
@@ -302,11 +436,272 @@ class KnowledgeGraphBuilder:
             
             # 移除置信度最低的边
             if edge_to_remove:
+                data = resolved_graph[edge_to_remove[0]][edge_to_remove[1]]
+                removed_edges.append(KnowledgeRelation(
+                    source_id=edge_to_remove[0],
+                    target_id=edge_to_remove[1],
+                    relation_type=data.get('relation_type', 'related'),
+                    confidence=data.get('confidence', 1.0)
+                ))
                 resolved_graph.remove_edge(*edge_to_remove)
                 logger.info(f"Removed edge {edge_to_remove} to break cycle")
         
+        self.removed_edges = removed_edges
         return resolved_graph
     
+    def find_feedback_edges(self, graph: nx.DiGraph) -> List[KnowledgeRelation]:
+        """计算打破所有循环需要移除的边（贪心反馈边集）
+        
+        算法：
+        1. 求强连通分量，环只可能出现在分量内部
+        2. 对每个非平凡分量使用Eades-Lin-Smyth贪心排序：
+           反复移除汇点（排到末尾）和源点（排到开头），
+           否则选出"出边置信度之和 - 入边置信度之和"最大的节点排到开头
+        3. 在该排序中指向前方的边即为反馈边，它们倾向于置信度较低的边
+        
+        复杂度O((V+E) log V)。
+        
+        Args:
+            graph: 知识图谱
+        
+        Returns:
+            需要移除的边列表
+        """
+        feedback_edges = []
+        
+        for component in nx.strongly_connected_components(graph):
+            if len(component) == 1:
+                node = next(iter(component))
+                if graph.has_edge(node, node):
+                    feedback_edges.append(self._edge_relation(graph, node, node))
+                continue
+            
+            position = self._greedy_component_order(graph, component)
+            
+            for source in component:
+                for target in graph.successors(source):
+                    if target in component and position[source] >= position[target]:
+                        feedback_edges.append(self._edge_relation(graph, source, target))
+        
+        return feedback_edges
+    
+    def _greedy_component_order(self, graph: nx.DiGraph, component: Set[int]) -> Dict[int, int]:
+        """对强连通分量内的节点做Eades-Lin-Smyth贪心排序（按置信度加权）
+        
+        Args:
+            graph: 知识图谱
+            component: 强连通分量的节点集合
+        
+        Returns:
+            节点 -> 排序位置
+        """
+        out_degree: Dict[int, int] = {}
+        in_degree: Dict[int, int] = {}
+        out_weight: Dict[int, float] = {}
+        in_weight: Dict[int, float] = {}
+        
+        for node in component:
+            out_degree[node] = in_degree[node] = 0
+            out_weight[node] = in_weight[node] = 0.0
+        
+        for source in component:
+            for target, data in graph[source].items():
+                if target in component and target != source:
+                    confidence = data.get('confidence', 1.0)
+                    out_degree[source] += 1
+                    out_weight[source] += confidence
+                    in_degree[target] += 1
+                    in_weight[target] += confidence
+        
+        remaining = set(component)
+        sinks = deque(node for node in component if out_degree[node] == 0)
+        sources = deque(node for node in component if in_degree[node] == 0)
+        # 大顶堆（惰性删除），键为出入权重差
+        heap = [(in_weight[node] - out_weight[node], node) for node in component]
+        heapq.heapify(heap)
+        
+        head: List[int] = []
+        tail: List[int] = []
+        
+        def remove(node: int):
+            remaining.discard(node)
+            for target, data in graph[node].items():
+                if target in remaining and target != node:
+                    in_degree[target] -= 1
+                    in_weight[target] -= data.get('confidence', 1.0)
+                    if in_degree[target] == 0:
+                        sources.append(target)
+                    heapq.heappush(heap, (in_weight[target] - out_weight[target], target))
+            for source in graph.predecessors(node):
+                if source in remaining and source != node:
+                    out_degree[source] -= 1
+                    out_weight[source] -= graph[source][node].get('confidence', 1.0)
+                    if out_degree[source] == 0:
+                        sinks.append(source)
+                    heapq.heappush(heap, (in_weight[source] - out_weight[source], source))
+        
+        while remaining:
+            if sinks:
+                node = sinks.popleft()
+                if node in remaining:
+                    tail.append(node)
+                    remove(node)
+                continue
+            
+            if sources:
+                node = sources.popleft()
+                if node in remaining:
+                    head.append(node)
+                    remove(node)
+                continue
+            
+            key, node = heapq.heappop(heap)
+            # 跳过已移除节点和过期的堆项
+            if node not in remaining or key != in_weight[node] - out_weight[node]:
+                continue
+            head.append(node)
+            remove(node)
+        
+        order = head + tail[::-1]
+        return {node: i for i, node in enumerate(order)}
+    
+    def _edge_relation(self, graph: nx.DiGraph, source: int, target: int) -> KnowledgeRelation:
+        """将图中的边转换为关系对象"""
+        data = graph[source][target]
+        return KnowledgeRelation(
+            source_id=source,
+            target_id=target,
+            relation_type=data.get('relation_type', 'related'),
+            confidence=data.get('confidence', 1.0)
+        )
+    
+    def _mention_pairs(
+        self,
+        knowledge_points: List[KnowledgePointInfo]
+    ) -> List[Tuple[int, int]]:
+        """生成"B的文本中提到A的概念"的知识点对
+        
+        使用倒排索引时，将每个知识点的名称和前3个关键词构建为Aho–Corasick自动机，
+        每个知识点的文本只扫描一次；否则两两调用_mentions_concept。
+        
+        Args:
+            knowledge_points: 知识点列表
+        
+        Returns:
+            按(i, j)排序的下标对列表，i < j
+        """
+        n = len(knowledge_points)
+        
+        if not self.use_inverted_index:
+            return [
+                (i, j)
+                for i in range(n)
+                for j in range(i + 1, n)
+                if self._mentions_concept(knowledge_points[j], knowledge_points[i])
+            ]
+        
+        matcher = ConceptMatcher()
+        for i, kp in enumerate(knowledge_points):
+            # 与_mentions_concept一致：前3个关键词和名称
+            for keyword in kp.keywords[:3]:
+                matcher.add(keyword, i)
+            matcher.add(kp.name, i)
+        matcher.build()
+        
+        pairs = []
+        for j, kp_b in enumerate(knowledge_points):
+            text_b = kp_b.summary + " " + kp_b.name
+            pairs.extend((i, j) for i in matcher.find_all(text_b) if i < j)
+        
+        pairs.sort()
+        return pairs
+    
+    def _shared_token_pairs(self, token_sets: List[Set[str]]) -> Set[Tuple[int, int]]:
+        """通过倒排索引找出至少共享一个词的下标对
+        
+        生成的候选对数量与实际重叠数量成正比，而不是n²。
+        
+        Args:
+            token_sets: 每个知识点的词集合
+        
+        Returns:
+            下标对集合，i < j
+        """
+        index: Dict[str, List[int]] = defaultdict(list)
+        for i, tokens in enumerate(token_sets):
+            for token in tokens:
+                index[token].append(i)
+        
+        pairs = set()
+        for postings in index.values():
+            for a in range(len(postings)):
+                for b in range(a + 1, len(postings)):
+                    pairs.add((postings[a], postings[b]))
+        
+        return pairs
+    
+    def _all_pairs(self, n: int) -> List[Tuple[int, int]]:
+        """生成全部下标对(i, j)，i < j"""
+        return [(i, j) for i in range(n) for j in range(i + 1, n)]
+    
+    def _related_candidate_pairs(
+        self,
+        knowledge_points: List[KnowledgePointInfo]
+    ) -> List[Tuple[int, int]]:
+        """生成相关关系的候选知识点对
+        
+        关键词重叠度和简单模式的语义相似度只有在共享关键词/词汇时才大于0，
+        因此阈值为正时只需比较共享关键词或摘要词汇的知识点对。
+        配置了相似度计算器（sentence-transformers或其jieba分词回退模式，分词方式与按空白分词不同）
+        或阈值不为正时退化为两两比较。
+        
+        Args:
+            knowledge_points: 知识点列表
+        
+        Returns:
+            按(i, j)排序的下标对列表，i < j
+        """
+        n = len(knowledge_points)
+        
+        if not self.use_inverted_index or \
+           self.keyword_overlap_threshold <= 0 or \
+           self.similarity_threshold <= 0 or \
+           self.similarity_calculator is not None:
+            return self._all_pairs(n)
+        
+        # 共享关键词（关键词重叠度）或共享摘要词汇（简单模式按空白分词的语义相似度）
+        pairs = self._shared_token_pairs([set(kp.keywords) for kp in knowledge_points])
+        pairs |= self._shared_token_pairs([set(kp.summary.split()) for kp in knowledge_points])
+        
+        return sorted(pairs)
+    
+    def _contains_candidate_pairs(
+        self,
+        knowledge_points: List[KnowledgePointInfo]
+    ) -> List[Tuple[int, int]]:
+        """生成包含关系的候选知识点对（有序）
+        
+        包含关系要求B的关键词至少一半出现在A中，因此只需比较共享关键词的知识点对。
+        
+        Args:
+            knowledge_points: 知识点列表
+        
+        Returns:
+            按(i, j)排序的有序下标对列表，i != j
+        """
+        n = len(knowledge_points)
+        
+        if not self.use_inverted_index:
+            return [(i, j) for i in range(n) for j in range(n) if i != j]
+        
+        pairs = []
+        for i, j in self._shared_token_pairs([set(kp.keywords) for kp in knowledge_points]):
+            pairs.append((i, j))
+            pairs.append((j, i))
+        
+        pairs.sort()
+        return pairs
+    
     def _mentions_concept(
         self,
         kp_b: KnowledgePointInfo,
@@ -400,6 +795,27 @@ class KnowledgeGraphBuilder:
         if not text1 or not text2:
             return 0.0
         
+        if self.similarity_cache is not None:
+            namespace = (
+                self.similarity_calculator.cache_namespace
+                if self.similarity_calculator else "graph:words"
+            )
+            return self.similarity_cache.get_or_compute(
+                text1, text2, self._compute_semantic_similarity, namespace=namespace
+            )
+        
+        return self._compute_semantic_similarity(text1, text2)
+    
+    def _compute_semantic_similarity(self, text1: str, text2: str) -> float:
+        """计算语义相似度（不经过缓存）
+        
+        Args:
+            text1: 第一个文本
+            text2: 第二个文本
+        
+        Returns:
+            相似度（0-1）
+        """
         # 如果使用高级相似度计算器
         if self.similarity_calculator:
             return self.similarity_calculator.calculate(text1, text2)
@@ -15,6 +15,8 @@ import jieba
 import jieba.analyse
 import re
 
+from artifact_cache import ArtifactCache
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,12 +28,16 @@ class KnowledgePointAnnotator:
     对切分好的知识点进行自动标注，生成名称、摘要、关键词、难度等信息。
     """
     
+    # 标注算法版本，算法变化导致结果不同时递增，使持久化缓存中的旧结果失效
+    ARTIFACT_VERSION = 1
+    
     def __init__(
         self,
         name_max_length: int = 15,
         summary_min_length: int = 50,
         summary_max_length: int = 200,
-        keyword_count: int = 10
+        keyword_count: int = 10,
+        artifact_cache: Optional[ArtifactCache] = None
     ):
         """初始化知识点标注器
         
@@ -40,11 +46,13 @@ class KnowledgePointAnnotator:
             summary_min_length: 摘要最小长度（字符数）
             summary_max_length: 摘要最大长度（字符数）
             keyword_count: 关键词数量
+            artifact_cache: 中间产物持久化缓存（可选），相同输入和参数的标注结果直接复用
         """
         self.name_max_length = name_max_length
         self.summary_min_length = summary_min_length
         self.summary_max_length = summary_max_length
         self.keyword_count = keyword_count
+        self.artifact_cache = artifact_cache
         
         # 初始化jieba
         jieba.initialize()
@@ -87,6 +95,37 @@ class KnowledgePointAnnotator:
             - type: 知识点类型（concept/example/practice/summary）
             - metadata: 其他元数据
         """
+        if self.artifact_cache is None:
+            return self._annotate(knowledge_point_text, asr_texts, ocr_texts, start_time, end_time)
+        
+        return self.artifact_cache.get_or_compute(
+            "annotation",
+            {
+                "text": knowledge_point_text,
+                "asr": asr_texts,
+                "ocr": ocr_texts,
+                "start_time": start_time,
+                "end_time": end_time
+            },
+            {
+                "version": self.ARTIFACT_VERSION,
+                "name_max_length": self.name_max_length,
+                "summary_min_length": self.summary_min_length,
+                "summary_max_length": self.summary_max_length,
+                "keyword_count": self.keyword_count
+            },
+            lambda: self._annotate(knowledge_point_text, asr_texts, ocr_texts, start_time, end_time)
+        )
+    
+    def _annotate(
+        self,
+        knowledge_point_text: str,
+        asr_texts: Optional[List[Dict]] = None,
+        ocr_texts: Optional[List[Dict]] = None,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None
+    ) -> Dict:
+        """对知识点进行自动标注（不经过持久化缓存），参数与返回值同annotate"""
         try:
             logger.info(f"Annotating knowledge point, text length: {len(knowledge_point_text)}")
             
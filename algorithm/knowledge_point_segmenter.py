@@ -5,12 +5,14 @@
 使用语义相似度检测话题转换点，结合OCR幻灯片切换点进行切分。
 """
 
+import bisect
 import logging
-from typing import List, Dict, Optional, Tuple
+from operator import attrgetter
+from typing import Any, Iterable, List, Dict, Optional, Tuple
 import numpy as np
 import jieba
 import jieba.analyse
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 # 导入语义相似度计算模块
 try:
@@ -19,6 +21,10 @@ try:
 except ImportError:
     SEMANTIC_SIMILARITY_AVAILABLE = False
 
+from artifact_cache import ArtifactCache
+from bounded_history import compact_record
+from similarity_cache import get_similarity_cache
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -35,6 +41,76 @@ class KnowledgePoint:
     difficulty: str = "medium"
 
 
+@dataclass
+class TextTokens:
+    """单段文本的分词结果
+    
+    每次切分中每段输入文本只分词一次，相似度计算、关键词提取
+    和难度估算都复用这里的结果。
+    """
+    term_freq: Dict[str, float]  # 候选词词频（已过滤停用词和单字词），保持首次出现顺序
+    keywords: List[str]          # 前10个TF-IDF关键词
+    keyword_set: frozenset       # keywords的集合形式，用于Jaccard相似度
+
+
+@compact_record
+@dataclass
+class TextRecord:
+    """合并后的单段文本
+    
+    只保存时间、来源和对原文本字符串的引用，不复制输入字典。
+    支持按键读取（record["start_time"]、record.get("text", "")），与原先的字典格式兼容。
+    """
+    start_time: float
+    end_time: float
+    text: str
+    source: str  # asr, ocr, subtitle
+    slide_number: Optional[int] = None
+    
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+class _RangeMinimum:
+    """区间最小值查询（稀疏表）
+    
+    O(n log n)预处理后，O(1)返回区间内最小值的位置（相同时取靠前的位置）。
+    """
+    
+    def __init__(self, values: List[float]):
+        """构建稀疏表
+        
+        Args:
+            values: 数值列表
+        """
+        self.values = values
+        self._table: List[List[int]] = [list(range(len(values)))]
+        
+        width = 1
+        while width * 2 <= len(values):
+            previous = self._table[-1]
+            self._table.append([
+                self._smaller(previous[i], previous[i + width])
+                for i in range(len(values) - width * 2 + 1)
+            ])
+            width *= 2
+    
+    def query(self, lo: int, hi: int) -> int:
+        """返回values[lo..hi]（闭区间）中最小值的位置"""
+        level = (hi - lo + 1).bit_length() - 1
+        row = self._table[level]
+        return self._smaller(row[lo], row[hi - (1 << level) + 1])
+    
+    def _smaller(self, i: int, j: int) -> int:
+        return j if self.values[j] < self.values[i] else i
+
+
 class KnowledgePointSegmenter:
     """知识点切分器
     
@@ -42,13 +118,19 @@ class KnowledgePointSegmenter:
     结合OCR的幻灯片切换点进行切分，确保每个知识点时长在2-10分钟。
     """
     
+    # 切分算法版本，算法变化导致结果不同时递增，使持久化缓存中的旧结果失效
+    ARTIFACT_VERSION = 1
+    
     def __init__(
         self,
         similarity_threshold: float = 0.7,
         min_duration: float = 120.0,  # 2分钟
         max_duration: float = 600.0,  # 10分钟
         window_size: int = 3,
-        use_advanced_similarity: bool = False
+        use_advanced_similarity: bool = False,
+        batch_similarity: bool = True,
+        use_similarity_cache: bool = True,
+        artifact_cache: Optional[ArtifactCache] = None
     ):
         """初始化知识点切分器
         
@@ -58,14 +140,19 @@ class KnowledgePointSegmenter:
             max_duration: 知识点最大时长（秒）
             window_size: 滑动窗口大小，用于计算相似度
             use_advanced_similarity: 是否使用sentence-transformers（需要安装）
+            batch_similarity: 是否批量计算相邻相似度（高级模式下一次性编码全部文本）
+            use_similarity_cache: 是否使用进程级共享的相似度缓存
+            artifact_cache: 中间产物持久化缓存（可选），相同输入和参数的切分结果直接复用
         """
         self.similarity_threshold = similarity_threshold
         self.min_duration = min_duration
         self.max_duration = max_duration
         self.window_size = window_size
+        self.batch_similarity = batch_similarity
         
         # 初始化jieba
         jieba.initialize()
+        self._tfidf = jieba.analyse.default_tfidf
         
         # 初始化语义相似度计算器
         if SEMANTIC_SIMILARITY_AVAILABLE and use_advanced_similarity:
@@ -75,6 +162,11 @@ class KnowledgePointSegmenter:
             self.similarity_calculator = None
             logger.info("Using simple similarity calculation")
         
+        # 进程级共享的相似度缓存
+        self.similarity_cache = get_similarity_cache() if use_similarity_cache else None
+        
+        self.artifact_cache = artifact_cache
+        
         logger.info(f"KnowledgePointSegmenter initialized with threshold={similarity_threshold}")
     
     def segment(
@@ -104,6 +196,36 @@ class KnowledgePointSegmenter:
         Raises:
             ValueError: 当输入数据格式不正确时
         """
+        if self.artifact_cache is None:
+            return self._segment(asr_texts, ocr_texts, subtitles)
+        
+        cached = self.artifact_cache.get_or_compute(
+            "segmentation",
+            {"asr": asr_texts, "ocr": ocr_texts, "subtitles": subtitles},
+            self._artifact_params(),
+            lambda: [asdict(kp) for kp in self._segment(asr_texts, ocr_texts, subtitles)]
+        )
+        return [KnowledgePoint(**kp) for kp in cached]
+    
+    def _artifact_params(self) -> Dict:
+        """影响切分结果的参数（持久化缓存键的一部分）"""
+        return {
+            "algorithm": type(self).__name__,
+            "version": self.ARTIFACT_VERSION,
+            "similarity": self._similarity_namespace(),
+            "similarity_threshold": self.similarity_threshold,
+            "min_duration": self.min_duration,
+            "max_duration": self.max_duration,
+            "window_size": self.window_size
+        }
+    
+    def _segment(
+        self,
+        asr_texts: List[Dict],
+        ocr_texts: Optional[List[Dict]] = None,
+        subtitles: Optional[List[Dict]] = None
+    ) -> List[KnowledgePoint]:
+        """切分知识点（不经过持久化缓存），参数与返回值同segment"""
         try:
             logger.info(f"Starting segmentation with {len(asr_texts)} ASR segments")
             
@@ -113,8 +235,11 @@ class KnowledgePointSegmenter:
                 logger.warning("No texts to segment")
                 return []
             
+            # 每段文本只分词一次，后续步骤复用
+            token_table = self.build_token_table(merged_texts)
+            
             # 2. 识别话题转换点
-            topic_shifts = self.detect_topic_shift(merged_texts)
+            topic_shifts = self.detect_topic_shift(merged_texts, token_table=token_table)
             logger.info(f"Detected {len(topic_shifts)} topic shifts")
             
             # 3. 结合OCR幻灯片切换点
@@ -123,10 +248,12 @@ class KnowledgePointSegmenter:
                 topic_shifts = self._merge_shifts(topic_shifts, slide_shifts)
             
             # 4. 根据时长要求调整切分点
-            adjusted_shifts = self._adjust_by_duration(merged_texts, topic_shifts)
+            adjusted_shifts = self._adjust_by_duration(merged_texts, topic_shifts, token_table)
             
             # 5. 生成知识点列表
-            knowledge_points = self._generate_knowledge_points(merged_texts, adjusted_shifts)
+            knowledge_points = self._generate_knowledge_points(
+                merged_texts, adjusted_shifts, token_table
+            )
             
             logger.info(f"Generated {len(knowledge_points)} knowledge points")
             return knowledge_points
@@ -139,6 +266,7 @@ class KnowledgePointSegmenter:
         """计算两个文本的语义相似度
         
         优先使用sentence-transformers（如果可用），否则使用关键词重叠。
+        启用相似度缓存时，相同文本对（与顺序无关）只计算一次。
         
         Args:
             text1: 第一个文本
@@ -147,6 +275,30 @@ class KnowledgePointSegmenter:
         Returns:
             相似度分数（0-1），1表示完全相同，0表示完全不同
         """
+        if self.similarity_cache is not None:
+            return self.similarity_cache.get_or_compute(
+                text1, text2, self._compute_similarity,
+                namespace=self._similarity_namespace()
+            )
+        
+        return self._compute_similarity(text1, text2)
+    
+    def _similarity_namespace(self) -> str:
+        """相似度缓存的命名空间"""
+        if self.similarity_calculator:
+            return self.similarity_calculator.cache_namespace
+        return "segmenter:keyword"
+    
+    def _compute_similarity(self, text1: str, text2: str) -> float:
+        """计算两个文本的语义相似度（不经过缓存）
+        
+        Args:
+            text1: 第一个文本
+            text2: 第二个文本
+        
+        Returns:
+            相似度分数（0-1）
+        """
         try:
             # 如果使用高级相似度计算器
             if self.similarity_calculator:
@@ -174,7 +326,8 @@ class KnowledgePointSegmenter:
     def detect_topic_shift(
         self,
         texts: List[Dict],
-        window_size: Optional[int] = None
+        window_size: Optional[int] = None,
+        token_table: Optional[List[TextTokens]] = None
     ) -> List[int]:
         """检测话题转换点
         
@@ -184,6 +337,7 @@ class KnowledgePointSegmenter:
         Args:
             texts: 文本列表，已按时间戳排序
             window_size: 滑动窗口大小，如果为None则使用self.window_size
+            token_table: build_token_table的结果，提供时关键词相似度直接复用分词结果
         
         Returns:
             话题转换点的索引列表
@@ -196,6 +350,9 @@ class KnowledgePointSegmenter:
         
         topic_shifts = []
         
+        # 批量模式下一次性计算全部相邻相似度
+        similarities = self._batch_adjacent_similarities(texts)
+        
         for i in range(len(texts) - 1):
             # 获取当前窗口的文本
             current_text = texts[i].get("text", "")
@@ -205,7 +362,14 @@ class KnowledgePointSegmenter:
                 continue
             
             # 计算相似度
-            similarity = self.calculate_similarity(current_text, next_text)
+            if similarities is not None:
+                similarity = float(similarities[i])
+            elif token_table is not None:
+                similarity = self._token_similarity(
+                    token_table[i], token_table[i + 1], current_text, next_text
+                )
+            else:
+                similarity = self.calculate_similarity(current_text, next_text)
             
             # 如果相似度低于阈值，认为是话题转换点
             if similarity < self.similarity_threshold:
@@ -214,6 +378,159 @@ class KnowledgePointSegmenter:
         
         return topic_shifts
     
+    def _batch_adjacent_similarities(self, texts: List[Dict]) -> Optional[np.ndarray]:
+        """批量计算相邻文本的相似度
+        
+        仅在启用批量模式且使用高级相似度计算器时生效：
+        整段课程的文本一次性编码为(N, d)矩阵，向量化得到全部相邻相似度，
+        避免每对文本各自调用模型、每段文本被编码两次。
+        启用相似度缓存时，所有相邻文本对均命中缓存则无需编码。
+        
+        Args:
+            texts: 文本列表，已按时间戳排序
+        
+        Returns:
+            长度为N-1的相似度数组；未启用批量模式或计算失败时返回None
+        """
+        if not self.batch_similarity or not self.similarity_calculator:
+            return None
+        
+        if not self.similarity_calculator.use_advanced:
+            return None
+        
+        try:
+            text_list = [t.get("text", "") for t in texts]
+            namespace = self.similarity_calculator.cache_namespace
+            
+            if self.similarity_cache is not None:
+                cached = [
+                    self.similarity_cache.get(text_list[i], text_list[i + 1], namespace)
+                    for i in range(len(text_list) - 1)
+                ]
+                if all(value is not None for value in cached):
+                    return np.array(cached, dtype=np.float32)
+            
+            similarities = self.similarity_calculator.calculate_adjacent(text_list)
+            
+            if self.similarity_cache is not None:
+                for i, value in enumerate(similarities):
+                    self.similarity_cache.put(text_list[i], text_list[i + 1], value, namespace)
+            
+            return similarities
+        except Exception as e:
+            logger.warning(f"Error in batch similarity calculation: {e}")
+            return None
+    
+    def build_token_table(self, texts: List[Dict]) -> List[TextTokens]:
+        """为每段文本构建分词结果表
+        
+        每段文本只调用一次jieba分词，得到候选词词频和前10个关键词。
+        
+        Args:
+            texts: 文本列表
+        
+        Returns:
+            与texts一一对应的TextTokens列表
+        """
+        table = []
+        
+        for item in texts:
+            term_freq = self._count_terms(item.get("text", ""))
+            keywords = self._rank_keywords(term_freq, top_k=10)
+            table.append(TextTokens(
+                term_freq=term_freq,
+                keywords=keywords,
+                keyword_set=frozenset(keywords)
+            ))
+        
+        return table
+    
+    def _count_terms(self, text: str) -> Dict[str, float]:
+        """统计候选词词频
+        
+        过滤规则与jieba.analyse.extract_tags一致（去除停用词和单字词）。
+        
+        Args:
+            text: 输入文本
+        
+        Returns:
+            词 -> 词频，保持首次出现顺序
+        """
+        freq: Dict[str, float] = {}
+        if not text:
+            return freq
+        
+        try:
+            stop_words = self._tfidf.stop_words
+            for word in self._tfidf.tokenizer.cut(text):
+                if len(word.strip()) < 2 or word.lower() in stop_words:
+                    continue
+                freq[word] = freq.get(word, 0.0) + 1.0
+        except Exception as e:
+            logger.warning(f"Error tokenizing text: {e}")
+        
+        return freq
+    
+    def _rank_keywords(self, term_freq: Dict[str, float], top_k: int = 10) -> List[str]:
+        """按TF-IDF权重对候选词排序
+        
+        与jieba.analyse.extract_tags的排序结果一致，但不需要重新分词。
+        
+        Args:
+            term_freq: 候选词词频
+            top_k: 返回前k个关键词
+        
+        Returns:
+            关键词列表
+        """
+        total = sum(term_freq.values())
+        if total <= 0:
+            return []
+        
+        idf_freq = self._tfidf.idf_freq
+        median_idf = self._tfidf.median_idf
+        weights = {
+            word: count * idf_freq.get(word, median_idf) / total
+            for word, count in term_freq.items()
+        }
+        
+        return sorted(weights, key=weights.__getitem__, reverse=True)[:top_k]
+    
+    def _token_similarity(
+        self,
+        tokens1: TextTokens,
+        tokens2: TextTokens,
+        text1: str,
+        text2: str
+    ) -> float:
+        """基于分词结果表计算关键词Jaccard相似度
+        
+        使用高级相似度计算器时仍走calculate_similarity。
+        
+        Args:
+            tokens1: 第一个文本的分词结果
+            tokens2: 第二个文本的分词结果
+            text1: 第一个文本
+            text2: 第二个文本
+        
+        Returns:
+            相似度分数（0-1）
+        """
+        if self.similarity_calculator and self.similarity_calculator.use_advanced:
+            return self.calculate_similarity(text1, text2)
+        
+        keywords1 = tokens1.keyword_set
+        keywords2 = tokens2.keyword_set
+        
+        if not keywords1 or not keywords2:
+            # 无法提取关键词时沿用原有计算方式（含回退逻辑）
+            return self.calculate_similarity(text1, text2)
+        
+        intersection = len(keywords1 & keywords2)
+        union = len(keywords1 | keywords2)
+        
+        return intersection / union if union > 0 else 0.0
+    
     def extract_keywords(self, text: str, top_k: int = 10) -> List[str]:
         """提取关键词
         
@@ -281,10 +598,11 @@ class KnowledgePointSegmenter:
         asr_texts: List[Dict],
         ocr_texts: Optional[List[Dict]],
         subtitles: Optional[List[Dict]]
-    ) -> List[Dict]:
+    ) -> List[TextRecord]:
         """合并并排序文本
         
-        将ASR、OCR和字幕文本合并，按时间戳排序。
+        将ASR、OCR和字幕文本合并，按时间戳排序（稳定排序，
+        开始时间相同时按ASR、OCR、字幕的顺序）。
         
         Args:
             asr_texts: ASR文本列表
@@ -294,42 +612,38 @@ class KnowledgePointSegmenter:
         Returns:
             合并并排序后的文本列表
         """
-        merged = []
-        
-        # 添加ASR文本
-        for item in asr_texts:
-            merged.append({
-                "start_time": item.get("start_time", 0.0),
-                "end_time": item.get("end_time", 0.0),
-                "text": item.get("text", ""),
-                "source": "asr"
-            })
-        
-        # 添加OCR文本
+        # 各来源已按时间排序时，拼接后的列表由k个有序段组成，
+        # Timsort识别这些有序段并逐段归并（O(n log k)），无需逐条比较
+        records = self._to_records(asr_texts, "asr")
         if ocr_texts:
-            for item in ocr_texts:
-                merged.append({
-                    "start_time": item.get("start_time", 0.0),
-                    "end_time": item.get("end_time", 0.0),
-                    "text": item.get("text", ""),
-                    "source": "ocr",
-                    "slide_number": item.get("slide_number")
-                })
-        
-        # 添加字幕文本
+            records += self._to_records(ocr_texts, "ocr")
         if subtitles:
-            for item in subtitles:
-                merged.append({
-                    "start_time": item.get("start_time", 0.0),
-                    "end_time": item.get("end_time", 0.0),
-                    "text": item.get("text", ""),
-                    "source": "subtitle"
-                })
+            records += self._to_records(subtitles, "subtitle")
         
-        # 按开始时间排序
-        merged.sort(key=lambda x: x["start_time"])
+        records.sort(key=attrgetter("start_time"))
+        return records
+    
+    def _to_records(self, items: Iterable[Dict], source: str) -> List[TextRecord]:
+        """将单个来源的文本转换为TextRecord列表
         
-        return merged
+        Args:
+            items: 文本列表
+            source: 来源（asr, ocr, subtitle）
+        
+        Returns:
+            记录列表（保持输入顺序）
+        """
+        with_slide = source == "ocr"
+        return [
+            TextRecord(
+                item.get("start_time", 0.0),
+                item.get("end_time", 0.0),
+                item.get("text", ""),
+                source,
+                item.get("slide_number") if with_slide else None
+            )
+            for item in items
+        ]
     
     def _detect_slide_shifts(self, ocr_texts: List[Dict]) -> List[int]:
         """检测OCR幻灯片切换点
@@ -368,71 +682,128 @@ class KnowledgePointSegmenter:
     def _adjust_by_duration(
         self,
         texts: List[Dict],
-        shifts: List[int]
+        shifts: List[int],
+        token_table: Optional[List[TextTokens]] = None
     ) -> List[int]:
         """根据时长要求调整切分点
         
-        确保每个知识点时长在min_duration和max_duration之间。
+        确保每个知识点时长在min_duration和max_duration之间（单段文本超长时除外）：
+        1. 从左到右贪心合并：知识点短于min_duration且并入下一段后不超过max_duration时，
+           跳过当前切分点；最后一个知识点过短时并入前一个
+        2. 递归拆分超长的知识点：在满足两侧都不短于min_duration的位置中，
+           选择相邻文本相似度最低的位置切分（没有满足条件的位置时在全部位置中选择）
+        
+        时长用开始时间数组和结束时间前缀最大值数组计算，候选位置用二分查找确定，
+        最低相似度位置用稀疏表O(1)查询，整体为O(n log n)，与切分点数量无关。
         
         Args:
-            texts: 文本列表
+            texts: 文本列表，已按开始时间排序
             shifts: 原始切分点列表
+            token_table: build_token_table的结果（可选），拆分超长知识点时用于计算相邻相似度
         
         Returns:
-            调整后的切分点列表
+            调整后的切分点列表（升序，以0开始、以len(texts)-1结束）；
+            第i个知识点包含texts[shifts[i]]到texts[shifts[i+1]]
         """
         if not texts:
             return []
         
-        adjusted_shifts = [0]  # 第一个知识点从0开始
-        
-        for shift in shifts:
-            if shift >= len(texts):
-                continue
-            
-            # 计算当前知识点时长
-            start_idx = adjusted_shifts[-1]
-            end_idx = shift
-            
-            start_time = texts[start_idx]["start_time"]
-            end_time = texts[end_idx]["end_time"]
-            duration = end_time - start_time
-            
-            # 如果时长超过最大值，需要提前切分
-            if duration > self.max_duration:
-                # 在中间位置添加切分点
-                mid_idx = (start_idx + end_idx) // 2
-                if mid_idx not in adjusted_shifts:
-                    adjusted_shifts.append(mid_idx)
-            
-            # 如果时长小于最小值，尝试合并到下一个
-            elif duration < self.min_duration and shift < len(texts) - 1:
-                # 检查是否可以合并
-                next_shift = shifts[shifts.index(shift) + 1] if shift in shifts else len(texts) - 1
-                next_duration = texts[next_shift]["end_time"] - texts[shift]["end_time"]
-                
-                if duration + next_duration <= self.max_duration:
-                    # 可以合并，跳过当前切分点
+        last = len(texts) - 1
+        starts = [t["start_time"] for t in texts]
+        ends = [t["end_time"] for t in texts]
+        
+        # 1. 贪心合并过短的知识点
+        candidates = sorted(set(shift for shift in shifts if 0 < shift < last))
+        boundaries = [0]
+        for i, shift in enumerate(candidates):
+            duration = ends[shift] - starts[boundaries[-1]]
+            if duration < self.min_duration:
+                next_shift = candidates[i + 1] if i + 1 < len(candidates) else last
+                if ends[next_shift] - starts[boundaries[-1]] <= self.max_duration:
                     continue
-            
-            adjusted_shifts.append(shift)
+            boundaries.append(shift)
+        
+        if len(boundaries) > 1 and ends[last] - starts[boundaries[-1]] < self.min_duration:
+            if ends[last] - starts[boundaries[-2]] <= self.max_duration:
+                boundaries.pop()
+        
+        if last > 0:
+            boundaries.append(last)
+        
+        # 2. 拆分超长的知识点
+        long_spans = [
+            (a, b) for a, b in zip(boundaries, boundaries[1:])
+            if ends[b] - starts[a] > self.max_duration and b - a > 1
+        ]
+        if not long_spans:
+            return boundaries
+        
+        end_max = list(ends)
+        for i in range(1, len(end_max)):
+            end_max[i] = max(end_max[i - 1], end_max[i])
+        lowest = _RangeMinimum(self._boundary_similarities(texts, token_table))
+        
+        split_points = set()
+        for a, b in long_spans:
+            stack = [(a, b)]
+            while stack:
+                a, b = stack.pop()
+                if ends[b] - starts[a] <= self.max_duration or b - a <= 1:
+                    continue
+                
+                # 两侧都不短于min_duration的切分位置范围[lo, hi]
+                lo = max(bisect.bisect_left(end_max, starts[a] + self.min_duration, a + 1, b), a + 1)
+                hi = min(bisect.bisect_right(starts, ends[b] - self.min_duration, a + 1, b) - 1, b - 1)
+                if lo > hi:
+                    lo, hi = a + 1, b - 1
+                
+                split = lowest.query(lo, hi)
+                split_points.add(split)
+                stack.append((split, b))
+                stack.append((a, split))
+        
+        return sorted(split_points.union(boundaries))
+    
+    def _boundary_similarities(
+        self,
+        texts: List[Dict],
+        token_table: Optional[List[TextTokens]] = None
+    ) -> List[float]:
+        """计算每个位置与前一段文本的相似度
         
-        # 确保最后一个切分点
-        if adjusted_shifts[-1] != len(texts) - 1:
-            adjusted_shifts.append(len(texts) - 1)
+        Args:
+            texts: 文本列表
+            token_table: build_token_table的结果（可选）
         
-        return sorted(list(set(adjusted_shifts)))
+        Returns:
+            长度为len(texts)的列表，第i项为texts[i-1]与texts[i]的相似度；
+            第0项及任一文本为空时为1.0（不作为切分的优先位置）
+        """
+        if token_table is None:
+            token_table = self.build_token_table(texts)
+        
+        similarities = [1.0] * len(texts)
+        for i in range(1, len(texts)):
+            previous_text = texts[i - 1].get("text", "")
+            text = texts[i].get("text", "")
+            if previous_text and text:
+                similarities[i] = self._token_similarity(
+                    token_table[i - 1], token_table[i], previous_text, text
+                )
+        return similarities
     
     def _generate_knowledge_points(
         self,
         texts: List[Dict],
-        shifts: List[int]
+        shifts: List[int],
+        token_table: Optional[List[TextTokens]] = None
     ) -> List[KnowledgePoint]:
         """生成知识点列表
         
         Args:
             texts: 文本列表
             shifts: 切分点列表
+            token_table: build_token_table的结果，提供时合并各段词频得到关键词，无需重新分词
         
         Returns:
             知识点列表
@@ -443,46 +814,86 @@ class KnowledgePointSegmenter:
             start_idx = shifts[i]
             end_idx = shifts[i + 1]
             
-            # 获取该知识点的所有文本
-            segment_texts = texts[start_idx:end_idx + 1]
-            combined_text = " ".join([t.get("text", "") for t in segment_texts])
-            
-            if not combined_text.strip():
-                continue
-            
-            # 计算起止时间
-            start_time = segment_texts[0]["start_time"]
-            end_time = segment_texts[-1]["end_time"]
-            
-            # 提取关键词
-            keywords = self.extract_keywords(combined_text, top_k=10)
-            
-            # 生成摘要
-            summary = self.generate_summary(combined_text, max_length=200)
-            
-            # 生成名称（使用第一个关键词或摘要的前几个字）
-            if keywords:
-                name = keywords[0]
-            else:
-                name = summary[:15] if summary else f"知识点{i+1}"
-            
-            # 估算难度（简单规则：根据文本长度和关键词数量）
-            difficulty = self._estimate_difficulty(combined_text, keywords)
-            
-            # 创建知识点对象
-            kp = KnowledgePoint(
-                name=name,
-                start_time=start_time,
-                end_time=end_time,
-                keywords=keywords,
-                summary=summary,
-                difficulty=difficulty
+            kp = self._build_knowledge_point(
+                texts[start_idx:end_idx + 1],
+                token_table[start_idx:end_idx + 1] if token_table is not None else None,
+                i
             )
-            
-            knowledge_points.append(kp)
+            if kp is not None:
+                knowledge_points.append(kp)
         
         return knowledge_points
     
+    def _build_knowledge_point(
+        self,
+        segment_texts: List[Dict],
+        tokens_list: Optional[List[TextTokens]] = None,
+        index: int = 0
+    ) -> Optional[KnowledgePoint]:
+        """由一段连续文本生成知识点
+        
+        Args:
+            segment_texts: 该知识点的所有文本
+            tokens_list: 与segment_texts对应的分词结果，提供时合并词频得到关键词，无需重新分词
+            index: 知识点序号（从0开始，用于默认名称）
+        
+        Returns:
+            知识点对象，文本全部为空时返回None
+        """
+        combined_text = " ".join([t.get("text", "") for t in segment_texts])
+        
+        if not combined_text.strip():
+            return None
+        
+        # 计算起止时间
+        start_time = segment_texts[0]["start_time"]
+        end_time = segment_texts[-1]["end_time"]
+        
+        # 提取关键词
+        if tokens_list is not None:
+            keywords = self._rank_keywords(self._merge_term_freq(tokens_list), top_k=10)
+        else:
+            keywords = self.extract_keywords(combined_text, top_k=10)
+        
+        # 生成摘要
+        summary = self.generate_summary(combined_text, max_length=200)
+        
+        # 生成名称（使用第一个关键词或摘要的前几个字）
+        if keywords:
+            name = keywords[0]
+        else:
+            name = summary[:15] if summary else f"知识点{index+1}"
+        
+        # 估算难度（简单规则：根据文本长度和关键词数量）
+        difficulty = self._estimate_difficulty(combined_text, keywords)
+        
+        # 创建知识点对象
+        return KnowledgePoint(
+            name=name,
+            start_time=start_time,
+            end_time=end_time,
+            keywords=keywords,
+            summary=summary,
+            difficulty=difficulty
+        )
+    
+    def _merge_term_freq(self, tokens_list: List[TextTokens]) -> Dict[str, float]:
+        """合并多段文本的词频
+        
+        按文本顺序累加，结果等价于对拼接后的文本重新分词统计。
+        
+        Args:
+            tokens_list: 分词结果列表
+        
+        Returns:
+            合并后的词频
+        """
+        merged: Dict[str, float] = {}
+        for tokens in tokens_list:
+            for word, count in tokens.term_freq.items():
+                merged[word] = merged.get(word, 0.0) + count
+        return merged
+    
     def _estimate_difficulty(self, text: str, keywords: List[str]) -> str:
         """估算知识点难度
         
@@ -4,10 +4,15 @@
 为每个学生生成定制化的学习顺序，考虑知识点依赖关系、掌握状态、疑难点等。
 """
 
+import hashlib
+import heapq
 import logging
-from typing import List, Dict, Optional, Set, Tuple
+import threading
+from collections import OrderedDict, deque
+from typing import List, Dict, Optional, Set, Tuple, Union
 from dataclasses import dataclass
 import networkx as nx
+import numpy as np
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -31,6 +36,349 @@ class NextSuggestion:
     estimated_time: float  # 预计学习时间（分钟）
 
 
+class CompiledCourseDAG:
+    """编译后的课程依赖图
+    
+    每个课程版本只构建一次，供所有学生的路径生成复用：
+    - 知识点ID映射为连续的整数下标
+    - 前置依赖边以CSR（indptr/indices）邻接数组存储
+    - 预先计算整张图的拓扑序和每个节点的拓扑排名
+    
+    全图拓扑序限制到任意节点子集上仍是该子集诱导子图的合法拓扑序，
+    因此单个学生的基础路径只需按掌握状态屏蔽已掌握节点，无需再构图排序。
+    """
+    
+    def __init__(
+        self,
+        dependencies: List[Tuple[int, int, str]],
+        version: Optional[str] = None
+    ):
+        """编译课程依赖图
+        
+        Args:
+            dependencies: 依赖关系列表 [(source_id, target_id, relation_type), ...]，
+                所有关系的端点都作为节点，只有prerequisite关系作为排序约束
+            version: 课程版本标识（可选），默认取依赖关系的内容哈希
+        """
+        self.dependencies = list(dependencies)
+        self.version = version or self.content_hash(self.dependencies)
+        
+        # 节点按首次出现的顺序编号
+        self.index: Dict[int, int] = {}
+        for source_id, target_id, _ in self.dependencies:
+            self.index.setdefault(source_id, len(self.index))
+            self.index.setdefault(target_id, len(self.index))
+        self.node_ids = np.array(list(self.index), dtype=np.int64)
+        
+        # 前置依赖边（去重，与DiGraph一致）
+        edges = sorted({
+            (self.index[source_id], self.index[target_id])
+            for source_id, target_id, relation_type in self.dependencies
+            if relation_type == "prerequisite"
+        })
+        
+        node_count = len(self.index)
+        self.indptr = np.zeros(node_count + 1, dtype=np.int64)
+        self.indices = np.array([target for _, target in edges], dtype=np.int64)
+        for source, _ in edges:
+            self.indptr[source + 1] += 1
+        np.cumsum(self.indptr, out=self.indptr)
+        self.in_degree = np.bincount(self.indices, minlength=node_count).astype(np.int64)
+        
+        # 拓扑序与拓扑排名
+        self.order, self.has_cycle = self._kahn_order()
+        self.rank = np.empty(node_count, dtype=np.int64)
+        self.rank[self.order] = np.arange(node_count, dtype=np.int64)
+        self.ordered_ids = self.node_ids[self.order]
+        
+        # 逐节点访问后继时使用的Python列表（避免每次切片NumPy数组）
+        node_id_list = self.node_ids.tolist()
+        indptr, indices = self.indptr.tolist(), self.indices.tolist()
+        self._successor_ids: List[List[int]] = [
+            [node_id_list[j] for j in indices[indptr[i]:indptr[i + 1]]]
+            for i in range(node_count)
+        ]
+        
+        if self.has_cycle:
+            logger.warning(f"Course DAG {self.version} contains prerequisite cycles")
+        
+        logger.info(
+            f"Compiled course DAG {self.version}: "
+            f"{node_count} nodes, {len(edges)} prerequisite edges"
+        )
+    
+    @staticmethod
+    def content_hash(dependencies: List[Tuple[int, int, str]]) -> str:
+        """依赖关系的内容哈希（与列表顺序无关）
+        
+        Args:
+            dependencies: 依赖关系列表
+        
+        Returns:
+            十六进制哈希字符串
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        for dependency in sorted(set(map(tuple, dependencies)), key=repr):
+            digest.update(repr(dependency).encode("utf-8"))
+        return digest.hexdigest()
+    
+    def __len__(self) -> int:
+        return len(self.node_ids)
+    
+    def __contains__(self, kp_id: int) -> bool:
+        return kp_id in self.index
+    
+    def successors(self, kp_id: int) -> List[int]:
+        """获取知识点的后续知识点（以其为前置的知识点）
+        
+        Args:
+            kp_id: 知识点ID
+        
+        Returns:
+            后续知识点ID列表
+        """
+        i = self.index.get(kp_id)
+        if i is None:
+            return []
+        return self._successor_ids[i]
+    
+    def mastered_mask(self, mastery_status: Dict[int, str]) -> np.ndarray:
+        """按掌握状态生成已掌握节点的掩码
+        
+        Args:
+            mastery_status: 掌握状态字典
+        
+        Returns:
+            布尔数组，下标为节点编号
+        """
+        mask = np.zeros(len(self.node_ids), dtype=bool)
+        for kp_id, status in mastery_status.items():
+            if status == "已掌握":
+                i = self.index.get(kp_id)
+                if i is not None:
+                    mask[i] = True
+        return mask
+    
+    def unmastered_order(self, mastery_status: Dict[int, str]) -> List[int]:
+        """按拓扑序列出未掌握的知识点
+        
+        图中的节点按预计算的拓扑序排列，只出现在掌握状态中的知识点
+        （没有任何依赖关系）按掌握状态的顺序追加在末尾。
+        
+        Args:
+            mastery_status: 掌握状态字典
+        
+        Returns:
+            未掌握的知识点ID列表
+        """
+        mask = self.mastered_mask(mastery_status)
+        path = self.ordered_ids[~mask[self.order]].tolist()
+        path.extend(
+            kp_id for kp_id, status in mastery_status.items()
+            if kp_id not in self.index and status != "已掌握"
+        )
+        return path
+    
+    def _kahn_order(self) -> Tuple[np.ndarray, bool]:
+        """Kahn算法计算拓扑序
+        
+        入度为0的节点按编号（即首次出现顺序）入队。存在环时，
+        环上及其下游的节点按编号追加在末尾。
+        
+        Returns:
+            (节点编号的拓扑序, 是否存在环)
+        """
+        indptr = self.indptr.tolist()
+        indices = self.indices.tolist()
+        in_degree = self.in_degree.tolist()
+        
+        queue = deque(i for i, degree in enumerate(in_degree) if degree == 0)
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for j in indices[indptr[i]:indptr[i + 1]]:
+                in_degree[j] -= 1
+                if in_degree[j] == 0:
+                    queue.append(j)
+        
+        has_cycle = len(order) < len(in_degree)
+        if has_cycle:
+            placed = set(order)
+            order.extend(i for i in range(len(in_degree)) if i not in placed)
+        
+        return np.array(order, dtype=np.int64), has_cycle
+
+
+class PathCache:
+    """学习路径缓存
+    
+    同一批学生（尤其是课程初期）往往有完全相同的掌握状态和疑难点。
+    缓存键是 (课程依赖图版本, 掌握状态位图, 疑难点集合, 难度信息) 的规范化哈希，
+    相同画像的学生直接复用已生成的路径。按LRU淘汰，课程依赖图变更时按版本失效。
+    """
+    
+    # 掌握状态编码：路径生成只区分这几种状态，其余（含"未学"和缺失）视为相同
+    STATUS_CODES = {"已掌握": 1, "疑难": 2, "学习中": 3}
+    
+    # 缓存键的摘要长度（字节）
+    DIGEST_SIZE = 16
+    
+    def __init__(self, max_entries: int = 4096):
+        """初始化路径缓存
+        
+        Args:
+            max_entries: 最大缓存条目数，超出后按LRU淘汰
+        """
+        self.max_entries = max_entries
+        
+        self._entries: "OrderedDict[bytes, Tuple[str, List[Dict]]]" = OrderedDict()
+        self._keys_by_version: Dict[str, Set[bytes]] = {}
+        self._lock = threading.Lock()
+        
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def make_key(
+        self,
+        course_dag: CompiledCourseDAG,
+        mastery_status: Dict[int, str],
+        difficult_points: Optional[List[int]],
+        difficulty_info: Optional[Dict[int, str]]
+    ) -> bytes:
+        """生成学生画像的缓存键
+        
+        Args:
+            course_dag: 编译后的课程依赖图
+            mastery_status: 掌握状态字典
+            difficult_points: 疑难点列表
+            difficulty_info: 难度信息字典
+        
+        Returns:
+            缓存键
+        """
+        # 依赖图中的节点编码为位图，不在图中的知识点按出现顺序记录（影响路径末尾的顺序）
+        codes = bytearray(len(course_dag))
+        extras = []
+        for kp_id, status in mastery_status.items():
+            code = self.STATUS_CODES.get(status, 0)
+            i = course_dag.index.get(kp_id)
+            if i is None:
+                extras.append((kp_id, code))
+            else:
+                codes[i] = code
+        
+        # 只有状态为疑难的疑难点会插入补偿资源
+        difficult = sorted(
+            kp_id for kp_id in set(difficult_points or ())
+            if mastery_status.get(kp_id) == "疑难"
+        )
+        
+        digest = hashlib.blake2b(digest_size=self.DIGEST_SIZE)
+        digest.update(course_dag.version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(codes)
+        digest.update(repr(extras).encode("utf-8"))
+        digest.update(repr(difficult).encode("utf-8"))
+        digest.update(repr(sorted(difficulty_info.items())).encode("utf-8") if difficulty_info else b"")
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Optional[List[Dict]]:
+        """查询缓存
+        
+        Args:
+            key: 缓存键
+        
+        Returns:
+            路径副本（节点字典可被调用方修改），未命中时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(node) for node in entry[1]]
+    
+    def put(self, key: bytes, version: str, path: List[Dict]):
+        """写入缓存
+        
+        Args:
+            key: 缓存键
+            version: 课程依赖图版本
+            path: 学习路径（保存副本）
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            
+            self._entries[key] = (version, [dict(node) for node in path])
+            self._keys_by_version.setdefault(version, set()).add(key)
+            
+            while len(self._entries) > self.max_entries:
+                old_key, (old_version, _) = self._entries.popitem(last=False)
+                self._discard_version_key(old_version, old_key)
+                self.evictions += 1
+    
+    def invalidate(self, version: str) -> int:
+        """使某个课程依赖图版本的缓存失效
+        
+        Args:
+            version: 课程依赖图版本
+        
+        Returns:
+            删除的条目数
+        """
+        with self._lock:
+            keys = self._keys_by_version.pop(version, set())
+            for key in keys:
+                self._entries.pop(key, None)
+        
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached paths for course DAG {version}")
+        return len(keys)
+    
+    def clear(self):
+        """清空缓存（统计计数保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_version.clear()
+    
+    def get_stats(self) -> Dict[str, float]:
+        """获取缓存统计
+        
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "versions": len(self._keys_by_version),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total > 0 else 0.0
+            }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _discard_version_key(self, version: str, key: bytes):
+        """从版本索引中移除缓存键"""
+        keys = self._keys_by_version.get(version)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_version[version]
+
+
 class LearningPathGenerator:
     """学习路径生成器
     
@@ -43,12 +391,14 @@ class LearningPathGenerator:
     
     def __init__(
         self,
-        difficulty_weights: Optional[Dict[str, int]] = None
+        difficulty_weights: Optional[Dict[str, int]] = None,
+        path_cache_size: int = 4096
     ):
         """初始化学习路径生成器
         
         Args:
             difficulty_weights: 难度权重，用于排序（easy=1, medium=2, hard=3）
+            path_cache_size: 路径缓存的最大条目数，0表示不使用缓存
         """
         self.difficulty_weights = difficulty_weights or {
             "easy": 1,
@@ -56,30 +406,39 @@ class LearningPathGenerator:
             "hard": 3
         }
         
+        # 相同画像学生的路径缓存
+        self.path_cache = PathCache(max_entries=path_cache_size) if path_cache_size > 0 else None
+        
+        # 课程版本 -> 最近使用的已编译依赖图（用于发现同一版本号下的依赖变更）
+        self._courses: Dict[str, CompiledCourseDAG] = {}
+        
         logger.info("LearningPathGenerator initialized")
     
     def generate_path(
         self,
         user_id: int,
         mastery_status: Dict[int, str],
-        dependencies: List[Tuple[int, int, str]],
+        dependencies: Union[List[Tuple[int, int, str]], CompiledCourseDAG],
         difficult_points: Optional[List[int]] = None,
         difficulty_info: Optional[Dict[int, str]] = None
     ) -> List[Dict]:
         """生成个性化学习路径
         
         算法步骤：
-        1. 构建知识图谱（有向无环图DAG）
-        2. 使用拓扑排序生成基础路径
-        3. 根据掌握状态过滤已掌握的知识点
-        4. 对疑难点进行特殊处理（插入补偿资源学习节点）
-        5. 优化路径顺序（考虑难度梯度）
+        1. 编译课程依赖图（传入已编译的依赖图时跳过）
+        2. 按预计算的拓扑序屏蔽已掌握的知识点，生成基础路径
+        3. 对疑难点进行特殊处理（插入补偿资源学习节点）
+        4. 优化路径顺序（考虑难度梯度）
+        
+        为大量学生生成路径时，应先调用compile_course编译一次，
+        再把编译结果作为dependencies传入。
         
         Args:
             user_id: 用户ID
             mastery_status: 掌握状态字典 {knowledge_point_id: status}
                 status: "未学" | "学习中" | "疑难" | "已掌握"
-            dependencies: 依赖关系列表 [(source_id, target_id, relation_type), ...]
+            dependencies: 依赖关系列表 [(source_id, target_id, relation_type), ...]，
+                或compile_course返回的已编译课程依赖图
                 relation_type: "prerequisite" | "related" | "contains"
             difficult_points: 疑难点列表（可选）
             difficulty_info: 难度信息字典 {knowledge_point_id: difficulty}（可选）
@@ -95,49 +454,143 @@ class LearningPathGenerator:
         try:
             logger.info(f"Generating learning path for user {user_id}")
             
-            # 1. 构建知识图谱
-            graph = self._build_dependency_graph(dependencies)
+            # 1. 编译课程依赖图
+            if isinstance(dependencies, CompiledCourseDAG):
+                course_dag = dependencies
+            else:
+                course_dag = self.compile_course(dependencies)
             
-            # 2. 获取所有知识点ID
-            all_kp_ids = set(mastery_status.keys())
-            if dependencies:
-                all_kp_ids.update([dep[0] for dep in dependencies])
-                all_kp_ids.update([dep[1] for dep in dependencies])
+            # 相同画像的学生直接复用缓存的路径
+            cache_key = None
+            if self.path_cache is not None:
+                self._register_course(course_dag)
+                cache_key = self.path_cache.make_key(
+                    course_dag, mastery_status, difficult_points, difficulty_info
+                )
+                cached_path = self.path_cache.get(cache_key)
+                if cached_path is not None:
+                    logger.info(f"Path served from cache: {len(cached_path)} nodes")
+                    return cached_path
             
-            # 3. 过滤已掌握的知识点
-            unmastered_kp_ids = self.filter_mastered(list(all_kp_ids), mastery_status)
+            # 2. 屏蔽已掌握的知识点，生成基础路径
+            if course_dag.has_cycle:
+                # 全图有环时，按该学生的未掌握子图排序（屏蔽已掌握节点后可能无环）
+                base_path = self._sort_with_cycles(course_dag, mastery_status)
+            else:
+                base_path = course_dag.unmastered_order(mastery_status)
             
-            if not unmastered_kp_ids:
+            if not base_path:
                 logger.info("All knowledge points are mastered")
+                if cache_key is not None:
+                    self.path_cache.put(cache_key, course_dag.version, [])
                 return []
             
-            # 4. 拓扑排序生成基础路径
-            base_path = self.topological_sort(graph, mastery_status, unmastered_kp_ids)
+            # 3. 对疑难点进行特殊处理
+            path_with_remedial = self.insert_remedial_resources(
+                base_path, difficult_points or [], mastery_status
+            )
             
-            # 5. 对疑难点进行特殊处理
-            if difficult_points:
-                path_with_remedial = self.insert_remedial_resources(
-                    base_path, difficult_points, mastery_status
-                )
-            else:
-                path_with_remedial = base_path
-            
-            # 6. 优化路径顺序（考虑难度梯度）
+            # 4. 优化路径顺序（考虑难度梯度）
             if difficulty_info:
-                optimized_path = self.optimize_path_order(path_with_remedial, difficulty_info)
+                optimized_path = self.optimize_path_order(path_with_remedial, difficulty_info, course_dag)
             else:
                 optimized_path = path_with_remedial
             
-            # 7. 添加推荐原因
+            # 5. 添加推荐原因
             final_path = self._add_recommendation_reasons(optimized_path, mastery_status, difficulty_info)
             
+            if cache_key is not None:
+                self.path_cache.put(cache_key, course_dag.version, final_path)
+            
             logger.info(f"Path generated: {len(final_path)} nodes")
             return final_path
-            
+        
         except Exception as e:
             logger.error(f"Error generating path: {e}", exc_info=True)
             raise
     
+    def compile_course(
+        self,
+        dependencies: List[Tuple[int, int, str]],
+        version: Optional[str] = None
+    ) -> CompiledCourseDAG:
+        """编译课程依赖图
+        
+        课程发布（或依赖关系变更）时调用一次，结果可用于该课程所有学生的路径生成。
+        
+        Args:
+            dependencies: 依赖关系列表
+            version: 课程版本标识（可选）
+        
+        Returns:
+            编译后的课程依赖图
+        """
+        course_dag = CompiledCourseDAG(dependencies, version=version)
+        if self.path_cache is not None:
+            self._register_course(course_dag)
+        return course_dag
+    
+    def invalidate_course(self, version: str) -> int:
+        """使某个课程版本缓存的学习路径失效
+        
+        Args:
+            version: 课程版本标识
+        
+        Returns:
+            删除的缓存条目数
+        """
+        self._courses.pop(version, None)
+        if self.path_cache is None:
+            return 0
+        return self.path_cache.invalidate(version)
+    
+    def _register_course(self, course_dag: CompiledCourseDAG):
+        """登记课程依赖图，同一版本号的依赖关系变化时使旧路径缓存失效"""
+        known = self._courses.get(course_dag.version)
+        if known is course_dag:
+            return
+        
+        # 依赖关系的顺序决定了同层节点的先后，因此按列表逐项比较
+        if known is not None and known.dependencies != course_dag.dependencies:
+            logger.info(f"Course DAG {course_dag.version} changed, invalidating cached paths")
+            self.path_cache.invalidate(course_dag.version)
+        self._courses[course_dag.version] = course_dag
+    
+    def generate_paths(
+        self,
+        mastery_by_user: Dict[int, Dict[int, str]],
+        dependencies: Union[List[Tuple[int, int, str]], CompiledCourseDAG],
+        difficult_points_by_user: Optional[Dict[int, List[int]]] = None,
+        difficulty_info: Optional[Dict[int, str]] = None
+    ) -> Dict[int, List[Dict]]:
+        """为一批学生生成学习路径（课程依赖图只编译一次）
+        
+        Args:
+            mastery_by_user: 用户ID -> 掌握状态字典
+            dependencies: 依赖关系列表，或已编译的课程依赖图
+            difficult_points_by_user: 用户ID -> 疑难点列表（可选）
+            difficulty_info: 难度信息字典（可选，所有学生共用）
+        
+        Returns:
+            用户ID -> 学习路径
+        """
+        if isinstance(dependencies, CompiledCourseDAG):
+            course_dag = dependencies
+        else:
+            course_dag = self.compile_course(dependencies)
+        difficult_points_by_user = difficult_points_by_user or {}
+        
+        return {
+            user_id: self.generate_path(
+                user_id,
+                mastery_status,
+                course_dag,
+                difficult_points_by_user.get(user_id),
+                difficulty_info
+            )
+            for user_id, mastery_status in mastery_by_user.items()
+        }
+    
     def topological_sort(
         self,
         graph: nx.DiGraph,
@@ -176,12 +629,14 @@ class LearningPathGenerator:
                 sorted_nodes = self._alternative_sort(subgraph, unmastered_kp_ids)
             
             # 确保所有未掌握的知识点都在路径中
+            placed = set(sorted_nodes)
             for kp_id in unmastered_kp_ids:
-                if kp_id not in sorted_nodes:
+                if kp_id not in placed:
                     sorted_nodes.append(kp_id)
+                    placed.add(kp_id)
             
             return sorted_nodes
-            
+        
         except Exception as e:
             logger.warning(f"Error in topological sort: {e}")
             # 如果排序失败，返回原始顺序
@@ -229,10 +684,11 @@ class LearningPathGenerator:
         """
         result = []
         order = 1
+        difficult_set = set(difficult_points)
         
         for kp_id in path:
             # 如果是疑难点，先插入补偿资源节点
-            if kp_id in difficult_points and mastery_status.get(kp_id) == "疑难":
+            if kp_id in difficult_set and mastery_status.get(kp_id) == "疑难":
                 result.append({
                     "knowledge_point_id": kp_id,
                     "order": order,
@@ -255,55 +711,79 @@ class LearningPathGenerator:
     def optimize_path_order(
         self,
         path: List[Dict],
-        difficulty_info: Dict[int, str]
+        difficulty_info: Dict[int, str],
+        course_dag: Optional[CompiledCourseDAG] = None
     ) -> List[Dict]:
         """优化路径顺序（考虑难度梯度）
         
-        在满足依赖关系的前提下，尽量先易后难。
+        在满足依赖关系的前提下，尽量先易后难：以难度权重为优先级的
+        Kahn算法（优先队列），在所有前置已安排的知识点中先安排最容易的，
+        难度相同时保持原路径中的先后顺序，复杂度O((V+E) log V)。
+        补偿资源节点紧跟在对应知识点之前。
         
         Args:
-            path: 当前路径
+            path: 当前路径（按依赖关系排好的顺序）
             difficulty_info: 难度信息字典
+            course_dag: 编译后的课程依赖图（可选）。未提供时没有依赖信息，
+                只按难度对知识点节点排序
         
         Returns:
             优化后的路径
         """
-        # 将路径按节点类型分组
-        knowledge_point_nodes = [node for node in path if node.get("node_type") == "knowledge_point"]
-        other_nodes = [node for node in path if node.get("node_type") != "knowledge_point"]
+        if course_dag is None:
+            return self._order_by_difficulty(path, difficulty_info)
         
-        # 对知识点节点按难度排序
-        def get_difficulty_weight(node):
+        # 按知识点分组：补偿资源等附属节点在前，知识点节点在后
+        groups: Dict[int, Tuple[List[Dict], List[Dict]]] = {}
+        first_position: Dict[int, int] = {}
+        for position, node in enumerate(path):
             kp_id = node["knowledge_point_id"]
+            if kp_id not in groups:
+                groups[kp_id] = ([], [])
+                first_position[kp_id] = position
+            attached, kp_nodes = groups[kp_id]
+            if node.get("node_type") == "knowledge_point":
+                kp_nodes.append(node)
+            else:
+                attached.append(node)
+        
+        # 路径内知识点之间的前置依赖（诱导子图）
+        in_degree = dict.fromkeys(groups, 0)
+        successors: Dict[int, List[int]] = {}
+        for kp_id in groups:
+            for next_id in course_dag.successors(kp_id):
+                if next_id in in_degree and next_id != kp_id:
+                    in_degree[next_id] += 1
+                    successors.setdefault(kp_id, []).append(next_id)
+        
+        def priority(kp_id: int) -> Tuple[int, int, int]:
             difficulty = difficulty_info.get(kp_id, "medium")
-            return self.difficulty_weights.get(difficulty, 2)
+            return (self.difficulty_weights.get(difficulty, 2), first_position[kp_id], kp_id)
         
-        # 保持原有顺序，但在同级别内按难度排序
-        # 这里简化处理：只对相邻的相同难度节点进行微调
-        sorted_kp_nodes = sorted(knowledge_point_nodes, key=get_difficulty_weight)
+        heap = [priority(kp_id) for kp_id, degree in in_degree.items() if degree == 0]
+        heapq.heapify(heap)
         
-        # 重新组合路径（保持补偿资源节点在对应知识点之前）
         result = []
-        used_kp_ids = set()
-        
-        # 先添加补偿资源节点和对应的知识点
-        for node in path:
-            if node.get("node_type") == "remedial_resource":
-                result.append(node)
-                # 找到对应的知识点节点
-                kp_id = node["knowledge_point_id"]
-                kp_node = next(
-                    (n for n in knowledge_point_nodes if n["knowledge_point_id"] == kp_id),
-                    None
-                )
-                if kp_node:
-                    result.append(kp_node)
-                    used_kp_ids.add(kp_id)
+        scheduled = set()
+        while heap:
+            kp_id = heapq.heappop(heap)[2]
+            scheduled.add(kp_id)
+            attached, kp_nodes = groups[kp_id]
+            result.extend(attached)
+            result.extend(kp_nodes)
+            
+            for next_id in successors.get(kp_id, ()):
+                in_degree[next_id] -= 1
+                if in_degree[next_id] == 0:
+                    heapq.heappush(heap, priority(next_id))
         
-        # 添加剩余的知识点节点
-        for node in sorted_kp_nodes:
-            if node["knowledge_point_id"] not in used_kp_ids:
-                result.append(node)
+        # 存在环时，环上的知识点按原路径顺序追加
+        if len(scheduled) < len(groups):
+            for kp_id in groups:
+                if kp_id not in scheduled:
+                    attached, kp_nodes = groups[kp_id]
+                    result.extend(attached)
+                    result.extend(kp_nodes)
         
         # 重新编号
         for i, node in enumerate(result, 1):
@@ -341,6 +821,55 @@ class LearningPathGenerator:
             estimated_time=estimated_time
         )
     
+    def _order_by_difficulty(
+        self,
+        path: List[Dict],
+        difficulty_info: Dict[int, str]
+    ) -> List[Dict]:
+        """没有依赖信息时按难度排序
+        
+        补偿资源节点及其知识点保持原顺序排在前面，其余知识点按难度排序。
+        
+        Args:
+            path: 当前路径
+            difficulty_info: 难度信息字典
+        
+        Returns:
+            排序后的路径
+        """
+        # 知识点ID -> 第一个知识点节点
+        kp_nodes_by_id: Dict[int, Dict] = {}
+        for node in path:
+            if node.get("node_type") == "knowledge_point":
+                kp_nodes_by_id.setdefault(node["knowledge_point_id"], node)
+        
+        def get_difficulty_weight(node):
+            difficulty = difficulty_info.get(node["knowledge_point_id"], "medium")
+            return self.difficulty_weights.get(difficulty, 2)
+        
+        # 先添加补偿资源节点和对应的知识点
+        result = []
+        used_kp_ids = set()
+        for node in path:
+            if node.get("node_type") == "remedial_resource":
+                result.append(node)
+                kp_node = kp_nodes_by_id.get(node["knowledge_point_id"])
+                if kp_node:
+                    result.append(kp_node)
+                    used_kp_ids.add(node["knowledge_point_id"])
+        
+        # 添加剩余的知识点节点
+        kp_nodes = [node for node in path if node.get("node_type") == "knowledge_point"]
+        for node in sorted(kp_nodes, key=get_difficulty_weight):
+            if node["knowledge_point_id"] not in used_kp_ids:
+                result.append(node)
+        
+        # 重新编号
+        for i, node in enumerate(result, 1):
+            node["order"] = i
+        
+        return result
+    
     def _build_dependency_graph(
         self,
         dependencies: List[Tuple[int, int, str]]
@@ -360,6 +889,30 @@ class LearningPathGenerator:
         
         return graph
     
+    def _sort_with_cycles(
+        self,
+        course_dag: CompiledCourseDAG,
+        mastery_status: Dict[int, str]
+    ) -> List[int]:
+        """依赖图有环时生成基础路径
+        
+        Args:
+            course_dag: 编译后的课程依赖图
+            mastery_status: 掌握状态
+        
+        Returns:
+            排序后的未掌握知识点ID列表
+        """
+        graph = self._build_dependency_graph(course_dag.dependencies)
+        all_kp_ids = set(mastery_status.keys())
+        all_kp_ids.update(course_dag.index)
+        
+        unmastered_kp_ids = self.filter_mastered(list(all_kp_ids), mastery_status)
+        if not unmastered_kp_ids:
+            return []
+        
+        return self.topological_sort(graph, mastery_status, unmastered_kp_ids)
+    
     def _alternative_sort(
         self,
         graph: nx.DiGraph,
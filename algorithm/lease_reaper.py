@@ -0,0 +1,308 @@
+"""
+后台租约回收器
+
+写锁租约（WriteLockLeaseManager）和AI生成锁（AIGenerationLockManager）都有需要按时处理的事件：
+租约到期回滚、已解锁记录的清理。原先这些只在有人调用check_lock_timeout或再次访问同一资源时才处理。
+
+本模块提供一个由后台守护线程驱动的分层时间轮，两个管理器共用：
+1. 第0层每格tick秒，共slots格；第L层每格tick*slots^L秒，到达时下放到更低层
+2. 注册和取消定时为O(1)，每个tick只处理到期的格子，与定时总数无关
+3. 到期回调在回收线程中执行，回滚等耗时操作不占用请求线程
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TimerHandle:
+    """定时句柄（用于取消）"""
+    
+    __slots__ = ("due_tick", "callback", "cancelled")
+    
+    def __init__(self, due_tick: int, callback: Callable[[], Any]):
+        self.due_tick = due_tick
+        self.callback = callback
+        self.cancelled = False
+
+
+class HierarchicalTimingWheel:
+    """分层时间轮
+    
+    不是线程安全的，由LeaseReaper加锁使用。时间以秒为单位，按tick取整。
+    """
+    
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, now: Optional[float] = None):
+        """初始化时间轮
+        
+        Args:
+            tick: 第0层每格的时长（秒）
+            slots: 每层格数
+            levels: 层数，最高层一圈为tick*slots^levels秒，更远的定时在最高层循环下放
+            now: 当前时间（秒），默认time.time()
+        
+        Raises:
+            ValueError: 当参数不是正数时
+        """
+        if tick <= 0 or slots <= 1 or levels <= 0:
+            raise ValueError(f"Invalid timing wheel shape: tick={tick}, slots={slots}, levels={levels}")
+        
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        
+        self._spans = [slots ** level for level in range(levels)]
+        self._wheels: List[List[List[TimerHandle]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._ready: List[TimerHandle] = []
+        self._current_tick = self._to_tick(time.time() if now is None else now)
+        self._count = 0
+    
+    def schedule(self, deadline: float, callback: Callable[[], Any]) -> TimerHandle:
+        """注册定时
+        
+        Args:
+            deadline: 到期时间（秒，与time.time()同一时钟）
+            callback: 到期回调
+        
+        Returns:
+            定时句柄
+        """
+        # 向上取整，回调不会早于deadline执行
+        handle = TimerHandle(math.ceil(deadline / self.tick), callback)
+        self._insert(handle)
+        self._count += 1
+        return handle
+    
+    def cancel(self, handle: TimerHandle):
+        """取消定时（惰性删除，到达所在格子时丢弃）"""
+        if not handle.cancelled:
+            handle.cancelled = True
+            self._count -= 1
+    
+    def advance(self, now: float) -> List[TimerHandle]:
+        """推进到now，返回到期的定时
+        
+        Args:
+            now: 当前时间（秒）
+        
+        Returns:
+            到期且未取消的定时（按到期顺序）
+        """
+        target = self._to_tick(now)
+        due = self._take_ready()
+        
+        while self._current_tick < target:
+            if self._count == len(due):
+                # 没有未到期的定时，直接跳到目标位置
+                self._current_tick = target
+                break
+            
+            self._current_tick += 1
+            tick = self._current_tick
+            
+            # 高层格子到达时下放（从高到低，下放的定时可能继续落到更低层）
+            for level in range(self.levels - 1, 0, -1):
+                span = self._spans[level]
+                if tick % span == 0:
+                    slot = self._wheels[level][(tick // span) % self.slots]
+                    entries = slot[:]
+                    slot.clear()
+                    for handle in entries:
+                        if not handle.cancelled:
+                            self._insert(handle)
+            
+            slot = self._wheels[0][tick % self.slots]
+            if slot:
+                due.extend(handle for handle in slot if not handle.cancelled)
+                slot.clear()
+            due.extend(self._take_ready())
+        
+        # 已取出的定时标记为完成，之后再cancel不会重复计数
+        for handle in due:
+            handle.cancelled = True
+        self._count -= len(due)
+        return due
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def _to_tick(self, seconds: float) -> int:
+        return int(seconds // self.tick)
+    
+    def _take_ready(self) -> List[TimerHandle]:
+        ready = [handle for handle in self._ready if not handle.cancelled]
+        self._ready = []
+        return ready
+    
+    def _insert(self, handle: TimerHandle):
+        """按剩余tick数放入对应层的格子"""
+        delta = handle.due_tick - self._current_tick
+        if delta <= 0:
+            self._ready.append(handle)
+            return
+        
+        level = 0
+        while level < self.levels - 1 and delta >= self._spans[level + 1]:
+            level += 1
+        index = (handle.due_tick // self._spans[level]) % self.slots
+        self._wheels[level][index].append(handle)
+
+
+class LeaseReaper:
+    """后台租约回收器
+    
+    守护线程每个tick推进一次时间轮并执行到期回调；也可以不启动线程，
+    由调用方（如测试）调用run_pending手动推进。
+    """
+    
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4):
+        """初始化租约回收器
+        
+        Args:
+            tick: 时间轮精度（秒），也是后台线程的唤醒间隔
+            slots: 每层格数
+            levels: 层数
+        """
+        self.tick = tick
+        self._wheel = HierarchicalTimingWheel(tick=tick, slots=slots, levels=levels)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        # 统计计数
+        self.scheduled = 0
+        self.fired = 0
+        self.errors = 0
+        
+        logger.info(f"LeaseReaper initialized with tick={tick}s")
+    
+    def schedule(self, deadline: float, callback: Callable[[], Any]) -> TimerHandle:
+        """注册到期回调
+        
+        Args:
+            deadline: 到期时间（秒，time.time()时钟）
+            callback: 到期回调（在回收线程中执行）
+        
+        Returns:
+            定时句柄
+        """
+        with self._lock:
+            self.scheduled += 1
+            return self._wheel.schedule(deadline, callback)
+    
+    def cancel(self, handle: Optional[TimerHandle]):
+        """取消定时
+        
+        Args:
+            handle: 定时句柄，None时忽略
+        """
+        if handle is None:
+            return
+        with self._lock:
+            self._wheel.cancel(handle)
+    
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """推进时间轮并执行到期回调
+        
+        Args:
+            now: 当前时间（秒），默认time.time()
+        
+        Returns:
+            执行的回调数
+        """
+        with self._lock:
+            due = self._wheel.advance(time.time() if now is None else now)
+        
+        # 回调在锁外执行，回调中可以注册新的定时
+        for handle in due:
+            try:
+                handle.callback()
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Lease reaper callback failed: {e}", exc_info=True)
+        
+        self.fired += len(due)
+        return len(due)
+    
+    def start(self):
+        """启动后台线程（已启动时忽略）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="lease-reaper", daemon=True)
+        self._thread.start()
+        
+        logger.info("LeaseReaper started")
+    
+    def stop(self, timeout: Optional[float] = None):
+        """停止后台线程
+        
+        Args:
+            timeout: 等待线程结束的最长时间（秒）
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        
+        logger.info("LeaseReaper stopped")
+    
+    @property
+    def running(self) -> bool:
+        """后台线程是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取回收器统计
+        
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            pending = len(self._wheel)
+        
+        return {
+            "running": self.running,
+            "tick": self.tick,
+            "pending": pending,
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "errors": self.errors
+        }
+    
+    def _run(self):
+        """后台线程主循环"""
+        while not self._stop_event.wait(self.tick):
+            self.run_pending()
+
+
+# 全局实例（延迟初始化）
+_global_reaper: Optional[LeaseReaper] = None
+_global_reaper_lock = threading.Lock()
+
+
+def get_lease_reaper() -> LeaseReaper:
+    """获取进程内共享的租约回收器（首次调用时创建并启动后台线程）
+    
+    Returns:
+        租约回收器实例
+    """
+    global _global_reaper
+    
+    if _global_reaper is None:
+        with _global_reaper_lock:
+            if _global_reaper is None:
+                reaper = LeaseReaper()
+                reaper.start()
+                _global_reaper = reaper
+    
+    return _global_reaper
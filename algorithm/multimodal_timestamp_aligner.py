@@ -4,12 +4,17 @@
 基于v9.0需求，解决ASR、OCR、视频帧之间的时间戳不一致问题。
 """
 
+import bisect
+import heapq
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 
+from bounded_history import BoundedHistory, compact_record
+from similarity_cache import get_similarity_cache
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -39,6 +44,7 @@ class VideoFrame:
     frame_data: Any  # 帧数据（简化处理）
 
 
+@compact_record
 @dataclass
 class AlignedSegment:
     """对齐后的片段"""
@@ -50,6 +56,7 @@ class AlignedSegment:
     semantic_coherence: float  # 语义连贯性（0-1）
 
 
+@compact_record
 @dataclass
 class SemanticDissonance:
     """语义脱节"""
@@ -76,19 +83,35 @@ class MultimodalTimestampAligner:
     # 语义脱节阈值
     DISSONANCE_THRESHOLD = 0.5  # 脱节分数阈值
     
-    def __init__(self, alignment_window: float = ALIGNMENT_WINDOW):
+    def __init__(
+        self,
+        alignment_window: float = ALIGNMENT_WINDOW,
+        use_similarity_cache: bool = True,
+        history_limit: Optional[int] = BoundedHistory.DEFAULT_MAX_RECORDS,
+        history_spill_path: Optional[str] = None
+    ):
         """初始化多模态时间戳对齐器
         
         Args:
             alignment_window: 对齐窗口（秒，默认3.0）
+            use_similarity_cache: 是否使用进程级共享的相似度缓存
+            history_limit: 对齐历史和语义脱节日志在内存中保留的最大记录数，None表示不限制
+            history_spill_path: 对齐历史溢出文件路径（可选）
         """
         self.alignment_window = alignment_window
         
-        # 存储对齐历史
-        self.alignment_history: List[AlignedSegment] = []
+        # 进程级共享的相似度缓存
+        self.similarity_cache = get_similarity_cache() if use_similarity_cache else None
+        
+        # 存储对齐历史（有界，超出后淘汰最旧记录）
+        self.alignment_history: BoundedHistory[AlignedSegment] = BoundedHistory(
+            max_records=history_limit, spill_path=history_spill_path
+        )
         
         # 存储语义脱节日志
-        self.dissonance_log: List[SemanticDissonance] = []
+        self.dissonance_log: BoundedHistory[SemanticDissonance] = BoundedHistory(
+            max_records=history_limit
+        )
         
         logger.info(
             f"MultimodalTimestampAligner initialized with "
@@ -103,6 +126,10 @@ class MultimodalTimestampAligner:
     ) -> Dict[str, Any]:
         """对齐时间戳
         
+        各输入只排序一次：OCR片段通过滑动双指针扫描维护当前窗口内的活跃片段，
+        视频帧通过二分查找定位窗口，整体复杂度O((A+O+F) log n)。
+        匹配结果与逐个线性扫描一致（候选顺序、并列时的取舍都保持输入顺序）。
+        
         Args:
             asr_data: ASR时间戳列表
             ocr_data: OCR时间戳列表
@@ -113,24 +140,16 @@ class MultimodalTimestampAligner:
         """
         aligned_segments = []
         
+        # 预先为每个ASR片段找出最佳OCR匹配
+        best_ocr_matches = self._match_ocr_segments(asr_data, ocr_data)
+        
+        # 视频帧按时间戳建立有序索引
+        frame_index = self._build_frame_index(video_frames)
+        
         # 1. 对齐ASR和OCR
-        for asr_seg in asr_data:
-            # 找到时间窗口内的OCR片段
-            matching_ocr = self._find_matching_segments(
-                asr_seg.start_time, ocr_data, self.alignment_window
-            )
-            
-            # 找到时间窗口内的视频帧
-            matching_frames = self._find_matching_frames(
-                asr_seg.start_time, video_frames, self.alignment_window
-            )
-            
-            # 选择最佳匹配
-            best_ocr = self._select_best_match(
-                asr_seg, matching_ocr, "ocr"
-            ) if matching_ocr else None
-            
-            best_frame = matching_frames[0] if matching_frames else None
+        for asr_seg, best_ocr in zip(asr_data, best_ocr_matches):
+            # 时间窗口内输入顺序最靠前的视频帧
+            best_frame = self._find_first_frame(asr_seg.start_time, frame_index)
             
             # 计算对齐质量分数
             alignment_score = self.calculate_alignment_score(
@@ -191,53 +210,120 @@ class MultimodalTimestampAligner:
         
         return result
     
-    def _find_matching_segments(
+    def _match_ocr_segments(
         self,
-        target_time: float,
-        segments: List[OCRSegment],
-        window: float
-    ) -> List[OCRSegment]:
-        """找到时间窗口内的匹配片段
+        asr_data: List[ASRSegment],
+        ocr_data: List[OCRSegment]
+    ) -> List[Optional[OCRSegment]]:
+        """为每个ASR片段选择最佳OCR匹配（滑动双指针）
+        
+        ASR按开始时间排序后依次扫描：开始时间不晚于窗口右端的OCR片段进入活跃集合，
+        结束时间早于窗口左端的OCR片段从最小堆中移出（窗口单调右移，移出后不会再匹配）。
         
         Args:
-            target_time: 目标时间
-            segments: 片段列表
-            window: 时间窗口
+            asr_data: ASR片段列表
+            ocr_data: OCR片段列表
+        
+        Returns:
+            与asr_data一一对应的最佳OCR片段（无匹配时为None）
+        """
+        window = self.alignment_window
+        best_matches: List[Optional[OCRSegment]] = [None] * len(asr_data)
+        
+        if not ocr_data:
+            return best_matches
+        
+        asr_order = sorted(range(len(asr_data)), key=lambda i: asr_data[i].start_time)
+        ocr_order = sorted(range(len(ocr_data)), key=lambda j: ocr_data[j].start_time)
+        
+        active: Dict[int, OCRSegment] = {}
+        end_heap: List[Tuple[float, int]] = []
+        pointer = 0
+        
+        for i in asr_order:
+            asr_seg = asr_data[i]
+            target_time = asr_seg.start_time
+            
+            # 加入开始时间落入窗口右端的片段
+            while pointer < len(ocr_order) and \
+                    ocr_data[ocr_order[pointer]].start_time <= target_time + window:
+                j = ocr_order[pointer]
+                active[j] = ocr_data[j]
+                heapq.heappush(end_heap, (ocr_data[j].end_time, j))
+                pointer += 1
+            
+            # 移出已结束于窗口左端之前的片段
+            while end_heap and end_heap[0][0] < target_time - window:
+                _, j = heapq.heappop(end_heap)
+                del active[j]
+            
+            if active:
+                # 候选按输入顺序排列，保证并列时的选择与线性扫描一致
+                candidates = [active[j] for j in sorted(active)]
+                best_matches[i] = self._select_best_match(asr_seg, candidates, "ocr")
+        
+        return best_matches
+    
+    def _build_frame_index(self, frames: List[VideoFrame]) -> Dict[str, Any]:
+        """为视频帧建立按时间戳排序的索引
+        
+        Args:
+            frames: 帧列表
         
         Returns:
-            匹配的片段列表
+            索引字典：timestamps（升序时间戳）、frames（对应帧）、
+            positions（对应的输入下标）、input_sorted（输入是否已按时间排序）
         """
-        matching = []
-        for seg in segments:
-            # 检查片段是否在时间窗口内
-            if (seg.start_time <= target_time + window and
-                seg.end_time >= target_time - window):
-                matching.append(seg)
-        
-        return matching
+        order = sorted(range(len(frames)), key=lambda k: frames[k].timestamp)
+        return {
+            "timestamps": [frames[k].timestamp for k in order],
+            "frames": [frames[k] for k in order],
+            "positions": order,
+            "input_sorted": all(order[k] < order[k + 1] for k in range(len(order) - 1))
+        }
     
-    def _find_matching_frames(
+    def _find_first_frame(
         self,
         target_time: float,
-        frames: List[VideoFrame],
-        window: float
-    ) -> List[VideoFrame]:
-        """找到时间窗口内的匹配帧
+        frame_index: Dict[str, Any]
+    ) -> Optional[VideoFrame]:
+        """二分查找时间窗口内输入顺序最靠前的视频帧
         
         Args:
             target_time: 目标时间
-            frames: 帧列表
-            window: 时间窗口
+            frame_index: _build_frame_index的结果
         
         Returns:
-            匹配的帧列表
+            匹配的视频帧，无匹配时返回None
         """
-        matching = []
-        for frame in frames:
-            if abs(frame.timestamp - target_time) <= window:
-                matching.append(frame)
+        timestamps = frame_index["timestamps"]
+        window = self.alignment_window
+        
+        def in_window(k: int) -> bool:
+            return abs(timestamps[k] - target_time) <= window
+        
+        lo = bisect.bisect_left(timestamps, target_time - window)
+        hi = bisect.bisect_right(timestamps, target_time + window)
+        
+        # 以与线性扫描相同的判定条件修正浮点边界
+        while lo > 0 and in_window(lo - 1):
+            lo -= 1
+        while lo < hi and not in_window(lo):
+            lo += 1
+        while hi < len(timestamps) and in_window(hi):
+            hi += 1
+        while hi > lo and not in_window(hi - 1):
+            hi -= 1
+        
+        if lo >= hi:
+            return None
         
-        return matching
+        if frame_index["input_sorted"]:
+            return frame_index["frames"][lo]
+        
+        positions = frame_index["positions"]
+        first = min(range(lo, hi), key=positions.__getitem__)
+        return frame_index["frames"][first]
     
     def _select_best_match(
         self,
@@ -336,6 +422,23 @@ class MultimodalTimestampAligner:
         if not text1 or not text2:
             return 0.0
         
+        if self.similarity_cache is not None:
+            return self.similarity_cache.get_or_compute(
+                text1, text2, self._compute_text_similarity, namespace="aligner:chars"
+            )
+        
+        return self._compute_text_similarity(text1, text2)
+    
+    def _compute_text_similarity(self, text1: str, text2: str) -> float:
+        """计算字符重叠度（不经过缓存）
+        
+        Args:
+            text1: 文本1
+            text2: 文本2
+        
+        Returns:
+            相似度分数（0-1）
+        """
         # 简单的字符重叠度计算
         set1 = set(text1.lower())
         set2 = set(text2.lower())
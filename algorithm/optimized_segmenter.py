@@ -5,9 +5,8 @@
 """
 
 import logging
-from functools import lru_cache
 from typing import List, Dict, Optional
-from knowledge_point_segmenter import KnowledgePointSegmenter, KnowledgePoint
+from knowledge_point_segmenter import KnowledgePointSegmenter, KnowledgePoint, TextTokens
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -18,50 +17,23 @@ class OptimizedKnowledgePointSegmenter(KnowledgePointSegmenter):
     """优化版知识点切分器
     
     优化点：
-    1. 使用LRU缓存缓存相似度计算结果
+    1. 使用进程级共享的LRU缓存缓存相似度计算结果
     2. 优化话题转换点检测算法（只计算相邻文本段）
-    3. 批量处理相似度计算
+    3. 批量处理相似度计算（高级模式下一次性编码全部文本）
     """
     
     def __init__(self, *args, **kwargs):
         """初始化优化版切分器"""
+        kwargs.setdefault("use_similarity_cache", True)
         super().__init__(*args, **kwargs)
         
-        # 使用LRU缓存缓存相似度计算结果
-        self._cached_similarity = lru_cache(maxsize=1000)(self._calculate_similarity_impl)
-        
         logger.info("OptimizedKnowledgePointSegmenter initialized with caching")
     
-    def calculate_similarity(self, text1: str, text2: str) -> float:
-        """计算相似度（使用缓存）
-        
-        Args:
-            text1: 第一个文本
-            text2: 第二个文本
-        
-        Returns:
-            相似度分数
-        """
-        # 使用缓存的相似度计算
-        return self._cached_similarity(text1, text2)
-    
-    def _calculate_similarity_impl(self, text1: str, text2: str) -> float:
-        """相似度计算实现（被缓存包装）
-        
-        Args:
-            text1: 第一个文本
-            text2: 第二个文本
-        
-        Returns:
-            相似度分数
-        """
-        # 调用父类的计算逻辑
-        return super().calculate_similarity(text1, text2)
-    
     def detect_topic_shift(
         self,
         texts: List[Dict],
-        window_size: Optional[int] = None
+        window_size: Optional[int] = None,
+        token_table: Optional[List[TextTokens]] = None
     ) -> List[int]:
         """优化版话题转换点检测
         
@@ -70,6 +42,7 @@ class OptimizedKnowledgePointSegmenter(KnowledgePointSegmenter):
         Args:
             texts: 文本列表
             window_size: 滑动窗口大小（未使用，保持接口兼容）
+            token_table: 分词结果表，提供时直接复用关键词
         
         Returns:
             话题转换点索引列表
@@ -79,6 +52,9 @@ class OptimizedKnowledgePointSegmenter(KnowledgePointSegmenter):
         
         topic_shifts = []
         
+        # 高级模式下批量编码，一次得到全部相邻相似度
+        similarities = self._batch_adjacent_similarities(texts)
+        
         # 只计算相邻文本段的相似度
         for i in range(len(texts) - 1):
             current_text = texts[i].get("text", "")
@@ -87,8 +63,15 @@ class OptimizedKnowledgePointSegmenter(KnowledgePointSegmenter):
             if not current_text or not next_text:
                 continue
             
-            # 使用缓存的相似度计算
-            similarity = self.calculate_similarity(current_text, next_text)
+            if similarities is not None:
+                similarity = float(similarities[i])
+            elif token_table is not None:
+                similarity = self._token_similarity(
+                    token_table[i], token_table[i + 1], current_text, next_text
+                )
+            else:
+                # 使用缓存的相似度计算
+                similarity = self.calculate_similarity(current_text, next_text)
             
             if similarity < self.similarity_threshold:
                 topic_shifts.append(i + 1)
@@ -97,8 +80,12 @@ class OptimizedKnowledgePointSegmenter(KnowledgePointSegmenter):
         return topic_shifts
     
     def clear_cache(self):
-        """清空缓存"""
-        self._cached_similarity.cache_clear()
+        """清空缓存
+        
+        相似度缓存为进程级共享，清空会影响所有使用该缓存的模块。
+        """
+        if self.similarity_cache is not None:
+            self.similarity_cache.clear()
         logger.info("Cache cleared")
 
 
@@ -5,7 +5,7 @@
 """
 
 import logging
-from typing import List, Dict, Optional, Tuple
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
 from datetime import datetime
 from learning_path_generator import LearningPathGenerator
@@ -22,16 +22,212 @@ class LearningEvent:
     knowledge_point_id: int
     timestamp: datetime
     metadata: Optional[Dict] = None
+    user_id: Optional[int] = None  # 事件所属用户（批量事件流中必填）
 
 
 @dataclass
 class AdjustmentResult:
     """调整结果"""
-    adjusted_path: List[Dict]
+    adjusted_path: "PathLike"  # 与adjust_path输入的路径类型相同
     adjustment_reason: str
     next_action: str
 
 
+class IndexedPath:
+    """带索引的学习路径
+    
+    以双向链表保存路径节点，并维护 知识点ID -> 节点句柄 的索引，
+    删除、在某节点前插入、按知识点查找都是O(1)。
+    order字段惰性编号：结构变化后只标记为过期，迭代或to_list时统一重新编号。
+    
+    路径节点仍是原来的字典，adjust_path既可以接受列表，也可以接受IndexedPath；
+    后者在多次事件之间复用，避免每个事件都重建和重新编号整条路径。
+    """
+    
+    # 链表哨兵句柄
+    _SENTINEL = 0
+    
+    def __init__(self, nodes: Iterable[Dict] = ()):
+        """初始化带索引的学习路径
+        
+        Args:
+            nodes: 路径节点（按顺序）
+        """
+        self._nodes: Dict[int, Dict] = {}
+        self._prev: Dict[int, int] = {self._SENTINEL: self._SENTINEL}
+        self._next: Dict[int, int] = {self._SENTINEL: self._SENTINEL}
+        # 知识点ID -> 节点句柄列表（同一知识点可能有知识点节点和补偿资源节点）
+        self._index: Dict[Any, List[int]] = {}
+        self._last_handle = self._SENTINEL
+        self._orders_dirty = False
+        
+        for node in nodes:
+            self.append(node)
+    
+    def __len__(self) -> int:
+        return len(self._nodes)
+    
+    def __iter__(self) -> Iterator[Dict]:
+        self.renumber()
+        return (self._nodes[handle] for handle in self._handles())
+    
+    def __getitem__(self, position: int) -> Dict:
+        return self.to_list()[position]
+    
+    def append(self, node: Dict) -> int:
+        """在路径末尾追加节点
+        
+        Args:
+            node: 路径节点
+        
+        Returns:
+            节点句柄
+        """
+        return self._link(node, self._SENTINEL)
+    
+    def insert_before(self, handle: int, node: Dict) -> int:
+        """在指定节点之前插入节点
+        
+        Args:
+            handle: 目标节点句柄
+            node: 新节点
+        
+        Returns:
+            新节点句柄
+        """
+        return self._link(node, handle)
+    
+    def remove_handle(self, handle: int) -> Dict:
+        """删除指定节点
+        
+        Args:
+            handle: 节点句柄
+        
+        Returns:
+            被删除的节点
+        """
+        node = self._nodes.pop(handle)
+        prev_handle = self._prev.pop(handle)
+        next_handle = self._next.pop(handle)
+        self._next[prev_handle] = next_handle
+        self._prev[next_handle] = prev_handle
+        
+        handles = self._index[node.get("knowledge_point_id")]
+        handles.remove(handle)
+        if not handles:
+            del self._index[node.get("knowledge_point_id")]
+        
+        self._orders_dirty = True
+        return node
+    
+    def node(self, handle: int) -> Dict:
+        """按句柄获取节点
+        
+        Args:
+            handle: 节点句柄
+        
+        Returns:
+            路径节点
+        """
+        return self._nodes[handle]
+    
+    def next_node(self, handle: int) -> Optional[Dict]:
+        """获取指定节点的后一个节点
+        
+        Args:
+            handle: 节点句柄
+        
+        Returns:
+            后一个节点，指定节点位于末尾时返回None
+        """
+        next_handle = self._next[handle]
+        return None if next_handle == self._SENTINEL else self._nodes[next_handle]
+    
+    def find(self, kp_id: int, node_type: Optional[str] = None) -> List[int]:
+        """按知识点查找节点句柄
+        
+        Args:
+            kp_id: 知识点ID
+            node_type: 节点类型（可选），None表示任意类型
+        
+        Returns:
+            节点句柄列表
+        """
+        handles = self._index.get(kp_id, [])
+        if node_type is None:
+            return list(handles)
+        return [h for h in handles if self._nodes[h].get("node_type") == node_type]
+    
+    def contains(self, kp_id: int, node_type: Optional[str] = None) -> bool:
+        """路径中是否包含指定知识点的节点
+        
+        Args:
+            kp_id: 知识点ID
+            node_type: 节点类型（可选）
+        
+        Returns:
+            是否包含
+        """
+        return bool(self.find(kp_id, node_type))
+    
+    def remove(self, kp_id: int, node_type: Optional[str] = None) -> int:
+        """删除指定知识点的节点
+        
+        Args:
+            kp_id: 知识点ID
+            node_type: 节点类型（可选），None表示删除该知识点的所有节点
+        
+        Returns:
+            删除的节点数
+        """
+        handles = self.find(kp_id, node_type)
+        for handle in handles:
+            self.remove_handle(handle)
+        return len(handles)
+    
+    def renumber(self):
+        """如有结构变化，按当前顺序重新编号order字段（从1开始）"""
+        if not self._orders_dirty:
+            return
+        
+        for i, handle in enumerate(self._handles(), 1):
+            self._nodes[handle]["order"] = i
+        self._orders_dirty = False
+    
+    def to_list(self) -> List[Dict]:
+        """转换为节点列表（已编号）"""
+        return list(self)
+    
+    def _handles(self) -> Iterator[int]:
+        """按路径顺序遍历节点句柄"""
+        handle = self._next[self._SENTINEL]
+        while handle != self._SENTINEL:
+            yield handle
+            handle = self._next[handle]
+    
+    def _link(self, node: Dict, next_handle: int) -> int:
+        """将节点链接到next_handle之前"""
+        self._last_handle += 1
+        handle = self._last_handle
+        prev_handle = self._prev[next_handle]
+        
+        self._nodes[handle] = node
+        self._prev[handle] = prev_handle
+        self._next[handle] = next_handle
+        self._next[prev_handle] = handle
+        self._prev[next_handle] = handle
+        self._index.setdefault(node.get("knowledge_point_id"), []).append(handle)
+        
+        # 追加到末尾且编号连续时无需重新编号
+        if next_handle != self._SENTINEL or node.get("order") != len(self._nodes):
+            self._orders_dirty = True
+        return handle
+
+
+# 路径参数类型：普通列表或带索引的路径
+PathLike = Union[List[Dict], IndexedPath]
+
+
 class PathAdjuster:
     """路径调整器
     
@@ -54,16 +250,18 @@ class PathAdjuster:
     
     def adjust_path(
         self,
-        current_path: List[Dict],
+        current_path: PathLike,
         learning_event: LearningEvent,
         progress: Optional[Dict] = None
     ) -> AdjustmentResult:
         """调整学习路径
         
         根据学习事件类型调用相应的处理方法。
+        传入列表时返回新的列表；传入IndexedPath时原地更新并返回同一对象，
+        每个事件只需O(1)的结构调整。
         
         Args:
-            current_path: 当前学习路径
+            current_path: 当前学习路径（列表或IndexedPath）
             learning_event: 学习事件
             progress: 学习进度信息（可选）
         
@@ -73,27 +271,30 @@ class PathAdjuster:
         try:
             logger.info(f"Adjusting path for event: {learning_event.event_type}, kp_id: {learning_event.knowledge_point_id}")
             
+            # IndexedPath会被原地更新，先记录调整前的长度
+            old_length = len(current_path)
+            
             # 根据事件类型处理
             if learning_event.event_type == "mastered":
                 adjusted_path = self.handle_mastery_event(current_path, learning_event.knowledge_point_id)
                 reason = self.get_adjustment_reason("mastered", learning_event.knowledge_point_id)
                 next_action = "继续学习下一个知识点"
-                
+            
             elif learning_event.event_type == "difficult":
                 adjusted_path = self.handle_difficulty_event(current_path, learning_event.knowledge_point_id)
                 reason = self.get_adjustment_reason("difficult", learning_event.knowledge_point_id)
                 next_action = "学习补偿资源，然后重新尝试"
-                
+            
             elif learning_event.event_type == "completed":
                 adjusted_path = self.handle_completion_event(current_path, learning_event.knowledge_point_id)
                 reason = self.get_adjustment_reason("completed", learning_event.knowledge_point_id)
                 next_action = "评估掌握情况，决定下一步"
-                
+            
             elif learning_event.event_type == "remedial_completed":
                 adjusted_path = self.handle_remedial_completion(current_path, learning_event.knowledge_point_id)
                 reason = self.get_adjustment_reason("remedial_completed", learning_event.knowledge_point_id)
                 next_action = "重新尝试学习该知识点"
-                
+            
             else:
                 logger.warning(f"Unknown event type: {learning_event.event_type}")
                 adjusted_path = current_path
@@ -105,7 +306,7 @@ class PathAdjuster:
                 adjusted_path = self.optimize_for_speed(adjusted_path, progress["learning_speed"])
             
             # 记录调整历史
-            self._record_adjustment(learning_event, reason, len(current_path), len(adjusted_path))
+            self._record_adjustment(learning_event, reason, old_length, len(adjusted_path))
             
             result = AdjustmentResult(
                 adjusted_path=adjusted_path,
@@ -113,161 +314,122 @@ class PathAdjuster:
                 next_action=next_action
             )
             
-            logger.info(f"Path adjusted: {len(current_path)} -> {len(adjusted_path)} nodes")
+            logger.info(f"Path adjusted: {old_length} -> {len(adjusted_path)} nodes")
             return result
-            
+        
         except Exception as e:
             logger.error(f"Error adjusting path: {e}", exc_info=True)
             raise
     
     def handle_mastery_event(
         self,
-        path: List[Dict],
+        path: PathLike,
         kp_id: int
-    ) -> List[Dict]:
+    ) -> PathLike:
         """处理掌握事件
         
         如果学生快速掌握了某个知识点，可以跳过相关的基础知识点。
         
         Args:
-            path: 当前路径
+            path: 当前路径（列表或IndexedPath）
             kp_id: 已掌握的知识点ID
         
         Returns:
-            调整后的路径
+            调整后的路径（与输入类型相同）
         """
-        # 从路径中移除已掌握的知识点
-        adjusted_path = [
-            node for node in path
-            if node.get("knowledge_point_id") != kp_id or node.get("node_type") == "remedial_resource"
-        ]
-        
-        # 移除对应的补偿资源节点（如果存在）
-        adjusted_path = [
-            node for node in adjusted_path
-            if not (node.get("node_type") == "remedial_resource" and 
-                   node.get("knowledge_point_id") == kp_id)
-        ]
-        
-        # 重新编号
-        for i, node in enumerate(adjusted_path, 1):
-            node["order"] = i
+        indexed = self._as_indexed(path)
+        
+        # 从路径中移除已掌握的知识点及其补偿资源节点
+        indexed.remove(kp_id)
         
         logger.debug(f"Removed mastered knowledge point {kp_id} from path")
-        return adjusted_path
+        return self._same_type(path, indexed)
     
     def handle_difficulty_event(
         self,
-        path: List[Dict],
+        path: PathLike,
         kp_id: int
-    ) -> List[Dict]:
+    ) -> PathLike:
         """处理疑难事件
         
         如果学生遇到困难，插入更多的基础知识点或补偿资源。
         
         Args:
-            path: 当前路径
+            path: 当前路径（列表或IndexedPath）
             kp_id: 疑难知识点ID
         
         Returns:
-            调整后的路径
+            调整后的路径（与输入类型相同）
         """
-        adjusted_path = []
-        
-        for node in path:
-            adjusted_path.append(node)
-            
-            # 如果遇到疑难点，在它之前插入补偿资源节点
-            if node.get("knowledge_point_id") == kp_id and node.get("node_type") == "knowledge_point":
-                # 检查是否已有补偿资源节点
-                has_remedial = any(
-                    n.get("knowledge_point_id") == kp_id and n.get("node_type") == "remedial_resource"
-                    for n in adjusted_path
-                )
-                
-                if not has_remedial:
-                    # 插入补偿资源节点
-                    remedial_node = {
-                        "knowledge_point_id": kp_id,
-                        "order": node["order"],
-                        "reason": "疑难点，需要先学习补偿资源",
-                        "node_type": "remedial_resource"
-                    }
-                    # 插入到当前节点之前
-                    adjusted_path.insert(-1, remedial_node)
-                    # 调整后续节点的顺序
-                    for i, n in enumerate(adjusted_path[adjusted_path.index(remedial_node)+1:], 
-                                       start=remedial_node["order"]+1):
-                        n["order"] = i
-        
-        # 重新编号
-        for i, node in enumerate(adjusted_path, 1):
-            node["order"] = i
+        indexed = self._as_indexed(path)
+        
+        # 在疑难点之前插入补偿资源节点（已有补偿资源节点时不重复插入）
+        kp_handles = indexed.find(kp_id, "knowledge_point")
+        if kp_handles and not indexed.contains(kp_id, "remedial_resource"):
+            kp_node = indexed.node(kp_handles[0])
+            indexed.insert_before(kp_handles[0], {
+                "knowledge_point_id": kp_id,
+                "order": kp_node.get("order"),
+                "reason": "疑难点，需要先学习补偿资源",
+                "node_type": "remedial_resource"
+            })
         
         logger.debug(f"Inserted remedial resource for difficult knowledge point {kp_id}")
-        return adjusted_path
+        return self._same_type(path, indexed)
     
     def handle_completion_event(
         self,
-        path: List[Dict],
+        path: PathLike,
         kp_id: int
-    ) -> List[Dict]:
+    ) -> PathLike:
         """处理完成事件
         
         学生完成了一个知识点学习，标记为"学习中"状态。
         路径通常不需要大幅调整，但可以优化后续顺序。
         
         Args:
-            path: 当前路径
+            path: 当前路径（列表或IndexedPath）
             kp_id: 完成的知识点ID
         
         Returns:
-            调整后的路径
+            调整后的路径（与输入类型相同）
         """
         # 完成事件通常不需要调整路径，只是标记进度
         # 但可以优化后续节点的顺序
-        adjusted_path = path.copy()
+        adjusted_path = path if isinstance(path, IndexedPath) else path.copy()
         
         logger.debug(f"Knowledge point {kp_id} completed, path remains mostly unchanged")
         return adjusted_path
     
     def handle_remedial_completion(
         self,
-        path: List[Dict],
+        path: PathLike,
         kp_id: int
-    ) -> List[Dict]:
+    ) -> PathLike:
         """处理补偿资源完成事件
         
         学生完成了补偿资源学习，重新评估是否掌握。
         
         Args:
-            path: 当前路径
+            path: 当前路径（列表或IndexedPath）
             kp_id: 完成补偿资源的知识点ID
         
         Returns:
-            调整后的路径
+            调整后的路径（与输入类型相同）
         """
-        adjusted_path = []
-        
-        for node in path:
-            # 移除已完成的补偿资源节点
-            if node.get("knowledge_point_id") == kp_id and node.get("node_type") == "remedial_resource":
-                continue
-            
-            adjusted_path.append(node)
+        indexed = self._as_indexed(path)
         
-        # 重新编号
-        for i, node in enumerate(adjusted_path, 1):
-            node["order"] = i
+        # 移除已完成的补偿资源节点
+        indexed.remove(kp_id, "remedial_resource")
         
         logger.debug(f"Removed completed remedial resource for knowledge point {kp_id}")
-        return adjusted_path
+        return self._same_type(path, indexed)
     
     def optimize_for_speed(
         self,
-        path: List[Dict],
+        path: PathLike,
         learning_speed: str
-    ) -> List[Dict]:
+    ) -> PathLike:
         """根据学习速度优化路径
         
         Args:
@@ -282,13 +444,13 @@ class PathAdjuster:
             # 这里简化处理：保持原路径，但可以标记为"可跳过"
             logger.debug("Fast learner detected, keeping current path")
             return path
-            
+        
         elif learning_speed == "slow":
             # 慢速学习者：可能需要插入更多基础知识点
             # 这里简化处理：保持原路径，但可以标记为"需要更多时间"
             logger.debug("Slow learner detected, keeping current path")
             return path
-            
+        
         else:
             # 正常速度：保持原路径
             return path
@@ -316,6 +478,16 @@ class PathAdjuster:
         
         return reasons.get(event_type, f"未知事件类型: {event_type}")
     
+    def _as_indexed(self, path: PathLike) -> IndexedPath:
+        """将路径转换为IndexedPath（已是IndexedPath时直接返回）"""
+        return path if isinstance(path, IndexedPath) else IndexedPath(path)
+    
+    def _same_type(self, original: PathLike, indexed: IndexedPath) -> PathLike:
+        """按输入路径的类型返回调整结果"""
+        if isinstance(original, IndexedPath):
+            return indexed
+        return indexed.to_list()
+    
     def _record_adjustment(
         self,
         event: LearningEvent,
@@ -0,0 +1,296 @@
+"""
+批量路径调整事件流
+
+在上课高峰期，播放器会为大量学生持续产生学习事件。本模块按批处理事件：
+1. 按(用户, 知识点)合并冗余事件（例如多次疑难后又掌握，只需执行掌握）
+2. 每个用户的事件在其带索引的路径上一次性应用
+3. 只输出路径差异（删除/插入的节点），而不是整条重写后的路径
+
+既支持同步批量接口，也支持从异步迭代器中按批大小/等待时间进行微批处理。
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import (
+    Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+)
+
+from path_adjuster import IndexedPath, LearningEvent, PathAdjuster
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 会改变路径结构的事件类型
+STRUCTURAL_EVENTS = ("mastered", "difficult", "remedial_completed")
+
+
+@dataclass
+class PathDiff:
+    """单个用户一批事件产生的路径差异"""
+    user_id: int
+    removed: List[Tuple[int, str]] = field(default_factory=list)  # 被删除节点的(知识点ID, 节点类型)
+    inserted: List[Dict[str, Any]] = field(default_factory=list)  # {"node": 新节点, "before": 后一节点的(知识点ID, 节点类型)或None}
+    events_received: int = 0  # 本批收到的事件数
+    events_applied: int = 0  # 合并后实际应用的事件数
+    
+    @property
+    def is_empty(self) -> bool:
+        """路径是否没有变化"""
+        return not self.removed and not self.inserted
+
+
+def coalesce_events(events: List[LearningEvent]) -> List[LearningEvent]:
+    """合并同一用户的冗余事件
+    
+    同一知识点的事件按以下规则合并为至多一个：
+    - 出现过mastered：只保留最后一个mastered（掌握会移除该知识点的全部节点，
+      之前的事件被覆盖，之后的事件在路径上找不到节点）
+    - 否则保留最后一个difficult或remedial_completed（前者确保补偿资源存在，
+      后者确保补偿资源不存在，结果只取决于最后一个）
+    - completed和未知类型的事件不改变路径，直接丢弃
+    
+    不同知识点的事件只影响各自的节点，互相可交换，按首次出现的顺序输出。
+    
+    Args:
+        events: 同一用户的事件列表（按发生顺序）
+    
+    Returns:
+        合并后的事件列表
+    """
+    latest: Dict[int, LearningEvent] = {}
+    for event in events:
+        if event.event_type not in STRUCTURAL_EVENTS:
+            continue
+        
+        kp_id = event.knowledge_point_id
+        current = latest.get(kp_id)
+        if current is not None and current.event_type == "mastered" and event.event_type != "mastered":
+            continue
+        
+        # 重新赋值不改变字典中的插入顺序
+        latest[kp_id] = event
+    
+    return list(latest.values())
+
+
+class PathAdjustmentStream:
+    """批量路径调整事件流
+    
+    维护每个用户的IndexedPath，按批应用学习事件并输出路径差异。
+    """
+    
+    # 异步微批处理的默认参数
+    DEFAULT_BATCH_SIZE = 500
+    DEFAULT_MAX_DELAY = 0.05  # 秒
+    
+    def __init__(
+        self,
+        adjuster: Optional[PathAdjuster] = None,
+        path_loader: Optional[Callable[[int], Optional[List[Dict]]]] = None
+    ):
+        """初始化批量路径调整事件流
+        
+        Args:
+            adjuster: 路径调整器实例，如果为None则创建新实例
+            path_loader: 按用户ID加载当前路径的函数（可选），
+                在首次收到某用户的事件且尚未设置路径时调用
+        """
+        self.adjuster = adjuster or PathAdjuster()
+        self.path_loader = path_loader
+        self.paths: Dict[int, IndexedPath] = {}
+        
+        # 统计计数
+        self.events_received = 0
+        self.events_applied = 0
+        self.events_skipped = 0  # 缺少用户ID或找不到路径的事件
+        self.diffs_emitted = 0
+        
+        logger.info("PathAdjustmentStream initialized")
+    
+    def set_path(self, user_id: int, path: List[Dict]) -> IndexedPath:
+        """设置用户的当前路径
+        
+        Args:
+            user_id: 用户ID
+            path: 学习路径
+        
+        Returns:
+            带索引的路径
+        """
+        indexed = path if isinstance(path, IndexedPath) else IndexedPath(path)
+        self.paths[user_id] = indexed
+        return indexed
+    
+    def get_path(self, user_id: int) -> Optional[IndexedPath]:
+        """获取用户的当前路径（必要时通过path_loader加载）
+        
+        Args:
+            user_id: 用户ID
+        
+        Returns:
+            带索引的路径，用户不存在时返回None
+        """
+        indexed = self.paths.get(user_id)
+        if indexed is None and self.path_loader is not None:
+            path = self.path_loader(user_id)
+            if path is not None:
+                indexed = self.set_path(user_id, path)
+        return indexed
+    
+    def process_batch(self, events: Iterable[LearningEvent]) -> List[PathDiff]:
+        """处理一批事件
+        
+        Args:
+            events: 学习事件（可以来自多个用户，需设置user_id）
+        
+        Returns:
+            路径发生变化的用户的差异列表（按用户首次出现的顺序）
+        """
+        events_by_user: Dict[int, List[LearningEvent]] = {}
+        for event in events:
+            self.events_received += 1
+            if event.user_id is None:
+                self.events_skipped += 1
+                logger.warning(
+                    f"Skipping event without user_id: {event.event_type}, "
+                    f"kp_id: {event.knowledge_point_id}"
+                )
+                continue
+            events_by_user.setdefault(event.user_id, []).append(event)
+        
+        diffs = []
+        for user_id, user_events in events_by_user.items():
+            diff = self._apply_user_events(user_id, user_events)
+            if diff is not None and not diff.is_empty:
+                diffs.append(diff)
+        
+        self.diffs_emitted += len(diffs)
+        return diffs
+    
+    async def process_stream(
+        self,
+        events: AsyncIterable[LearningEvent],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_delay: float = DEFAULT_MAX_DELAY
+    ) -> AsyncIterator[List[PathDiff]]:
+        """从异步事件源中按微批处理事件
+        
+        凑满batch_size个事件，或距本批第一个事件超过max_delay秒时处理一批。
+        
+        Args:
+            events: 异步学习事件源
+            batch_size: 每批最多事件数
+            max_delay: 每批最长等待时间（秒）
+        
+        Yields:
+            每批产生的路径差异列表（没有差异的批次不输出）
+        """
+        loop = asyncio.get_running_loop()
+        # 队列不设上限，保证事件源结束或出错时结束标记总能写入
+        queue: asyncio.Queue = asyncio.Queue()
+        end_of_stream = object()
+        
+        async def pump():
+            try:
+                async for event in events:
+                    queue.put_nowait(event)
+            finally:
+                queue.put_nowait(end_of_stream)
+        
+        producer = asyncio.ensure_future(pump())
+        try:
+            finished = False
+            while not finished:
+                batch = []
+                item = await queue.get()
+                if item is end_of_stream:
+                    break
+                batch.append(item)
+                deadline = loop.time() + max_delay
+                
+                while len(batch) < batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is end_of_stream:
+                        finished = True
+                        break
+                    batch.append(item)
+                
+                diffs = self.process_batch(batch)
+                if diffs:
+                    yield diffs
+            
+            # 事件源抛出的异常在这里向调用方传播
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取事件流统计
+        
+        Returns:
+            统计字典
+        """
+        return {
+            "users": len(self.paths),
+            "events_received": self.events_received,
+            "events_applied": self.events_applied,
+            "events_coalesced": self.events_received - self.events_applied - self.events_skipped,
+            "events_skipped": self.events_skipped,
+            "diffs_emitted": self.diffs_emitted
+        }
+    
+    def _apply_user_events(
+        self,
+        user_id: int,
+        events: List[LearningEvent]
+    ) -> Optional[PathDiff]:
+        """合并并应用单个用户的事件，返回路径差异"""
+        indexed = self.get_path(user_id)
+        if indexed is None:
+            self.events_skipped += len(events)
+            logger.warning(f"No path for user {user_id}, skipping {len(events)} events")
+            return None
+        
+        coalesced = coalesce_events(events)
+        
+        # 只有事件涉及的知识点的节点可能变化，记录这些节点调整前的句柄
+        before: Dict[int, Dict] = {}
+        for event in coalesced:
+            for handle in indexed.find(event.knowledge_point_id):
+                before[handle] = indexed.node(handle)
+        
+        for event in coalesced:
+            self.adjuster.adjust_path(indexed, event)
+        self.events_applied += len(coalesced)
+        
+        after = set()
+        for event in coalesced:
+            after.update(indexed.find(event.knowledge_point_id))
+        
+        diff = PathDiff(user_id=user_id, events_received=len(events), events_applied=len(coalesced))
+        if after - before.keys():
+            # 插入的节点带有最新编号
+            indexed.renumber()
+        for handle, node in before.items():
+            if handle not in after:
+                diff.removed.append((node.get("knowledge_point_id"), node.get("node_type")))
+        for handle in sorted(after - before.keys()):
+            next_node = indexed.next_node(handle)
+            diff.inserted.append({
+                "node": indexed.node(handle),
+                "before": (
+                    (next_node.get("knowledge_point_id"), next_node.get("node_type"))
+                    if next_node is not None else None
+                )
+            })
+        
+        return diff
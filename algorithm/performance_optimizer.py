@@ -10,6 +10,8 @@ import functools
 import time
 from collections import defaultdict
 
+from similarity_cache import get_similarity_cache
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -154,52 +156,20 @@ class PerformanceOptimizer:
 
 
 def optimize_segmentation_with_cache(segmenter):
-    """优化知识点切分：添加缓存"""
-    original_segment = segmenter.segment
-    
-    @functools.lru_cache(maxsize=100)
-    def cached_similarity(text1, text2):
-        return segmenter.calculate_similarity(text1, text2)
+    """优化知识点切分：添加缓存
     
-    def optimized_segment(asr_texts, ocr_texts=None, subtitles=None):
-        # 使用缓存的相似度计算
-        segmenter.calculate_similarity = cached_similarity
-        return original_segment(asr_texts, ocr_texts, subtitles)
-    
-    segmenter.segment = optimized_segment
+    接入进程级共享的相似度缓存，与知识图谱构建、时间戳对齐共用同一份缓存。
+    """
+    segmenter.similarity_cache = get_similarity_cache()
     return segmenter
 
 
 def optimize_batch_processing(detector):
-    """优化批量处理：使用向量化计算"""
-    original_batch_detect = detector.batch_detect
-    
-    def optimized_batch_detect(behavior_data_list):
-        # 批量计算困难度分数
-        scores = []
-        for behavior_data in behavior_data_list:
-            score = detector.calculate_difficulty_score(behavior_data)
-            scores.append(score)
-        
-        # 批量判断
-        results = []
-        for i, behavior_data in enumerate(behavior_data_list):
-            trigger_reasons = detector.get_trigger_reasons(behavior_data)
-            is_difficult = len(trigger_reasons) > 0 or scores[i] >= 1.0
-            confidence = detector._calculate_confidence(behavior_data, trigger_reasons, scores[i])
-            
-            from difficulty_detector import DifficultyResult
-            result = DifficultyResult(
-                is_difficult=is_difficult,
-                difficulty_score=min(scores[i], 10.0),
-                trigger_reasons=trigger_reasons,
-                confidence=confidence
-            )
-            results.append((behavior_data, result))
-        
-        return results
+    """优化批量处理：使用向量化计算
     
-    detector.batch_detect = optimized_batch_detect
+    DifficultyDetector.batch_detect已基于列式向量化的detect_columns实现，
+    这里保留接口兼容，直接返回检测器。
+    """
     return detector
 
 
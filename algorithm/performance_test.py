@@ -1,358 +1,497 @@
 """
-性能测试脚本
+性能基准测试脚本
 
-测试各个算法模块的性能，识别性能瓶颈。
+在可扩展的合成数据上测试各个算法模块的性能：
+- 知识点切分（多小时ASR/OCR流）
+- 知识图谱构建（10～10,000个知识点）
+- 学习路径生成
+- 难点识别（1k～1M学生）与公共难点聚合
+- 多模态时间戳对齐
+
+计时使用time.perf_counter，每个用例先预热再重复测量，
+结果以JSON输出，便于在不同提交之间对比回归。
+
+用法：
+    python performance_test.py --scale small
+    python performance_test.py --scale large --repeat 5 --output bench.json
+    python performance_test.py --scale medium --compare baseline.json
 """
 
-import time
+import argparse
+import gc
+import json
 import logging
-import sys
 import os
-from typing import Dict, List
-import cProfile
-import pstats
-from io import StringIO
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
 
 # 添加路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'tests'))
 
+from benchmark_data import (
+    generate_asr_stream, generate_ocr_stream, generate_alignment_inputs,
+    generate_knowledge_points, generate_dependencies, generate_mastery_status,
+    generate_difficulty_info, generate_behavior_columns, behaviors_from_columns
+)
 from knowledge_point_segmenter import KnowledgePointSegmenter
-from knowledge_point_annotator import KnowledgePointAnnotator
-from knowledge_graph_builder import KnowledgeGraphBuilder, KnowledgePointInfo
-from difficulty_detector import DifficultyDetector, BehaviorData
+from knowledge_graph_builder import KnowledgeGraphBuilder
+from difficulty_detector import DifficultyDetector
 from public_difficulty_detector import PublicDifficultyDetector
 from learning_path_generator import LearningPathGenerator
-from path_adjuster import PathAdjuster, LearningEvent
-from remedial_resource_strategy import RemedialResourceStrategy, DifficultyLevel
-from knowledge_card_generator import KnowledgeCardGenerator, KnowledgePointInfo as KPInfo
-from exercise_generator import ExerciseGenerator
-from tests.mock_data import (
-    MOCK_ASR_TEXTS, MOCK_OCR_TEXTS, MOCK_BEHAVIOR_DATA,
-    MOCK_MASTERY_STATUS, MOCK_DEPENDENCIES, MOCK_KNOWLEDGE_POINT
-)
+from multimodal_timestamp_aligner import MultimodalTimestampAligner
 
 # 配置日志
 logging.basicConfig(level=logging.WARNING)  # 减少日志输出
 logger = logging.getLogger(__name__)
 
+# 结果格式版本，JSON结构变化时递增
+SCHEMA_VERSION = 1
 
-class PerformanceTester:
-    """性能测试器"""
+# 规模预设
+SCALES: Dict[str, Dict[str, Any]] = {
+    "small": {
+        "stream_hours": 0.5,
+        "graph_knowledge_points": 10,
+        "path_knowledge_points": 100,
+        "students": 1_000,
+        "public_events": 1_000,
+        "alignment_hours": 0.5,
+    },
+    "medium": {
+        "stream_hours": 2.0,
+        "graph_knowledge_points": 1_000,
+        "path_knowledge_points": 2_000,
+        "students": 100_000,
+        "public_events": 50_000,
+        "alignment_hours": 2.0,
+    },
+    "large": {
+        "stream_hours": 6.0,
+        "graph_knowledge_points": 10_000,
+        "path_knowledge_points": 10_000,
+        "students": 1_000_000,
+        "public_events": 200_000,
+        "alignment_hours": 6.0,
+    },
+}
+
+
+@dataclass
+class BenchmarkResult:
+    """单个基准用例的测量结果"""
+    name: str
+    params: Dict[str, Any]
+    items: int  # 每次运行处理的数据量（用于计算吞吐量）
+    warmup: int
+    repeat: int
+    times: List[float] = field(default_factory=list)  # 每次运行的耗时（秒）
     
-    def __init__(self):
-        """初始化性能测试器"""
-        self.results: Dict[str, Dict] = {}
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.times) if self.times else 0.0
     
-    def test_module_a_segmentation(self, iterations: int = 10) -> Dict:
-        """测试模块A：知识点切分性能"""
-        print(f"\n测试模块A：知识点切分（{iterations}次迭代）")
-        print("-" * 60)
-        
-        segmenter = KnowledgePointSegmenter()
-        times = []
-        
-        for i in range(iterations):
-            start_time = time.time()
-            knowledge_points = segmenter.segment(MOCK_ASR_TEXTS, MOCK_OCR_TEXTS)
-            elapsed = time.time() - start_time
-            times.append(elapsed)
-            if i == 0:
-                print(f"  首次运行: {elapsed:.4f}秒，生成 {len(knowledge_points)} 个知识点")
-        
-        avg_time = sum(times) / len(times)
-        min_time = min(times)
-        max_time = max(times)
-        
-        result = {
-            "module": "知识点切分",
-            "iterations": iterations,
-            "avg_time": avg_time,
-            "min_time": min_time,
-            "max_time": max_time,
-            "throughput": 1.0 / avg_time if avg_time > 0 else 0
-        }
-        
-        print(f"  平均时间: {avg_time:.4f}秒")
-        print(f"  最小时间: {min_time:.4f}秒")
-        print(f"  最大时间: {max_time:.4f}秒")
-        print(f"  吞吐量: {result['throughput']:.2f} 次/秒")
-        
-        self.results["segmentation"] = result
-        return result
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times) if self.times else 0.0
     
-    def test_module_a_annotation(self, iterations: int = 10) -> Dict:
-        """测试模块A：知识点标注性能"""
-        print(f"\n测试模块A：知识点标注（{iterations}次迭代）")
-        print("-" * 60)
-        
-        annotator = KnowledgePointAnnotator()
-        kp_text = "函数是一种映射关系，它将输入映射到输出。我们可以用def关键字来定义函数。"
-        times = []
-        
-        for i in range(iterations):
-            start_time = time.time()
-            annotation = annotator.annotate(kp_text, MOCK_ASR_TEXTS[:3], MOCK_OCR_TEXTS[:2])
-            elapsed = time.time() - start_time
-            times.append(elapsed)
-        
-        avg_time = sum(times) / len(times)
-        
-        result = {
-            "module": "知识点标注",
-            "iterations": iterations,
-            "avg_time": avg_time,
-            "throughput": 1.0 / avg_time if avg_time > 0 else 0
-        }
-        
-        print(f"  平均时间: {avg_time:.4f}秒")
-        print(f"  吞吐量: {result['throughput']:.2f} 次/秒")
-        
-        self.results["annotation"] = result
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.times) if len(self.times) > 1 else 0.0
+    
+    @property
+    def throughput(self) -> float:
+        """按中位数计算的吞吐量（条/秒）"""
+        return self.items / self.median if self.median > 0 else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可JSON序列化的字典"""
+        result = asdict(self)
+        result.update({
+            "mean": self.mean,
+            "median": self.median,
+            "stdev": self.stdev,
+            "min": min(self.times) if self.times else 0.0,
+            "max": max(self.times) if self.times else 0.0,
+            "throughput": self.throughput,
+        })
         return result
+
+
+def measure(
+    name: str,
+    func: Callable[[], Any],
+    items: int,
+    params: Dict[str, Any],
+    warmup: int = 1,
+    repeat: int = 5
+) -> BenchmarkResult:
+    """测量函数耗时
     
-    def test_module_b_difficulty_detection(self, iterations: int = 100) -> Dict:
-        """测试模块B：难点识别性能"""
-        print(f"\n测试模块B：难点识别（{iterations}次迭代）")
-        print("-" * 60)
-        
-        detector = DifficultyDetector()
-        behavior_data = BehaviorData(
-            user_id=1, knowledge_point_id=10,
-            replay_count=3, pause_count=5,
-            total_watch_time=600.0, knowledge_point_duration=200.0, seek_count=2
+    数据准备应在func之外完成，func只包含被测逻辑。
+    计时期间关闭垃圾回收，避免GC停顿带来的抖动。
+    
+    Args:
+        name: 用例名称
+        func: 被测函数（无参数）
+        items: 每次运行处理的数据量
+        params: 用例参数（写入结果）
+        warmup: 预热次数（不计入结果）
+        repeat: 测量次数
+    
+    Returns:
+        测量结果
+    """
+    result = BenchmarkResult(name=name, params=params, items=items, warmup=warmup, repeat=repeat)
+    
+    for _ in range(warmup):
+        func()
+    
+    gc_enabled = gc.isenabled()
+    try:
+        for _ in range(repeat):
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            func()
+            result.times.append(time.perf_counter() - start)
+            if gc_enabled:
+                gc.enable()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    
+    logger.info(f"{name}: median={result.median:.4f}s, throughput={result.throughput:.1f}/s")
+    return result
+
+
+class BenchmarkSuite:
+    """基准测试套件
+    
+    每个bench_*方法生成对应规模的合成数据并测量一个模块，
+    结果汇总为JSON报告。
+    """
+    
+    def __init__(
+        self,
+        scale: str = "small",
+        warmup: int = 1,
+        repeat: int = 5,
+        seed: int = 0,
+        overrides: Optional[Dict[str, Any]] = None
+    ):
+        """初始化基准测试套件
+        
+        Args:
+            scale: 规模预设（small/medium/large）
+            warmup: 每个用例的预热次数
+            repeat: 每个用例的测量次数
+            seed: 合成数据随机种子
+            overrides: 覆盖规模预设中的个别参数
+        
+        Raises:
+            ValueError: 规模预设不存在或参数未知
+        """
+        if scale not in SCALES:
+            raise ValueError(f"Unknown scale: {scale}, expected one of {list(SCALES)}")
+        
+        self.scale = scale
+        self.config = dict(SCALES[scale])
+        for key, value in (overrides or {}).items():
+            if key not in self.config:
+                raise ValueError(f"Unknown benchmark parameter: {key}")
+            self.config[key] = value
+        
+        self.warmup = warmup
+        self.repeat = repeat
+        self.seed = seed
+        self.results: List[BenchmarkResult] = []
+    
+    def bench_segmentation(self) -> BenchmarkResult:
+        """知识点切分：多小时ASR/OCR流"""
+        hours = self.config["stream_hours"]
+        asr_texts = generate_asr_stream(hours, seed=self.seed)
+        ocr_texts = generate_ocr_stream(hours, seed=self.seed)
+        segmenter = KnowledgePointSegmenter(use_similarity_cache=False)
+        
+        return self._measure(
+            "segmentation",
+            lambda: segmenter.segment(asr_texts, ocr_texts),
+            items=len(asr_texts),
+            params={"stream_hours": hours, "asr_segments": len(asr_texts), "ocr_segments": len(ocr_texts)}
         )
-        times = []
-        
-        for i in range(iterations):
-            start_time = time.time()
-            result = detector.detect(behavior_data)
-            elapsed = time.time() - start_time
-            times.append(elapsed)
-        
-        avg_time = sum(times) / len(times)
-        
-        result = {
-            "module": "难点识别",
-            "iterations": iterations,
-            "avg_time": avg_time,
-            "throughput": 1.0 / avg_time if avg_time > 0 else 0
-        }
-        
-        print(f"  平均时间: {avg_time:.4f}秒")
-        print(f"  吞吐量: {result['throughput']:.2f} 次/秒")
-        
-        self.results["difficulty_detection"] = result
-        return result
     
-    def test_module_c_path_generation(self, iterations: int = 50) -> Dict:
-        """测试模块C：学习路径生成性能"""
-        print(f"\n测试模块C：学习路径生成（{iterations}次迭代）")
-        print("-" * 60)
-        
+    def bench_graph_building(self) -> BenchmarkResult:
+        """知识图谱构建：关系检测、建图与环处理"""
+        count = self.config["graph_knowledge_points"]
+        knowledge_points = generate_knowledge_points(count, seed=self.seed)
+        builder = KnowledgeGraphBuilder(use_similarity_cache=False)
+        
+        return self._measure(
+            "graph_building",
+            lambda: builder.build_graph(knowledge_points),
+            items=count,
+            params={"knowledge_points": count}
+        )
+    
+    def bench_path_generation(self) -> BenchmarkResult:
+        """学习路径生成：拓扑排序、补偿资源插入和难度优化"""
+        count = self.config["path_knowledge_points"]
+        dependencies = generate_dependencies(count, seed=self.seed)
+        mastery_status = generate_mastery_status(count, seed=self.seed)
+        difficulty_info = generate_difficulty_info(count, seed=self.seed)
+        difficult_points = [kp_id for kp_id, status in mastery_status.items() if status == "疑难"]
+        generator = LearningPathGenerator(path_cache_size=0)
+        course_dag = generator.compile_course(dependencies)
+        
+        return self._measure(
+            "path_generation",
+            lambda: generator.generate_path(
+                1, mastery_status, course_dag, difficult_points, difficulty_info
+            ),
+            items=count,
+            params={"knowledge_points": count, "dependencies": len(dependencies)}
+        )
+    
+    def bench_path_cache_hit(self) -> BenchmarkResult:
+        """学习路径缓存命中：相同画像的学生复用已生成的路径"""
+        count = self.config["path_knowledge_points"]
+        dependencies = generate_dependencies(count, seed=self.seed)
+        mastery_status = generate_mastery_status(count, seed=self.seed)
+        difficulty_info = generate_difficulty_info(count, seed=self.seed)
+        difficult_points = [kp_id for kp_id, status in mastery_status.items() if status == "疑难"]
         generator = LearningPathGenerator()
-        mastery_status = MOCK_MASTERY_STATUS
-        dependencies = MOCK_DEPENDENCIES
-        times = []
-        
-        for i in range(iterations):
-            start_time = time.time()
-            path = generator.generate_path(1, mastery_status, dependencies)
-            elapsed = time.time() - start_time
-            times.append(elapsed)
-        
-        avg_time = sum(times) / len(times)
-        
-        result = {
-            "module": "学习路径生成",
-            "iterations": iterations,
-            "avg_time": avg_time,
-            "throughput": 1.0 / avg_time if avg_time > 0 else 0
-        }
-        
-        print(f"  平均时间: {avg_time:.4f}秒")
-        print(f"  吞吐量: {result['throughput']:.2f} 次/秒")
-        
-        self.results["path_generation"] = result
-        return result
+        course_dag = generator.compile_course(dependencies)
+        generator.generate_path(1, mastery_status, course_dag, difficult_points, difficulty_info)
+        
+        return self._measure(
+            "path_cache_hit",
+            lambda: generator.generate_path(
+                1, mastery_status, course_dag, difficult_points, difficulty_info
+            ),
+            items=count,
+            params={"knowledge_points": count, "dependencies": len(dependencies)}
+        )
     
-    def test_module_d_resource_generation(self, iterations: int = 20) -> Dict:
-        """测试模块D：资源生成性能"""
-        print(f"\n测试模块D：资源生成（{iterations}次迭代）")
-        print("-" * 60)
-        
-        card_generator = KnowledgeCardGenerator()
-        exercise_generator = ExerciseGenerator()
+    def bench_difficulty_detection(self) -> BenchmarkResult:
+        """个人难点识别：列式批量检测全部学生"""
+        students = self.config["students"]
+        columns = generate_behavior_columns(students, seed=self.seed)
+        detector = DifficultyDetector()
         
-        kp_info = KPInfo(
-            id=10,
-            name="函数定义",
-            summary="函数是一种映射关系。",
-            keywords=["函数", "映射"],
-            difficulty="medium"
+        return self._measure(
+            "difficulty_detection",
+            lambda: detector.detect_columns(columns),
+            items=students,
+            params={"students": students}
+        )
+    
+    def bench_public_detection(self) -> BenchmarkResult:
+        """公共难点识别：单次扫描聚合课程全部知识点"""
+        events = self.config["public_events"]
+        knowledge_points = max(1, events // 1000)
+        behaviors = behaviors_from_columns(
+            generate_behavior_columns(events, knowledge_points, seed=self.seed)
         )
         
-        # 测试知识卡片生成
-        card_times = []
-        for i in range(iterations):
-            start_time = time.time()
-            card = card_generator.generate_card(kp_info, asr_text="函数定义")
-            elapsed = time.time() - start_time
-            card_times.append(elapsed)
-        
-        # 测试练习题生成
-        exercise_times = []
-        for i in range(iterations):
-            start_time = time.time()
-            exercises = exercise_generator.generate_exercises(kp_info, count=5)
-            elapsed = time.time() - start_time
-            exercise_times.append(elapsed)
-        
-        avg_card_time = sum(card_times) / len(card_times)
-        avg_exercise_time = sum(exercise_times) / len(exercise_times)
+        def run():
+            detector = PublicDifficultyDetector()
+            return detector.batch_detect_events(1, behaviors)
         
-        result = {
-            "module": "资源生成",
-            "iterations": iterations,
-            "card_avg_time": avg_card_time,
-            "exercise_avg_time": avg_exercise_time,
-            "total_avg_time": avg_card_time + avg_exercise_time
+        return self._measure(
+            "public_detection",
+            run,
+            items=events,
+            params={"events": events, "knowledge_points": knowledge_points}
+        )
+    
+    def bench_alignment(self) -> BenchmarkResult:
+        """多模态时间戳对齐：ASR、OCR与视频帧"""
+        hours = self.config["alignment_hours"]
+        asr_data, ocr_data, video_frames = generate_alignment_inputs(hours, seed=self.seed)
+        
+        def run():
+            aligner = MultimodalTimestampAligner(use_similarity_cache=False)
+            return aligner.align_timestamps(asr_data, ocr_data, video_frames)
+        
+        return self._measure(
+            "alignment",
+            run,
+            items=len(asr_data),
+            params={
+                "alignment_hours": hours,
+                "asr_segments": len(asr_data),
+                "ocr_segments": len(ocr_data),
+                "video_frames": len(video_frames)
+            }
+        )
+    
+    def benchmarks(self) -> Dict[str, Callable[[], BenchmarkResult]]:
+        """全部基准用例（名称 -> 方法）"""
+        return {
+            "segmentation": self.bench_segmentation,
+            "graph_building": self.bench_graph_building,
+            "path_generation": self.bench_path_generation,
+            "path_cache_hit": self.bench_path_cache_hit,
+            "difficulty_detection": self.bench_difficulty_detection,
+            "public_detection": self.bench_public_detection,
+            "alignment": self.bench_alignment,
         }
-        
-        print(f"  知识卡片平均时间: {avg_card_time:.4f}秒")
-        print(f"  练习题平均时间: {avg_exercise_time:.4f}秒")
-        print(f"  总平均时间: {result['total_avg_time']:.4f}秒")
-        
-        self.results["resource_generation"] = result
-        return result
     
-    def test_batch_operations(self) -> Dict:
-        """测试批量操作性能"""
-        print(f"\n测试批量操作性能")
-        print("-" * 60)
-        
-        # 批量难点识别
-        detector = DifficultyDetector()
-        behavior_list = [
-            BehaviorData(user_id=i, knowledge_point_id=10,
-                        replay_count=3, pause_count=5,
-                        total_watch_time=600.0, knowledge_point_duration=200.0, seek_count=2)
-            for i in range(100)
-        ]
-        
-        start_time = time.time()
-        results = detector.batch_detect(behavior_list)
-        batch_time = time.time() - start_time
-        
-        # 单个操作时间
-        single_start = time.time()
-        for behavior in behavior_list[:10]:
-            detector.detect(behavior)
-        single_time = (time.time() - single_start) / 10
-        
-        result = {
-            "module": "批量操作",
-            "batch_size": len(behavior_list),
-            "batch_time": batch_time,
-            "single_time": single_time,
-            "speedup": (single_time * len(behavior_list)) / batch_time if batch_time > 0 else 0
+    def run(self, only: Optional[List[str]] = None) -> Dict[str, Any]:
+        """运行基准测试
+        
+        Args:
+            only: 只运行指定的用例（可选）
+        
+        Returns:
+            JSON报告字典
+        
+        Raises:
+            ValueError: 用例名称不存在
+        """
+        benchmarks = self.benchmarks()
+        selected = only or list(benchmarks)
+        unknown = [name for name in selected if name not in benchmarks]
+        if unknown:
+            raise ValueError(f"Unknown benchmarks: {unknown}, expected some of {list(benchmarks)}")
+        
+        self.results = [benchmarks[name]() for name in selected]
+        return self.report()
+    
+    def report(self) -> Dict[str, Any]:
+        """生成JSON报告"""
+        return {
+            "schema_version": SCHEMA_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "environment": environment_info(),
+            "scale": self.scale,
+            "config": self.config,
+            "seed": self.seed,
+            "benchmarks": {result.name: result.to_dict() for result in self.results},
         }
-        
-        print(f"  批量处理 {len(behavior_list)} 条记录: {batch_time:.4f}秒")
-        print(f"  单个处理时间: {single_time:.4f}秒")
-        print(f"  加速比: {result['speedup']:.2f}x")
-        
-        self.results["batch_operations"] = result
-        return result
     
-    def profile_module(self, module_name: str, func, *args, **kwargs):
-        """性能分析（使用cProfile）"""
-        print(f"\n性能分析：{module_name}")
-        print("-" * 60)
-        
-        profiler = cProfile.Profile()
-        profiler.enable()
-        
-        result = func(*args, **kwargs)
-        
-        profiler.disable()
-        
-        # 生成分析报告
-        s = StringIO()
-        ps = pstats.Stats(profiler, stream=s)
-        ps.sort_stats('cumulative')
-        ps.print_stats(20)  # 显示前20个最耗时的函数
-        
-        print(s.getvalue())
-        
-        return result
+    def _measure(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        items: int,
+        params: Dict[str, Any]
+    ) -> BenchmarkResult:
+        return measure(name, func, items, params, warmup=self.warmup, repeat=self.repeat)
+
+
+def environment_info() -> Dict[str, Any]:
+    """收集运行环境信息（用于判断两份报告是否可比）"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
     
-    def generate_report(self) -> str:
-        """生成性能测试报告"""
-        report = "\n" + "=" * 60 + "\n"
-        report += "性能测试报告\n"
-        report += "=" * 60 + "\n\n"
-        
-        # 汇总结果
-        report += "## 性能汇总\n\n"
-        report += "| 模块 | 平均时间(秒) | 吞吐量(次/秒) |\n"
-        report += "|------|-------------|--------------|\n"
-        
-        for key, result in self.results.items():
-            module = result.get("module", key)
-            avg_time = result.get("avg_time", result.get("total_avg_time", 0))
-            throughput = result.get("throughput", 0)
-            
-            report += f"| {module} | {avg_time:.4f} | {throughput:.2f} |\n"
-        
-        # 性能瓶颈分析
-        report += "\n## 性能瓶颈分析\n\n"
-        
-        # 找出最慢的模块
-        slowest = max(
-            self.results.items(),
-            key=lambda x: x[1].get("avg_time", x[1].get("total_avg_time", 0))
-        )
-        
-        report += f"**最慢的模块**：{slowest[1].get('module', slowest[0])}\n"
-        report += f"- 平均时间：{slowest[1].get('avg_time', slowest[1].get('total_avg_time', 0)):.4f}秒\n"
-        
-        # 优化建议
-        report += "\n## 优化建议\n\n"
-        
-        for key, result in self.results.items():
-            avg_time = result.get("avg_time", result.get("total_avg_time", 0))
-            if avg_time > 0.1:  # 如果超过100ms
-                module = result.get("module", key)
-                report += f"- **{module}**：平均时间 {avg_time:.4f}秒，建议优化\n"
-        
-        return report
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": commit,
+    }
+
+
+def compare_reports(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    threshold: float = 0.1
+) -> Dict[str, Dict[str, Any]]:
+    """对比两份报告的中位数耗时
     
-    def run_all_tests(self):
-        """运行所有性能测试"""
-        print("=" * 60)
-        print("开始性能测试")
-        print("=" * 60)
-        
-        # 测试各个模块
-        self.test_module_a_segmentation(iterations=10)
-        self.test_module_a_annotation(iterations=10)
-        self.test_module_b_difficulty_detection(iterations=100)
-        self.test_module_c_path_generation(iterations=50)
-        self.test_module_d_resource_generation(iterations=20)
-        self.test_batch_operations()
-        
-        # 生成报告
-        report = self.generate_report()
-        print(report)
-        
-        # 保存报告
-        with open("algorithm/性能测试报告.md", "w", encoding="utf-8") as f:
-            f.write(report)
-        
-        print("\n性能测试报告已保存到：algorithm/性能测试报告.md")
+    Args:
+        baseline: 基线报告
+        current: 当前报告
+        threshold: 判定回归/提升的相对变化阈值（默认10%）
+    
+    Returns:
+        用例名称 -> {baseline, current, ratio, status}，
+        status为regression/improvement/unchanged
+    """
+    comparison = {}
+    for name, result in current.get("benchmarks", {}).items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or base["median"] <= 0:
+            continue
+        
+        ratio = result["median"] / base["median"]
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        
+        comparison[name] = {
+            "baseline": base["median"],
+            "current": result["median"],
+            "ratio": ratio,
+            "status": status,
+        }
+    
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="算法模块性能基准测试")
+    parser.add_argument("--scale", choices=list(SCALES), default="small", help="规模预设")
+    parser.add_argument("--warmup", type=int, default=1, help="每个用例的预热次数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的测量次数")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据随机种子")
+    parser.add_argument("--only", nargs="+", help="只运行指定的用例")
+    parser.add_argument("--set", nargs="+", default=[], metavar="KEY=VALUE", help="覆盖规模预设中的参数")
+    parser.add_argument("--output", help="JSON报告输出路径（默认输出到标准输出）")
+    parser.add_argument("--compare", help="基线JSON报告路径，输出中位数耗时对比")
+    parser.add_argument("--threshold", type=float, default=0.1, help="回归判定阈值（相对变化）")
+    args = parser.parse_args(argv)
+    
+    # 各模块导入时以INFO级别配置了日志，这里统一降低，避免日志干扰计时
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    overrides = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        overrides[key] = float(value) if "." in value else int(value)
+    
+    suite = BenchmarkSuite(
+        scale=args.scale, warmup=args.warmup, repeat=args.repeat,
+        seed=args.seed, overrides=overrides
+    )
+    report = suite.run(args.only)
+    
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["comparison"] = compare_reports(json.load(f), report, args.threshold)
+    
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    regressions = [
+        name for name, item in report.get("comparison", {}).items()
+        if item["status"] == "regression"
+    ]
+    return 1 if regressions else 0
 
 
 if __name__ == "__main__":
-    tester = PerformanceTester()
-    tester.run_all_tests()
+    sys.exit(main())
@@ -5,9 +5,9 @@
 """
 
 import logging
-from typing import List, Dict, Optional
-from dataclasses import dataclass
-from difficulty_detector import DifficultyDetector, BehaviorData, DifficultyResult
+from typing import Iterable, List, Dict, Optional
+from dataclasses import dataclass, field
+from difficulty_detector import DifficultyDetector, BehaviorData, behavior_columns
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +25,166 @@ class PublicDifficultyResult:
     recommendation: str  # 教学建议
 
 
+@dataclass
+class KnowledgePointDifficultyStats:
+    """单个知识点的难点统计（流式累加）"""
+    knowledge_point_id: int
+    record_count: int = 0  # 已处理的行为记录数（同一学生可能有多条）
+    difficult_count: int = 0  # 判定为困难的记录数
+    score_sum: float = 0.0  # 困难度分数之和
+    affected_bitmap: bytearray = field(default_factory=bytearray)  # 受影响学生位图（按学生序号）
+    
+    @property
+    def difficulty_ratio(self) -> float:
+        """困难记录比例（0-1），每个学生一条记录时即困难学生比例"""
+        return self.difficult_count / self.record_count if self.record_count > 0 else 0.0
+    
+    @property
+    def average_difficulty_score(self) -> float:
+        """平均困难度分数"""
+        return self.score_sum / self.record_count if self.record_count > 0 else 0.0
+
+
+class PublicDifficultyAggregator:
+    """公共难点流式聚合器
+    
+    行为事件只处理一次：每批事件用DifficultyDetector.detect_columns向量化判定，
+    再按知识点累加困难记录数、分数之和和受影响学生位图。
+    困难比例和平均分数查询均为O(1)。
+    """
+    
+    def __init__(self, difficulty_detector: Optional[DifficultyDetector] = None):
+        """初始化聚合器
+        
+        Args:
+            difficulty_detector: 难点识别器实例，如果为None则创建新实例
+        """
+        self.difficulty_detector = difficulty_detector or DifficultyDetector()
+        
+        # 学生ID -> 位图中的序号，以及序号 -> 学生ID
+        self._student_index: Dict[int, int] = {}
+        self._student_ids: List[int] = []
+        
+        # 知识点ID -> 统计
+        self._stats: Dict[int, KnowledgePointDifficultyStats] = {}
+    
+    def add(self, behavior_data: BehaviorData, knowledge_point_id: Optional[int] = None) -> None:
+        """处理单条行为事件
+        
+        Args:
+            behavior_data: 行为数据
+            knowledge_point_id: 归属的知识点ID，如果为None则使用behavior_data.knowledge_point_id
+        """
+        self.add_batch([behavior_data], knowledge_point_id)
+    
+    def add_batch(
+        self,
+        behaviors: List[BehaviorData],
+        knowledge_point_id: Optional[int] = None
+    ) -> None:
+        """处理一批行为事件
+        
+        Args:
+            behaviors: 行为数据列表
+            knowledge_point_id: 归属的知识点ID，如果为None则使用各条记录的knowledge_point_id
+        """
+        if not behaviors:
+            return
+        
+        batch_result = self.difficulty_detector.detect_columns(behavior_columns(behaviors))
+        scores = batch_result.difficulty_scores.tolist()
+        difficult = batch_result.is_difficult.tolist()
+        
+        for i, behavior_data in enumerate(behaviors):
+            kp_id = knowledge_point_id if knowledge_point_id is not None else behavior_data.knowledge_point_id
+            stats = self._stats.get(kp_id)
+            if stats is None:
+                stats = self._stats[kp_id] = KnowledgePointDifficultyStats(knowledge_point_id=kp_id)
+            
+            stats.record_count += 1
+            stats.score_sum += scores[i]
+            
+            if difficult[i]:
+                stats.difficult_count += 1
+                self._mark_affected(stats, behavior_data.user_id)
+    
+    def _mark_affected(self, stats: KnowledgePointDifficultyStats, user_id: int) -> None:
+        """在位图中标记受影响学生（同一学生只记录一次）"""
+        index = self._student_index.get(user_id)
+        if index is None:
+            index = self._student_index[user_id] = len(self._student_ids)
+            self._student_ids.append(user_id)
+        byte_index, bit = divmod(index, 8)
+        
+        bitmap = stats.affected_bitmap
+        if byte_index >= len(bitmap):
+            bitmap.extend(bytes(byte_index + 1 - len(bitmap)))
+        bitmap[byte_index] |= 1 << bit
+    
+    def get_stats(self, knowledge_point_id: int) -> Optional[KnowledgePointDifficultyStats]:
+        """获取知识点统计
+        
+        Args:
+            knowledge_point_id: 知识点ID
+        
+        Returns:
+            统计对象，未见过该知识点时返回None
+        """
+        return self._stats.get(knowledge_point_id)
+    
+    def get_difficulty_ratio(self, knowledge_point_id: int) -> float:
+        """查询困难学生比例（O(1)）"""
+        stats = self._stats.get(knowledge_point_id)
+        return stats.difficulty_ratio if stats else 0.0
+    
+    def get_average_score(self, knowledge_point_id: int) -> float:
+        """查询平均困难度分数（O(1)）"""
+        stats = self._stats.get(knowledge_point_id)
+        return stats.average_difficulty_score if stats else 0.0
+    
+    def is_affected(self, knowledge_point_id: int, user_id: int) -> bool:
+        """查询学生是否在该知识点上遇到困难（O(1)）"""
+        stats = self._stats.get(knowledge_point_id)
+        index = self._student_index.get(user_id)
+        if stats is None or index is None:
+            return False
+        
+        byte_index, bit = divmod(index, 8)
+        return byte_index < len(stats.affected_bitmap) and bool(stats.affected_bitmap[byte_index] & (1 << bit))
+    
+    def get_affected_students(self, knowledge_point_id: int) -> List[int]:
+        """从位图解码受影响学生ID（按学生首次遇到困难的顺序）
+        
+        Args:
+            knowledge_point_id: 知识点ID
+        
+        Returns:
+            受影响学生ID列表
+        """
+        stats = self._stats.get(knowledge_point_id)
+        if stats is None:
+            return []
+        
+        student_ids = self._student_ids
+        affected = []
+        for byte_index, byte in enumerate(stats.affected_bitmap):
+            while byte:
+                bit = (byte & -byte).bit_length() - 1
+                affected.append(student_ids[byte_index * 8 + bit])
+                byte &= byte - 1
+        return affected
+    
+    def knowledge_point_ids(self) -> List[int]:
+        """返回已处理的知识点ID（按首次出现顺序）"""
+        return list(self._stats.keys())
+    
+    def reset(self) -> None:
+        """清空所有统计"""
+        self._student_index.clear()
+        self._student_ids.clear()
+        self._stats.clear()
+
+
 class PublicDifficultyDetector:
     """公共难点识别器
     
@@ -46,6 +206,9 @@ class PublicDifficultyDetector:
         self.difficulty_ratio_threshold = difficulty_ratio_threshold
         self.difficulty_detector = difficulty_detector or DifficultyDetector()
         
+        # 流式聚合器：通过record_events持续累加行为事件
+        self.aggregator = PublicDifficultyAggregator(self.difficulty_detector)
+        
         logger.info(f"PublicDifficultyDetector initialized with threshold={difficulty_ratio_threshold}")
     
     def detect_public_difficulty(
@@ -76,41 +239,18 @@ class PublicDifficultyDetector:
                     recommendation="暂无数据"
                 )
             
-            # 对每个学生进行难点检测
-            difficulty_results = []
-            difficult_students = []
-            
-            for behavior_data in all_students_behavior:
-                result = self.difficulty_detector.detect(behavior_data)
-                difficulty_results.append(result)
-                
-                if result.is_difficult:
-                    difficult_students.append(behavior_data.user_id)
-            
-            # 计算困难学生比例
-            difficulty_ratio = len(difficult_students) / len(all_students_behavior)
-            
-            # 计算平均困难度分数
-            average_difficulty_score = sum(r.difficulty_score for r in difficulty_results) / len(difficulty_results)
+            # 一次扫描完成所有学生的难点检测和统计
+            aggregator = PublicDifficultyAggregator(self.difficulty_detector)
+            aggregator.add_batch(all_students_behavior, knowledge_point_id)
             
-            # 判断是否为公共难点
-            is_public_difficulty = difficulty_ratio >= self.difficulty_ratio_threshold
+            result = self.build_result(aggregator, knowledge_point_id)
             
-            # 生成教学建议
-            recommendation = self.get_recommendation(difficulty_ratio, average_difficulty_score)
-            
-            result = PublicDifficultyResult(
-                knowledge_point_id=knowledge_point_id,
-                is_public_difficulty=is_public_difficulty,
-                difficulty_ratio=difficulty_ratio,
-                average_difficulty_score=average_difficulty_score,
-                affected_students=difficult_students,
-                recommendation=recommendation
+            logger.info(
+                f"Public difficulty detection completed: is_public={result.is_public_difficulty}, "
+                f"ratio={result.difficulty_ratio:.2f}"
             )
-            
-            logger.info(f"Public difficulty detection completed: is_public={is_public_difficulty}, ratio={difficulty_ratio:.2f}")
             return result
-            
+        
         except Exception as e:
             logger.error(f"Error in public difficulty detection: {e}", exc_info=True)
             raise
@@ -118,27 +258,84 @@ class PublicDifficultyDetector:
     def calculate_difficulty_ratio(
         self,
         knowledge_point_id: int,
-        behavior_data: List[BehaviorData]
+        behavior_data: Optional[List[BehaviorData]] = None
     ) -> float:
         """计算困难学生比例
         
         Args:
             knowledge_point_id: 知识点ID
-            behavior_data: 行为数据列表
+            behavior_data: 行为数据列表；为None时直接查询流式聚合器（O(1)）
         
         Returns:
             困难学生比例（0-1）
         """
+        if behavior_data is None:
+            return self.aggregator.get_difficulty_ratio(knowledge_point_id)
+        
         if not behavior_data:
             return 0.0
         
-        difficult_count = 0
-        for behavior in behavior_data:
-            result = self.difficulty_detector.detect(behavior)
-            if result.is_difficult:
-                difficult_count += 1
+        batch_result = self.difficulty_detector.detect_columns(behavior_columns(behavior_data))
+        return int(batch_result.is_difficult.sum()) / len(behavior_data)
+    
+    def record_events(self, behaviors: Iterable[BehaviorData]) -> None:
+        """将行为事件累加到流式聚合器
         
-        return difficult_count / len(behavior_data)
+        事件按各自的knowledge_point_id归属，之后可通过calculate_difficulty_ratio(kp_id)
+        或get_aggregated_result(kp_id)以O(1)查询。
+        
+        Args:
+            behaviors: 行为事件
+        """
+        self.aggregator.add_batch(list(behaviors))
+    
+    def get_aggregated_result(self, knowledge_point_id: int) -> PublicDifficultyResult:
+        """从流式聚合器获取知识点的公共难点识别结果
+        
+        Args:
+            knowledge_point_id: 知识点ID
+        
+        Returns:
+            公共难点识别结果
+        """
+        return self.build_result(self.aggregator, knowledge_point_id)
+    
+    def build_result(
+        self,
+        aggregator: PublicDifficultyAggregator,
+        knowledge_point_id: int
+    ) -> PublicDifficultyResult:
+        """根据聚合器中的知识点统计生成公共难点识别结果
+        
+        Args:
+            aggregator: 流式聚合器
+            knowledge_point_id: 知识点ID
+        
+        Returns:
+            公共难点识别结果
+        """
+        stats = aggregator.get_stats(knowledge_point_id)
+        if stats is None or stats.record_count == 0:
+            return PublicDifficultyResult(
+                knowledge_point_id=knowledge_point_id,
+                is_public_difficulty=False,
+                difficulty_ratio=0.0,
+                average_difficulty_score=0.0,
+                affected_students=[],
+                recommendation="暂无数据"
+            )
+        
+        difficulty_ratio = stats.difficulty_ratio
+        average_difficulty_score = stats.average_difficulty_score
+        
+        return PublicDifficultyResult(
+            knowledge_point_id=stats.knowledge_point_id,
+            is_public_difficulty=difficulty_ratio >= self.difficulty_ratio_threshold,
+            difficulty_ratio=difficulty_ratio,
+            average_difficulty_score=average_difficulty_score,
+            affected_students=aggregator.get_affected_students(knowledge_point_id),
+            recommendation=self.get_recommendation(difficulty_ratio, average_difficulty_score)
+        )
     
     def get_recommendation(
         self,
@@ -179,11 +376,35 @@ class PublicDifficultyDetector:
         Returns:
             公共难点识别结果列表
         """
-        results = []
-        
+        aggregator = PublicDifficultyAggregator(self.difficulty_detector)
         for kp_id, behavior_list in knowledge_point_behaviors.items():
-            result = self.detect_public_difficulty(kp_id, behavior_list)
-            results.append(result)
+            aggregator.add_batch(behavior_list, kp_id)
+        
+        results = [self.build_result(aggregator, kp_id) for kp_id in knowledge_point_behaviors]
+        
+        logger.info(f"Batch detection completed for video {video_id}: {len(results)} knowledge points")
+        return results
+    
+    def batch_detect_events(
+        self,
+        video_id: int,
+        behaviors: Iterable[BehaviorData]
+    ) -> List[PublicDifficultyResult]:
+        """一次扫描检测课程所有知识点
+        
+        行为事件无需预先按知识点分组，按各自的knowledge_point_id归属。
+        
+        Args:
+            video_id: 视频ID
+            behaviors: 所有学生、所有知识点的行为事件
+        
+        Returns:
+            公共难点识别结果列表（按知识点首次出现顺序）
+        """
+        aggregator = PublicDifficultyAggregator(self.difficulty_detector)
+        aggregator.add_batch(list(behaviors))
+        
+        results = [self.build_result(aggregator, kp_id) for kp_id in aggregator.knowledge_point_ids()]
         
         logger.info(f"Batch detection completed for video {video_id}: {len(results)} knowledge points")
         return results
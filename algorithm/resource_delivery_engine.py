@@ -0,0 +1,424 @@
+"""
+补偿资源异步批量投递引擎
+
+考试日前后会在几分钟内为大量学生推送补偿资源，逐条同步推送会成为瓶颈。本模块基于asyncio：
+1. 每个推送通道（websocket、message_queue）维护一个连接池，连接在批次之间复用
+2. 微批处理：同一通道的消息凑满batch_size条，或距本批第一条消息超过flush_interval秒时一次发送
+3. 同时在途的批次数不超过max_in_flight，超出时submit等待（背压）
+4. 发送失败的批次按指数退避重试，最多max_retries次；失败的连接被丢弃，重试时重新建立
+
+连接通过工厂函数创建，只需实现send_batch和close。内置的StreamConnection使用asyncio流，
+每批消息编码为一行JSON帧，服务端回复一行确认，便于用进程内的模拟服务端测试。
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class DeliveryError(Exception):
+    """服务端拒绝了一批消息"""
+
+
+class StreamConnection:
+    """基于asyncio流的推送连接
+    
+    请求帧：{"channel": 通道名, "messages": [...]}，以换行结尾
+    确认帧：{"ok": true} 或 {"ok": false, "error": 错误信息}，以换行结尾
+    """
+    
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, channel: str):
+        """初始化连接
+        
+        Args:
+            reader: 流读取端
+            writer: 流写入端
+            channel: 通道名（写入每个请求帧）
+        """
+        self.reader = reader
+        self.writer = writer
+        self.channel = channel
+    
+    @classmethod
+    async def open(cls, host: str, port: int, channel: str) -> "StreamConnection":
+        """建立连接
+        
+        Args:
+            host: 服务端地址
+            port: 服务端端口
+            channel: 通道名
+        
+        Returns:
+            连接实例
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, channel)
+    
+    async def send_batch(self, messages: List[Dict[str, Any]]):
+        """发送一批消息并等待确认
+        
+        Args:
+            messages: 消息列表（可JSON序列化）
+        
+        Raises:
+            ConnectionError: 连接在收到确认前关闭
+            DeliveryError: 服务端拒绝了这批消息
+        """
+        frame = json.dumps({"channel": self.channel, "messages": messages}, ensure_ascii=False)
+        self.writer.write(frame.encode("utf-8") + b"\n")
+        await self.writer.drain()
+        
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("connection closed before acknowledgement")
+        
+        ack = json.loads(line)
+        if not ack.get("ok"):
+            raise DeliveryError(ack.get("error", "rejected"))
+    
+    async def close(self):
+        """关闭连接"""
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+def stream_connection_factory(host: str, port: int, channel: str) -> Callable[[], Awaitable[StreamConnection]]:
+    """创建StreamConnection的工厂函数
+    
+    Args:
+        host: 服务端地址
+        port: 服务端端口
+        channel: 通道名
+    
+    Returns:
+        无参数的异步工厂函数
+    """
+    async def factory() -> StreamConnection:
+        return await StreamConnection.open(host, port, channel)
+    
+    return factory
+
+
+class ConnectionPool:
+    """单个通道的连接池
+    
+    同时借出的连接数不超过size；空闲连接按后进先出复用，不足时按需新建。
+    """
+    
+    def __init__(self, factory: Callable[[], Awaitable[Any]], size: int):
+        """初始化连接池
+        
+        Args:
+            factory: 创建连接的异步工厂函数
+            size: 最大连接数
+        
+        Raises:
+            ValueError: 当size不是正数时
+        """
+        if size <= 0:
+            raise ValueError(f"size must be positive, got {size}")
+        
+        self.factory = factory
+        self.size = size
+        
+        self._idle: List[Any] = []
+        self._slots = asyncio.Semaphore(size)
+        
+        # 统计计数
+        self.opened = 0
+        self.discarded = 0
+    
+    async def acquire(self) -> Any:
+        """借出一个连接（连接数已满时等待）
+        
+        Returns:
+            连接
+        """
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        
+        try:
+            connection = await self.factory()
+        except BaseException:
+            self._slots.release()
+            raise
+        
+        self.opened += 1
+        return connection
+    
+    async def release(self, connection: Any, broken: bool = False):
+        """归还连接
+        
+        Args:
+            connection: 借出的连接
+            broken: 连接是否已损坏（损坏的连接被关闭而不是放回池中）
+        """
+        try:
+            if broken:
+                self.discarded += 1
+                await connection.close()
+            else:
+                self._idle.append(connection)
+        finally:
+            self._slots.release()
+    
+    async def close(self):
+        """关闭全部空闲连接"""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await connection.close()
+
+
+class AsyncDeliveryEngine:
+    """异步批量投递引擎
+    
+    必须在事件循环中使用；不再使用时调用close发送剩余消息并关闭连接。
+    """
+    
+    DEFAULT_BATCH_SIZE = 100
+    DEFAULT_FLUSH_INTERVAL = 0.05
+    
+    def __init__(
+        self,
+        connection_factories: Dict[str, Callable[[], Awaitable[Any]]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_in_flight: int = 16,
+        pool_size: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 0.05,
+        max_backoff: float = 2.0,
+        send_timeout: float = 10.0
+    ):
+        """初始化投递引擎
+        
+        Args:
+            connection_factories: 通道名到连接工厂函数的映射，连接需实现send_batch和close
+            batch_size: 每批最多消息数
+            flush_interval: 每批最长等待时间（秒）
+            max_in_flight: 同时在途的最大批次数（所有通道合计）
+            pool_size: 每个通道的最大连接数
+            max_retries: 每批最大重试次数
+            retry_backoff: 首次重试前的等待时间（秒），之后每次翻倍
+            max_backoff: 重试等待时间上限（秒）
+            send_timeout: 单次发送（含确认）的超时时间（秒）
+        
+        Raises:
+            ValueError: 当参数不合法时
+        """
+        if not connection_factories:
+            raise ValueError("at least one channel is required")
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        if flush_interval < 0:
+            raise ValueError(f"flush_interval must be non-negative, got {flush_interval}")
+        if max_in_flight <= 0:
+            raise ValueError(f"max_in_flight must be positive, got {max_in_flight}")
+        if max_retries < 0:
+            raise ValueError(f"max_retries must be non-negative, got {max_retries}")
+        
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.send_timeout = send_timeout
+        
+        self.pools: Dict[str, ConnectionPool] = {
+            channel: ConnectionPool(factory, pool_size)
+            for channel, factory in connection_factories.items()
+        }
+        
+        # 各通道未发送的(消息, 结果Future)和刷新定时器
+        self._buffers: Dict[str, List[Tuple[Dict[str, Any], asyncio.Future]]] = {
+            channel: [] for channel in self.pools
+        }
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        
+        # 延迟到第一次使用时创建（需要运行中的事件循环）
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        
+        # 统计计数
+        self.submitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.batches_sent = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        
+        logger.info(
+            f"AsyncDeliveryEngine initialized: channels={list(self.pools)}, "
+            f"batch_size={batch_size}, max_in_flight={max_in_flight}"
+        )
+    
+    async def submit(self, channel: str, message: Dict[str, Any]) -> asyncio.Future:
+        """提交一条消息
+        
+        消息进入所属通道的当前批次，满批时立即发送（在途批次已满时等待）。
+        
+        Args:
+            channel: 通道名
+            message: 消息（可JSON序列化）
+        
+        Returns:
+            投递结果Future，所在批次发送成功时结果为True，重试耗尽后为False
+        
+        Raises:
+            ValueError: 当通道未配置时
+        """
+        if channel not in self.pools:
+            raise ValueError(f"Unknown channel: {channel}")
+        
+        future = asyncio.get_running_loop().create_future()
+        buffer = self._buffers[channel]
+        buffer.append((message, future))
+        self.submitted += 1
+        
+        if len(buffer) >= self.batch_size:
+            await self._flush_channel(channel)
+        elif len(buffer) == 1 and channel not in self._timers:
+            self._timers[channel] = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._on_timer, channel
+            )
+        
+        return future
+    
+    async def deliver(self, channel: str, messages: List[Dict[str, Any]]) -> List[bool]:
+        """提交一组消息并等待全部投递完成
+        
+        Args:
+            channel: 通道名
+            messages: 消息列表
+        
+        Returns:
+            与messages一一对应的投递结果
+        """
+        futures = [await self.submit(channel, message) for message in messages]
+        await self.flush()
+        return list(await asyncio.gather(*futures))
+    
+    async def flush(self):
+        """立即发送所有通道未满的批次，并等待在途批次完成"""
+        for channel in self.pools:
+            if self._buffers[channel]:
+                await self._flush_channel(channel)
+        
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+    
+    async def close(self):
+        """发送剩余消息并关闭所有连接"""
+        await self.flush()
+        for pool in self.pools.values():
+            await pool.close()
+        
+        logger.info(f"AsyncDeliveryEngine closed: {self.delivered} delivered, {self.failed} failed")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取投递统计
+        
+        Returns:
+            统计字典
+        """
+        return {
+            "submitted": self.submitted,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "buffered": sum(len(buffer) for buffer in self._buffers.values()),
+            "batches_sent": self.batches_sent,
+            "retries": self.retries,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "connections_opened": {channel: pool.opened for channel, pool in self.pools.items()},
+            "connections_discarded": {channel: pool.discarded for channel, pool in self.pools.items()}
+        }
+    
+    def _on_timer(self, channel: str):
+        """批次等待超时，在新任务中发送（定时回调中不能等待在途批次名额）"""
+        self._timers.pop(channel, None)
+        if self._buffers[channel]:
+            self._track(asyncio.ensure_future(self._flush_channel(channel)))
+    
+    async def _flush_channel(self, channel: str):
+        """取出通道当前批次并启动发送任务"""
+        timer = self._timers.pop(channel, None)
+        if timer is not None:
+            timer.cancel()
+        
+        batch = self._buffers[channel]
+        if not batch:
+            return
+        self._buffers[channel] = []
+        
+        if self._in_flight is None:
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        await self._in_flight.acquire()
+        
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self._track(asyncio.ensure_future(self._send(channel, batch)))
+    
+    def _track(self, task: asyncio.Future):
+        """记录后台任务，flush时等待其完成"""
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _send(self, channel: str, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        """发送一批消息，失败时按指数退避重试"""
+        messages = [message for message, _ in batch]
+        pool = self.pools[channel]
+        success = False
+        
+        try:
+            for attempt in range(self.max_retries + 1):
+                if attempt > 0:
+                    self.retries += 1
+                    await asyncio.sleep(min(self.max_backoff, self.retry_backoff * 2 ** (attempt - 1)))
+                
+                try:
+                    connection = await pool.acquire()
+                except (OSError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Failed to connect to {channel} (attempt {attempt + 1}): {e}")
+                    continue
+                
+                try:
+                    await asyncio.wait_for(connection.send_batch(messages), self.send_timeout)
+                except (OSError, ValueError, DeliveryError, asyncio.TimeoutError) as e:
+                    # 连接状态未知（可能残留未读的确认帧），不再复用
+                    await pool.release(connection, broken=True)
+                    logger.warning(f"Failed to deliver {len(messages)} messages via {channel} (attempt {attempt + 1}): {e}")
+                    continue
+                except BaseException:
+                    # 其他异常（包括取消）同样要归还名额，否则连接池会永久少一个连接
+                    await pool.release(connection, broken=True)
+                    raise
+                
+                await pool.release(connection)
+                success = True
+                break
+        finally:
+            self.in_flight -= 1
+            self._in_flight.release()
+            
+            self.batches_sent += 1
+            if success:
+                self.delivered += len(batch)
+            else:
+                self.failed += len(batch)
+                logger.error(f"Giving up on {len(batch)} messages via {channel} after {self.max_retries} retries")
+            
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(success)
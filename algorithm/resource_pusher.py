@@ -2,31 +2,25 @@
 补偿资源推送机制
 
 将生成的资源推送给学生，支持多种推送方式。
+websocket和message_queue方式可以配置异步批量投递引擎（AsyncDeliveryEngine），
+通过batch_push_async以连接复用、微批处理和有界并发的方式推送大量资源。
 """
 
 import logging
-from typing import List, Dict, Optional
-from dataclasses import dataclass
+import uuid
+from typing import Any, List, Dict, Optional, Union
 from datetime import datetime
 import json
 
+from bounded_history import BoundedHistory
+from resource_delivery_engine import AsyncDeliveryEngine
+from resource_store import Resource, ResourceStore, SQLiteResourceStore
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
-class Resource:
-    """资源对象"""
-    resource_id: str
-    user_id: int
-    knowledge_point_id: int
-    resource_type: str  # knowledge_card, exercise, video
-    content: str  # Markdown或JSON格式的内容
-    created_at: datetime
-    status: str = "pending"  # pending, sent, read
-
-
 class ResourcePusher:
     """资源推送器
     
@@ -36,22 +30,42 @@ class ResourcePusher:
     def __init__(
         self,
         push_method: str = "database",  # websocket, message_queue, database
-        max_retries: int = 3
+        max_retries: int = 3,
+        history_limit: Optional[int] = BoundedHistory.DEFAULT_MAX_RECORDS,
+        history_spill_path: Optional[str] = None,
+        delivery_engine: Optional[AsyncDeliveryEngine] = None,
+        resource_store: Optional[Union[ResourceStore, SQLiteResourceStore]] = None
     ):
         """初始化资源推送器
         
         Args:
             push_method: 推送方式（websocket, message_queue, database）
             max_retries: 最大重试次数
+            history_limit: 推送历史在内存中保留的最大记录数，None表示不限制
+            history_spill_path: 推送历史溢出文件路径（可选）
+            delivery_engine: 异步批量投递引擎（可选），需要配置与push_method同名的通道，
+                供batch_push_async使用；引擎的max_retries必须与max_retries一致
+            resource_store: 资源存储（可选），默认使用内存存储，每个用户的sent和read资源各自保留最近的
+                ResourceStore.DEFAULT_MAX_FINISHED_PER_USER条（pending资源不淘汰）；需要持久化或
+                其他保留数量时传入配置好的ResourceStore/SQLiteResourceStore
         """
+        if delivery_engine is not None and delivery_engine.max_retries != max_retries:
+            raise ValueError(
+                f"delivery_engine.max_retries ({delivery_engine.max_retries}) "
+                f"does not match max_retries ({max_retries})"
+            )
+        
         self.push_method = push_method
         self.max_retries = max_retries
+        self.delivery_engine = delivery_engine
         
-        # 推送历史（模拟数据库）
-        self.push_history: List[Resource] = []
+        # 推送历史（模拟数据库，有界，超出后淘汰最旧记录）
+        self.push_history: BoundedHistory[Resource] = BoundedHistory(
+            max_records=history_limit, spill_path=history_spill_path
+        )
         
-        # 待推送资源（模拟数据库）
-        self.pending_resources: Dict[int, List[Resource]] = {}
+        # 资源存储（按ID索引，按用户和状态分区），推送的每个资源都写入，已推送/已读的资源按保留策略淘汰
+        self.resource_store = resource_store if resource_store is not None else ResourceStore()
         
         logger.info(f"ResourcePusher initialized with method: {push_method}")
     
@@ -77,16 +91,8 @@ class ResourcePusher:
             logger.info(f"Pushing resource: user={user_id}, kp={knowledge_point_id}, type={resource_type}")
             
             # 创建资源对象
-            resource_id = f"{user_id}_{knowledge_point_id}_{resource_type}_{datetime.now().timestamp()}"
-            resource = Resource(
-                resource_id=resource_id,
-                user_id=user_id,
-                knowledge_point_id=knowledge_point_id,
-                resource_type=resource_type,
-                content=resource_content,
-                created_at=datetime.now(),
-                status="pending"
-            )
+            resource = self._create_resource(user_id, knowledge_point_id, resource_type, resource_content)
+            resource_id = resource.resource_id
             
             # 根据推送方式推送
             success = False
@@ -98,16 +104,16 @@ class ResourcePusher:
                 success = self.push_via_database(user_id, resource)
             
             if success:
-                resource.status = "sent"
+                self._set_status(resource, "sent")
                 logger.info(f"Resource pushed successfully: {resource_id}")
             else:
                 logger.warning(f"Failed to push resource: {resource_id}")
             
             # 记录推送历史
-            self.push_history.append(resource)
+            self._record(resource)
             
             return success
-            
+        
         except Exception as e:
             logger.error(f"Error pushing resource: {e}", exc_info=True)
             return False
@@ -163,11 +169,8 @@ class ResourcePusher:
             是否推送成功
         """
         try:
-            # 将资源添加到待推送列表
-            if user_id not in self.pending_resources:
-                self.pending_resources[user_id] = []
-            
-            self.pending_resources[user_id].append(resource)
+            # 将资源写入资源存储（pending状态）
+            self.resource_store.add(resource)
             
             logger.debug(f"Resource added to database for user {user_id}")
             return True
@@ -184,24 +187,35 @@ class ResourcePusher:
         Returns:
             待推送资源列表
         """
-        if user_id not in self.pending_resources:
-            return []
-        
-        resources = self.pending_resources[user_id]
-        
-        # 转换为字典格式
-        result = []
-        for resource in resources:
-            if resource.status == "pending":
-                result.append({
-                    "resource_id": resource.resource_id,
-                    "knowledge_point_id": resource.knowledge_point_id,
-                    "resource_type": resource.resource_type,
-                    "content": resource.content,
-                    "created_at": resource.created_at.isoformat()
-                })
-        
-        return result
+        resources, _ = self.resource_store.list_by_status(user_id, "pending")
+        return [self._to_pending_item(resource) for resource in resources]
+    
+    def get_pending_page(
+        self,
+        user_id: int,
+        cursor: Optional[str] = None,
+        page_size: int = 50
+    ) -> Dict[str, Any]:
+        """分页获取待推送资源（学生登录时使用，耗时只与页大小有关）
+        
+        Args:
+            user_id: 用户ID
+            cursor: 上一页返回的next_cursor，None表示第一页
+            page_size: 每页资源数
+        
+        Returns:
+            {"resources": 本页资源列表, "next_cursor": 下一页游标（没有下一页时为None）}
+        
+        Raises:
+            ValueError: 当游标或page_size不合法时
+        """
+        resources, next_cursor = self.resource_store.list_by_status(
+            user_id, "pending", cursor=cursor, limit=page_size
+        )
+        return {
+            "resources": [self._to_pending_item(resource) for resource in resources],
+            "next_cursor": next_cursor
+        }
     
     def mark_as_read(
         self,
@@ -218,25 +232,13 @@ class ResourcePusher:
             是否标记成功
         """
         try:
-            if user_id not in self.pending_resources:
-                return False
-            
-            # 查找资源
-            for resource in self.pending_resources[user_id]:
-                if resource.resource_id == resource_id:
-                    resource.status = "read"
-                    logger.info(f"Resource marked as read: {resource_id}")
-                    return True
-            
-            # 也在历史记录中查找
-            for resource in self.push_history:
-                if resource.resource_id == resource_id and resource.user_id == user_id:
-                    resource.status = "read"
-                    return True
+            if self.resource_store.update_status(resource_id, "read", user_id=user_id):
+                logger.info(f"Resource marked as read: {resource_id}")
+                return True
             
             logger.warning(f"Resource not found: {resource_id}")
             return False
-            
+        
         except Exception as e:
             logger.error(f"Error marking resource as read: {e}")
             return False
@@ -275,6 +277,119 @@ class ResourcePusher:
             "success": success_count,
             "failed": failed_count
         }
+    
+    async def batch_push_async(
+        self,
+        resources: List[Dict]
+    ) -> Dict[str, int]:
+        """通过异步投递引擎批量推送资源
+        
+        资源按push_method对应的通道提交给投递引擎，由引擎负责微批处理、连接复用、
+        并发控制和重试（最多max_retries次，初始化时已校验与引擎一致）。未配置投递引擎、
+        引擎没有push_method对应的通道或推送方式为database时退化为batch_push。
+        
+        Args:
+            resources: 资源列表，每个资源包含 user_id, knowledge_point_id, resource_type, content
+        
+        Returns:
+            推送结果统计：{"success": count, "failed": count}
+        """
+        if self.delivery_engine is None or self.push_method == "database":
+            return self.batch_push(resources)
+        
+        if self.push_method not in self.delivery_engine.pools:
+            logger.warning(
+                f"Delivery engine has no channel for push method {self.push_method}, "
+                f"falling back to batch_push"
+            )
+            return self.batch_push(resources)
+        
+        created = []
+        futures = []
+        for resource_data in resources:
+            resource = self._create_resource(
+                user_id=resource_data["user_id"],
+                knowledge_point_id=resource_data["knowledge_point_id"],
+                resource_type=resource_data["resource_type"],
+                resource_content=resource_data["content"]
+            )
+            created.append(resource)
+            futures.append(await self.delivery_engine.submit(self.push_method, self._to_message(resource)))
+        
+        await self.delivery_engine.flush()
+        
+        success_count = 0
+        for resource, future in zip(created, futures):
+            if future.result():
+                resource.status = "sent"
+                success_count += 1
+            self._record(resource)
+        
+        failed_count = len(created) - success_count
+        logger.info(f"Async batch push completed: {success_count} success, {failed_count} failed")
+        
+        return {
+            "success": success_count,
+            "failed": failed_count
+        }
+    
+    def _create_resource(
+        self,
+        user_id: int,
+        knowledge_point_id: int,
+        resource_type: str,
+        resource_content: str
+    ) -> Resource:
+        """创建待推送的资源对象
+        
+        资源ID带随机后缀：同一时刻为同一用户生成的多个资源（批量推送时很常见）不会重复。
+        """
+        return Resource(
+            resource_id=f"{user_id}_{knowledge_point_id}_{resource_type}_{uuid.uuid4().hex[:16]}",
+            user_id=user_id,
+            knowledge_point_id=knowledge_point_id,
+            resource_type=resource_type,
+            content=resource_content,
+            created_at=datetime.now(),
+            status="pending"
+        )
+    
+    def _set_status(self, resource: Resource, status: str):
+        """修改资源状态，已写入资源存储的资源同步更新存储中的状态队列"""
+        self.resource_store.update_status(resource.resource_id, status)
+        resource.status = status
+    
+    def _record(self, resource: Resource):
+        """记录推送历史，尚未写入资源存储的资源（非database方式）按当前状态写入
+        
+        推送失败的资源保持pending状态，学生登录时仍可通过get_pending_resources拉取。
+        """
+        self.push_history.append(resource)
+        if resource.resource_id not in self.resource_store:
+            self.resource_store.add(resource)
+    
+    @staticmethod
+    def _to_pending_item(resource: Resource) -> Dict[str, Any]:
+        """将资源转换为待推送列表中的条目"""
+        return {
+            "resource_id": resource.resource_id,
+            "knowledge_point_id": resource.knowledge_point_id,
+            "resource_type": resource.resource_type,
+            "content": resource.content,
+            "created_at": resource.created_at.isoformat()
+        }
+    
+    @staticmethod
+    def _to_message(resource: Resource) -> Dict[str, Any]:
+        """将资源转换为推送消息"""
+        return {
+            "resource_id": resource.resource_id,
+            "user_id": resource.user_id,
+            "knowledge_point_id": resource.knowledge_point_id,
+            "resource_type": resource.resource_type,
+            "content": resource.content,
+            "created_at": resource.created_at.isoformat()
+        }
 
 
 # 使用示例
@@ -0,0 +1,494 @@
+"""
+补偿资源存储模块
+
+为资源推送提供带索引的资源存储，学生登录时的查询和标记已读不随推送历史的增长而变慢：
+1. resource_id -> 资源记录的哈希索引，标记已读为O(1)
+2. 每个用户按状态（pending/sent/read）分区的队列，资源进入某一状态时追加到对应队列末尾
+3. 基于游标的分页：游标是队列中的序号，翻页时二分定位，单页查询为O(log n + 页大小)
+4. 保留策略：每个用户的已推送（sent）和已读（read）资源各自最多保留max_finished_per_user条，
+   超出时淘汰最早进入该状态的资源；待推送（pending）资源学生尚未拉取，不淘汰
+
+提供两种实现，接口相同：
+- ResourceStore：内存存储。状态变化时旧队列中的条目只做标记（惰性删除），失效条目过多时压缩队列
+- SQLiteResourceStore：SQLite存储，(user_id, status, seq)联合索引，进程重启后仍然有效
+"""
+
+import logging
+import sqlite3
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from bounded_history import compact_record
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 资源状态
+RESOURCE_STATUSES = ("pending", "sent", "read")
+
+# 受保留策略约束（超出上限后淘汰）的状态
+RETAINED_STATUSES = ("sent", "read")
+
+
+@compact_record
+@dataclass
+class Resource:
+    """资源对象"""
+    resource_id: str
+    user_id: int
+    knowledge_point_id: int
+    resource_type: str  # knowledge_card, exercise, video
+    content: str  # Markdown或JSON格式的内容
+    created_at: datetime
+    status: str = "pending"  # pending, sent, read
+
+
+def _parse_cursor(cursor: Optional[str]) -> int:
+    """解析分页游标，None表示从头开始"""
+    if cursor is None:
+        return -1
+    try:
+        return int(cursor)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+
+def _check_limit(limit: Optional[int]):
+    """校验分页大小"""
+    if limit is not None and limit <= 0:
+        raise ValueError(f"limit must be positive, got {limit}")
+
+
+def _check_retention(max_finished_per_user: Optional[int]):
+    """校验保留数量"""
+    if max_finished_per_user is not None and max_finished_per_user <= 0:
+        raise ValueError(f"max_finished_per_user must be positive, got {max_finished_per_user}")
+
+
+def _check_status(status: str):
+    """校验资源状态"""
+    if status not in RESOURCE_STATUSES:
+        raise ValueError(f"Unknown status: {status}, expected one of {RESOURCE_STATUSES}")
+
+
+class _StatusQueue:
+    """单个用户单个状态的资源队列（序号递增）"""
+    
+    __slots__ = ("seqs", "resource_ids", "stale", "head")
+    
+    def __init__(self):
+        self.seqs: List[int] = []
+        self.resource_ids: List[str] = []
+        self.stale = 0  # 已离开该状态（或被淘汰）、尚未压缩掉的条目数
+        self.head = 0  # 此前的条目都已失效（淘汰时从这里开始扫描）
+
+
+class ResourceStore:
+    """内存资源存储
+    
+    存储的是资源对象本身，状态变化直接反映在调用方持有的对象上。
+    资源状态必须通过update_status修改，否则状态队列不会同步。
+    """
+    
+    # 失效条目超过存活条目且不少于该值时压缩队列
+    COMPACT_MIN_STALE = 64
+    
+    # 每个用户每种已完成状态（sent/read）默认保留的资源数
+    DEFAULT_MAX_FINISHED_PER_USER = 1000
+    
+    def __init__(self, max_finished_per_user: Optional[int] = DEFAULT_MAX_FINISHED_PER_USER):
+        """初始化内存资源存储
+        
+        Args:
+            max_finished_per_user: 每个用户的sent和read资源各自最多保留的数量，超出时淘汰
+                最早进入该状态的资源；None表示全部保留
+        
+        Raises:
+            ValueError: 当max_finished_per_user不是正数时
+        """
+        _check_retention(max_finished_per_user)
+        self.max_finished_per_user = max_finished_per_user
+        self._records: Dict[str, Resource] = {}
+        # resource_id -> 资源在当前状态队列中的序号（旧队列中序号不同的条目即为失效条目）
+        self._positions: Dict[str, int] = {}
+        self._queues: Dict[Tuple[int, str], _StatusQueue] = {}
+        self._next_seq = 0
+        
+        # 统计计数
+        self.compactions = 0
+        self.evictions = 0
+    
+    def add(self, resource: Resource):
+        """添加资源
+        
+        Args:
+            resource: 资源对象（按其当前状态进入对应队列）
+        
+        Raises:
+            ValueError: 当资源ID已存在或状态不合法时
+        """
+        _check_status(resource.status)
+        if resource.resource_id in self._records:
+            raise ValueError(f"Duplicate resource_id: {resource.resource_id}")
+        
+        self._records[resource.resource_id] = resource
+        self._enqueue(resource)
+    
+    def get(self, resource_id: str) -> Optional[Resource]:
+        """按ID查询资源
+        
+        Args:
+            resource_id: 资源ID
+        
+        Returns:
+            资源对象，不存在时返回None
+        """
+        return self._records.get(resource_id)
+    
+    def update_status(self, resource_id: str, status: str, user_id: Optional[int] = None) -> bool:
+        """修改资源状态
+        
+        Args:
+            resource_id: 资源ID
+            status: 新状态
+            user_id: 资源所属用户（可选），不匹配时不修改
+        
+        Returns:
+            资源是否存在（且属于user_id）
+        
+        Raises:
+            ValueError: 当状态不合法时
+        """
+        _check_status(status)
+        resource = self._records.get(resource_id)
+        if resource is None or (user_id is not None and resource.user_id != user_id):
+            return False
+        if resource.status == status:
+            return True
+        
+        old_queue = self._queues[(resource.user_id, resource.status)]
+        resource.status = status
+        self._enqueue(resource)
+        
+        old_queue.stale += 1
+        self._maybe_compact(old_queue)
+        return True
+    
+    def list_by_status(
+        self,
+        user_id: int,
+        status: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Resource], Optional[str]]:
+        """按状态分页查询用户的资源（按进入该状态的先后顺序）
+        
+        Args:
+            user_id: 用户ID
+            status: 资源状态
+            cursor: 上一页返回的游标，None表示第一页
+            limit: 每页最多资源数，None表示不分页
+        
+        Returns:
+            (资源列表, 下一页游标)，没有下一页时游标为None
+        
+        Raises:
+            ValueError: 当状态、游标或limit不合法时
+        """
+        _check_status(status)
+        _check_limit(limit)
+        after = _parse_cursor(cursor)
+        queue = self._queues.get((user_id, status))
+        if queue is None:
+            return [], None
+        
+        page = []
+        seqs = queue.seqs
+        index = bisect_right(seqs, after)
+        while index < len(seqs):
+            if limit is not None and len(page) >= limit:
+                return page, str(seqs[index - 1])
+            resource_id = queue.resource_ids[index]
+            if self._positions.get(resource_id) == seqs[index]:
+                page.append(self._records[resource_id])
+            index += 1
+        
+        return page, None
+    
+    def count(self, user_id: int, status: str) -> int:
+        """用户某一状态的资源数
+        
+        Args:
+            user_id: 用户ID
+            status: 资源状态
+        
+        Returns:
+            资源数
+        """
+        queue = self._queues.get((user_id, status))
+        return len(queue.seqs) - queue.stale if queue is not None else 0
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取存储统计
+        
+        Returns:
+            统计字典
+        """
+        by_status = {status: 0 for status in RESOURCE_STATUSES}
+        stale = 0
+        for (_, status), queue in self._queues.items():
+            by_status[status] += len(queue.seqs) - queue.stale
+            stale += queue.stale
+        
+        return {
+            "resources": len(self._records),
+            "users": len({user_id for user_id, _ in self._queues}),
+            "by_status": by_status,
+            "stale_entries": stale,
+            "compactions": self.compactions,
+            "evictions": self.evictions
+        }
+    
+    def __contains__(self, resource_id: str) -> bool:
+        return resource_id in self._records
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def _enqueue(self, resource: Resource):
+        """资源追加到其当前状态的队列末尾"""
+        seq = self._next_seq
+        self._next_seq += 1
+        
+        queue = self._queues.get((resource.user_id, resource.status))
+        if queue is None:
+            queue = self._queues[(resource.user_id, resource.status)] = _StatusQueue()
+        queue.seqs.append(seq)
+        queue.resource_ids.append(resource.resource_id)
+        self._positions[resource.resource_id] = seq
+        
+        if self.max_finished_per_user is not None and resource.status in RETAINED_STATUSES:
+            self._evict(queue, self.max_finished_per_user)
+    
+    def _evict(self, queue: _StatusQueue, keep: int):
+        """从队首淘汰存活条目，直到存活条目不超过keep"""
+        positions = self._positions
+        while len(queue.seqs) - queue.stale > keep:
+            resource_id = queue.resource_ids[queue.head]
+            if positions.get(resource_id) == queue.seqs[queue.head]:
+                del positions[resource_id]
+                del self._records[resource_id]
+                queue.stale += 1
+                self.evictions += 1
+            queue.head += 1
+        self._maybe_compact(queue)
+    
+    def _maybe_compact(self, queue: _StatusQueue):
+        """失效条目过多时压缩队列"""
+        if queue.stale >= max(self.COMPACT_MIN_STALE, len(queue.seqs) - queue.stale):
+            self._compact(queue)
+    
+    def _compact(self, queue: _StatusQueue):
+        """删除队列中的失效条目（序号顺序不变，已发出的游标仍然有效）"""
+        positions = self._positions
+        live = [
+            (seq, resource_id)
+            for seq, resource_id in zip(queue.seqs, queue.resource_ids)
+            if positions.get(resource_id) == seq
+        ]
+        queue.seqs = [seq for seq, _ in live]
+        queue.resource_ids = [resource_id for _, resource_id in live]
+        queue.stale = 0
+        queue.head = 0
+        self.compactions += 1
+
+
+class SQLiteResourceStore:
+    """SQLite资源存储
+    
+    接口与ResourceStore相同。查询返回新构造的资源对象，状态以数据库为准。
+    """
+    
+    # 数据库忙时的等待时间（秒）
+    BUSY_TIMEOUT = 30.0
+    
+    def __init__(
+        self,
+        path: str = ":memory:",
+        max_finished_per_user: Optional[int] = ResourceStore.DEFAULT_MAX_FINISHED_PER_USER
+    ):
+        """初始化SQLite资源存储
+        
+        Args:
+            path: SQLite数据库文件路径
+            max_finished_per_user: 保留策略，同ResourceStore
+        
+        Raises:
+            ValueError: 当max_finished_per_user不是正数时
+        """
+        _check_retention(max_finished_per_user)
+        self.path = path
+        self.max_finished_per_user = max_finished_per_user
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS resources ("
+                "resource_id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, "
+                "knowledge_point_id INTEGER NOT NULL, resource_type TEXT NOT NULL, content TEXT NOT NULL, "
+                "created_at TEXT, status TEXT NOT NULL, seq INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_resources_user_status ON resources (user_id, status, seq)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_resources_seq ON resources (seq)")
+        
+        logger.info(f"SQLiteResourceStore initialized at {path}")
+    
+    def add(self, resource: Resource):
+        """添加资源
+        
+        Args:
+            resource: 资源对象
+        
+        Raises:
+            ValueError: 当资源ID已存在或状态不合法时
+        """
+        _check_status(resource.status)
+        created_at = resource.created_at.isoformat() if resource.created_at is not None else None
+        with self._lock:
+            try:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT INTO resources VALUES (?, ?, ?, ?, ?, ?, ?, "
+                        "(SELECT COALESCE(MAX(seq), -1) + 1 FROM resources))",
+                        (resource.resource_id, resource.user_id, resource.knowledge_point_id,
+                         resource.resource_type, resource.content, created_at, resource.status)
+                    )
+                    self._evict(resource.user_id, resource.status)
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Duplicate resource_id: {resource.resource_id}")
+    
+    def get(self, resource_id: str) -> Optional[Resource]:
+        """按ID查询资源（参数与返回值同ResourceStore.get）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM resources WHERE resource_id = ?", (resource_id,)
+            ).fetchone()
+        return self._to_resource(row) if row is not None else None
+    
+    def update_status(self, resource_id: str, status: str, user_id: Optional[int] = None) -> bool:
+        """修改资源状态（参数与返回值同ResourceStore.update_status）"""
+        _check_status(status)
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute(
+                    "SELECT user_id, status FROM resources WHERE resource_id = ?", (resource_id,)
+                ).fetchone()
+                if row is None or (user_id is not None and row[0] != user_id):
+                    return False
+                if row[1] != status:
+                    self._conn.execute(
+                        "UPDATE resources SET status = ?, "
+                        "seq = (SELECT MAX(seq) + 1 FROM resources) WHERE resource_id = ?",
+                        (status, resource_id)
+                    )
+                    self._evict(row[0], status)
+        return True
+    
+    def list_by_status(
+        self,
+        user_id: int,
+        status: str,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[Resource], Optional[str]]:
+        """按状态分页查询用户的资源（参数与返回值同ResourceStore.list_by_status）"""
+        _check_status(status)
+        _check_limit(limit)
+        after = _parse_cursor(cursor)
+        
+        with self._lock:
+            # 多取一条用于判断是否还有下一页
+            rows = self._conn.execute(
+                "SELECT * FROM resources WHERE user_id = ? AND status = ? AND seq > ? "
+                "ORDER BY seq LIMIT ?",
+                (user_id, status, after, -1 if limit is None else limit + 1)
+            ).fetchall()
+        
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = str(rows[-1][7])
+        return [self._to_resource(row) for row in rows], next_cursor
+    
+    def count(self, user_id: int, status: str) -> int:
+        """用户某一状态的资源数（参数与返回值同ResourceStore.count）"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM resources WHERE user_id = ? AND status = ?", (user_id, status)
+            ).fetchone()[0]
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取存储统计
+        
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            by_status = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM resources GROUP BY status"
+            ).fetchall())
+            users = self._conn.execute("SELECT COUNT(DISTINCT user_id) FROM resources").fetchone()[0]
+        
+        return {
+            "resources": sum(by_status.values()),
+            "users": users,
+            "by_status": {status: by_status.get(status, 0) for status in RESOURCE_STATUSES}
+        }
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+    
+    def __contains__(self, resource_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM resources WHERE resource_id = ?", (resource_id,)
+            ).fetchone() is not None
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM resources").fetchone()[0]
+    
+    def _evict(self, user_id: int, status: str):
+        """按保留策略删除最早进入该状态的资源（调用方持有self._lock并处于事务中）"""
+        if self.max_finished_per_user is None or status not in RETAINED_STATUSES:
+            return
+        self._conn.execute(
+            "DELETE FROM resources WHERE resource_id IN ("
+            "SELECT resource_id FROM resources WHERE user_id = ? AND status = ? "
+            "ORDER BY seq DESC LIMIT -1 OFFSET ?)",
+            (user_id, status, self.max_finished_per_user)
+        )
+    
+    @staticmethod
+    def _to_resource(row: tuple) -> Resource:
+        """数据库行转换为资源对象"""
+        resource_id, user_id, knowledge_point_id, resource_type, content, created_at, status, _ = row
+        return Resource(
+            resource_id=resource_id,
+            user_id=user_id,
+            knowledge_point_id=knowledge_point_id,
+            resource_type=resource_type,
+            content=content,
+            created_at=datetime.fromisoformat(created_at) if created_at is not None else None,
+            status=status
+        )
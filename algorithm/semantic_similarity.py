@@ -7,9 +7,11 @@
 """
 
 import logging
-from typing import Optional
+from typing import List, Optional
 import warnings
 
+import numpy as np
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -41,13 +43,13 @@ class SemanticSimilarityCalculator:
         """
         self.use_advanced = use_advanced and SENTENCE_TRANSFORMERS_AVAILABLE
         self.model = None
+        # 使用中文语义相似度模型
+        self.model_name = model_name or "paraphrase-multilingual-MiniLM-L12-v2"
         
         if self.use_advanced:
             try:
-                # 使用中文语义相似度模型
-                model_name = model_name or "paraphrase-multilingual-MiniLM-L12-v2"
-                logger.info(f"Loading sentence-transformers model: {model_name}")
-                self.model = SentenceTransformer(model_name)
+                logger.info(f"Loading sentence-transformers model: {self.model_name}")
+                self.model = SentenceTransformer(self.model_name)
                 logger.info("Model loaded successfully")
             except Exception as e:
                 logger.warning(f"Failed to load sentence-transformers model: {e}")
@@ -57,6 +59,13 @@ class SemanticSimilarityCalculator:
         if not self.use_advanced:
             logger.info("Using simple keyword-based similarity")
     
+    @property
+    def cache_namespace(self) -> str:
+        """相似度缓存的命名空间，区分不同模型和计算方式"""
+        if self.use_advanced and self.model:
+            return f"model:{self.model_name}"
+        return "keyword"
+    
     def calculate(self, text1: str, text2: str) -> float:
         """计算两个文本的语义相似度
         
@@ -75,6 +84,76 @@ class SemanticSimilarityCalculator:
         else:
             return self._calculate_simple(text1, text2)
     
+    def encode_batch(self, texts: List[str], batch_size: int = 64) -> Optional[np.ndarray]:
+        """批量编码文本（仅高级模式）
+        
+        一次调用模型完成整段课程所有文本的编码，避免逐对重复编码。
+        空文本对应的行保持为零向量。
+        
+        Args:
+            texts: 文本列表
+            batch_size: 模型每批编码的文本数
+        
+        Returns:
+            (N, d) 的向量矩阵，每行已做L2归一化；简单模式或编码失败时返回None
+        """
+        if not (self.use_advanced and self.model):
+            return None
+        
+        try:
+            non_empty = [i for i, text in enumerate(texts) if text]
+            if not non_empty:
+                return None
+            
+            encoded = self.model.encode(
+                [texts[i] for i in non_empty],
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+            encoded = np.asarray(encoded, dtype=np.float32)
+            
+            embeddings = np.zeros((len(texts), encoded.shape[1]), dtype=np.float32)
+            embeddings[non_empty] = encoded
+            return embeddings
+            
+        except Exception as e:
+            logger.warning(f"Error in batch encoding: {e}")
+            return None
+    
+    def calculate_adjacent(self, texts: List[str]) -> np.ndarray:
+        """批量计算相邻文本的相似度
+        
+        高级模式下先用encode_batch一次性编码得到(N, d)矩阵，
+        再通过一次向量化运算得到全部相邻余弦相似度；
+        简单模式下逐对调用calculate。
+        
+        Args:
+            texts: 已按时间排序的文本列表
+        
+        Returns:
+            长度为N-1的数组，第i个元素为texts[i]与texts[i+1]的相似度（0-1）
+        """
+        if len(texts) < 2:
+            return np.zeros(0, dtype=np.float32)
+        
+        embeddings = self.encode_batch(texts)
+        if embeddings is None:
+            return np.array(
+                [self.calculate(texts[i], texts[i + 1]) for i in range(len(texts) - 1)],
+                dtype=np.float32
+            )
+        
+        # 行向量已归一化，逐行点积即余弦相似度，再归一化到0-1范围
+        cosine = np.einsum("ij,ij->i", embeddings[:-1], embeddings[1:])
+        similarities = np.clip((cosine + 1) / 2, 0.0, 1.0)
+        
+        # 与calculate保持一致：任一文本为空时相似度为0
+        empty = np.array([not text for text in texts])
+        similarities[empty[:-1] | empty[1:]] = 0.0
+        
+        return similarities
+    
     def _calculate_advanced(self, text1: str, text2: str) -> float:
         """使用sentence-transformers计算相似度
         
@@ -0,0 +1,228 @@
+"""
+相似度缓存模块
+
+提供进程级共享的文本相似度缓存，供知识点切分、知识图谱构建、
+多模态时间戳对齐等模块复用，避免重复课程和重跑时重复计算。
+
+特性：
+1. 键为规范化文本对的稳定哈希，与文本顺序无关
+2. 按内存预算进行LRU淘汰
+3. 记录命中/未命中/淘汰次数
+"""
+
+import hashlib
+import logging
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SimilarityCache:
+    """文本相似度缓存
+    
+    不同模块的相似度算法不同（关键词重叠、词汇重叠、字符重叠、向量模型），
+    通过namespace区分，同一文本对在不同算法下互不干扰。
+    """
+    
+    # 缓存键的摘要长度（字节）
+    DIGEST_SIZE = 16
+    
+    # 每个缓存项除键和值以外的额外开销估算（OrderedDict链表节点和哈希表槽位）
+    ENTRY_OVERHEAD = 100
+    
+    def __init__(self, max_memory_mb: float = 64.0):
+        """初始化相似度缓存
+        
+        Args:
+            max_memory_mb: 缓存内存预算（MB），超出后按LRU淘汰
+        """
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        
+        self._entries: "OrderedDict[bytes, float]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        logger.info(f"SimilarityCache initialized with max_memory={max_memory_mb}MB")
+    
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        """规范化文本
+        
+        Unicode NFC规范化，合并连续空白并去除首尾空白。
+        
+        Args:
+            text: 原始文本
+        
+        Returns:
+            规范化后的文本
+        """
+        return " ".join(unicodedata.normalize("NFC", text).split())
+    
+    def make_key(self, text1: str, text2: str, namespace: str = "") -> bytes:
+        """生成缓存键
+        
+        分别对两个规范化文本取摘要后排序再合并哈希，
+        因此(text1, text2)与(text2, text1)得到同一个键。
+        
+        Args:
+            text1: 第一个文本
+            text2: 第二个文本
+            namespace: 相似度算法标识
+        
+        Returns:
+            缓存键
+        """
+        digest1 = hashlib.blake2b(
+            self.normalize_text(text1).encode("utf-8"), digest_size=self.DIGEST_SIZE
+        ).digest()
+        digest2 = hashlib.blake2b(
+            self.normalize_text(text2).encode("utf-8"), digest_size=self.DIGEST_SIZE
+        ).digest()
+        
+        low, high = sorted((digest1, digest2))
+        return hashlib.blake2b(
+            namespace.encode("utf-8") + b"\0" + low + high, digest_size=self.DIGEST_SIZE
+        ).digest()
+    
+    def get(self, text1: str, text2: str, namespace: str = "") -> Optional[float]:
+        """查询缓存
+        
+        Args:
+            text1: 第一个文本
+            text2: 第二个文本
+            namespace: 相似度算法标识
+        
+        Returns:
+            缓存的相似度，未命中时返回None
+        """
+        key = self.make_key(text1, text2, namespace)
+        
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, text1: str, text2: str, value: float, namespace: str = ""):
+        """写入缓存
+        
+        Args:
+            text1: 第一个文本
+            text2: 第二个文本
+            value: 相似度
+            namespace: 相似度算法标识
+        """
+        key = self.make_key(text1, text2, namespace)
+        value = float(value)
+        
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                return
+            
+            self._entries[key] = value
+            self._memory_bytes += self._entry_size(key, value)
+            
+            # 超出内存预算时淘汰最久未使用的条目
+            while self._memory_bytes > self.max_memory_bytes and self._entries:
+                old_key, old_value = self._entries.popitem(last=False)
+                self._memory_bytes -= self._entry_size(old_key, old_value)
+                self.evictions += 1
+    
+    def get_or_compute(
+        self,
+        text1: str,
+        text2: str,
+        compute: Callable[[str, str], float],
+        namespace: str = ""
+    ) -> float:
+        """查询缓存，未命中时计算并写入
+        
+        Args:
+            text1: 第一个文本
+            text2: 第二个文本
+            compute: 相似度计算函数，未命中时以原始文本调用
+            namespace: 相似度算法标识
+        
+        Returns:
+            相似度
+        """
+        cached = self.get(text1, text2, namespace)
+        if cached is not None:
+            return cached
+        
+        value = compute(text1, text2)
+        self.put(text1, text2, value, namespace)
+        return value
+    
+    def clear(self):
+        """清空缓存（统计计数保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+        logger.info("Similarity cache cleared")
+    
+    def get_stats(self) -> Dict[str, float]:
+        """获取缓存统计
+        
+        Returns:
+            统计字典
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total > 0 else 0.0
+            }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _entry_size(self, key: bytes, value: float) -> int:
+        """估算单个缓存项占用的内存（字节）"""
+        return sys.getsizeof(key) + sys.getsizeof(value) + self.ENTRY_OVERHEAD
+
+
+# 全局实例（延迟初始化）
+_global_cache: Optional[SimilarityCache] = None
+_global_cache_lock = threading.Lock()
+
+
+def get_similarity_cache(max_memory_mb: float = 64.0) -> SimilarityCache:
+    """获取进程级共享的相似度缓存（单例模式）
+    
+    Args:
+        max_memory_mb: 首次创建时使用的内存预算（MB）
+    
+    Returns:
+        相似度缓存实例
+    """
+    global _global_cache
+    
+    if _global_cache is None:
+        with _global_cache_lock:
+            if _global_cache is None:
+                _global_cache = SimilarityCache(max_memory_mb=max_memory_mb)
+    
+    return _global_cache
@@ -0,0 +1,271 @@
+"""
+流式增量知识点切分
+
+KnowledgePointSegmenter.segment需要一次拿到完整的ASR/OCR列表。直播课和超长录像中，
+文本是分块陆续到达的，本模块在有界的滑动窗口上增量切分：
+1. 各来源的文本块进入重排缓冲区，超过乱序容忍时间后按开始时间释放
+2. 释放的文本逐段加入当前未完成的知识点，与上一段比较相似度
+3. 话题转换或幻灯片切换且当前知识点已达到min_duration时确认切分
+4. 加入新文本会超过max_duration时，在当前知识点内相似度最低的位置强制切分
+5. 确认的知识点立即输出，之后不再改变
+
+窗口中只保留未完成的知识点（时长不超过max_duration）和重排缓冲区，内存占用与录像总时长无关。
+"""
+
+import heapq
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from knowledge_point_segmenter import KnowledgePointSegmenter, KnowledgePoint, TextRecord, TextTokens
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StreamingSegmenter:
+    """流式增量知识点切分器
+    
+    复用KnowledgePointSegmenter的分词、相似度计算、关键词和摘要生成，
+    切分阈值和时长限制也取自该切分器。
+    """
+    
+    def __init__(
+        self,
+        segmenter: Optional[KnowledgePointSegmenter] = None,
+        reorder_window: float = 5.0
+    ):
+        """初始化流式切分器
+        
+        Args:
+            segmenter: 知识点切分器实例，如果为None则使用默认参数创建
+            reorder_window: 乱序容忍时间（秒）。文本在开始时间落后于已收到的最新开始时间
+                超过该值后才进入切分，以便ASR/OCR各自的延迟不打乱顺序
+        
+        Raises:
+            ValueError: 当reorder_window为负数时
+        """
+        if reorder_window < 0:
+            raise ValueError(f"reorder_window must be non-negative, got {reorder_window}")
+        
+        self.segmenter = segmenter or KnowledgePointSegmenter()
+        self.reorder_window = reorder_window
+        
+        self.reset()
+        
+        logger.info(f"StreamingSegmenter initialized with reorder_window={reorder_window}s")
+    
+    def reset(self):
+        """清空状态，开始新的录像"""
+        # 重排缓冲区：(开始时间, 到达序号, 文本)
+        self._pending: List[Tuple[float, int, TextRecord]] = []
+        self._sequence = 0
+        self._latest_start = float("-inf")
+        self._released_start = float("-inf")
+        
+        # 未完成的知识点：文本、分词结果、与前一段文本的相似度（首段为None）
+        self._texts: List[TextRecord] = []
+        self._tokens: List[TextTokens] = []
+        self._similarities: List[Optional[float]] = []
+        self._window_end = float("-inf")
+        self._current_slide = None
+        
+        # 统计计数
+        self.items_received = 0
+        self.late_items = 0
+        self.forced_splits = 0
+        self.knowledge_points_emitted = 0
+    
+    def feed(
+        self,
+        asr_texts: Optional[List[Dict]] = None,
+        ocr_texts: Optional[List[Dict]] = None,
+        subtitles: Optional[List[Dict]] = None
+    ) -> List[KnowledgePoint]:
+        """输入一批新到达的文本
+        
+        Args:
+            asr_texts: ASR转写文本块，格式同KnowledgePointSegmenter.segment
+            ocr_texts: OCR识别文本块（带slide_number）
+            subtitles: 字幕文本块
+        
+        Returns:
+            本次确认的知识点列表（按时间顺序）
+        """
+        for source, items in (("asr", asr_texts), ("ocr", ocr_texts), ("subtitle", subtitles)):
+            for item in items or ():
+                self._push(source, item)
+        
+        emitted = []
+        threshold = self._latest_start - self.reorder_window
+        while self._pending and self._pending[0][0] <= threshold:
+            emitted.extend(self._release(heapq.heappop(self._pending)[2]))
+        return emitted
+    
+    def finish(self) -> List[KnowledgePoint]:
+        """输入结束，输出剩余的全部知识点
+        
+        最后一个知识点可能短于min_duration（没有后续文本可以合并）。
+        
+        Returns:
+            剩余的知识点列表
+        """
+        emitted = []
+        while self._pending:
+            emitted.extend(self._release(heapq.heappop(self._pending)[2]))
+        
+        if self._texts:
+            emitted.extend(self._emit(len(self._texts)))
+        
+        logger.info(f"Streaming segmentation finished: {self.knowledge_points_emitted} knowledge points")
+        return emitted
+    
+    def iter_segment(self, chunks: Iterable[Dict[str, List[Dict]]]) -> Iterator[KnowledgePoint]:
+        """对文本块序列进行流式切分
+        
+        Args:
+            chunks: 文本块序列，每个元素为{"asr": [...], "ocr": [...], "subtitles": [...]}（均可选）
+        
+        Yields:
+            确认的知识点
+        """
+        self.reset()
+        for chunk in chunks:
+            yield from self.feed(chunk.get("asr"), chunk.get("ocr"), chunk.get("subtitles"))
+        yield from self.finish()
+    
+    def get_stats(self) -> Dict[str, float]:
+        """获取流式切分统计
+        
+        Returns:
+            统计字典
+        """
+        return {
+            "items_received": self.items_received,
+            "late_items": self.late_items,
+            "pending_items": len(self._pending),
+            "window_items": len(self._texts),
+            "window_duration": self._window_duration(),
+            "forced_splits": self.forced_splits,
+            "knowledge_points_emitted": self.knowledge_points_emitted
+        }
+    
+    def _push(self, source: str, item: Dict):
+        """文本进入重排缓冲区"""
+        record = TextRecord(
+            item.get("start_time", 0.0),
+            item.get("end_time", 0.0),
+            item.get("text", ""),
+            source,
+            item.get("slide_number") if source == "ocr" else None
+        )
+        
+        self.items_received += 1
+        self._latest_start = max(self._latest_start, record.start_time)
+        heapq.heappush(self._pending, (record.start_time, self._sequence, record))
+        self._sequence += 1
+    
+    def _release(self, item: TextRecord) -> List[KnowledgePoint]:
+        """文本进入切分窗口，返回因此确认的知识点"""
+        if item.start_time < self._released_start:
+            # 超出乱序容忍时间的文本按到达顺序接在窗口末尾
+            self.late_items += 1
+            logger.debug(f"Late text at {item.start_time:.1f}s, appended to current window")
+        self._released_start = max(self._released_start, item.start_time)
+        
+        segmenter = self.segmenter
+        term_freq = segmenter._count_terms(item.text)
+        keywords = segmenter._rank_keywords(term_freq, top_k=10)
+        tokens = TextTokens(term_freq=term_freq, keywords=keywords, keyword_set=frozenset(keywords))
+        
+        # 话题转换（与batch模式相同：任一文本为空时不比较）
+        similarity = None
+        shift = False
+        if self._texts:
+            previous_text = self._texts[-1].text
+            if previous_text and item.text:
+                similarity = segmenter._token_similarity(
+                    self._tokens[-1], tokens, previous_text, item.text
+                )
+                shift = similarity < segmenter.similarity_threshold
+        
+        # 幻灯片切换
+        slide_number = item.slide_number
+        if slide_number is not None:
+            if self._current_slide is not None and slide_number != self._current_slide:
+                shift = True
+            self._current_slide = slide_number
+        
+        emitted = []
+        
+        # 当前知识点已达到最小时长时在转换点确认切分，否则并入当前知识点
+        if shift and self._window_duration() >= segmenter.min_duration:
+            emitted.extend(self._emit(len(self._texts)))
+            similarity = None
+        
+        # 加入新文本会超过最大时长时强制切分
+        while self._texts and (
+            max(self._window_end, item.end_time) - self._texts[0].start_time > segmenter.max_duration
+        ):
+            self.forced_splits += 1
+            emitted.extend(self._emit(self._best_split()))
+            if not self._texts:
+                similarity = None
+        
+        self._texts.append(item)
+        self._tokens.append(tokens)
+        self._similarities.append(similarity)
+        self._window_end = max(self._window_end, item.end_time)
+        return emitted
+    
+    def _best_split(self) -> int:
+        """选择强制切分的位置
+        
+        在满足左侧不短于min_duration的位置中取相似度最低的（相同时取较晚的位置）；
+        没有满足条件的位置时，整个窗口作为一个知识点。
+        
+        Returns:
+            切分位置（窗口内索引，左侧为[0, split)）
+        """
+        window_start = self._texts[0].start_time
+        left_end = float("-inf")
+        best_split = len(self._texts)
+        best_similarity = float("inf")
+        
+        for split in range(1, len(self._texts)):
+            left_end = max(left_end, self._texts[split - 1].end_time)
+            if left_end - window_start < self.segmenter.min_duration:
+                continue
+            similarity = self._similarities[split]
+            # 未比较过的边界（空文本）视为完全相似
+            similarity = 1.0 if similarity is None else similarity
+            if similarity <= best_similarity:
+                best_split = split
+                best_similarity = similarity
+        
+        return best_split
+    
+    def _emit(self, split: int) -> List[KnowledgePoint]:
+        """确认窗口前split段文本为一个知识点，其余文本留在窗口中"""
+        texts = self._texts[:split]
+        tokens = self._tokens[:split]
+        del self._texts[:split]
+        del self._tokens[:split]
+        del self._similarities[:split]
+        if self._similarities:
+            self._similarities[0] = None
+        self._window_end = max((t.end_time for t in self._texts), default=float("-inf"))
+        
+        kp = self.segmenter._build_knowledge_point(texts, tokens, self.knowledge_points_emitted)
+        if kp is None:
+            return []
+        
+        self.knowledge_points_emitted += 1
+        logger.debug(f"Knowledge point confirmed: {kp.name} ({kp.start_time:.1f}s - {kp.end_time:.1f}s)")
+        return [kp]
+    
+    def _window_duration(self) -> float:
+        """当前未完成知识点的时长"""
+        if not self._texts:
+            return 0.0
+        return self._window_end - self._texts[0].start_time
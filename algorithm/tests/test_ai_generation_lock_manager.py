@@ -0,0 +1,84 @@
+"""
+AI生成锁定管理器单元测试
+"""
+
+import time
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_generation_lock_manager import AIGenerationLockManager, LockStatus
+
+
+class TestAIGenerationLockManager:
+    """AI生成锁定管理器测试类"""
+    
+    def test_video_lock_covers_knowledge_points(self):
+        """测试锁定视频后其下的知识点隐式锁定，解锁视频后恢复"""
+        manager = AIGenerationLockManager()
+        manager.register_knowledge_points(1, [10, 11])
+        manager.lock_ai_generation(100, video_id=1)
+        
+        assert manager.is_locked(knowledge_point_id=10)
+        assert manager.get_lock_status(knowledge_point_id=11) == LockStatus.LOCKED
+        assert not manager.is_locked(knowledge_point_id=12)
+        assert not manager.has_locked_knowledge_points(1)
+        
+        assert manager.unlock_ai_generation(100, video_id=1)
+        assert not manager.is_locked(knowledge_point_id=10)
+        assert manager.get_lock_status(knowledge_point_id=10) is None
+    
+    def test_intention_locks(self):
+        """测试单独锁定的知识点在所属视频上记录意向锁"""
+        manager = AIGenerationLockManager()
+        manager.lock_ai_generation(100, video_id=1, knowledge_point_ids=[10, 11])
+        manager.unlock_ai_generation(100, video_id=1)
+        
+        assert manager.has_locked_knowledge_points(1)
+        assert not manager.is_locked(video_id=1)
+        assert manager.is_locked(knowledge_point_id=10)
+        
+        manager.register_knowledge_points(2, [11])
+        manager.unlock_ai_generation(100, knowledge_point_ids=[10])
+        
+        assert not manager.has_locked_knowledge_points(1)
+        assert manager.has_locked_knowledge_points(2)
+    
+    def test_batch_writes_one_history_record(self):
+        """测试批量锁定/解锁只写一条历史记录，只有锁定者本人可以解锁"""
+        manager = AIGenerationLockManager()
+        lock_results = manager.batch_lock(100, video_ids=[1, 2], knowledge_point_ids=[10, 11, 12])
+        unlock_results = manager.batch_unlock(200, knowledge_point_ids=[10])
+        manager.batch_unlock(100, video_ids=[2], knowledge_point_ids=[10, 99])
+        
+        assert lock_results["total_locked"] == 5
+        assert unlock_results["total_unlocked"] == 0
+        assert [h.action for h in manager.lock_history] == ["batch_lock", "batch_unlock"]
+        assert manager.lock_history[-1].knowledge_point_ids == [10]
+        assert len(manager.get_lock_history(knowledge_point_id=10)) == 2
+        assert manager.is_locked(video_id=1) and not manager.is_locked(video_id=2)
+        assert not manager.is_locked(knowledge_point_id=10)
+    
+    def test_bulk_lock_lookup_is_constant_time(self):
+        """测试一次锁定1万个知识点后查询仍为O(1)"""
+        manager = AIGenerationLockManager()
+        kp_ids = list(range(10000))
+        manager.register_knowledge_points(1, kp_ids[:5000])
+        manager.batch_lock(100, knowledge_point_ids=kp_ids)
+        
+        start = time.perf_counter()
+        for kp_id in kp_ids:
+            assert manager.is_locked(knowledge_point_id=kp_id)
+        elapsed = time.perf_counter() - start
+        
+        assert elapsed < 0.5
+        assert len(manager.lock_history) == 1
+        assert manager.get_lock_statistics()["locked_knowledge_points"] == 10000
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,147 @@
+"""
+中间产物持久化缓存单元测试
+"""
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from artifact_cache import ArtifactCache
+from knowledge_point_segmenter import KnowledgePointSegmenter
+from knowledge_point_annotator import KnowledgePointAnnotator
+from knowledge_card_generator import KnowledgeCardGenerator, KnowledgePointInfo
+from course_ingestion_pipeline import CourseIngestionPipeline
+from tests.mock_data import MOCK_ASR_TEXTS, MOCK_OCR_TEXTS
+from tests.test_course_ingestion_pipeline import write_json
+
+
+class TestArtifactCache:
+    """中间产物缓存测试类"""
+    
+    def setup_method(self):
+        """测试前初始化"""
+        self.cache = ArtifactCache()
+    
+    def test_key_depends_on_inputs_and_params(self):
+        """测试键对输入、参数和类型敏感，与字典键顺序无关"""
+        key = ArtifactCache.make_key("segmentation", {"a": 1, "b": [1, 2]}, {"threshold": 0.7})
+        
+        assert key == ArtifactCache.make_key("segmentation", {"b": [1, 2], "a": 1}, {"threshold": 0.7})
+        assert key != ArtifactCache.make_key("segmentation", {"a": 1, "b": [1, 3]}, {"threshold": 0.7})
+        assert key != ArtifactCache.make_key("segmentation", {"a": 1, "b": [1, 2]}, {"threshold": 0.6})
+        assert key != ArtifactCache.make_key("annotation", {"a": 1, "b": [1, 2]}, {"threshold": 0.7})
+    
+    def test_get_or_compute(self):
+        """测试未命中时计算并写入，命中时不再计算"""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            return {"value": [1, 2, 3]}
+        
+        first = self.cache.get_or_compute("test", "input", {}, compute)
+        second = self.cache.get_or_compute("test", "input", {}, compute)
+        
+        assert first == second == {"value": [1, 2, 3]}
+        assert len(calls) == 1
+        stats = self.cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["by_kind"] == {"test": 1}
+    
+    def test_cached_none_is_a_hit(self):
+        """测试缓存的值为None时命中，不会每次重新计算"""
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            return None
+        
+        assert self.cache.get_or_compute("test", "empty", {}, compute) is None
+        assert self.cache.get_or_compute("test", "empty", {}, compute) is None
+        assert len(calls) == 1
+        assert self.cache.get("missing", default="fallback") == "fallback"
+    
+    def test_persists_across_instances(self, tmp_path):
+        """测试文件缓存在重新打开后仍然有效"""
+        path = str(tmp_path / "artifacts.db")
+        cache = ArtifactCache(path)
+        key = cache.make_key("test", "input")
+        cache.put("test", key, ["结果"])
+        cache.close()
+        
+        reopened = ArtifactCache(path)
+        
+        assert reopened.get(key) == ["结果"]
+        assert len(reopened) == 1
+    
+    def test_invalidate_and_eviction(self):
+        """测试按类型删除和按访问时间淘汰"""
+        cache = ArtifactCache(max_entries=2)
+        for i in range(3):
+            cache.put("a" if i < 2 else "b", f"k{i}", i)
+        
+        assert len(cache) == 2
+        assert cache.get("k0") is None
+        assert cache.invalidate("a") == 1
+        assert cache.get("k2") == 2
+        
+        with pytest.raises(ValueError):
+            ArtifactCache(max_entries=0)
+    
+    def test_segmenter_reuses_cached_result(self):
+        """测试切分结果命中缓存后与直接计算一致，参数变化时重新计算"""
+        segmenter = KnowledgePointSegmenter(artifact_cache=self.cache)
+        
+        first = segmenter.segment(MOCK_ASR_TEXTS, MOCK_OCR_TEXTS)
+        second = segmenter.segment(MOCK_ASR_TEXTS, MOCK_OCR_TEXTS)
+        
+        assert first == second == KnowledgePointSegmenter().segment(MOCK_ASR_TEXTS, MOCK_OCR_TEXTS)
+        assert self.cache.get_stats()["hits"] == 1
+        
+        KnowledgePointSegmenter(min_duration=60.0, artifact_cache=self.cache).segment(
+            MOCK_ASR_TEXTS, MOCK_OCR_TEXTS
+        )
+        assert self.cache.get_stats()["by_kind"] == {"segmentation": 2}
+    
+    def test_annotator_and_card_generator(self):
+        """测试标注结果和知识卡片的缓存"""
+        annotator = KnowledgePointAnnotator(artifact_cache=self.cache)
+        text = " ".join(item["text"] for item in MOCK_ASR_TEXTS[:4])
+        
+        annotation = annotator.annotate(text, MOCK_ASR_TEXTS[:4], start_time=0.0, end_time=240.0)
+        assert annotator.annotate(text, MOCK_ASR_TEXTS[:4], start_time=0.0, end_time=240.0) == annotation
+        
+        info = KnowledgePointInfo(
+            id=1, name=annotation["name"], summary=annotation["summary"],
+            keywords=annotation["keywords"], difficulty=annotation["difficulty"],
+            start_time=0.0, end_time=240.0
+        )
+        card = KnowledgeCardGenerator(artifact_cache=self.cache).generate_card(info, asr_text=text)
+        
+        # 新的生成器实例（进程重启）从持久化缓存读取
+        assert KnowledgeCardGenerator(artifact_cache=self.cache).generate_card(info, asr_text=text) == card
+        assert self.cache.get_stats()["by_kind"] == {"annotation": 1, "knowledge_card": 1}
+        assert self.cache.get_stats()["hits"] == 2
+    
+    def test_pipeline_rerun_hits_cache(self, tmp_path):
+        """测试流水线重新解析时复用缓存，结果一致"""
+        course = tmp_path / "course"
+        course.mkdir()
+        write_json(course / "v1.json", {"asr": MOCK_ASR_TEXTS, "ocr": MOCK_OCR_TEXTS})
+        path = str(tmp_path / "artifacts.db")
+        
+        first = CourseIngestionPipeline(workers=0, artifact_cache_path=path).run(str(course))
+        second = CourseIngestionPipeline(workers=0, artifact_cache_path=path).run(str(course))
+        
+        assert second.knowledge_points == first.knowledge_points
+        stats = ArtifactCache(path).get_stats()
+        assert stats["by_kind"]["segmentation"] == 1
+        assert stats["by_kind"]["annotation"] == len(first.knowledge_points)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,139 @@
+"""
+有界历史记录单元测试
+"""
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bounded_history import BoundedHistory
+from data_audit_engine import DataAuditEngine, AnomalyPattern
+from resource_pusher import ResourcePusher, Resource
+from multimodal_timestamp_aligner import MultimodalTimestampAligner, ASRSegment
+
+
+class TestBoundedHistory:
+    """有界历史记录测试类"""
+    
+    def test_ring_buffer_keeps_latest(self):
+        """测试超出容量后只保留最新记录"""
+        history = BoundedHistory(max_records=3)
+        history.extend(range(5))
+        
+        assert len(history) == 3
+        assert history.copy() == [2, 3, 4]
+        assert history[0] == 2 and history[-1] == 4
+        assert history[1:] == [3, 4]
+        assert history.get_stats()["total_count"] == 5
+        assert history.get_stats()["evicted_count"] == 2
+    
+    def test_unbounded(self):
+        """测试max_records为None时不淘汰"""
+        history = BoundedHistory(max_records=None)
+        history.extend(range(100))
+        
+        assert len(history) == 100
+        assert history.evicted_count == 0
+    
+    def test_invalid_limit(self):
+        """测试非法容量"""
+        with pytest.raises(ValueError):
+            BoundedHistory(max_records=0)
+    
+    def test_spill_to_disk(self, tmp_path):
+        """测试被淘汰的记录写入溢出文件并可读回"""
+        spill_path = str(tmp_path / "patterns.jsonl")
+        history = BoundedHistory(max_records=2, spill_path=spill_path)
+        for i in range(4):
+            history.append(AnomalyPattern(
+                pattern_type="batch_feedback",
+                affected_feedbacks=[i],
+                severity="high",
+                description=f"pattern {i}"
+            ))
+        
+        spilled = list(history.iter_spilled())
+        assert [p["affected_feedbacks"] for p in spilled] == [[0], [1]]
+        assert [p.affected_feedbacks for p in history] == [[2], [3]]
+        assert history.get_stats()["spilled_count"] == 2
+    
+    def test_spill_buffer_flushed_on_exit(self, tmp_path):
+        """测试进程退出时不足一批的溢出记录也会写入文件"""
+        import subprocess
+        
+        spill_path = str(tmp_path / "history.jsonl")
+        script = (
+            "from bounded_history import BoundedHistory\n"
+            f"history = BoundedHistory(max_records=1, spill_path={spill_path!r})\n"
+            "history.extend(range(4))\n"
+        )
+        subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            check=True
+        )
+        
+        with open(spill_path, encoding="utf-8") as f:
+            assert f.read().split() == ["0", "1", "2"]
+
+
+class TestEngineHistories:
+    """引擎历史记录测试类"""
+    
+    def test_compact_records(self):
+        """测试历史记录使用__slots__且默认值保留"""
+        resource = Resource(
+            resource_id="r1",
+            user_id=1,
+            knowledge_point_id=1,
+            resource_type="knowledge_card",
+            content="",
+            created_at=None
+        )
+        
+        assert resource.status == "pending"
+        assert not hasattr(resource, "__dict__")
+        assert resource == Resource("r1", 1, 1, "knowledge_card", "", None, "pending")
+    
+    def test_resource_pusher_history_limit(self):
+        """测试推送历史受容量限制且查询接口可用"""
+        pusher = ResourcePusher(history_limit=3)
+        for kp_id in range(5):
+            pusher.push_resource(1, kp_id, "knowledge_card", "内容")
+        
+        assert len(pusher.push_history) == 3
+        assert [r.knowledge_point_id for r in pusher.push_history] == [2, 3, 4]
+        
+        latest = pusher.push_history[-1]
+        assert pusher.mark_as_read(1, latest.resource_id)
+        assert latest.status == "read"
+    
+    def test_aligner_statistics_over_window(self):
+        """测试对齐统计基于保留的历史记录"""
+        aligner = MultimodalTimestampAligner(history_limit=2, use_similarity_cache=False)
+        asr = [ASRSegment(float(i), float(i) + 1.0, f"片段{i}") for i in range(4)]
+        aligner.align_timestamps(asr, [], [])
+        
+        stats = aligner.get_alignment_statistics()
+        assert stats["total_alignments"] == 2
+        assert stats["dissonance_rate"] <= 1.0
+    
+    def test_data_audit_patterns_copy(self):
+        """测试异常模式查询返回列表副本"""
+        engine = DataAuditEngine(history_limit=1)
+        engine.anomaly_patterns.extend([
+            AnomalyPattern("a", [1], "low", ""),
+            AnomalyPattern("b", [2], "high", "")
+        ])
+        
+        patterns = engine.get_anomaly_patterns()
+        assert isinstance(patterns, list)
+        assert [p.pattern_type for p in patterns] == ["b"]
+        assert engine.get_anomaly_patterns(severity="low") == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
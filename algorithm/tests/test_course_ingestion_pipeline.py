@@ -0,0 +1,97 @@
+"""
+课程批量解析流水线单元测试
+"""
+
+import json
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from course_ingestion_pipeline import CourseIngestionPipeline, discover_videos
+from tests.mock_data import MOCK_ASR_TEXTS, MOCK_OCR_TEXTS
+
+
+def write_json(path, data):
+    """写入JSON文件"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+class TestCourseIngestionPipeline:
+    """课程批量解析流水线测试类"""
+    
+    def setup_method(self):
+        """测试前初始化"""
+        self.segmenter_options = {"min_duration": 120.0, "max_duration": 600.0}
+    
+    def make_course(self, directory):
+        """构造包含两种输入格式的课程目录"""
+        write_json(directory / "v1.json", {"asr": MOCK_ASR_TEXTS, "ocr": MOCK_OCR_TEXTS})
+        write_json(directory / "v2.asr.json", MOCK_ASR_TEXTS[:6])
+        write_json(directory / "v2.ocr.json", MOCK_OCR_TEXTS[:6])
+        write_json(directory / "v3.ocr.json", MOCK_OCR_TEXTS)
+        (directory / "notes.txt").write_text("ignored", encoding="utf-8")
+    
+    def test_discover_videos(self, tmp_path):
+        """测试按文件名识别视频输入，缺少ASR的视频被跳过"""
+        self.make_course(tmp_path)
+        
+        videos = discover_videos(str(tmp_path))
+        
+        assert [v.video_id for v in videos] == ["v1", "v2"]
+        assert videos[0].path.endswith("v1.json")
+        assert videos[1].asr_path.endswith("v2.asr.json")
+        assert videos[1].ocr_path.endswith("v2.ocr.json")
+    
+    def test_run_in_process(self, tmp_path):
+        """测试单进程模式下的完整流程和阶段统计"""
+        self.make_course(tmp_path)
+        pipeline = CourseIngestionPipeline(workers=0, segmenter_options=self.segmenter_options)
+        
+        result = pipeline.run(str(tmp_path))
+        
+        assert result.stats["videos"] == 2
+        assert result.stats["failed_videos"] == 0
+        assert len(result.knowledge_points) == result.stats["knowledge_points"] > 0
+        assert [kp.id for kp in result.knowledge_points] == list(range(1, len(result.knowledge_points) + 1))
+        assert set(result.video_of.values()) == {"v1", "v2"}
+        assert result.graph.number_of_nodes() == len(result.knowledge_points)
+        assert set(result.stats["stages"]) == {"load", "segment", "annotate", "graph"}
+        assert result.stats["stages"]["segment"]["items"] == len(MOCK_ASR_TEXTS) + 6
+    
+    def test_process_pool_matches_in_process(self, tmp_path):
+        """测试多进程结果与单进程一致（知识点ID与完成顺序无关）"""
+        self.make_course(tmp_path)
+        
+        serial = CourseIngestionPipeline(workers=0, segmenter_options=self.segmenter_options).run(str(tmp_path))
+        parallel = CourseIngestionPipeline(workers=2, segmenter_options=self.segmenter_options).run(str(tmp_path))
+        
+        assert parallel.knowledge_points == serial.knowledge_points
+        assert parallel.video_of == serial.video_of
+        assert sorted(parallel.graph.edges) == sorted(serial.graph.edges)
+    
+    def test_failed_video_is_reported(self, tmp_path):
+        """测试单个视频解析失败不影响其他视频"""
+        self.make_course(tmp_path)
+        (tmp_path / "v0.json").write_text("{不是JSON", encoding="utf-8")
+        
+        result = CourseIngestionPipeline(workers=0, segmenter_options=self.segmenter_options).run(str(tmp_path))
+        
+        assert result.stats["failed_videos"] == 1
+        assert result.videos[0].video_id == "v0"
+        assert result.videos[0].error
+        assert set(result.video_of.values()) == {"v1", "v2"}
+    
+    def test_invalid_arguments(self, tmp_path):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            CourseIngestionPipeline(workers=-1)
+        with pytest.raises(ValueError):
+            discover_videos(str(tmp_path / "missing"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -10,11 +10,16 @@ from datetime import datetime
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import numpy as np
+
 from difficulty_detector import (
     DifficultyDetector,
     BehaviorData,
     KnowledgePointInfo,
-    DifficultyResult
+    DifficultyResult,
+    TRIGGER_REPLAY,
+    TRIGGER_WATCH_RATIO,
+    behavior_columns
 )
 
 
@@ -145,6 +150,54 @@ class TestDifficultyDetector:
         
         assert len(results) == len(behavior_data_list)
         assert all(isinstance(r[1], DifficultyResult) for r in results)
+    
+    def test_batch_detect_matches_detect(self):
+        """测试批量检测结果与逐条检测一致"""
+        behavior_data_list = [
+            BehaviorData(user_id=1, knowledge_point_id=10, replay_count=3, pause_count=5,
+                        total_watch_time=600.0, knowledge_point_duration=200.0, seek_count=2),
+            BehaviorData(user_id=2, knowledge_point_id=10, replay_count=0, pause_count=1,
+                        total_watch_time=200.0, knowledge_point_duration=200.0, seek_count=1),
+            BehaviorData(user_id=3, knowledge_point_id=11, replay_count=1, pause_count=0,
+                        total_watch_time=300.0, knowledge_point_duration=0.0, seek_count=6),
+        ]
+        
+        results = self.detector.batch_detect(behavior_data_list)
+        
+        for behavior_data, result in results:
+            assert result == self.detector.detect(behavior_data)
+    
+    def test_detect_columns_structured_array(self):
+        """测试结构化数组输入的列式检测"""
+        records = np.zeros(3, dtype=[
+            ("user_id", "i8"),
+            ("replay_count", "i4"),
+            ("pause_count", "i4"),
+            ("total_watch_time", "f8"),
+            ("knowledge_point_duration", "f8"),
+            ("seek_count", "i4"),
+        ])
+        records["user_id"] = [1, 2, 3]
+        records["replay_count"] = [3, 0, 0]
+        records["total_watch_time"] = [0.0, 400.0, 10.0]
+        records["knowledge_point_duration"] = 100.0
+        
+        result = self.detector.detect_columns(records)
+        
+        assert result.is_difficult.tolist() == [True, True, False]
+        assert result.trigger_masks.tolist() == [TRIGGER_REPLAY, TRIGGER_WATCH_RATIO, 0]
+        assert result.flagged_rows().tolist() == [0, 1]
+        assert result.user_ids.tolist() == [1, 2, 3]
+        assert result.trigger_reasons(0) == ["回放次数过多（3次 >= 2.0次）"]
+        assert result.trigger_reasons(2) == []
+    
+    def test_detect_columns_missing_field(self):
+        """测试缺少字段时报错"""
+        columns = behavior_columns([BehaviorData(user_id=1, knowledge_point_id=10)])
+        del columns["seek_count"]
+        
+        with pytest.raises(ValueError):
+            self.detector.detect_columns(columns)
 
 
 if __name__ == "__main__":
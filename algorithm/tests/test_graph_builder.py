@@ -10,6 +10,7 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from knowledge_graph_builder import (
+    ConceptMatcher,
     KnowledgeGraphBuilder,
     KnowledgePointInfo,
     KnowledgeRelation
@@ -105,6 +106,37 @@ class TestKnowledgeGraphBuilder:
         cycles = self.builder.detect_cycles(resolved_graph)
         assert len(cycles) == 0, "解决后应该没有循环"
     
+    def test_resolve_cycles_reports_removed_edges(self):
+        """测试反馈边集策略移除置信度最低的边并记录"""
+        graph = nx.DiGraph()
+        graph.add_edge(1, 2, relation_type="prerequisite", confidence=0.8)
+        graph.add_edge(2, 3, relation_type="prerequisite", confidence=0.7)
+        graph.add_edge(3, 1, relation_type="related", confidence=0.6)
+        graph.add_edge(3, 4, relation_type="prerequisite", confidence=0.9)
+        
+        resolved_graph = self.builder.resolve_cycles(graph)
+        
+        assert nx.is_directed_acyclic_graph(resolved_graph)
+        assert [(r.source_id, r.target_id) for r in self.builder.removed_edges] == [(3, 1)]
+        assert self.builder.removed_edges[0].relation_type == "related"
+        assert resolved_graph.has_edge(3, 4), "不在环上的边应该保留"
+    
+    def test_resolve_cycles_dense_graph(self):
+        """测试稠密图上的循环处理结果无环"""
+        graph = nx.gnm_random_graph(100, 1500, directed=True, seed=1)
+        for source, target in graph.edges:
+            graph[source][target]["confidence"] = ((source * 31 + target) % 97) / 97
+        
+        resolved_graph = self.builder.resolve_cycles(graph)
+        
+        assert nx.is_directed_acyclic_graph(resolved_graph)
+        assert resolved_graph.number_of_edges() + len(self.builder.removed_edges) == 1500
+    
+    def test_invalid_cycle_strategy(self):
+        """测试非法的循环处理策略"""
+        with pytest.raises(ValueError):
+            KnowledgeGraphBuilder(cycle_strategy="unknown")
+    
     def test_calculate_keyword_overlap(self):
         """测试关键词重叠度计算"""
         keywords_a = ["函数", "映射", "定义"]
@@ -131,6 +163,40 @@ class TestKnowledgeGraphBuilder:
         
         assert isinstance(relations, list)
         assert all(isinstance(r, KnowledgeRelation) for r in relations)
+    
+    def test_inverted_index_matches_exhaustive(self):
+        """测试倒排索引候选生成与两两比较结果一致"""
+        exhaustive = KnowledgeGraphBuilder(use_inverted_index=False)
+        
+        for detect in ("detect_prerequisites", "detect_related", "detect_contains"):
+            indexed_relations = getattr(self.builder, detect)(self.knowledge_points)
+            exhaustive_relations = getattr(exhaustive, detect)(self.knowledge_points)
+            assert indexed_relations == exhaustive_relations, f"{detect}结果应该一致"
+    
+    def test_inverted_index_with_similarity_calculator(self):
+        """测试配置相似度计算器（含jieba回退模式）时不会因按空白分词的索引漏掉相关关系"""
+        knowledge_points = [
+            KnowledgePointInfo(id=1, name="A", summary="Python函数定义与函数调用", keywords=["Python"],
+                               start_time=0.0, end_time=10.0),
+            KnowledgePointInfo(id=2, name="B", summary="函数定义和函数调用Python", keywords=["函数"],
+                               start_time=10.0, end_time=20.0),
+        ]
+        indexed = KnowledgeGraphBuilder(use_advanced_similarity=True)
+        exhaustive = KnowledgeGraphBuilder(use_advanced_similarity=True, use_inverted_index=False)
+        
+        assert indexed.detect_related(knowledge_points) == exhaustive.detect_related(knowledge_points)
+    
+    def test_concept_matcher(self):
+        """测试多模式串匹配"""
+        matcher = ConceptMatcher()
+        matcher.add("函数", 1)
+        matcher.add("函数参数", 2)
+        matcher.add("参数", 3)
+        matcher.add("返回值", 4)
+        
+        assert matcher.find_all("函数可以有位置参数") == {1, 3}
+        assert matcher.find_all("函数参数") == {1, 2, 3}
+        assert matcher.find_all("今天天气很好") == set()
 
 
 if __name__ == "__main__":
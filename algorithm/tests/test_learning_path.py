@@ -34,6 +34,90 @@ class TestLearningPathGenerator:
         assert isinstance(path, list)
         assert len(path) > 0
     
+    def test_compiled_course_dag(self):
+        """测试编译后的课程依赖图：拓扑序屏蔽已掌握节点"""
+        dependencies = [(1, 2, "prerequisite"), (2, 3, "prerequisite"), (1, 3, "prerequisite"), (4, 3, "related")]
+        course_dag = self.generator.compile_course(dependencies)
+        
+        assert not course_dag.has_cycle
+        assert course_dag.successors(1) == [2, 3]
+        assert course_dag.version == self.generator.compile_course(list(reversed(dependencies))).version
+        
+        order = course_dag.unmastered_order({1: "已掌握", 5: "未学", 6: "已掌握"})
+        assert order.index(2) < order.index(3)
+        assert set(order) == {2, 3, 4, 5}
+        assert order[-1] == 5, "不在依赖图中的知识点追加在末尾"
+    
+    def test_generate_paths_shared_dag(self):
+        """测试多个学生共用编译后的依赖图"""
+        course_dag = self.generator.compile_course([(1, 2, "prerequisite"), (2, 3, "prerequisite")])
+        paths = self.generator.generate_paths(
+            {1: {1: "已掌握"}, 2: {1: "疑难"}},
+            course_dag,
+            difficult_points_by_user={2: [1]}
+        )
+        
+        assert [node["knowledge_point_id"] for node in paths[1]] == [2, 3]
+        assert [node["node_type"] for node in paths[2]][:2] == ["remedial_resource", "knowledge_point"]
+    
+    def test_generate_path_with_cycle(self):
+        """测试依赖图有环时回退到按子图排序"""
+        dependencies = [(1, 2, "prerequisite"), (2, 3, "prerequisite"), (3, 1, "prerequisite")]
+        
+        path = self.generator.generate_path(1, {3: "已掌握"}, dependencies)
+        
+        assert [node["knowledge_point_id"] for node in path] == [1, 2]
+    
+    def test_path_cache_shared_profiles(self):
+        """测试相同画像的学生复用缓存路径，且返回的路径互不影响"""
+        course_dag = self.generator.compile_course([(1, 2, "prerequisite"), (2, 3, "prerequisite")], version="v1")
+        
+        first = self.generator.generate_path(1, {1: "已掌握", 2: "未学"}, course_dag)
+        first[0]["reason"] = "已修改"
+        # "未学"与缺失的状态生成相同路径；不处于疑难状态的疑难点不影响路径
+        second = self.generator.generate_path(2, {1: "已掌握"}, course_dag, difficult_points=[3])
+        
+        assert [node["knowledge_point_id"] for node in second] == [2, 3]
+        assert second[0]["reason"] != "已修改"
+        stats = self.generator.path_cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        
+        self.generator.generate_path(3, {1: "疑难"}, course_dag, difficult_points=[1])
+        assert self.generator.path_cache.get_stats()["misses"] == 2
+    
+    def test_path_cache_invalidation(self):
+        """测试课程依赖变更或手动失效后不再命中旧路径"""
+        course_dag = self.generator.compile_course([(1, 2, "prerequisite")], version="v1")
+        assert [n["knowledge_point_id"] for n in self.generator.generate_path(1, {}, course_dag)] == [1, 2]
+        
+        # 同一版本号下依赖关系变化
+        course_dag = self.generator.compile_course([(2, 1, "prerequisite")], version="v1")
+        assert [n["knowledge_point_id"] for n in self.generator.generate_path(1, {}, course_dag)] == [2, 1]
+        
+        assert self.generator.invalidate_course("v1") == 1
+        assert len(self.generator.path_cache) == 0
+        
+        generator = LearningPathGenerator(path_cache_size=0)
+        assert generator.path_cache is None
+        assert generator.generate_path(1, {}, course_dag)
+    
+    def test_optimize_path_order_respects_prerequisites(self):
+        """测试难度优化不破坏前置依赖，且同层先易后难"""
+        dependencies = [(1, 2, "prerequisite"), (3, 4, "prerequisite")]
+        mastery_status = {1: "未学", 2: "疑难", 3: "未学", 4: "未学"}
+        difficulty_info = {1: "hard", 2: "easy", 3: "easy", 4: "medium"}
+        
+        path = self.generator.generate_path(1, mastery_status, dependencies, [2], difficulty_info)
+        
+        assert [(n["knowledge_point_id"], n["node_type"]) for n in path] == [
+            (3, "knowledge_point"),
+            (4, "knowledge_point"),
+            (1, "knowledge_point"),
+            (2, "remedial_resource"),
+            (2, "knowledge_point"),
+        ]
+        assert [n["order"] for n in path] == [1, 2, 3, 4, 5]
+    
     def test_filter_mastered(self):
         """测试过滤已掌握的知识点"""
         knowledge_points = [1, 2, 3, 4]
@@ -113,6 +197,53 @@ class TestPathAdjuster:
         assert has_remedial
 
 
+class TestIndexedPath:
+    """带索引的学习路径测试类"""
+    
+    def setup_method(self):
+        """测试前初始化"""
+        from path_adjuster import PathAdjuster, IndexedPath
+        
+        self.adjuster = PathAdjuster()
+        self.path = IndexedPath([
+            {"knowledge_point_id": kp_id, "order": kp_id, "reason": "基础", "node_type": "knowledge_point"}
+            for kp_id in (1, 2, 3)
+        ])
+    
+    def test_events_update_in_place(self):
+        """测试事件原地更新路径并惰性重新编号"""
+        from path_adjuster import LearningEvent
+        from datetime import datetime
+        
+        result = self.adjuster.adjust_path(self.path, LearningEvent("difficult", 2, datetime.now()))
+        assert result.adjusted_path is self.path
+        assert [(n["knowledge_point_id"], n["node_type"], n["order"]) for n in self.path] == [
+            (1, "knowledge_point", 1),
+            (2, "remedial_resource", 2),
+            (2, "knowledge_point", 3),
+            (3, "knowledge_point", 4),
+        ]
+        
+        # 重复的疑难事件不再插入补偿资源
+        self.adjuster.adjust_path(self.path, LearningEvent("difficult", 2, datetime.now()))
+        assert len(self.path) == 4
+        
+        self.adjuster.adjust_path(self.path, LearningEvent("mastered", 2, datetime.now()))
+        assert [n["knowledge_point_id"] for n in self.path.to_list()] == [1, 3]
+        assert [n["order"] for n in self.path.to_list()] == [1, 2]
+        assert not self.path.contains(2)
+        assert self.adjuster.get_adjustment_history()[-1]["old_path_length"] == 4
+    
+    def test_remedial_completion(self):
+        """测试补偿资源完成事件只移除补偿资源节点"""
+        self.adjuster.handle_difficulty_event(self.path, 3)
+        assert self.path.contains(3, "remedial_resource")
+        
+        self.adjuster.handle_remedial_completion(self.path, 3)
+        assert not self.path.contains(3, "remedial_resource")
+        assert self.path.contains(3, "knowledge_point")
+
+
 class TestRemedialResourceStrategy:
     """补偿资源推送策略测试类"""
     
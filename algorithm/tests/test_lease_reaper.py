@@ -0,0 +1,145 @@
+"""
+后台租约回收器单元测试
+"""
+
+import random
+import time
+from datetime import timedelta
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lease_reaper import HierarchicalTimingWheel, LeaseReaper
+from write_lock_lease_manager import WriteLockLeaseManager, LockStatus
+from ai_generation_lock_manager import AIGenerationLockManager
+
+
+class TestHierarchicalTimingWheel:
+    """分层时间轮测试类"""
+    
+    def test_fires_in_order_across_levels(self):
+        """测试跨层的定时按到期顺序触发，且不会提前触发"""
+        rng = random.Random(7)
+        wheel = HierarchicalTimingWheel(tick=1.0, slots=8, levels=3, now=0)
+        deadlines = [rng.randint(1, 2000) for _ in range(500)]
+        for deadline in deadlines:
+            wheel.schedule(deadline, lambda d=deadline: d)
+        
+        fired = []
+        for now in range(0, 2100, 13):
+            for handle in wheel.advance(now):
+                deadline = handle.callback()
+                assert deadline <= now
+                fired.append(deadline)
+        
+        assert fired == sorted(deadlines)
+        assert len(wheel) == 0
+    
+    def test_cancel_and_past_deadline(self):
+        """测试取消的定时不触发，已过期的定时在下一次推进时触发"""
+        wheel = HierarchicalTimingWheel(tick=1.0, slots=4, levels=2, now=100)
+        cancelled = wheel.schedule(110, lambda: "cancelled")
+        wheel.schedule(105, lambda: "due")
+        wheel.schedule(50, lambda: "past")
+        wheel.cancel(cancelled)
+        
+        assert len(wheel) == 2
+        assert [h.callback() for h in wheel.advance(100)] == ["past"]
+        assert [h.callback() for h in wheel.advance(200)] == ["due"]
+        assert len(wheel) == 0
+    
+    def test_invalid_shape(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            HierarchicalTimingWheel(tick=0)
+
+
+class TestLeaseReaper:
+    """租约回收器与锁管理器集成测试类"""
+    
+    def test_expires_write_lock_on_schedule(self):
+        """测试回收器到期后过期并回滚写锁，续约和释放的锁不受影响"""
+        reaper = LeaseReaper(tick=0.1)
+        manager = WriteLockLeaseManager(lease_duration=timedelta(seconds=60), reaper=reaper)
+        
+        expiring = manager.acquire_lock("video_1", "video", 100).lock_token
+        released = manager.acquire_lock("video_2", "video", 100).lock_token
+        manager.release_lock(released, rollback=False)
+        
+        assert reaper.run_pending(now=time.time() + 30) == 0
+        assert reaper.run_pending(now=time.time() + 61) == 1
+        assert manager.locks[expiring].status == LockStatus.EXPIRED
+        assert ("video", "video_1") not in manager.resource_locks
+        assert manager.get_lock_statistics()["reaped_locks"] == 1
+        assert reaper.get_stats()["pending"] == 0
+    
+    def test_expiry_heap_unused_with_reaper(self):
+        """测试配置回收器时反复续约和释放不会让到期堆增长，check_lock_timeout仍可兜底"""
+        reaper = LeaseReaper(tick=0.1)
+        manager = WriteLockLeaseManager(lease_duration=timedelta(seconds=60), reaper=reaper)
+        for i in range(200):
+            token = manager.acquire_lock(f"video_{i}", "video", 100).lock_token
+            for _ in range(5):
+                manager.renew_lock(token, 100)
+            manager.release_lock(token, rollback=False)
+        
+        stats = manager.get_lock_statistics()
+        assert stats["expiry_heap_entries"] == 0
+        assert reaper.get_stats()["pending"] == 0
+        
+        token = manager.acquire_lock("video_x", "video", 100).lock_token
+        manager.locks[token].expires_at -= timedelta(seconds=120)
+        assert [lock["lock_token"] for lock in manager.check_lock_timeout()] == [token]
+        assert reaper.get_stats()["pending"] == 0
+    
+    def test_background_thread(self):
+        """测试后台线程自动过期租约"""
+        reaper = LeaseReaper(tick=0.05)
+        manager = WriteLockLeaseManager(lease_duration=timedelta(seconds=0.1), reaper=reaper)
+        token = manager.acquire_lock("video_1", "video", 100).lock_token
+        
+        reaper.start()
+        try:
+            deadline = time.time() + 5
+            while manager.locks[token].status == LockStatus.ACQUIRED and time.time() < deadline:
+                time.sleep(0.02)
+        finally:
+            reaper.stop()
+        
+        assert manager.locks[token].status == LockStatus.EXPIRED
+        assert not reaper.running
+    
+    def test_compacted_write_locks_are_archived(self):
+        """测试压缩出租约表的锁进入有界历史"""
+        manager = WriteLockLeaseManager(num_shards=1, max_finished_locks=1, history_limit=2)
+        for i in range(5):
+            token = manager.acquire_lock(f"video_{i}", "video", 100).lock_token
+            manager.release_lock(token, rollback=False)
+        
+        assert len(manager.locks) == 1
+        assert [lock.resource_id for lock in manager.lock_history] == ["video_2", "video_3"]
+    
+    def test_purges_unlocked_ai_locks(self):
+        """测试已解锁的AI生成锁在保留期后清理，重新锁定的记录保留"""
+        reaper = LeaseReaper(tick=0.1)
+        manager = AIGenerationLockManager(
+            reaper=reaper, unlocked_retention=timedelta(seconds=10), history_limit=3
+        )
+        manager.lock_ai_generation(1, video_id=1, knowledge_point_ids=[10, 11])
+        manager.unlock_ai_generation(1, video_id=1, knowledge_point_ids=[10, 11])
+        manager.lock_ai_generation(1, knowledge_point_ids=[11])
+        
+        assert reaper.run_pending(now=time.time() + 11) == 3
+        assert 1 not in manager.video_locks
+        assert list(manager.knowledge_point_locks) == [11]
+        assert manager.is_locked(knowledge_point_id=11)
+        assert manager.get_lock_statistics()["purged_records"] == 2
+        assert len(manager.get_lock_history()) == 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+"""
+批量路径调整事件流单元测试
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+from datetime import datetime
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from path_adjuster import LearningEvent
+from path_adjustment_stream import PathAdjustmentStream, coalesce_events
+
+
+def make_path(kp_ids):
+    """构造只包含知识点节点的路径"""
+    return [
+        {"knowledge_point_id": kp_id, "order": i, "reason": "基础", "node_type": "knowledge_point"}
+        for i, kp_id in enumerate(kp_ids, 1)
+    ]
+
+
+def event(event_type, kp_id, user_id):
+    """构造学习事件"""
+    return LearningEvent(event_type, kp_id, datetime.now(), user_id=user_id)
+
+
+class TestPathAdjustmentStream:
+    """批量路径调整事件流测试类"""
+    
+    def setup_method(self):
+        """测试前初始化"""
+        self.stream = PathAdjustmentStream()
+        self.stream.set_path(1, make_path([1, 2, 3]))
+        self.stream.set_path(2, make_path([1, 2, 3]))
+    
+    def test_coalesce_events(self):
+        """测试同一知识点的冗余事件被合并"""
+        events = [
+            event("difficult", 2, 1),
+            event("difficult", 2, 1),
+            event("completed", 3, 1),
+            event("mastered", 2, 1),
+            event("difficult", 2, 1),
+            event("difficult", 1, 1),
+            event("remedial_completed", 1, 1),
+        ]
+        
+        coalesced = coalesce_events(events)
+        
+        assert [(e.event_type, e.knowledge_point_id) for e in coalesced] == [
+            ("mastered", 2),
+            ("remedial_completed", 1),
+        ]
+    
+    def test_process_batch_emits_diffs(self):
+        """测试一批多用户事件只输出路径差异"""
+        diffs = self.stream.process_batch([
+            event("difficult", 2, 1),
+            event("mastered", 3, 2),
+            event("difficult", 1, 2),
+            event("mastered", 1, 2),
+            event("completed", 2, 1),
+        ])
+        
+        assert [d.user_id for d in diffs] == [1, 2]
+        
+        user1 = diffs[0]
+        assert user1.removed == []
+        assert len(user1.inserted) == 1
+        assert user1.inserted[0]["node"]["node_type"] == "remedial_resource"
+        assert user1.inserted[0]["node"]["order"] == 2
+        assert user1.inserted[0]["before"] == (2, "knowledge_point")
+        
+        user2 = diffs[1]
+        assert sorted(user2.removed) == [(1, "knowledge_point"), (3, "knowledge_point")]
+        assert user2.inserted == []
+        assert (user2.events_received, user2.events_applied) == (3, 2)
+        
+        assert [n["knowledge_point_id"] for n in self.stream.get_path(2)] == [2]
+    
+    def test_unchanged_users_and_missing_paths(self):
+        """测试无变化的用户不输出差异，未知用户的事件被跳过"""
+        diffs = self.stream.process_batch([
+            event("completed", 1, 1),
+            event("mastered", 1, 99),
+            LearningEvent("mastered", 1, datetime.now()),
+        ])
+        
+        assert diffs == []
+        stats = self.stream.get_stats()
+        assert stats["events_received"] == 3
+        assert stats["events_skipped"] == 2
+    
+    def test_path_loader(self):
+        """测试按需加载用户路径"""
+        stream = PathAdjustmentStream(path_loader=lambda user_id: make_path([5, 6]))
+        
+        diffs = stream.process_batch([event("mastered", 5, 7)])
+        
+        assert diffs[0].removed == [(5, "knowledge_point")]
+        assert [n["knowledge_point_id"] for n in stream.get_path(7)] == [6]
+    
+    def test_process_stream(self):
+        """测试异步事件流的微批处理"""
+        async def source():
+            for kp_id in (1, 2, 3):
+                yield event("difficult", kp_id, 1)
+                await asyncio.sleep(0)
+        
+        async def collect():
+            return [
+                diffs async for diffs in self.stream.process_stream(source(), batch_size=2, max_delay=1.0)
+            ]
+        
+        batches = asyncio.run(collect())
+        
+        assert [len(diffs) for diffs in batches] == [1, 1]
+        assert sum(len(diffs[0].inserted) for diffs in batches) == 3
+        assert len(self.stream.get_path(1)) == 6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
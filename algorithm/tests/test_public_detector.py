@@ -9,7 +9,11 @@ import os
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from public_difficulty_detector import PublicDifficultyDetector, PublicDifficultyResult
+from public_difficulty_detector import (
+    PublicDifficultyAggregator,
+    PublicDifficultyDetector,
+    PublicDifficultyResult
+)
 from difficulty_detector import BehaviorData
 
 
@@ -114,6 +118,51 @@ class TestPublicDifficultyDetector:
         assert "public_difficulties" in report
         assert report["total_knowledge_points"] == 2
         assert report["public_difficulties"] == 1
+    
+    def test_streaming_aggregation(self):
+        """测试流式聚合与一次性检测结果一致"""
+        events = [
+            BehaviorData(user_id=1, knowledge_point_id=10, replay_count=3, pause_count=5,
+                        total_watch_time=600.0, knowledge_point_duration=200.0, seek_count=2),
+            BehaviorData(user_id=2, knowledge_point_id=11, replay_count=0, pause_count=0,
+                        total_watch_time=0.0, knowledge_point_duration=200.0, seek_count=0),
+            BehaviorData(user_id=2, knowledge_point_id=10, replay_count=0, pause_count=0,
+                        total_watch_time=0.0, knowledge_point_duration=200.0, seek_count=0),
+            BehaviorData(user_id=3, knowledge_point_id=11, replay_count=4, pause_count=6,
+                        total_watch_time=700.0, knowledge_point_duration=200.0, seek_count=3),
+        ]
+        
+        self.detector.record_events(events[:2])
+        self.detector.record_events(events[2:])
+        
+        for kp_id in (10, 11):
+            kp_events = [e for e in events if e.knowledge_point_id == kp_id]
+            expected = self.detector.detect_public_difficulty(kp_id, kp_events)
+            
+            assert self.detector.get_aggregated_result(kp_id) == expected
+            assert self.detector.calculate_difficulty_ratio(kp_id) == expected.difficulty_ratio
+        
+        assert self.detector.aggregator.is_affected(10, 1)
+        assert not self.detector.aggregator.is_affected(10, 2)
+        
+        results = self.detector.batch_detect_events(1, events)
+        assert [r.knowledge_point_id for r in results] == [10, 11]
+        assert [r.affected_students for r in results] == [[1], [3]]
+    
+    def test_aggregator_deduplicates_affected_students(self):
+        """测试同一学生的多条困难记录只计入一次受影响学生"""
+        aggregator = PublicDifficultyAggregator()
+        behavior = BehaviorData(user_id=7, knowledge_point_id=1, replay_count=3, pause_count=5,
+                                total_watch_time=600.0, knowledge_point_duration=200.0, seek_count=2)
+        
+        aggregator.add(behavior)
+        aggregator.add(behavior)
+        
+        stats = aggregator.get_stats(1)
+        assert stats.record_count == 2
+        assert stats.difficult_count == 2
+        assert aggregator.get_affected_students(1) == [7]
+        assert aggregator.get_stats(2) is None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+"""
+补偿资源异步批量投递引擎单元测试
+
+使用进程内的模拟推送服务端（asyncio流，一行JSON帧一批消息）。
+"""
+
+import asyncio
+import json
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_delivery_engine import AsyncDeliveryEngine, stream_connection_factory
+from resource_pusher import ResourcePusher
+
+
+class FakePushServer:
+    """模拟推送服务端
+    
+    记录收到的每批消息；前reject_first批回复拒绝，之后回复确认。
+    """
+    
+    def __init__(self, reject_first: int = 0, delay: float = 0.0):
+        self.reject_first = reject_first
+        self.delay = delay
+        self.frames = []
+        self.connections = 0
+        self.concurrent = 0
+        self.peak_concurrent = 0
+        self.server = None
+    
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+    
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+    
+    def factory(self, channel):
+        return stream_connection_factory("127.0.0.1", self.port, channel)
+    
+    @property
+    def messages(self):
+        return [m for frame in self.frames for m in frame["messages"]]
+    
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                
+                self.concurrent += 1
+                self.peak_concurrent = max(self.peak_concurrent, self.concurrent)
+                await asyncio.sleep(self.delay)
+                self.concurrent -= 1
+                
+                if self.reject_first > 0:
+                    self.reject_first -= 1
+                    writer.write(b'{"ok": false, "error": "busy"}\n')
+                else:
+                    self.frames.append(json.loads(line))
+                    writer.write(b'{"ok": true}\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+def run(coroutine_function, server):
+    """启动模拟服务端并执行测试协程"""
+    async def main():
+        await server.start()
+        try:
+            return await coroutine_function(server)
+        finally:
+            await server.stop()
+    
+    return asyncio.run(main())
+
+
+class TestAsyncDeliveryEngine:
+    """异步批量投递引擎测试类"""
+    
+    def test_batches_by_size_and_reuses_connections(self):
+        """测试满批发送和连接复用，消息全部投递"""
+        async def scenario(server):
+            engine = AsyncDeliveryEngine(
+                {"websocket": server.factory("websocket")},
+                batch_size=100, flush_interval=10.0, pool_size=2
+            )
+            results = await engine.deliver("websocket", [{"n": i} for i in range(250)])
+            await engine.close()
+            return engine, results
+        
+        server = FakePushServer()
+        engine, results = run(scenario, server)
+        
+        assert all(results) and len(results) == 250
+        assert sorted(len(frame["messages"]) for frame in server.frames) == [50, 100, 100]
+        assert sorted(m["n"] for m in server.messages) == list(range(250))
+        assert {frame["channel"] for frame in server.frames} == {"websocket"}
+        assert server.connections <= 2
+        assert engine.get_stats()["delivered"] == 250
+    
+    def test_flushes_after_interval(self):
+        """测试未满的批次在flush_interval后自动发送"""
+        async def scenario(server):
+            engine = AsyncDeliveryEngine(
+                {"message_queue": server.factory("message_queue")},
+                batch_size=100, flush_interval=0.01
+            )
+            futures = [await engine.submit("message_queue", {"n": i}) for i in range(3)]
+            results = await asyncio.wait_for(asyncio.gather(*futures), 5.0)
+            await engine.close()
+            return results
+        
+        server = FakePushServer()
+        results = run(scenario, server)
+        
+        assert results == [True, True, True]
+        assert len(server.frames) == 1
+    
+    def test_retry_with_backoff(self):
+        """测试被拒绝的批次重试后成功，重试耗尽后返回失败"""
+        async def scenario(server):
+            engine = AsyncDeliveryEngine(
+                {"websocket": server.factory("websocket")},
+                batch_size=10, max_retries=2, retry_backoff=0.001
+            )
+            recovered = await engine.deliver("websocket", [{"n": 1}])
+            
+            server.reject_first = 10
+            failed = await engine.deliver("websocket", [{"n": 2}])
+            await engine.close()
+            return engine, recovered, failed
+        
+        server = FakePushServer(reject_first=2)
+        engine, recovered, failed = run(scenario, server)
+        
+        assert recovered == [True]
+        assert failed == [False]
+        stats = engine.get_stats()
+        assert stats["retries"] == 4
+        assert stats["failed"] == 1
+        assert stats["connections_discarded"]["websocket"] == 5
+    
+    def test_unexpected_error_returns_pool_slot(self):
+        """测试send_batch抛出意外异常时连接名额仍归还连接池"""
+        class BrokenConnection:
+            async def send_batch(self, messages):
+                raise RuntimeError("connection bug")
+            
+            async def close(self):
+                pass
+        
+        async def factory():
+            return BrokenConnection()
+        
+        async def scenario():
+            engine = AsyncDeliveryEngine({"websocket": factory}, batch_size=1, pool_size=2)
+            for i in range(3):
+                with pytest.raises(RuntimeError):
+                    await asyncio.wait_for(engine.deliver("websocket", [{"n": i}]), 1.0)
+            
+            pool = engine.pools["websocket"]
+            free_slots = pool._slots._value
+            connection = await asyncio.wait_for(pool.acquire(), 1.0)
+            await pool.release(connection)
+            return engine, free_slots
+        
+        engine, free_slots = asyncio.run(scenario())
+        
+        assert free_slots == 2
+        stats = engine.get_stats()
+        assert stats["failed"] == 3
+        assert stats["connections_discarded"]["websocket"] == 3
+    
+    def test_bounded_in_flight(self):
+        """测试同时在途的批次数不超过max_in_flight"""
+        async def scenario(server):
+            engine = AsyncDeliveryEngine(
+                {"websocket": server.factory("websocket")},
+                batch_size=5, max_in_flight=3, pool_size=8
+            )
+            results = await engine.deliver("websocket", [{"n": i} for i in range(100)])
+            await engine.close()
+            return engine, results
+        
+        server = FakePushServer(delay=0.005)
+        engine, results = run(scenario, server)
+        
+        assert all(results)
+        assert engine.get_stats()["peak_in_flight"] == 3
+        assert server.peak_concurrent <= 3
+    
+    def test_invalid_arguments(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            AsyncDeliveryEngine({})
+        with pytest.raises(ValueError):
+            AsyncDeliveryEngine({"websocket": None}, batch_size=0)
+        
+        async def unknown_channel():
+            engine = AsyncDeliveryEngine({"websocket": None})
+            await engine.submit("sms", {})
+        
+        with pytest.raises(ValueError):
+            asyncio.run(unknown_channel())
+
+
+class TestResourcePusherAsync:
+    """资源推送器异步批量推送测试类"""
+    
+    def test_batch_push_async(self):
+        """测试通过投递引擎批量推送，资源ID唯一"""
+        async def scenario(server):
+            engine = AsyncDeliveryEngine({"websocket": server.factory("websocket")}, batch_size=50)
+            pusher = ResourcePusher(push_method="websocket", delivery_engine=engine)
+            resources = [
+                {"user_id": 1, "knowledge_point_id": 10, "resource_type": "exercise", "content": f"# 练习{i}"}
+                for i in range(120)
+            ]
+            result = await pusher.batch_push_async(resources)
+            await engine.close()
+            return pusher, result
+        
+        server = FakePushServer()
+        pusher, result = run(scenario, server)
+        
+        assert result == {"success": 120, "failed": 0}
+        assert len({m["resource_id"] for m in server.messages}) == 120
+        assert all(resource.status == "sent" for resource in pusher.push_history)
+    
+    def test_batch_push_async_without_engine(self):
+        """测试未配置投递引擎时退化为同步批量推送"""
+        pusher = ResourcePusher(push_method="database")
+        resources = [{"user_id": 1, "knowledge_point_id": 10, "resource_type": "exercise", "content": "# 练习"}]
+        
+        assert asyncio.run(pusher.batch_push_async(resources)) == {"success": 1, "failed": 0}
+    
+    def test_batch_push_async_unknown_channel(self):
+        """测试投递引擎没有推送方式对应的通道时退化为同步批量推送"""
+        engine = AsyncDeliveryEngine({"websocket": None})
+        pusher = ResourcePusher(push_method="message_queue", delivery_engine=engine)
+        resources = [{"user_id": 1, "knowledge_point_id": 10, "resource_type": "exercise", "content": "# 练习"}]
+        
+        assert asyncio.run(pusher.batch_push_async(resources)) == {"success": 1, "failed": 0}
+        assert len(pusher.push_history) == 1
+    
+    def test_max_retries_must_match_engine(self):
+        """测试推送器与投递引擎的重试次数不一致时拒绝"""
+        engine = AsyncDeliveryEngine({"websocket": None}, max_retries=5)
+        
+        with pytest.raises(ValueError):
+            ResourcePusher(push_method="websocket", delivery_engine=engine)
+        assert ResourcePusher(push_method="websocket", max_retries=5, delivery_engine=engine).max_retries == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,199 @@
+"""
+补偿资源存储单元测试
+"""
+
+from datetime import datetime
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_store import Resource, ResourceStore, SQLiteResourceStore
+from resource_pusher import ResourcePusher
+
+
+def make_resource(index, user_id=1, status="pending"):
+    """构造资源对象"""
+    return Resource(
+        resource_id=f"r{index}",
+        user_id=user_id,
+        knowledge_point_id=index,
+        resource_type="exercise",
+        content=f"# 练习{index}",
+        created_at=datetime(2024, 1, 1, 8, 0, 0),
+        status=status
+    )
+
+
+def page_ids(store, user_id, status, page_size):
+    """按页读取全部资源ID"""
+    ids, cursor = [], None
+    while True:
+        resources, cursor = store.list_by_status(user_id, status, cursor=cursor, limit=page_size)
+        ids.extend(r.resource_id for r in resources)
+        if cursor is None:
+            return ids
+
+
+def page_ids_from(store, cursor, page_size):
+    """从游标开始按页读取剩余的pending资源ID"""
+    ids = []
+    while cursor is not None:
+        resources, cursor = store.list_by_status(1, "pending", cursor=cursor, limit=page_size)
+        ids.extend(r.resource_id for r in resources)
+    return ids
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request):
+    """两种存储实现使用相同的测试"""
+    if request.param == "memory":
+        return ResourceStore()
+    return SQLiteResourceStore()
+
+
+class TestResourceStore:
+    """资源存储测试类"""
+    
+    def test_index_and_status_partitions(self, store):
+        """测试按ID查询和按用户、状态分区"""
+        for i in range(5):
+            store.add(make_resource(i, user_id=1 if i < 3 else 2))
+        
+        assert store.get("r4").user_id == 2
+        assert store.get("missing") is None
+        assert "r0" in store and len(store) == 5
+        
+        assert store.update_status("r1", "read", user_id=1)
+        assert not store.update_status("r1", "read", user_id=2)
+        assert not store.update_status("missing", "read")
+        
+        assert [r.resource_id for r in store.list_by_status(1, "pending")[0]] == ["r0", "r2"]
+        assert [r.resource_id for r in store.list_by_status(1, "read")[0]] == ["r1"]
+        assert store.count(2, "pending") == 2
+        assert store.get_stats()["by_status"] == {"pending": 4, "sent": 0, "read": 1}
+    
+    def test_cursor_pagination(self, store):
+        """测试游标分页在翻页过程中资源状态变化时不重复、不遗漏剩余资源"""
+        for i in range(10):
+            store.add(make_resource(i))
+        
+        first, cursor = store.list_by_status(1, "pending", limit=4)
+        assert [r.resource_id for r in first] == ["r0", "r1", "r2", "r3"]
+        
+        # 已读的资源离开pending队列，未读取的资源不受影响
+        store.update_status("r1", "read")
+        store.update_status("r5", "read")
+        rest = page_ids_from(store, cursor, 4)
+        
+        assert rest == ["r4", "r6", "r7", "r8", "r9"]
+        assert page_ids(store, 1, "read", 1) == ["r1", "r5"]
+    
+    def test_invalid_arguments(self, store):
+        """测试非法参数"""
+        store.add(make_resource(0))
+        with pytest.raises(ValueError):
+            store.add(make_resource(0))
+        with pytest.raises(ValueError):
+            store.update_status("r0", "archived")
+        with pytest.raises(ValueError):
+            store.list_by_status(1, "pending", cursor="abc")
+        with pytest.raises(ValueError):
+            store.list_by_status(1, "pending", limit=0)
+    
+    def test_compaction_keeps_cursors_valid(self):
+        """测试压缩失效条目后计数和游标仍然正确"""
+        store = ResourceStore()
+        for i in range(200):
+            store.add(make_resource(i))
+        page, cursor = store.list_by_status(1, "pending", limit=150)
+        
+        for i in range(0, 200, 2):
+            store.update_status(f"r{i}", "sent")
+        
+        assert store.get_stats()["compactions"] >= 1
+        assert store.count(1, "pending") == 100
+        assert page_ids_from(store, cursor, 7) == [f"r{i}" for i in range(151, 200, 2)]
+        assert len(page_ids(store, 1, "sent", 30)) == 100
+    
+    def test_retention_evicts_oldest_finished(self):
+        """测试sent/read资源超出保留数量后淘汰最早进入该状态的，pending资源不淘汰"""
+        for store in (ResourceStore(max_finished_per_user=3), SQLiteResourceStore(max_finished_per_user=3)):
+            for i in range(10):
+                store.add(make_resource(i))
+            for i in range(8):
+                store.update_status(f"r{i}", "read")
+            store.add(make_resource(10, user_id=2, status="read"))
+            
+            assert page_ids(store, 1, "read", 2) == ["r5", "r6", "r7"]
+            assert page_ids(store, 1, "pending", 5) == ["r8", "r9"]
+            assert store.get("r0") is None and not store.update_status("r0", "pending")
+            assert store.count(1, "read") == 3 and store.count(2, "read") == 1
+            assert len(store) == 6
+        
+        with pytest.raises(ValueError):
+            ResourceStore(max_finished_per_user=0)
+    
+    def test_retention_bounds_memory(self):
+        """测试持续推送时内存存储的记录数和队列长度保持有界"""
+        store = ResourceStore(max_finished_per_user=50)
+        for i in range(5001):
+            store.add(make_resource(i))
+            store.update_status(f"r{i}", "sent")
+            if i % 2:
+                store.update_status(f"r{i}", "read")
+        
+        stats = store.get_stats()
+        assert stats["resources"] == 100
+        assert stats["by_status"] == {"pending": 0, "sent": 50, "read": 50}
+        assert stats["stale_entries"] <= 3 * ResourceStore.COMPACT_MIN_STALE
+        assert page_ids(store, 1, "read", 7) == [f"r{i}" for i in range(4901, 5000, 2)]
+    
+    def test_sqlite_persistence(self, tmp_path):
+        """测试SQLite存储在重新打开后仍然有效"""
+        path = str(tmp_path / "resources.db")
+        store = SQLiteResourceStore(path)
+        store.add(make_resource(0))
+        store.update_status("r0", "read")
+        store.close()
+        
+        reopened = SQLiteResourceStore(path)
+        
+        assert reopened.get("r0") == make_resource(0, status="read")
+
+
+class TestResourcePusherStore:
+    """资源推送器与资源存储集成测试类"""
+    
+    def test_mark_as_read_uses_index(self):
+        """测试历史记录被淘汰后仍可按ID标记已读"""
+        pusher = ResourcePusher(push_method="websocket", history_limit=2)
+        for kp_id in range(5):
+            pusher.push_resource(1, kp_id, "knowledge_card", "内容")
+        
+        oldest = pusher.resource_store.list_by_status(1, "sent", limit=1)[0][0]
+        
+        assert pusher.mark_as_read(1, oldest.resource_id)
+        assert not pusher.mark_as_read(2, oldest.resource_id)
+        assert oldest.status == "read"
+    
+    def test_pending_page(self):
+        """测试待推送资源分页"""
+        pusher = ResourcePusher(push_method="database", resource_store=SQLiteResourceStore())
+        for i in range(5):
+            pusher.resource_store.add(make_resource(i))
+        
+        page = pusher.get_pending_page(1, page_size=3)
+        second = pusher.get_pending_page(1, cursor=page["next_cursor"], page_size=3)
+        
+        assert [r["resource_id"] for r in page["resources"]] == ["r0", "r1", "r2"]
+        assert [r["resource_id"] for r in second["resources"]] == ["r3", "r4"]
+        assert second["next_cursor"] is None
+        assert len(pusher.get_pending_resources(1)) == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -9,7 +9,10 @@ import os
 # 添加父目录到路径
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+import numpy as np
+
 from knowledge_point_segmenter import KnowledgePointSegmenter, KnowledgePoint
+from semantic_similarity import SemanticSimilarityCalculator
 from tests.mock_data import MOCK_ASR_TEXTS, MOCK_OCR_TEXTS
 
 
@@ -120,6 +123,97 @@ class TestKnowledgePointSegmenter:
         knowledge_points = self.segmenter.segment(MOCK_ASR_TEXTS)
         
         assert len(knowledge_points) > 0, "只有ASR文本也应该能切分"
+    
+    def test_detect_topic_shift_batch_encoding(self):
+        """测试批量模式下整段文本只编码一次"""
+        class FakeModel:
+            def __init__(self):
+                self.calls = 0
+            
+            def encode(self, texts, **kwargs):
+                self.calls += 1
+                vectors = {"函数": [1.0, 0.0], "天气": [0.0, 1.0]}
+                return np.array([vectors["函数" if "函数" in t else "天气"] for t in texts])
+        
+        calculator = SemanticSimilarityCalculator(use_advanced=False)
+        calculator.use_advanced = True
+        calculator.model = FakeModel()
+        self.segmenter.similarity_calculator = calculator
+        
+        texts = [
+            {"start_time": 0.0, "end_time": 120.0, "text": "函数定义"},
+            {"start_time": 120.0, "end_time": 240.0, "text": "函数参数"},
+            {"start_time": 240.0, "end_time": 360.0, "text": "今天天气很好"},
+            {"start_time": 360.0, "end_time": 480.0, "text": ""},
+        ]
+        
+        shifts = self.segmenter.detect_topic_shift(texts)
+        
+        assert calculator.model.calls == 1, "批量模式下应该只调用一次模型编码"
+        assert shifts == [2], "只有语义不同的相邻文本之间才是转换点"
+        
+        similarities = calculator.calculate_adjacent([t["text"] for t in texts])
+        assert similarities.shape == (3,), "相邻相似度数量应该是N-1"
+        assert similarities[0] == pytest.approx(1.0), "相同向量的相似度应该为1"
+        assert similarities[2] == 0.0, "空文本的相似度应该为0"
+    
+    def test_token_table_matches_keyword_extraction(self):
+        """测试分词结果表与直接提取关键词的结果一致"""
+        texts = [{"text": item["text"]} for item in MOCK_ASR_TEXTS[:3]]
+        table = self.segmenter.build_token_table(texts)
+        
+        assert len(table) == len(texts), "每段文本应该对应一条分词结果"
+        for tokens, item in zip(table, texts):
+            assert tokens.keywords == self.segmenter.extract_keywords(item["text"], top_k=10)
+        
+        merged = self.segmenter._merge_term_freq(table)
+        combined_text = " ".join(item["text"] for item in texts)
+        assert self.segmenter._rank_keywords(merged, top_k=10) == \
+            self.segmenter.extract_keywords(combined_text, top_k=10), "合并词频应该等价于拼接文本重新分词"
+    
+    def test_merge_and_sort_texts(self):
+        """测试多来源文本按开始时间稳定合并，记录支持按键读取"""
+        asr = [{"start_time": 0.0, "end_time": 10.0, "text": "a1"}, {"start_time": 10.0, "end_time": 20.0, "text": "a2"}]
+        ocr = [{"start_time": 10.0, "end_time": 20.0, "text": "o1", "slide_number": 1}]
+        subtitles = [{"start_time": 5.0, "end_time": 6.0, "text": "s2"}, {"start_time": 0.0, "end_time": 5.0, "text": "s1"}]
+        
+        merged = self.segmenter._merge_and_sort_texts(asr, ocr, subtitles)
+        
+        assert [(t.text, t.source) for t in merged] == [
+            ("a1", "asr"), ("s1", "subtitle"), ("s2", "subtitle"), ("a2", "asr"), ("o1", "ocr")
+        ]
+        assert merged[4]["slide_number"] == 1 and merged[0].get("slide_number") is None
+        assert merged[0].get("missing", "default") == "default"
+        assert not hasattr(merged[0], "__dict__")
+        with pytest.raises(KeyError):
+            merged[0]["missing"]
+    
+    def test_adjust_by_duration_merges_short_segments(self):
+        """测试过短的知识点被贪心合并，末尾的切分点不会越界"""
+        texts = [
+            {"start_time": i * 60.0, "end_time": (i + 1) * 60.0, "text": "函数的参数"}
+            for i in range(10)
+        ]
+        
+        adjusted = self.segmenter._adjust_by_duration(texts, [1, 2, 3, 5, 9])
+        
+        assert adjusted[0] == 0 and adjusted[-1] == 9
+        for a, b in zip(adjusted, adjusted[1:]):
+            assert texts[b]["end_time"] - texts[a]["start_time"] >= 120.0
+    
+    def test_adjust_by_duration_splits_at_lowest_similarity(self):
+        """测试超长的知识点在相似度最低的位置拆分"""
+        texts = [
+            {"start_time": i * 60.0, "end_time": (i + 1) * 60.0, "text": "函数的参数和返回值"}
+            for i in range(6)
+        ] + [
+            {"start_time": i * 60.0, "end_time": (i + 1) * 60.0, "text": "列表的索引和切片"}
+            for i in range(6, 12)
+        ]
+        
+        adjusted = self.segmenter._adjust_by_duration(texts, [])
+        
+        assert adjusted == [0, 6, 11]
 
 
 if __name__ == "__main__":
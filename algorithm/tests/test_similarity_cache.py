@@ -0,0 +1,93 @@
+"""
+相似度缓存单元测试
+"""
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity_cache import SimilarityCache, get_similarity_cache
+from knowledge_point_segmenter import KnowledgePointSegmenter
+from knowledge_graph_builder import KnowledgeGraphBuilder
+from multimodal_timestamp_aligner import MultimodalTimestampAligner
+
+
+class TestSimilarityCache:
+    """相似度缓存测试类"""
+    
+    def setup_method(self):
+        """测试前初始化"""
+        self.cache = SimilarityCache(max_memory_mb=1.0)
+    
+    def test_order_independent_key(self):
+        """测试缓存键与文本顺序无关"""
+        key1 = self.cache.make_key("函数定义", "函数参数", "keyword")
+        key2 = self.cache.make_key("函数参数", "函数定义", "keyword")
+        
+        assert key1 == key2, "交换文本顺序应该得到相同的键"
+        assert key1 == self.cache.make_key(" 函数定义\n", "函数参数", "keyword"), "规范化后相同的文本应该得到相同的键"
+        assert key1 != self.cache.make_key("函数定义", "函数参数", "chars"), "不同命名空间的键应该不同"
+    
+    def test_get_or_compute_counts(self):
+        """测试命中/未命中计数"""
+        calls = []
+        
+        def compute(text1, text2):
+            calls.append((text1, text2))
+            return 0.5
+        
+        assert self.cache.get_or_compute("a", "b", compute) == 0.5
+        assert self.cache.get_or_compute("b", "a", compute) == 0.5
+        
+        stats = self.cache.get_stats()
+        assert len(calls) == 1, "相同文本对只应计算一次"
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["entries"] == 1
+    
+    def test_lru_eviction_by_memory_budget(self):
+        """测试超出内存预算时按LRU淘汰"""
+        entry_size = self.cache._entry_size(self.cache.make_key("a", "b"), 0.0)
+        cache = SimilarityCache(max_memory_mb=entry_size * 2 / (1024 * 1024))
+        
+        cache.put("a", "b", 0.1)
+        cache.put("c", "d", 0.2)
+        cache.get("a", "b")  # a-b成为最近使用
+        cache.put("e", "f", 0.3)
+        
+        assert len(cache) == 2, "缓存项数量不应超出内存预算"
+        assert cache.get("c", "d") is None, "最久未使用的条目应该被淘汰"
+        assert cache.get("a", "b") == pytest.approx(0.1)
+        assert cache.get_stats()["evictions"] == 1
+    
+    def test_shared_across_modules(self):
+        """测试切分器、图谱构建器和对齐器共享同一缓存"""
+        segmenter = KnowledgePointSegmenter()
+        builder = KnowledgeGraphBuilder()
+        aligner = MultimodalTimestampAligner()
+        
+        shared = get_similarity_cache()
+        assert segmenter.similarity_cache is shared
+        assert builder.similarity_cache is shared
+        assert aligner.similarity_cache is shared
+        
+        hits_before = shared.hits
+        first = segmenter.calculate_similarity("函数是一种映射关系", "函数的参数列表")
+        second = segmenter.calculate_similarity("函数的参数列表", "函数是一种映射关系")
+        
+        assert first == second
+        assert shared.hits == hits_before + 1, "交换顺序的重复计算应该命中缓存"
+    
+    def test_cache_disabled(self):
+        """测试关闭缓存"""
+        segmenter = KnowledgePointSegmenter(use_similarity_cache=False)
+        
+        assert segmenter.similarity_cache is None
+        assert 0 <= segmenter.calculate_similarity("函数定义", "函数参数") <= 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
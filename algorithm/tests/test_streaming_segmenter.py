@@ -0,0 +1,107 @@
+"""
+流式增量知识点切分单元测试
+"""
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge_point_segmenter import KnowledgePointSegmenter
+from streaming_segmenter import StreamingSegmenter
+from tests.mock_data import MOCK_ASR_TEXTS, MOCK_OCR_TEXTS
+
+
+def make_asr(count, seconds=30.0, text="函数的参数和返回值"):
+    """构造等长的ASR片段"""
+    return [
+        {"start_time": i * seconds, "end_time": (i + 1) * seconds, "text": text}
+        for i in range(count)
+    ]
+
+
+class TestStreamingSegmenter:
+    """流式增量切分测试类"""
+    
+    def setup_method(self):
+        """测试前初始化"""
+        self.segmenter = KnowledgePointSegmenter(min_duration=120.0, max_duration=600.0)
+    
+    def test_emits_incrementally(self):
+        """测试知识点在确认后立即输出，且覆盖全部文本"""
+        stream = StreamingSegmenter(self.segmenter, reorder_window=0.0)
+        
+        emitted = []
+        for i in range(0, len(MOCK_ASR_TEXTS), 2):
+            emitted.append(stream.feed(MOCK_ASR_TEXTS[i:i + 2], MOCK_OCR_TEXTS[i:i + 2]))
+        tail = stream.finish()
+        
+        knowledge_points = [kp for batch in emitted for kp in batch] + tail
+        assert any(emitted[:-1]), "录像结束前应已输出知识点"
+        assert knowledge_points[0].start_time == 0.0
+        assert knowledge_points[-1].end_time == 1200.0
+        starts = [kp.start_time for kp in knowledge_points]
+        assert starts == sorted(starts)
+        assert all(kp.keywords and kp.summary for kp in knowledge_points)
+        assert stream.get_stats()["knowledge_points_emitted"] == len(knowledge_points)
+    
+    def test_duration_limits(self):
+        """测试话题不变时按max_duration强制切分，且不短于min_duration"""
+        segmenter = KnowledgePointSegmenter(similarity_threshold=0.0, min_duration=120.0, max_duration=300.0)
+        stream = StreamingSegmenter(segmenter, reorder_window=0.0)
+        
+        knowledge_points = stream.feed(make_asr(40)) + stream.finish()
+        durations = [kp.end_time - kp.start_time for kp in knowledge_points]
+        
+        # 所有边界相似度相同，取满足最小时长的最晚位置
+        assert durations == [270.0, 270.0, 270.0, 270.0, 120.0]
+        assert stream.get_stats()["forced_splits"] == 4
+    
+    def test_forced_split_at_lowest_similarity(self):
+        """测试强制切分选择相似度最低的边界"""
+        segmenter = KnowledgePointSegmenter(similarity_threshold=0.0, min_duration=60.0, max_duration=300.0)
+        stream = StreamingSegmenter(segmenter, reorder_window=0.0)
+        asr = make_asr(3, text="函数的参数和返回值") + make_asr(8, text="列表的索引和切片遍历")
+        for i, item in enumerate(asr):
+            item["start_time"], item["end_time"] = i * 30.0, (i + 1) * 30.0
+        
+        first = stream.feed(asr)
+        
+        assert [(kp.start_time, kp.end_time) for kp in first] == [(0.0, 90.0)]
+    
+    def test_bounded_window(self):
+        """测试窗口大小与录像时长无关"""
+        stream = StreamingSegmenter(self.segmenter, reorder_window=0.0)
+        
+        largest = 0
+        for i, item in enumerate(make_asr(2000)):
+            item["text"] = "函数的参数" if i % 10 < 5 else "列表的切片"
+            stream.feed([item])
+            largest = max(largest, stream.get_stats()["window_items"])
+        
+        assert largest <= 600.0 / 30.0
+        assert stream.get_stats()["knowledge_points_emitted"] > 100
+    
+    def test_reorder_window(self):
+        """测试乱序容忍时间内的文本按开始时间排序"""
+        stream = StreamingSegmenter(self.segmenter, reorder_window=60.0)
+        asr = make_asr(4)
+        
+        assert stream.feed([asr[1], asr[0]]) == []
+        assert stream.get_stats()["pending_items"] == 2
+        stream.feed([asr[3], asr[2]])
+        knowledge_points = stream.finish()
+        
+        assert stream.get_stats()["late_items"] == 0
+        assert knowledge_points[0].start_time == 0.0
+    
+    def test_invalid_reorder_window(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            StreamingSegmenter(self.segmenter, reorder_window=-1.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
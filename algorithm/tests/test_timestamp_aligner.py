@@ -0,0 +1,98 @@
+"""
+多模态时间戳对齐单元测试
+"""
+
+import random
+
+import pytest
+import sys
+import os
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multimodal_timestamp_aligner import (
+    ASRSegment,
+    MultimodalTimestampAligner,
+    OCRSegment,
+    VideoFrame
+)
+
+
+def linear_scan(aligner, asr_data, ocr_data, video_frames):
+    """逐个ASR片段线性扫描全部OCR片段和视频帧（参照实现）"""
+    window = aligner.alignment_window
+    matches = []
+    for asr_seg in asr_data:
+        target_time = asr_seg.start_time
+        candidates = [
+            seg for seg in ocr_data
+            if seg.start_time <= target_time + window and seg.end_time >= target_time - window
+        ]
+        frames = [frame for frame in video_frames if abs(frame.timestamp - target_time) <= window]
+        best_ocr = aligner._select_best_match(asr_seg, candidates, "ocr") if candidates else None
+        matches.append((best_ocr, frames[0] if frames else None))
+    return matches
+
+
+def sweep(aligner, asr_data, ocr_data, video_frames):
+    """对齐器的扫描实现"""
+    result = aligner.align_timestamps(asr_data, ocr_data, video_frames)
+    return [(seg.ocr_segment, seg.video_frame) for seg in result["aligned_segments"]]
+
+
+class TestTimestampAlignment:
+    """时间戳对齐测试类"""
+    
+    def setup_method(self):
+        """测试前初始化"""
+        self.aligner = MultimodalTimestampAligner(alignment_window=3.0, use_similarity_cache=False)
+    
+    def test_boundary_nested_and_zero_length(self):
+        """测试恰好接触窗口边界、嵌套和零长度区间"""
+        asr_data = [
+            ASRSegment(10.0, 12.0, "函数 定义"),
+            ASRSegment(20.0, 21.0, "函数 参数"),
+            ASRSegment(30.0, 30.0, "返回值"),
+        ]
+        ocr_data = [
+            OCRSegment(13.0, 15.0, "函数 定义", 1),   # 开始时间恰好在窗口右端
+            OCRSegment(2.0, 7.0, "函数 定义", 2),     # 结束时间恰好在窗口左端
+            OCRSegment(0.0, 40.0, "其他", 3),         # 包含其余所有区间
+            OCRSegment(19.0, 22.0, "函数 参数", 4),   # 嵌套在上一个区间内
+            OCRSegment(33.0, 33.0, "返回值", 5),      # 零长度，恰好在窗口右端
+            OCRSegment(26.9, 26.9, "返回值", 6),      # 零长度，刚好在窗口外
+        ]
+        video_frames = [VideoFrame(33.0, None), VideoFrame(7.0, None), VideoFrame(17.0, None)]
+        
+        expected = linear_scan(self.aligner, asr_data, ocr_data, video_frames)
+        
+        assert sweep(self.aligner, asr_data, ocr_data, video_frames) == expected
+        assert [ocr.slide_num for ocr, _ in expected] == [1, 4, 5]
+        assert [frame.timestamp if frame else None for _, frame in expected] == [7.0, 17.0, 33.0]
+    
+    def test_matches_linear_scan(self):
+        """测试随机输入（未排序、整数边界、零长度区间）与线性扫描结果一致"""
+        rng = random.Random(8)
+        words = ["函数", "参数", "返回值", "循环", "列表"]
+        
+        def text():
+            return " ".join(rng.sample(words, 2))
+        
+        for _ in range(50):
+            asr_data = []
+            for _ in range(rng.randint(0, 30)):
+                start = float(rng.randint(0, 100))
+                asr_data.append(ASRSegment(start, start + rng.randint(0, 5), text()))
+            ocr_data = []
+            for j in range(rng.randint(0, 30)):
+                start = float(rng.randint(0, 100))
+                ocr_data.append(OCRSegment(start, start + rng.choice([0, 0, 1, 3, 20]), text(), j))
+            video_frames = [VideoFrame(float(rng.randint(0, 100)), k) for k in range(rng.randint(0, 30))]
+            
+            assert sweep(self.aligner, asr_data, ocr_data, video_frames) == \
+                linear_scan(self.aligner, asr_data, ocr_data, video_frames)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -3,7 +3,13 @@
 """
 
 import pytest
+import sys
+import os
 from datetime import datetime, timedelta
+
+# 添加父目录到路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from algorithm.write_lock_lease_manager import (
     WriteLockLeaseManager,
     LockStatus
@@ -223,6 +229,83 @@ class TestWriteLockLeaseManager:
         assert stats["active_locks"] == 3
         assert stats["by_type"]["video"] == 2
         assert stats["by_type"]["knowledge_point"] == 1
+    
+    def test_reacquire_same_teacher_renews(self):
+        """测试同一教师重复获取锁时续约（不在持锁状态下重入）"""
+        manager = WriteLockLeaseManager()
+        
+        result1 = manager.acquire_lock("video_123", "video", 100)
+        result2 = manager.acquire_lock("video_123", "video", 100)
+        
+        assert result2.success is True
+        assert result2.lock_token == result1.lock_token
+        assert result2.expires_at >= result1.expires_at
+        assert manager.get_resource_lock_status("video_123", "video")["lock_token"] == result1.lock_token
+    
+    def test_stale_token_does_not_release_new_lock(self):
+        """测试已结束的旧令牌不会释放同一资源上的新锁"""
+        manager = WriteLockLeaseManager()
+        
+        old_token = manager.acquire_lock("video_123", "video", 100).lock_token
+        manager.release_lock(old_token, rollback=False)
+        new_token = manager.acquire_lock("video_123", "video", 200).lock_token
+        
+        assert manager.release_lock(old_token) is False
+        assert manager.resource_locks[("video", "video_123")] == new_token
+        assert manager.release_lock("not_a_token") is False
+        assert manager.get_lock_status("lock_video_x_1_0_999") is None
+    
+    def test_timeout_only_processes_expired(self):
+        """测试超时检查只处理到期的锁，续约后的旧到期时间不会导致过期"""
+        manager = WriteLockLeaseManager(lease_duration=timedelta(seconds=0.2))
+        
+        renewed = manager.acquire_lock("video_1", "video", 100).lock_token
+        expiring = manager.acquire_lock("video_2", "video", 100).lock_token
+        manager.renew_lock(renewed, 100)
+        
+        import time
+        time.sleep(0.3)
+        expired = manager.check_lock_timeout()
+        
+        assert [lock["lock_token"] for lock in expired] == [expiring]
+        assert manager.locks[renewed].status == LockStatus.ACQUIRED
+        assert manager.check_lock_timeout() == []
+    
+    def test_finished_locks_are_compacted(self):
+        """测试已结束的锁超出保留数量后被删除"""
+        manager = WriteLockLeaseManager(num_shards=1, max_finished_locks=2)
+        
+        tokens = [manager.acquire_lock(f"video_{i}", "video", 100).lock_token for i in range(4)]
+        for token in tokens[:3]:
+            manager.release_lock(token, rollback=False)
+        
+        assert tokens[0] not in manager.locks
+        assert len(manager.locks) == 3
+        assert manager.get_lock_statistics()["compacted_locks"] == 1
+        assert manager.compact() == 2
+        assert list(manager.locks) == [tokens[3]]
+    
+    def test_concurrent_teachers(self):
+        """测试多线程并发获取不同资源的锁，同一资源只有一个教师成功"""
+        import threading
+        manager = WriteLockLeaseManager()
+        results = []
+        
+        def worker(teacher_id):
+            for i in range(200):
+                result = manager.acquire_lock(f"kp_{i}", "knowledge_point", teacher_id)
+                if result.success:
+                    results.append((i, teacher_id))
+                    manager.renew_lock(result.lock_token, teacher_id)
+        
+        threads = [threading.Thread(target=worker, args=(teacher_id,)) for teacher_id in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert sorted(i for i, _ in results) == list(range(200))
+        assert len(manager.resource_locks) == 200
 
 
 if __name__ == "__main__":
@@ -2,15 +2,29 @@
 写锁租约机制
 
 基于v10.0需求，解决教师专家标注时的并发冲突问题。
+
+租约表按资源分片（锁分段），不同资源的加锁、续约、发布互不阻塞：
+1. 资源(resource_type, resource_id)按哈希落到固定分片，锁令牌中记录分片编号
+2. 每个分片维护到期时间最小堆，超时检查只处理已到期的锁，与锁总数无关
+3. 已释放、已回滚、已过期的锁只保留最近的一部分用于查询，超出后从租约表移入有界的历史记录
+4. 可选的后台租约回收器（LeaseReaper）：租约到期时自动过期并回滚，不需要等待check_lock_timeout
 """
 
+import heapq
+import itertools
 import logging
 import threading
-from typing import Dict, List, Optional, Any
+from collections import deque
+from collections.abc import Mapping
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 
+from bounded_history import BoundedHistory
+from lease_reaper import LeaseReaper, TimerHandle
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -48,6 +62,52 @@ class LockAcquisitionResult:
     message: str = ""  # 消息
 
 
+class _LeaseShard:
+    """租约表分片"""
+    
+    __slots__ = ("lock", "locks", "resource_locks", "expiry_heap", "finished", "timers")
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        # 锁令牌 -> 写锁（持有中的锁和最近结束的锁）
+        self.locks: Dict[str, WriteLock] = {}
+        # (resource_type, resource_id) -> 持有中的锁令牌
+        self.resource_locks: Dict[tuple, str] = {}
+        # (到期时间, 锁令牌)，续约后旧条目失效，出堆时跳过
+        self.expiry_heap: List[Tuple[datetime, str]] = []
+        # 已结束的锁令牌（按结束顺序），用于压缩
+        self.finished: deque = deque()
+        # 锁令牌 -> 后台回收器中的到期定时（配置了回收器时）
+        self.timers: Dict[str, TimerHandle] = {}
+
+
+class _ShardedView(Mapping):
+    """分片字典的只读合并视图（兼容按字典访问locks/resource_locks的调用方）"""
+    
+    def __init__(self, manager: "WriteLockLeaseManager", attribute: str):
+        self._manager = manager
+        self._attribute = attribute
+    
+    def __getitem__(self, key):
+        if self._attribute == "locks":
+            shard = self._manager._shard_for_token(key)
+        else:
+            shard = self._manager._shard_for_resource(key)
+        if shard is None:
+            raise KeyError(key)
+        with shard.lock:
+            return getattr(shard, self._attribute)[key]
+    
+    def __iter__(self) -> Iterator:
+        for shard in self._manager._shards:
+            with shard.lock:
+                keys = list(getattr(shard, self._attribute))
+            yield from keys
+    
+    def __len__(self) -> int:
+        return sum(len(getattr(shard, self._attribute)) for shard in self._manager._shards)
+
+
 class WriteLockLeaseManager:
     """写锁租约管理器
     
@@ -65,28 +125,70 @@ class WriteLockLeaseManager:
     # 续约时间（延长30分钟）
     RENEW_DURATION = timedelta(minutes=30)
     
-    def __init__(self, lease_duration: timedelta = DEFAULT_LEASE_DURATION):
+    # 默认分片数
+    DEFAULT_NUM_SHARDS = 16
+    
+    # 默认保留的已结束锁数量（所有分片合计）
+    DEFAULT_MAX_FINISHED_LOCKS = 10000
+    
+    def __init__(
+        self,
+        lease_duration: timedelta = DEFAULT_LEASE_DURATION,
+        num_shards: int = DEFAULT_NUM_SHARDS,
+        max_finished_locks: Optional[int] = DEFAULT_MAX_FINISHED_LOCKS,
+        reaper: Optional[LeaseReaper] = None,
+        history_limit: Optional[int] = BoundedHistory.DEFAULT_MAX_RECORDS,
+        history_spill_path: Optional[str] = None
+    ):
         """初始化写锁租约管理器
         
         Args:
             lease_duration: 租约持续时间（默认30分钟）
+            num_shards: 租约表分片数
+            max_finished_locks: 保留的已结束（释放/回滚/过期）锁数量，超出后将最早结束的移入
+                lock_history；None表示全部保留
+            reaper: 后台租约回收器（可选，通常为get_lease_reaper()），配置后租约到期时在回收线程中
+                自动过期并回滚
+            history_limit: 锁历史在内存中保留的最大记录数，None表示不限制
+            history_spill_path: 锁历史溢出文件路径（可选）
+        
+        Raises:
+            ValueError: 当num_shards或max_finished_locks不是正数时
         """
+        if num_shards <= 0:
+            raise ValueError(f"num_shards must be positive, got {num_shards}")
+        if max_finished_locks is not None and max_finished_locks <= 0:
+            raise ValueError(f"max_finished_locks must be positive, got {max_finished_locks}")
+        
         self.lease_duration = lease_duration
+        self.num_shards = num_shards
+        self.max_finished_locks = max_finished_locks
+        self.reaper = reaper
         
-        # 存储锁（key: lock_token）
-        self.locks: Dict[str, WriteLock] = {}
+        # 从租约表中压缩掉的已结束锁（有界，超出后淘汰最旧记录）
+        self.lock_history: BoundedHistory[WriteLock] = BoundedHistory(
+            max_records=history_limit, spill_path=history_spill_path
+        )
         
-        # 资源到锁的映射（key: (resource_type, resource_id)）
-        self.resource_locks: Dict[tuple, str] = {}
+        self._shards = [_LeaseShard() for _ in range(num_shards)]
+        # 每个分片保留的已结束锁数量
+        self._finished_per_shard = (
+            None if max_finished_locks is None else -(-max_finished_locks // num_shards)
+        )
         
-        # 线程锁（保护并发访问）
-        self._lock = threading.Lock()
+        # 存储锁（key: lock_token）和资源到锁的映射（key: (resource_type, resource_id)），只读视图
+        self.locks: Mapping = _ShardedView(self, "locks")
+        self.resource_locks: Mapping = _ShardedView(self, "resource_locks")
         
-        # 锁令牌计数器
-        self._token_counter = 0
+        # 锁令牌计数器（itertools.count的next是原子操作，不需要全局锁）
+        self._token_counter = itertools.count(1)
+        
+        # 统计计数
+        self.compacted_count = 0
+        self.reaped_count = 0
         
         logger.info(
-            f"WriteLockLeaseManager initialized with lease_duration={lease_duration}"
+            f"WriteLockLeaseManager initialized with lease_duration={lease_duration}, shards={num_shards}"
         )
     
     def acquire_lock(
@@ -107,35 +209,37 @@ class WriteLockLeaseManager:
         Returns:
             锁获取结果
         """
-        with self._lock:
-            resource_key = (resource_type, resource_id)
-            
+        resource_key = (resource_type, resource_id)
+        shard_index = self._shard_index(resource_key)
+        shard = self._shards[shard_index]
+        
+        with shard.lock:
             # 检查资源是否已被锁定
-            if resource_key in self.resource_locks:
-                existing_token = self.resource_locks[resource_key]
-                existing_lock = self.locks.get(existing_token)
+            existing_token = shard.resource_locks.get(resource_key)
+            if existing_token is not None:
+                existing_lock = shard.locks[existing_token]
+                
+                # 检查是否过期
+                if datetime.now() < existing_lock.expires_at:
+                    # 如果同一个教师，允许续约
+                    if existing_lock.teacher_id == teacher_id:
+                        return self._renew_locked(shard, existing_token, teacher_id)
+                    return LockAcquisitionResult(
+                        success=False,
+                        message=f"资源已被教师{existing_lock.teacher_id}锁定，到期时间：{existing_lock.expires_at}"
+                    )
                 
-                if existing_lock and existing_lock.status == LockStatus.ACQUIRED:
-                    # 检查是否过期
-                    if datetime.now() < existing_lock.expires_at:
-                        # 如果同一个教师，允许续约
-                        if existing_lock.teacher_id == teacher_id:
-                            return self.renew_lock(existing_token, teacher_id)
-                        else:
-                            return LockAcquisitionResult(
-                                success=False,
-                                message=f"资源已被教师{existing_lock.teacher_id}锁定，到期时间：{existing_lock.expires_at}"
-                            )
-                    else:
-                        # 已过期，清理
-                        self._cleanup_expired_lock(existing_token)
+                # 已过期，清理
+                self._cleanup_expired_lock(shard, existing_token)
             
-            # 生成锁令牌
-            self._token_counter += 1
-            lock_token = f"lock_{resource_type}_{resource_id}_{self._token_counter}_{int(datetime.now().timestamp())}"
+            # 生成锁令牌（末段为分片编号，按令牌操作时据此定位分片）
+            now = datetime.now()
+            lock_token = (
+                f"lock_{resource_type}_{resource_id}_{next(self._token_counter)}_"
+                f"{int(now.timestamp())}_{shard_index}"
+            )
             
             # 创建锁
-            now = datetime.now()
             lock = WriteLock(
                 lock_token=lock_token,
                 resource_id=resource_id,
@@ -149,20 +253,21 @@ class WriteLockLeaseManager:
             )
             
             # 存储锁
-            self.locks[lock_token] = lock
-            self.resource_locks[resource_key] = lock_token
-            
-            logger.info(
-                f"Lock acquired: token={lock_token}, resource={resource_type}:{resource_id}, "
-                f"teacher={teacher_id}, expires_at={lock.expires_at}"
-            )
-            
-            return LockAcquisitionResult(
-                success=True,
-                lock_token=lock_token,
-                expires_at=lock.expires_at,
-                message="锁获取成功"
-            )
+            shard.locks[lock_token] = lock
+            shard.resource_locks[resource_key] = lock_token
+            self._schedule_expiry(shard, lock)
+        
+        logger.info(
+            f"Lock acquired: token={lock_token}, resource={resource_type}:{resource_id}, "
+            f"teacher={teacher_id}, expires_at={lock.expires_at}"
+        )
+        
+        return LockAcquisitionResult(
+            success=True,
+            lock_token=lock_token,
+            expires_at=lock.expires_at,
+            message="锁获取成功"
+        )
     
     def renew_lock(
         self,
@@ -178,51 +283,15 @@ class WriteLockLeaseManager:
         Returns:
             续约结果
         """
-        with self._lock:
-            if lock_token not in self.locks:
-                return LockAcquisitionResult(
-                    success=False,
-                    message="锁不存在"
-                )
-            
-            lock = self.locks[lock_token]
-            
-            # 验证教师ID
-            if lock.teacher_id != teacher_id:
-                return LockAcquisitionResult(
-                    success=False,
-                    message="无权续约此锁"
-                )
-            
-            # 检查锁状态
-            if lock.status != LockStatus.ACQUIRED:
-                return LockAcquisitionResult(
-                    success=False,
-                    message=f"锁状态为{lock.status.value}，无法续约"
-                )
-            
-            # 检查是否已过期
-            if datetime.now() >= lock.expires_at:
-                return LockAcquisitionResult(
-                    success=False,
-                    message="锁已过期，无法续约"
-                )
-            
-            # 续约（延长租约时间）
-            now = datetime.now()
-            lock.expires_at = now + self.RENEW_DURATION
-            lock.last_renewed_at = now
-            
-            logger.info(
-                f"Lock renewed: token={lock_token}, new_expires_at={lock.expires_at}"
-            )
-            
+        shard = self._shard_for_token(lock_token)
+        if shard is None:
             return LockAcquisitionResult(
-                success=True,
-                lock_token=lock_token,
-                expires_at=lock.expires_at,
-                message="锁续约成功"
+                success=False,
+                message="锁不存在"
             )
+        
+        with shard.lock:
+            return self._renew_locked(shard, lock_token, teacher_id)
     
     def release_lock(
         self,
@@ -236,34 +305,15 @@ class WriteLockLeaseManager:
             rollback: 是否回滚到原始数据（默认True）
         
         Returns:
-            是否成功释放
+            是否成功释放（锁不存在或已结束时返回False）
         """
-        with self._lock:
-            if lock_token not in self.locks:
-                logger.warning(f"Lock not found: {lock_token}")
-                return False
-            
-            lock = self.locks[lock_token]
-            
-            # 如果回滚，恢复原始数据
-            if rollback and lock.edited_data and lock.original_data:
-                logger.info(f"Rolling back changes for lock: {lock_token}")
-                # 这里应该调用实际的数据回滚逻辑
-                # 简化处理，只记录日志
-            
-            # 更新锁状态
-            lock.status = LockStatus.RELEASED if not rollback else LockStatus.ROLLED_BACK
-            
-            # 清理资源映射
-            resource_key = (lock.resource_type, lock.resource_id)
-            if resource_key in self.resource_locks:
-                del self.resource_locks[resource_key]
-            
-            logger.info(
-                f"Lock released: token={lock_token}, rollback={rollback}"
-            )
-            
-            return True
+        shard = self._shard_for_token(lock_token)
+        if shard is None:
+            logger.warning(f"Lock not found: {lock_token}")
+            return False
+        
+        with shard.lock:
+            return self._release_locked(shard, lock_token, rollback)
     
     def atomic_publish(
         self,
@@ -279,13 +329,17 @@ class WriteLockLeaseManager:
         Returns:
             是否成功发布
         """
-        with self._lock:
-            if lock_token not in self.locks:
+        shard = self._shard_for_token(lock_token)
+        if shard is None:
+            logger.error(f"Lock not found: {lock_token}")
+            return False
+        
+        with shard.lock:
+            lock = shard.locks.get(lock_token)
+            if lock is None:
                 logger.error(f"Lock not found: {lock_token}")
                 return False
             
-            lock = self.locks[lock_token]
-            
             # 检查锁状态
             if lock.status != LockStatus.ACQUIRED:
                 logger.error(f"Lock status is {lock.status.value}, cannot publish")
@@ -294,7 +348,7 @@ class WriteLockLeaseManager:
             # 检查是否已过期
             if datetime.now() >= lock.expires_at:
                 logger.error(f"Lock expired, cannot publish")
-                self._cleanup_expired_lock(lock_token)
+                self._cleanup_expired_lock(shard, lock_token)
                 return False
             
             # 保存编辑数据
@@ -306,23 +360,26 @@ class WriteLockLeaseManager:
                 f"Atomic publish: token={lock_token}, resource={lock.resource_type}:{lock.resource_id}"
             )
             
-            # 发布成功后释放锁
-            self.release_lock(lock_token, rollback=False)
-            
-            return True
+            # 发布成功后释放锁（与发布在同一临界区内）
+            return self._release_locked(shard, lock_token, rollback=False)
     
     def check_lock_timeout(self) -> List[Dict[str, Any]]:
         """检查锁超时（定时任务调用）
         
+        只弹出各分片到期堆中已到期的条目，耗时与到期锁数量成正比。
+        配置了回收器时过期由回收器处理，这里只检查仍有定时的活跃租约（兜底，通常为空）。
+        
         Returns:
             超时的锁列表
         """
-        with self._lock:
-            now = datetime.now()
-            expired_locks = []
-            
-            for lock_token, lock in list(self.locks.items()):
-                if lock.status == LockStatus.ACQUIRED and now >= lock.expires_at:
+        now = datetime.now()
+        expired_locks = []
+        
+        for shard in self._shards:
+            with shard.lock:
+                for lock_token in self._pop_expired(shard, now):
+                    lock = shard.locks[lock_token]
+                    
                     # 锁已过期
                     expired_locks.append({
                         "lock_token": lock_token,
@@ -334,38 +391,27 @@ class WriteLockLeaseManager:
                     })
                     
                     # 清理过期锁
-                    self._cleanup_expired_lock(lock_token)
-            
-            if expired_locks:
-                logger.warning(f"Found {len(expired_locks)} expired locks")
-            
-            return expired_locks
-    
-    def _cleanup_expired_lock(self, lock_token: str) -> None:
-        """清理过期锁
+                    self._cleanup_expired_lock(shard, lock_token)
         
-        Args:
-            lock_token: 锁令牌
-        """
-        if lock_token not in self.locks:
-            return
-        
-        lock = self.locks[lock_token]
-        
-        # 更新状态
-        lock.status = LockStatus.EXPIRED
+        if expired_locks:
+            logger.warning(f"Found {len(expired_locks)} expired locks")
         
-        # 回滚数据
-        if lock.edited_data and lock.original_data:
-            logger.info(f"Auto-rolling back expired lock: {lock_token}")
-            # 这里应该调用实际的数据回滚逻辑
+        return expired_locks
+    
+    def compact(self) -> int:
+        """立即删除所有已结束的锁
         
-        # 清理资源映射
-        resource_key = (lock.resource_type, lock.resource_id)
-        if resource_key in self.resource_locks:
-            del self.resource_locks[resource_key]
+        Returns:
+            删除的锁数量
+        """
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                while shard.finished:
+                    self._archive(shard, shard.finished.popleft())
+                    removed += 1
         
-        logger.info(f"Cleaned up expired lock: {lock_token}")
+        return removed
     
     def get_lock_status(
         self,
@@ -379,26 +425,13 @@ class WriteLockLeaseManager:
         Returns:
             锁状态字典，如果不存在则返回None
         """
-        with self._lock:
-            if lock_token not in self.locks:
-                return None
-            
-            lock = self.locks[lock_token]
-            now = datetime.now()
-            
-            return {
-                "lock_token": lock_token,
-                "resource_id": lock.resource_id,
-                "resource_type": lock.resource_type,
-                "teacher_id": lock.teacher_id,
-                "status": lock.status.value,
-                "acquired_at": lock.acquired_at.isoformat(),
-                "expires_at": lock.expires_at.isoformat(),
-                "last_renewed_at": lock.last_renewed_at.isoformat(),
-                "is_expired": now >= lock.expires_at,
-                "remaining_seconds": max(0, int((lock.expires_at - now).total_seconds())),
-                "has_edited_data": lock.edited_data is not None
-            }
+        shard = self._shard_for_token(lock_token)
+        if shard is None:
+            return None
+        
+        with shard.lock:
+            lock = shard.locks.get(lock_token)
+            return self._lock_status(lock, datetime.now()) if lock is not None else None
     
     def get_resource_lock_status(
         self,
@@ -415,20 +448,20 @@ class WriteLockLeaseManager:
             锁状态字典，如果资源未被锁定则返回None
         """
         resource_key = (resource_type, resource_id)
+        shard = self._shard_for_resource(resource_key)
         
-        with self._lock:
-            if resource_key not in self.resource_locks:
+        with shard.lock:
+            lock_token = shard.resource_locks.get(resource_key)
+            if lock_token is None:
                 return None
-            
-            lock_token = self.resource_locks[resource_key]
-            return self.get_lock_status(lock_token)
+            return self._lock_status(shard.locks[lock_token], datetime.now())
     
     def get_all_locks(
         self,
         teacher_id: Optional[int] = None,
         resource_type: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """获取所有锁
+        """获取所有锁（包括保留的已结束锁）
         
         Args:
             teacher_id: 教师ID（可选，用于过滤）
@@ -437,21 +470,21 @@ class WriteLockLeaseManager:
         Returns:
             锁列表
         """
-        with self._lock:
-            locks = []
-            
-            for lock_token, lock in self.locks.items():
-                # 过滤
-                if teacher_id is not None and lock.teacher_id != teacher_id:
-                    continue
-                if resource_type is not None and lock.resource_type != resource_type:
-                    continue
-                
-                status = self.get_lock_status(lock_token)
-                if status:
-                    locks.append(status)
-            
-            return locks
+        now = datetime.now()
+        locks = []
+        
+        for shard in self._shards:
+            with shard.lock:
+                for lock in shard.locks.values():
+                    # 过滤
+                    if teacher_id is not None and lock.teacher_id != teacher_id:
+                        continue
+                    if resource_type is not None and lock.resource_type != resource_type:
+                        continue
+                    
+                    locks.append(self._lock_status(lock, now))
+        
+        return locks
     
     def get_lock_statistics(self) -> Dict[str, Any]:
         """获取锁统计信息
@@ -459,31 +492,247 @@ class WriteLockLeaseManager:
         Returns:
             统计信息字典
         """
-        with self._lock:
-            total = len(self.locks)
-            by_status = {}
-            by_type = {}
-            
-            for lock in self.locks.values():
-                # 按状态统计
-                status_key = lock.status.value
-                by_status[status_key] = by_status.get(status_key, 0) + 1
-                
-                # 按类型统计
-                type_key = lock.resource_type
-                by_type[type_key] = by_type.get(type_key, 0) + 1
-            
-            # 统计过期锁
-            now = datetime.now()
-            expired_count = sum(
-                1 for lock in self.locks.values()
-                if lock.status == LockStatus.ACQUIRED and now >= lock.expires_at
+        now = datetime.now()
+        total = 0
+        by_status = {}
+        by_type = {}
+        expired_count = 0
+        heap_entries = 0
+        
+        for shard in self._shards:
+            with shard.lock:
+                total += len(shard.locks)
+                heap_entries += len(shard.expiry_heap)
+                for lock in shard.locks.values():
+                    # 按状态统计
+                    status_key = lock.status.value
+                    by_status[status_key] = by_status.get(status_key, 0) + 1
+                    
+                    # 按类型统计
+                    type_key = lock.resource_type
+                    by_type[type_key] = by_type.get(type_key, 0) + 1
+                    
+                    # 统计过期锁
+                    if lock.status == LockStatus.ACQUIRED and now >= lock.expires_at:
+                        expired_count += 1
+        
+        return {
+            "total_locks": total,
+            "by_status": by_status,
+            "by_type": by_type,
+            "expired_count": expired_count,
+            "active_locks": by_status.get(LockStatus.ACQUIRED.value, 0),
+            "shards": self.num_shards,
+            "expiry_heap_entries": heap_entries,
+            "compacted_locks": self.compacted_count,
+            "reaped_locks": self.reaped_count,
+            "history_records": len(self.lock_history)
+        }
+    
+    def _renew_locked(
+        self,
+        shard: _LeaseShard,
+        lock_token: str,
+        teacher_id: int
+    ) -> LockAcquisitionResult:
+        """续约锁（调用方持有shard.lock）"""
+        lock = shard.locks.get(lock_token)
+        if lock is None:
+            return LockAcquisitionResult(
+                success=False,
+                message="锁不存在"
             )
-            
-            return {
-                "total_locks": total,
-                "by_status": by_status,
-                "by_type": by_type,
-                "expired_count": expired_count,
-                "active_locks": by_status.get(LockStatus.ACQUIRED.value, 0)
-            }
+        
+        # 验证教师ID
+        if lock.teacher_id != teacher_id:
+            return LockAcquisitionResult(
+                success=False,
+                message="无权续约此锁"
+            )
+        
+        # 检查锁状态
+        if lock.status != LockStatus.ACQUIRED:
+            return LockAcquisitionResult(
+                success=False,
+                message=f"锁状态为{lock.status.value}，无法续约"
+            )
+        
+        # 检查是否已过期
+        now = datetime.now()
+        if now >= lock.expires_at:
+            return LockAcquisitionResult(
+                success=False,
+                message="锁已过期，无法续约"
+            )
+        
+        # 续约（延长租约时间），旧的到期条目在出堆时跳过，旧的回收器定时被取消
+        lock.expires_at = now + self.RENEW_DURATION
+        lock.last_renewed_at = now
+        self._schedule_expiry(shard, lock)
+        
+        logger.info(
+            f"Lock renewed: token={lock_token}, new_expires_at={lock.expires_at}"
+        )
+        
+        return LockAcquisitionResult(
+            success=True,
+            lock_token=lock_token,
+            expires_at=lock.expires_at,
+            message="锁续约成功"
+        )
+    
+    def _release_locked(
+        self,
+        shard: _LeaseShard,
+        lock_token: str,
+        rollback: bool
+    ) -> bool:
+        """释放锁（调用方持有shard.lock）"""
+        lock = shard.locks.get(lock_token)
+        if lock is None:
+            logger.warning(f"Lock not found: {lock_token}")
+            return False
+        if lock.status != LockStatus.ACQUIRED:
+            logger.warning(f"Lock already {lock.status.value}: {lock_token}")
+            return False
+        
+        # 如果回滚，恢复原始数据
+        if rollback and lock.edited_data and lock.original_data:
+            logger.info(f"Rolling back changes for lock: {lock_token}")
+            # 这里应该调用实际的数据回滚逻辑
+            # 简化处理，只记录日志
+        
+        # 更新锁状态
+        self._finish(shard, lock, LockStatus.RELEASED if not rollback else LockStatus.ROLLED_BACK)
+        
+        logger.info(
+            f"Lock released: token={lock_token}, rollback={rollback}"
+        )
+        
+        return True
+    
+    def _cleanup_expired_lock(self, shard: _LeaseShard, lock_token: str) -> None:
+        """清理过期锁（调用方持有shard.lock）
+        
+        Args:
+            shard: 锁所在分片
+            lock_token: 锁令牌
+        """
+        lock = shard.locks.get(lock_token)
+        if lock is None or lock.status != LockStatus.ACQUIRED:
+            return
+        
+        # 回滚数据
+        if lock.edited_data and lock.original_data:
+            logger.info(f"Auto-rolling back expired lock: {lock_token}")
+            # 这里应该调用实际的数据回滚逻辑
+        
+        # 更新状态
+        self._finish(shard, lock, LockStatus.EXPIRED)
+        
+        logger.info(f"Cleaned up expired lock: {lock_token}")
+    
+    def _finish(self, shard: _LeaseShard, lock: WriteLock, status: LockStatus) -> None:
+        """锁进入结束状态：解除资源映射，超出保留数量时删除最早结束的锁（调用方持有shard.lock）"""
+        lock.status = status
+        
+        resource_key = (lock.resource_type, lock.resource_id)
+        if shard.resource_locks.get(resource_key) == lock.lock_token:
+            del shard.resource_locks[resource_key]
+        
+        if self.reaper is not None:
+            self.reaper.cancel(shard.timers.pop(lock.lock_token, None))
+        
+        shard.finished.append(lock.lock_token)
+        if self._finished_per_shard is not None:
+            while len(shard.finished) > self._finished_per_shard:
+                self._archive(shard, shard.finished.popleft())
+    
+    def _archive(self, shard: _LeaseShard, lock_token: str) -> None:
+        """已结束的锁从租约表移入锁历史（调用方持有shard.lock）"""
+        lock = shard.locks.pop(lock_token, None)
+        if lock is not None:
+            self.lock_history.append(lock)
+            self.compacted_count += 1
+    
+    def _pop_expired(self, shard: _LeaseShard, now: datetime) -> List[str]:
+        """取出分片中已到期的活跃锁令牌（调用方持有shard.lock）"""
+        if self.reaper is not None:
+            return [
+                lock_token for lock_token in shard.timers
+                if shard.locks[lock_token].expires_at <= now
+            ]
+        
+        expired = []
+        heap = shard.expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, lock_token = heapq.heappop(heap)
+            lock = shard.locks.get(lock_token)
+            # 已结束或已续约的锁留下的旧条目
+            if lock is None or lock.status != LockStatus.ACQUIRED or lock.expires_at != expires_at:
+                continue
+            expired.append(lock_token)
+        return expired
+    
+    def _schedule_expiry(self, shard: _LeaseShard, lock: WriteLock) -> None:
+        """登记锁的到期时间（调用方持有shard.lock）
+        
+        未配置回收器时压入到期堆，由check_lock_timeout弹出；配置回收器时只在回收器中
+        注册（或更新）定时，不再使用到期堆，否则没有人调用check_lock_timeout时堆会无限增长。
+        """
+        if self.reaper is None:
+            heapq.heappush(shard.expiry_heap, (lock.expires_at, lock.lock_token))
+            return
+        
+        self.reaper.cancel(shard.timers.get(lock.lock_token))
+        shard.timers[lock.lock_token] = self.reaper.schedule(
+            lock.expires_at.timestamp(),
+            partial(self._reap_expired, shard, lock.lock_token, lock.expires_at)
+        )
+    
+    def _reap_expired(self, shard: _LeaseShard, lock_token: str, expires_at: datetime) -> None:
+        """回收器到期回调：过期并回滚仍未释放的锁（在回收线程中执行）"""
+        with shard.lock:
+            lock = shard.locks.get(lock_token)
+            # 定时注册后又续约过时（旧定时已被回收器取出，未能取消），以新的定时为准
+            if lock is None or lock.status != LockStatus.ACQUIRED or lock.expires_at != expires_at:
+                return
+            
+            shard.timers.pop(lock_token, None)
+            self._cleanup_expired_lock(shard, lock_token)
+            self.reaped_count += 1
+    
+    def _shard_index(self, resource_key: tuple) -> int:
+        """资源所在的分片编号"""
+        return hash(resource_key) % self.num_shards
+    
+    def _shard_for_resource(self, resource_key: tuple) -> _LeaseShard:
+        """资源所在的分片"""
+        return self._shards[self._shard_index(resource_key)]
+    
+    def _shard_for_token(self, lock_token: str) -> Optional[_LeaseShard]:
+        """锁令牌所在的分片，令牌格式不正确时返回None"""
+        try:
+            index = int(lock_token.rsplit("_", 1)[1])
+        except (AttributeError, IndexError, ValueError):
+            return None
+        if not 0 <= index < self.num_shards:
+            return None
+        return self._shards[index]
+    
+    @staticmethod
+    def _lock_status(lock: WriteLock, now: datetime) -> Dict[str, Any]:
+        """锁状态字典"""
+        return {
+            "lock_token": lock.lock_token,
+            "resource_id": lock.resource_id,
+            "resource_type": lock.resource_type,
+            "teacher_id": lock.teacher_id,
+            "status": lock.status.value,
+            "acquired_at": lock.acquired_at.isoformat(),
+            "expires_at": lock.expires_at.isoformat(),
+            "last_renewed_at": lock.last_renewed_at.isoformat(),
+            "is_expired": now >= lock.expires_at,
+            "remaining_seconds": max(0, int((lock.expires_at - now).total_seconds())),
+            "has_edited_data": lock.edited_data is not None
+        }